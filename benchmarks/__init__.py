@@ -0,0 +1,13 @@
+# Copyright (c) 2020 NVIDIA Corporation
+"""
+Throughput and latency benchmarks of NeMo collections.
+
+All inputs are synthetic and generated from fixed seeds, so the benchmarks
+run on CPU without any downloads. Run them from the repository root with:
+
+    python -m benchmarks.run_benchmarks --output results.json
+
+and compare two runs with:
+
+    python -m benchmarks.run_benchmarks --output new.json --baseline old.json
+"""
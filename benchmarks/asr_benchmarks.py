@@ -0,0 +1,140 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import json
+import os
+import tempfile
+
+import numpy as np
+import soundfile as sf
+import torch
+from ruamel.yaml import YAML
+
+import nemo.collections.asr as nemo_asr
+from benchmarks.common import benchmark, measure, perturb_sentences, random_sentences, seed_everything
+from nemo.collections.asr.helpers import post_process_predictions
+from nemo.collections.asr.metrics import word_error_rate
+
+LABELS = list(" abcdefghijklmnopqrstuvwxyz'")
+QUARTZNET_CONFIG = os.path.join(os.path.dirname(__file__), "..", "examples", "asr", "configs", "quartznet5x3.yaml")
+
+
+def _write_manifest(folder, num_files, sample_rate=16000, min_duration=1.0, max_duration=4.0, seed=0):
+    rng = np.random.RandomState(seed)
+    texts = random_sentences(num_files, seed=seed)
+    manifest = os.path.join(folder, "manifest.json")
+    with open(manifest, "w") as f:
+        for i, text in enumerate(texts):
+            duration = rng.uniform(min_duration, max_duration)
+            samples = (0.1 * rng.randn(int(duration * sample_rate))).astype(np.float32)
+            path = os.path.join(folder, f"{i}.wav")
+            sf.write(path, samples, sample_rate)
+            f.write(json.dumps({"audio_filepath": path, "duration": duration, "text": text}) + "\n")
+    return manifest
+
+
+@benchmark("asr/data_layer/AudioToTextDataLayer")
+def audio_to_text_data_layer(args):
+    num_files, batch_size = 64, 16
+    with tempfile.TemporaryDirectory() as folder:
+        manifest = _write_manifest(folder, num_files, seed=args.seed)
+        data_layer = nemo_asr.AudioToTextDataLayer(
+            manifest_filepath=manifest, labels=LABELS, batch_size=batch_size, shuffle=False
+        )
+
+        def run():
+            for _ in data_layer.data_iterator:
+                pass
+
+        return measure(
+            run, num_files, "samples", args.repeat, args.warmup, {"num_files": num_files, "batch_size": batch_size}
+        )
+
+
+@benchmark("asr/preprocessor/AudioToMelSpectrogramPreprocessor")
+def mel_spectrogram_preprocessor(args):
+    seed_everything(args.seed)
+    batch_size, duration, sample_rate = 8, 10.0, 16000
+    preprocessor = nemo_asr.AudioToMelSpectrogramPreprocessor(sample_rate=sample_rate, dither=0.0)
+    signal = 0.1 * torch.randn(batch_size, int(duration * sample_rate))
+    lengths = torch.full((batch_size,), signal.size(1), dtype=torch.long)
+    num_frames = batch_size * (signal.size(1) // preprocessor.featurizer.hop_length + 1)
+
+    def run():
+        with torch.no_grad():
+            preprocessor.forward(signal, lengths)
+
+    return measure(
+        run, num_frames, "frames", args.repeat, args.warmup, {"batch_size": batch_size, "duration": duration}
+    )
+
+
+@benchmark("asr/decoding/greedy_ctc")
+def greedy_ctc_decoding(args):
+    seed_everything(args.seed)
+    batch_size, time_steps = 32, 500
+    decoder = nemo_asr.GreedyCTCDecoder()
+    log_probs = torch.randn(batch_size, time_steps, len(LABELS) + 1).log_softmax(dim=-1)
+
+    def run():
+        predictions = decoder.forward(log_probs=log_probs)
+        post_process_predictions([predictions], LABELS)
+
+    return measure(
+        run, batch_size * time_steps, "frames", args.repeat, args.warmup, {"batch_size": batch_size},
+    )
+
+
+@benchmark("asr/metrics/word_error_rate")
+def wer(args):
+    references = random_sentences(2000, seed=args.seed)
+    hypotheses = perturb_sentences(references, seed=args.seed)
+    num_words = sum(len(r.split()) for r in references)
+
+    def run():
+        word_error_rate(hypotheses, references)
+
+    return measure(run, num_words, "words", args.repeat, args.warmup, {"num_sentences": len(references)})
+
+
+def _encoder_benchmark(args, fused=False, script=False):
+    seed_everything(args.seed)
+    batch_size, duration = 4, 10.0
+    with open(QUARTZNET_CONFIG) as f:
+        config = YAML(typ="safe").load(f)
+    encoder = nemo_asr.JasperEncoder(
+        feat_in=config["AudioToMelSpectrogramPreprocessor"]["features"], **config["JasperEncoder"]
+    )
+    encoder.eval()
+    num_frames = int(duration * 100)
+    audio_signal = torch.randn(batch_size, config["AudioToMelSpectrogramPreprocessor"]["features"], num_frames)
+    audio_signal = audio_signal.to(encoder._device)
+    # one full length utterance, the others padded
+    length = torch.tensor([num_frames - 100 * i for i in range(batch_size)], device=encoder._device)
+    module = encoder.fused_for_inference(script=script) if fused else encoder.forward
+
+    def run():
+        with torch.no_grad():
+            module(audio_signal, length)
+
+    return measure(
+        run,
+        batch_size * num_frames,
+        "frames",
+        args.repeat,
+        args.warmup,
+        {"batch_size": batch_size, "duration": duration, "fused": fused, "script": script},
+    )
+
+
+@benchmark("asr/encoder/QuartzNet5x3")
+def quartznet_encoder(args):
+    return _encoder_benchmark(args)
+
+
+@benchmark("asr/encoder/QuartzNet5x3_fused")
+def quartznet_encoder_fused(args):
+    return _encoder_benchmark(args, fused=True)
+
+
+@benchmark("asr/encoder/QuartzNet5x3_fused_script")
+def quartznet_encoder_fused_script(args):
+    return _encoder_benchmark(args, fused=True, script=True)
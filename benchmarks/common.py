@@ -0,0 +1,106 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import random
+import time
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+__all__ = ['BENCHMARKS', 'benchmark', 'measure', 'seed_everything', 'random_sentences', 'perturb_sentences']
+
+# name -> function(args) returning measurement dict, in registration order
+BENCHMARKS = OrderedDict()
+
+
+def benchmark(name):
+    """Registers a benchmark function under name, e.g. 'asr/preprocessor'.
+
+    The function gets parsed command line arguments and returns the result of
+    measure(), optionally extended with extra fields such as parameters."""
+
+    def register(fn):
+        if name in BENCHMARKS:
+            raise ValueError(f"Benchmark {name} is already registered")
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+def measure(run, num_units, unit, repeat=5, warmup=1, params=None):
+    """
+    Calls run() warmup + repeat times and reports throughput of the median
+    call.
+
+    Args:
+        run (callable): function without arguments to time
+        num_units (int): number of units (samples, frames, tokens...)
+            processed by one call of run
+        unit (str): name of the units
+        repeat (int): number of timed calls
+        warmup (int): number of calls which are not timed
+        params (dict): parameters of the benchmark to report
+
+    Returns:
+        dict with throughput in units per second, median and min latency in
+        ms and all timings
+    """
+    for _ in range(warmup):
+        run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    median = float(np.median(times))
+    return {
+        "unit": unit,
+        "units_per_call": num_units,
+        "throughput": num_units / median if median > 0 else float("inf"),
+        "median_ms": median * 1000.0,
+        "min_ms": min(times) * 1000.0,
+        "times_ms": [t * 1000.0 for t in times],
+        "params": params or {},
+    }
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def random_sentences(num_sentences, min_words=4, max_words=20, vocab_size=1000, seed=0):
+    """Deterministic synthetic sentences from a vocabulary of lowercase
+    pseudo-words with Zipf-like frequencies."""
+    rng = np.random.RandomState(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocab = ["".join(rng.choice(letters, rng.randint(2, 9))) for _ in range(vocab_size)]
+    probs = 1.0 / np.arange(1, vocab_size + 1)
+    probs /= probs.sum()
+    sentences = []
+    for _ in range(num_sentences):
+        words = rng.choice(vocab_size, rng.randint(min_words, max_words + 1), p=probs)
+        sentences.append(" ".join(vocab[w] for w in words))
+    return sentences
+
+
+def perturb_sentences(sentences, error_rate=0.2, seed=0):
+    """Deterministically deletes, duplicates or swaps words of sentences to
+    get hypotheses which partially match them."""
+    rng = np.random.RandomState(seed)
+    perturbed = []
+    for sentence in sentences:
+        words = sentence.split()
+        result = []
+        for i, word in enumerate(words):
+            r = rng.rand()
+            if r < error_rate / 3:
+                continue
+            result.append(word)
+            if r < 2 * error_rate / 3:
+                result.append(word)
+            elif r < error_rate and i + 1 < len(words):
+                result[-1] = words[i + 1]
+        perturbed.append(" ".join(result))
+    return perturbed
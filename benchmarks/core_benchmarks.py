@@ -0,0 +1,99 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import torch
+
+import nemo
+from benchmarks.common import benchmark, measure, seed_everything
+from nemo.backends.pytorch.tutorials import MSELoss, TaylorNet
+from nemo.core.neural_types import AxisType, BatchTag, ChannelTag, NeuralType
+
+NUM_MODULES = 8
+
+
+def _build_dag(size, batch_size):
+    data_layer = nemo.backends.pytorch.common.ZerosDataLayer(
+        size=size,
+        dtype=torch.FloatTensor,
+        batch_size=batch_size,
+        output_ports={
+            "x": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag, dim=1)}),
+            "y": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag, dim=1)}),
+        },
+    )
+    modules = [TaylorNet(dim=4) for _ in range(NUM_MODULES)]
+    x, y = data_layer()
+    y_pred = x
+    for module in modules:
+        y_pred = module(x=y_pred)
+    loss = MSELoss()(predictions=y_pred, target=y)
+    return modules, x, y_pred, loss
+
+
+def _modules_forward(modules, x):
+    with torch.no_grad():
+        for module in modules:
+            x = module.forward(x)
+    return x
+
+
+@benchmark("core/dag_overhead/infer")
+def infer_overhead(args):
+    """Time of PtActions.infer() per batch on top of the forward passes."""
+    seed_everything(args.seed)
+    size, batch_size = 512, 8
+    modules, _, y_pred, _ = _build_dag(size, batch_size)
+    num_batches = size // batch_size
+    x = torch.zeros(batch_size, 1)
+    nf = nemo.core.NeuralModuleFactory.get_default_factory()
+
+    forward = measure(lambda: [_modules_forward(modules, x) for _ in range(num_batches)], num_batches, "batches")
+    result = measure(
+        lambda: nf.infer(tensors=[y_pred], verbose=False),
+        num_batches,
+        "batches",
+        args.repeat,
+        args.warmup,
+        {"num_modules": NUM_MODULES, "batch_size": batch_size},
+    )
+    result["overhead_per_batch_ms"] = (result["median_ms"] - forward["median_ms"]) / num_batches
+    return result
+
+
+@benchmark("core/dag_overhead/train")
+def train_overhead(args):
+    seed_everything(args.seed)
+    size, batch_size = 512, 8
+    _, _, _, loss = _build_dag(size, batch_size)
+    nf = nemo.core.NeuralModuleFactory.get_default_factory()
+
+    def run():
+        nf.train(
+            tensors_to_optimize=[loss],
+            optimizer="sgd",
+            optimization_params={"num_epochs": 1, "lr": 1e-4},
+            reset=True,
+        )
+
+    params = {"num_modules": NUM_MODULES, "batch_size": batch_size}
+    return measure(run, size // batch_size, "steps", args.repeat, args.warmup, params)
+
+
+@benchmark("core/dag_overhead/compile_inference")
+def compiled_inference_overhead(args):
+    seed_everything(args.seed)
+    num_calls, batch_size = 1000, 8
+    modules, x_tensor, y_pred, _ = _build_dag(batch_size, batch_size)
+    nf = nemo.core.NeuralModuleFactory.get_default_factory()
+    run_dag = nf.compile_inference(inputs=[x_tensor], outputs=y_pred)
+    x = torch.zeros(batch_size, 1)
+
+    forward = measure(lambda: [_modules_forward(modules, x) for _ in range(num_calls)], num_calls, "calls")
+    result = measure(
+        lambda: [run_dag(x) for _ in range(num_calls)],
+        num_calls,
+        "calls",
+        args.repeat,
+        args.warmup,
+        {"num_modules": NUM_MODULES, "batch_size": batch_size},
+    )
+    result["overhead_per_call_ms"] = (result["median_ms"] - forward["median_ms"]) / num_calls
+    return result
@@ -0,0 +1,47 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import os
+import subprocess
+import sys
+
+from benchmarks.common import benchmark, measure
+
+# Dependencies which importing a collection should not pull in, since
+# collections load their modules on first use
+HEAVY_MODULES = [
+    "torchvision",
+    "transformers",
+    "sentencepiece",
+    "youtokentome",
+    "h5py",
+    "librosa",
+    "matplotlib",
+    "kaldi_io",
+    "inflect",
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Imports module in a fresh interpreter and prints which HEAVY_MODULES it
+# loaded. Timings include interpreter startup, see the torch benchmark.
+CHECK = "import sys; import {module}; print(','.join(m for m in {heavy!r} if m in sys.modules))"
+
+
+def _import_benchmark(module):
+    def run_benchmark(args):
+        command = [sys.executable, "-c", CHECK.format(module=module, heavy=HEAVY_MODULES)]
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+        loaded = []
+
+        def run():
+            output = subprocess.check_output(command, env=env, cwd=ROOT, stderr=subprocess.DEVNULL)
+            loaded[:] = [m for m in output.decode().strip().split(",") if m]
+
+        result = measure(run, 1, "imports", args.repeat, args.warmup, {"module": module})
+        result["heavy_modules_loaded"] = list(loaded)
+        return result
+
+    return run_benchmark
+
+
+for _module in ["torch", "nemo", "nemo.collections.asr", "nemo.collections.nlp", "nemo.collections.tts"]:
+    benchmark(f"core/import/{_module}")(_import_benchmark(_module))
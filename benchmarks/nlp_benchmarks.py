@@ -0,0 +1,231 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import json
+import os
+import tempfile
+from collections import Counter
+
+import numpy as np
+import torch
+
+from benchmarks.common import benchmark, measure, perturb_sentences, random_sentences, seed_everything
+from nemo.collections.nlp.data.datasets.lm_bert_dataset import BertPretrainingDataset, WholeWordMasking
+from nemo.collections.nlp.data.datasets.machine_translation_dataset import TranslationDataset
+from nemo.collections.nlp.data.tokenizers import (
+    CharTokenizer,
+    NemoBertTokenizer,
+    NemoGPT2Tokenizer,
+    SentencePieceTokenizer,
+    WordTokenizer,
+    YouTokenToMeTokenizer,
+)
+from nemo.collections.nlp.metrics.fast_bleu import fast_corpus_bleu
+from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_decoders import TransformerDecoder
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_generators import (
+    BeamSearchSequenceGenerator,
+)
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import TransformerEmbedding
+
+BERT_SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def _write_lines(path, lines):
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def _words(sentences):
+    return sorted({word for sentence in sentences for word in sentence.split()})
+
+
+def _bert_vocab(folder, sentences):
+    letters = sorted({c for sentence in sentences for c in sentence if c != " "})
+    tokens = BERT_SPECIAL_TOKENS + letters + ["##" + c for c in letters] + _words(sentences)[:2000]
+    return _write_lines(os.path.join(folder, "bert_vocab.txt"), tokens)
+
+
+def _gpt2_files(folder, sentences, num_merges=300):
+    """Byte-level vocabulary with merges of the most frequent symbol pairs."""
+    from transformers.tokenization_gpt2 import bytes_to_unicode
+
+    byte_encoder = bytes_to_unicode()
+    vocab = {c: i for i, c in enumerate(byte_encoder.values())}
+    pairs = Counter()
+    for sentence in sentences:
+        for word in sentence.split():
+            symbols = "".join(byte_encoder[b] for b in (" " + word).encode("utf-8"))
+            pairs.update(zip(symbols, symbols[1:]))
+    merges = [pair for pair, _ in pairs.most_common(num_merges)]
+    for first, second in merges:
+        vocab.setdefault(first + second, len(vocab))
+    vocab_file = os.path.join(folder, "gpt2_vocab.json")
+    with open(vocab_file, "w") as f:
+        json.dump(vocab, f)
+    merges_file = _write_lines(
+        os.path.join(folder, "gpt2_merges.txt"), ["#version: 0.2"] + [f"{a} {b}" for a, b in merges]
+    )
+    return vocab_file, merges_file
+
+
+def _create_tokenizer(name, folder, sentences):
+    corpus = _write_lines(os.path.join(folder, "corpus.txt"), sentences)
+    if name == "CharTokenizer":
+        chars = sorted({c for sentence in sentences for c in sentence})
+        return CharTokenizer(_write_lines(os.path.join(folder, "chars.txt"), chars))
+    if name == "WordTokenizer":
+        return WordTokenizer(_write_lines(os.path.join(folder, "words.txt"), _words(sentences)))
+    if name == "SentencePieceTokenizer":
+        import sentencepiece as spm
+
+        prefix = os.path.join(folder, "spm")
+        spm.SentencePieceTrainer.Train(f"--input={corpus} --model_prefix={prefix} --vocab_size=500 --minloglevel=2")
+        return SentencePieceTokenizer(prefix + ".model")
+    if name == "YouTokenToMeTokenizer":
+        import youtokentome as yttm
+
+        model = os.path.join(folder, "yttm.model")
+        yttm.BPE.train(data=corpus, model=model, vocab_size=500, n_threads=1)
+        return YouTokenToMeTokenizer(model)
+    if name == "NemoBertTokenizer":
+        return NemoBertTokenizer(vocab_file=_bert_vocab(folder, sentences))
+    if name == "NemoGPT2Tokenizer":
+        vocab_file, merges_file = _gpt2_files(folder, sentences)
+        return NemoGPT2Tokenizer(vocab_file=vocab_file, merges_file=merges_file)
+    raise ValueError(f"Unknown tokenizer {name}")
+
+
+def _tokenizer_benchmark(name):
+    def run_benchmark(args):
+        sentences = random_sentences(2000, seed=args.seed)
+        with tempfile.TemporaryDirectory() as folder:
+            tokenizer = _create_tokenizer(name, folder, sentences)
+        num_tokens = sum(len(tokenizer.text_to_ids(sentence)) for sentence in sentences)
+
+        def run():
+            for sentence in sentences:
+                tokenizer.text_to_ids(sentence)
+
+        return measure(run, num_tokens, "tokens", args.repeat, args.warmup, {"num_sentences": len(sentences)})
+
+    return run_benchmark
+
+
+for _name in [
+    "CharTokenizer",
+    "WordTokenizer",
+    "SentencePieceTokenizer",
+    "YouTokenToMeTokenizer",
+    "NemoBertTokenizer",
+    "NemoGPT2Tokenizer",
+]:
+    benchmark(f"nlp/tokenizer/{_name}")(_tokenizer_benchmark(_name))
+
+
+@benchmark("nlp/data_layer/BertPretrainingDataset")
+def bert_pretraining_dataset(args):
+    seed_everything(args.seed)
+    num_samples = 256
+    sentences = random_sentences(2000, min_words=8, max_words=40, seed=args.seed)
+    with tempfile.TemporaryDirectory() as folder:
+        tokenizer = NemoBertTokenizer(vocab_file=_bert_vocab(folder, sentences))
+        dataset = BertPretrainingDataset(
+            tokenizer, _write_lines(os.path.join(folder, "train.txt"), sentences), max_seq_length=128
+        )
+
+        def run():
+            for i in range(num_samples):
+                dataset[i]
+
+        return measure(run, num_samples, "samples", args.repeat, args.warmup, {"max_seq_length": 128})
+
+
+def _masking_benchmark(batch_size):
+    def run_benchmark(args):
+        seed_everything(args.seed)
+        num_samples, seq_length = 256, 128
+        sentences = random_sentences(2000, min_words=8, max_words=40, seed=args.seed)
+        with tempfile.TemporaryDirectory() as folder:
+            tokenizer = NemoBertTokenizer(vocab_file=_bert_vocab(folder, sentences))
+        masking = WholeWordMasking(tokenizer)
+        ids = np.full((num_samples, seq_length), masking.pad_id)
+        for i in range(num_samples):
+            sample = tokenizer.text_to_ids(" ".join(sentences[i : i + 8]))[:seq_length]
+            ids[i, : len(sample)] = sample
+        batches = [ids[i : i + batch_size] for i in range(0, num_samples, batch_size)]
+
+        def run():
+            for batch in batches:
+                if batch_size == 1:
+                    masking(batch[0])
+                else:
+                    masking(batch)
+
+        return measure(
+            run, num_samples, "samples", args.repeat, args.warmup, {"batch_size": batch_size, "seq_length": seq_length}
+        )
+
+    return run_benchmark
+
+
+benchmark("nlp/masking/WholeWordMasking_per_sample")(_masking_benchmark(1))
+benchmark("nlp/masking/WholeWordMasking_per_batch")(_masking_benchmark(64))
+
+
+@benchmark("nlp/data_layer/TranslationDataset")
+def translation_dataset(args):
+    sentences = random_sentences(4000, seed=args.seed)
+    targets = random_sentences(4000, seed=args.seed + 1)
+    with tempfile.TemporaryDirectory() as folder:
+        tokenizer = WordTokenizer(_write_lines(os.path.join(folder, "words.txt"), _words(sentences + targets)))
+        src = _write_lines(os.path.join(folder, "train.src"), sentences)
+        tgt = _write_lines(os.path.join(folder, "train.tgt"), targets)
+
+        def run():
+            dataset = TranslationDataset(tokenizer, tokenizer, src, tgt, tokens_in_batch=1024)
+            for i in range(len(dataset)):
+                dataset[i]
+
+        return measure(run, len(sentences), "samples", args.repeat, args.warmup, {"tokens_in_batch": 1024})
+
+
+@benchmark("nlp/decoding/BeamSearchSequenceGenerator")
+def beam_search(args):
+    seed_everything(args.seed)
+    vocab_size, hidden_size, batch_size, src_length = 1000, 256, 8, 32
+    embedding = TransformerEmbedding(vocab_size, hidden_size).eval()
+    decoder = TransformerDecoder(2, hidden_size, inner_size=1024, num_attention_heads=4).eval()
+    log_softmax = torch.nn.Sequential(torch.nn.Linear(hidden_size, vocab_size), torch.nn.LogSoftmax(dim=-1)).eval()
+    generator = BeamSearchSequenceGenerator(
+        embedding, decoder, log_softmax, beam_size=4, max_sequence_length=128, max_delta_length=32
+    )
+    src = torch.randn(batch_size, src_length, hidden_size)
+    src_mask = torch.ones(batch_size, src_length)
+    with torch.no_grad():
+        num_tokens = generator(encoder_hidden_states=src, encoder_input_mask=src_mask).numel()
+
+    def run():
+        with torch.no_grad():
+            generator(encoder_hidden_states=src, encoder_input_mask=src_mask)
+
+    return measure(
+        run, num_tokens, "tokens", args.repeat, args.warmup, {"beam_size": 4, "batch_size": batch_size},
+    )
+
+
+def _bleu_benchmark(bleu_fn):
+    def run_benchmark(args):
+        references = random_sentences(2000, seed=args.seed)
+        hypotheses = perturb_sentences(references, seed=args.seed)
+        num_words = sum(len(r.split()) for r in references)
+
+        def run():
+            bleu_fn(hypotheses, [references])
+
+        return measure(run, num_words, "words", args.repeat, args.warmup, {"num_sentences": len(references)})
+
+    return run_benchmark
+
+
+benchmark("nlp/metrics/corpus_bleu")(_bleu_benchmark(corpus_bleu))
+benchmark("nlp/metrics/fast_corpus_bleu")(_bleu_benchmark(fast_corpus_bleu))
@@ -0,0 +1,168 @@
+# Copyright (c) 2020 NVIDIA Corporation
+"""
+Runs NeMo benchmarks and writes their results as JSON.
+
+Examples:
+
+    # all benchmarks
+    python -m benchmarks.run_benchmarks --output results.json
+
+    # only tokenizers and decoding, compared against an earlier run
+    python -m benchmarks.run_benchmarks --filter "tokenizer|decoding" --baseline results.json
+
+Every result holds the throughput in units per second (samples, frames,
+tokens, words, ...) of the median of --repeat timed calls. Benchmarks which
+need packages that are not installed are reported as skipped.
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import traceback
+
+import torch
+
+import nemo
+
+logging = nemo.logging
+
+BENCHMARK_MODULES = [
+    "benchmarks.import_benchmarks",
+    "benchmarks.core_benchmarks",
+    "benchmarks.asr_benchmarks",
+    "benchmarks.nlp_benchmarks",
+    "benchmarks.tts_benchmarks",
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="NeMo throughput and latency benchmarks")
+    parser.add_argument("--filter", type=str, default=None, help="regex selecting benchmarks to run")
+    parser.add_argument("--list", action="store_true", help="list benchmarks and exit")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed calls")
+    parser.add_argument("--warmup", type=int, default=1, help="number of untimed calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num_threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--device", type=str, default="cpu", choices=["cpu", "gpu"])
+    parser.add_argument("--output", type=str, default=None, help="JSON file to write results to")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON results to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="relative throughput drop reported as regression"
+    )
+    return parser.parse_args()
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_benchmarks():
+    """Imports benchmark modules. Returns registered benchmarks and dict of
+    module -> reason for modules which could not be imported."""
+    unavailable = {}
+    for module in BENCHMARK_MODULES:
+        try:
+            importlib.import_module(module)
+        except ImportError as e:
+            unavailable[module] = str(e)
+    from benchmarks.common import BENCHMARKS
+
+    return BENCHMARKS, unavailable
+
+
+def compare(results, baseline, tolerance):
+    """Returns list of (name, baseline throughput, throughput, ratio) and
+    logs benchmarks which got slower by more than tolerance."""
+    baseline_results = {r["name"]: r for r in baseline["results"] if r.get("status") == "ok"}
+    comparison = []
+    for result in results:
+        old = baseline_results.get(result["name"])
+        if result.get("status") != "ok" or old is None:
+            continue
+        ratio = result["throughput"] / old["throughput"]
+        comparison.append((result["name"], old["throughput"], result["throughput"], ratio))
+        if ratio < 1.0 - tolerance:
+            logging.warning(f"Regression in {result['name']}: {ratio:.2f}x of baseline throughput")
+    return comparison
+
+
+def main():
+    args = parse_args()
+    if args.num_threads is not None:
+        torch.set_num_threads(args.num_threads)
+    placement = nemo.core.DeviceType.GPU if args.device == "gpu" else nemo.core.DeviceType.CPU
+    nemo.core.NeuralModuleFactory(placement=placement, create_tb_writer=False)
+
+    benchmarks, unavailable = load_benchmarks()
+    pattern = re.compile(args.filter) if args.filter else None
+    names = [name for name in benchmarks if pattern is None or pattern.search(name)]
+    if args.list:
+        for name in names:
+            print(name)
+        for module, reason in unavailable.items():
+            print(f"{module} (unavailable: {reason})")
+        return
+
+    results = []
+    for module, reason in unavailable.items():
+        results.append({"name": module, "status": "skipped", "reason": reason})
+    for name in names:
+        logging.info(f"Running {name}")
+        try:
+            result = benchmarks[name](args)
+            result = dict(name=name, status="ok", **result)
+            logging.info(f"{name}: {result['throughput']:.1f} {result['unit']}/s, median {result['median_ms']:.2f} ms")
+        except ImportError as e:
+            result = {"name": name, "status": "skipped", "reason": str(e)}
+            logging.warning(f"Skipped {name}: {e}")
+        except Exception as e:
+            result = {"name": name, "status": "error", "reason": f"{type(e).__name__}: {e}"}
+            logging.error(f"{name} failed:\n{traceback.format_exc()}")
+        results.append(result)
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(),
+            "commit": _git_commit(),
+            "nemo_version": nemo.__version__,
+            "torch_version": torch.__version__,
+            "python_version": platform.python_version(),
+            "platform": platform.platform(),
+            "device": args.device,
+            "num_threads": torch.get_num_threads(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline_commit"] = baseline["meta"].get("commit")
+        report["comparison"] = [
+            {"name": name, "baseline_throughput": old, "throughput": new, "ratio": ratio}
+            for name, old, new, ratio in compare(results, baseline, args.tolerance)
+        ]
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        logging.info(f"Results saved to {args.output}")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import torch
+
+import nemo.collections.tts as nemo_tts
+from benchmarks.common import benchmark, measure, seed_everything
+
+
+@benchmark("tts/decoding/Tacotron2DecoderInfer")
+def tacotron2_decoder_infer(args):
+    seed_everything(args.seed)
+    batch_size, max_decoder_steps = 4, 200
+    decoder = nemo_tts.Tacotron2DecoderInfer(n_mel_channels=80, max_decoder_steps=max_decoder_steps).decoder
+    decoder.eval()
+    with torch.no_grad():
+        # never predict the end of utterance, so that every run decodes
+        # max_decoder_steps frames
+        decoder.gate_layer.linear_layer.bias.fill_(-1e3)
+    memory = torch.randn(batch_size, 60, 512)
+    memory_lengths = torch.tensor([60, 45, 30, 50])
+
+    def infer():
+        # prenet dropout is active during inference, so fix the seed
+        torch.manual_seed(args.seed)
+        with torch.no_grad():
+            return decoder.infer(memory, memory_lengths)
+
+    num_frames = int(infer()[3].sum())
+    return measure(
+        infer,
+        num_frames,
+        "frames",
+        args.repeat,
+        args.warmup,
+        {"batch_size": batch_size, "max_decoder_steps": max_decoder_steps},
+    )
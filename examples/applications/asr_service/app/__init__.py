@@ -1,7 +1,8 @@
 # Copyright (c) 2019 NVIDIA Corporation
 import os
 
-from app import routes  # noqa
+from app.batcher import MicroBatcher
+from app.inference import ASRInferenceModel
 from flask import Flask
 from ruamel.yaml import YAML
 
@@ -11,10 +12,6 @@ import nemo.collections.asr as nemo_asr
 logging = nemo.logging
 
 app = Flask(__name__)
-# make sure WORK_DIR exists before calling your service
-# in this folder, the service will store received .wav files and constructed
-# .json manifests
-WORK_DIR = "<PATH_TO_YOUR_WORKDIR>"
 MODEL_YAML = "<PATH_TO_YOUR_YAML>"
 CHECKPOINT_ENCODER = "<PATH_TO_ENCODER_CHECKPOINT>"
 CHECKPOINT_DECODER = "<PATH_TO_DECODER_CHECKPOINT>"
@@ -22,6 +19,12 @@ CHECKPOINT_DECODER = "<PATH_TO_DECODER_CHECKPOINT>"
 ENABLE_NGRAM = False
 # This is only necessary if ENABLE_NGRAM = True. Otherwise, set to empty string
 LM_PATH = "<PATH_TO_KENLM_BINARY>"
+# Requests arriving within MAX_BATCH_WAIT_MS after the first one are
+# transcribed together in a batch of at most MAX_BATCH_SIZE requests
+MAX_BATCH_SIZE = 16
+MAX_BATCH_WAIT_MS = 10.0
+# Requests are rejected with 503 if MAX_QUEUE_SIZE requests are already waiting
+MAX_QUEUE_SIZE = 64
 
 # Read model YAML
 yaml = YAML(typ="safe")
@@ -41,7 +44,6 @@ jasper_encoder = nemo_asr.JasperEncoder(
 jasper_encoder.restore_from(CHECKPOINT_ENCODER, local_rank=0)
 jasper_decoder = nemo_asr.JasperDecoderForCTC(feat_in=1024, num_classes=len(labels))
 jasper_decoder.restore_from(CHECKPOINT_DECODER, local_rank=0)
-greedy_decoder = nemo_asr.GreedyCTCDecoder()
 
 if ENABLE_NGRAM and os.path.isfile(LM_PATH):
     beam_search_with_lm = nemo_asr.BeamSearchDecoderWithLM(
@@ -49,6 +51,20 @@ if ENABLE_NGRAM and os.path.isfile(LM_PATH):
     )
 else:
     logging.info("Beam search is not enabled")
+    ENABLE_NGRAM = False
+    beam_search_with_lm = None
+
+# Modules stay loaded for the lifetime of the service, all requests go
+# through a single micro-batching worker
+asr_model = ASRInferenceModel(
+    data_preprocessor, jasper_encoder, jasper_decoder, labels=labels, beam_search=beam_search_with_lm
+)
+batcher = MicroBatcher(
+    asr_model.transcribe, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS, max_queue_size=MAX_QUEUE_SIZE,
+).start()
+
+# routes use the objects above, so they are imported last
+from app import routes  # noqa
 
 if __name__ == '__main__':
     app.run()
@@ -0,0 +1,159 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+import nemo
+
+logging = nemo.logging
+
+__all__ = ['ServiceOverloaded', 'LatencyStats', 'MicroBatcher']
+
+
+class ServiceOverloaded(Exception):
+    """Raised when the request queue of MicroBatcher is full."""
+
+    pass
+
+
+class LatencyStats:
+    """
+    Keeps latencies of the last window requests and reports their percentiles.
+
+    Args:
+        window (int): number of the most recent requests to keep
+    """
+
+    def __init__(self, window=1000):
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._num_requests = 0
+
+    def add(self, latency, batch_size):
+        with self._lock:
+            self._latencies.append(latency)
+            self._batch_sizes.append(batch_size)
+            self._num_requests += 1
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Returns number of requests, latency percentiles in ms and mean
+        batch size of the requests in the window."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            batch_sizes = np.array(self._batch_sizes)
+            summary = {'num_requests': self._num_requests}
+        if len(latencies) == 0:
+            return summary
+        for p, value in zip(percentiles, np.percentile(latencies * 1000.0, percentiles)):
+            summary[f'latency_p{p}_ms'] = round(float(value), 2)
+        summary['mean_batch_size'] = round(float(batch_sizes.mean()), 2)
+        return summary
+
+
+class _Request:
+    __slots__ = ['item', 'future', 'arrival']
+
+    def __init__(self, item):
+        self.item = item
+        self.future = Future()
+        self.arrival = time.monotonic()
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching on top of a single worker thread.
+
+    Requests are put into a bounded queue. The worker takes the first waiting
+    request and then keeps collecting requests for at most max_wait_ms or
+    until max_batch_size requests are collected, and processes all of them as
+    a single batch. If the queue is full, new requests are rejected with
+    ServiceOverloaded instead of piling up.
+
+    Args:
+        process_batch (callable): takes a list of items and returns a list of
+            results in the same order
+        max_batch_size (int): maximum number of requests in a batch
+        max_wait_ms (float): how long to wait for more requests after the
+            first request of a batch has arrived
+        max_queue_size (int): maximum number of waiting requests
+        stats_window (int): number of requests used for latency percentiles
+    """
+
+    _STOP = object()
+
+    def __init__(self, process_batch, max_batch_size=16, max_wait_ms=10.0, max_queue_size=64, stats_window=1000):
+        self._process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = LatencyStats(stats_window)
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='MicroBatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(self._STOP)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, item, block_timeout=0.0):
+        """Adds item to the queue and returns a Future with its result.
+        Waits at most block_timeout seconds for a free place in the queue."""
+        request = _Request(item)
+        try:
+            if block_timeout > 0:
+                self._queue.put(request, timeout=block_timeout)
+            else:
+                self._queue.put_nowait(request)
+        except queue.Full:
+            raise ServiceOverloaded(f"{self._queue.maxsize} requests are already waiting")
+        return request.future
+
+    def __call__(self, item, timeout=None, block_timeout=0.0):
+        return self.submit(item, block_timeout=block_timeout).result(timeout)
+
+    def _next_batch(self):
+        first = self._queue.get()
+        if first is self._STOP:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if request is self._STOP:
+                # process collected requests first
+                self._queue.put(request)
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                results = self._process_batch([request.item for request in batch])
+            except Exception as e:
+                logging.error(f"Failed to process batch of {len(batch)} requests: {e}")
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            done = time.monotonic()
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+                self.stats.add(done - request.arrival, len(batch))
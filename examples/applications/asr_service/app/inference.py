@@ -0,0 +1,83 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import io
+
+import torch
+
+from nemo.collections.asr.parts.segment import AudioSegment
+
+__all__ = ['read_audio', 'ASRInferenceModel']
+
+
+def read_audio(data, sample_rate=16000):
+    """Decodes audio file contents (any format supported by soundfile) into
+    float32 samples at the given sample rate."""
+    segment = AudioSegment.from_file(io.BytesIO(data), target_sr=sample_rate)
+    return segment.samples
+
+
+class ASRInferenceModel:
+    """
+    Runs preloaded Jasper/QuartzNet modules on in-memory audio without data
+    layers, DAGs or manifests.
+
+    Args:
+        data_preprocessor: AudioToMelSpectrogramPreprocessor
+        encoder: JasperEncoder with restored weights
+        decoder: JasperDecoderForCTC with restored weights
+        labels (list): labels of the decoder, blank is the last class
+        beam_search: optional BeamSearchDecoderWithLM
+    """
+
+    def __init__(self, data_preprocessor, encoder, decoder, labels, beam_search=None):
+        self.data_preprocessor = data_preprocessor
+        self.encoder = encoder
+        self.decoder = decoder
+        self.labels = labels
+        self.blank_id = len(labels)
+        self.beam_search = beam_search
+        self.device = next(encoder.parameters()).device
+
+        self.data_preprocessor.featurizer.eval()
+        self.encoder.eval()
+        self.decoder.eval()
+
+    def _ctc_greedy_decode(self, predictions, length):
+        text, previous = [], self.blank_id
+        for p in predictions[:length]:
+            if p != previous and p != self.blank_id:
+                text.append(self.labels[p])
+            previous = p
+        return ''.join(text)
+
+    @torch.no_grad()
+    def transcribe(self, requests):
+        """
+        Args:
+            requests: list of (samples, greedy) pairs, where samples is 1-d
+                float32 array of audio samples and greedy tells whether to
+                use greedy decoding instead of beam search with LM
+        Returns:
+            list of transcriptions
+        """
+        lengths = torch.tensor([len(samples) for samples, _ in requests], dtype=torch.long)
+        signal = torch.zeros(len(requests), int(lengths.max()))
+        for i, (samples, _) in enumerate(requests):
+            signal[i, : len(samples)] = torch.from_numpy(samples)
+        signal, lengths = signal.to(self.device), lengths.to(self.device)
+
+        processed, processed_len = self.data_preprocessor.forward(signal, lengths)
+        encoded, encoded_len = self.encoder.forward(processed, processed_len)
+        encoded_len = encoded_len.long()
+        log_probs = self.decoder.forward(encoded)
+
+        predictions = log_probs.argmax(dim=-1).cpu().tolist()
+        lengths = encoded_len.cpu().tolist()
+        results = [self._ctc_greedy_decode(p, n) for p, n in zip(predictions, lengths)]
+
+        beam_ids = [i for i, (_, greedy) in enumerate(requests) if not greedy]
+        if beam_ids and self.beam_search is not None:
+            index = torch.tensor(beam_ids, device=log_probs.device)
+            beams = self.beam_search.forward(log_probs[index], encoded_len[index])[0]
+            for i, beam in zip(beam_ids, beams):
+                results[i] = beam[0][1]
+        return results
@@ -0,0 +1,75 @@
+# Copyright (c) 2020 NVIDIA Corporation
+"""
+Load generator for the ASR service.
+
+Sends audio files to the /transcribe endpoint from several concurrent clients
+and reports throughput and client-side latency percentiles, e.g.:
+
+    python load_generator.py --url http://localhost:5000 --audio a.wav b.wav \
+        --concurrency 16 --num_requests 500
+"""
+import argparse
+import itertools
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load generator for the ASR service")
+    parser.add_argument("--url", type=str, default="http://localhost:5000", help="address of the service")
+    parser.add_argument("--audio", type=str, nargs="+", required=True, help="audio files to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="number of concurrent clients")
+    parser.add_argument("--num_requests", type=int, default=200, help="total number of requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="timeout of a single request")
+    return parser.parse_args()
+
+
+def send(url, data, timeout):
+    """Returns (status, latency in seconds) of a single request."""
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/octet-stream"})
+    start = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, OSError):
+        status = None
+    return status, time.monotonic() - start
+
+
+def main():
+    args = parse_args()
+    url = args.url.rstrip("/")
+    payloads = []
+    for path in args.audio:
+        with open(path, "rb") as f:
+            payloads.append(f.read())
+
+    requests = itertools.islice(itertools.cycle(payloads), args.num_requests)
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(lambda data: send(url + "/transcribe", data, args.timeout), requests))
+    total_time = time.monotonic() - start
+
+    latencies = np.array([latency for status, latency in results if status == 200]) * 1000.0
+    num_rejected = sum(status == 503 for status, _ in results)
+    num_failed = len(results) - len(latencies) - num_rejected
+    print(f"requests: {len(results)}, ok: {len(latencies)}, rejected: {num_rejected}, failed: {num_failed}")
+    print(f"throughput: {len(latencies) / total_time:.2f} requests/s")
+    if len(latencies) > 0:
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"latency ms: p50 {p50:.1f}, p90 {p90:.1f}, p99 {p99:.1f}, max {latencies.max():.1f}")
+
+    with urllib.request.urlopen(url + "/stats", timeout=args.timeout) as response:
+        print("server stats:", json.loads(response.read()))
+
+
+if __name__ == "__main__":
+    main()
@@ -58,6 +58,10 @@ parser.add_argument("--save_step_freq", default=-1, type=int)
 parser.add_argument("--optimizer_kind", default="adam", type=str)
 parser.add_argument("--amp_opt_level", default="O0", type=str, choices=["O0", "O1", "O2"])
 parser.add_argument("--shuffle_data", action='store_true')
+parser.add_argument("--use_cache", action='store_true', help="cache the processed features next to the data")
+parser.add_argument(
+    "--use_bucketing", action='store_true', help="batch training dialogues of similar lengths to reduce padding"
+)
 parser.add_argument("--num_train_samples", default=-1, type=int)
 parser.add_argument("--num_eval_samples", default=-1, type=int)
 parser.add_argument("--grad_norm_clip", type=float, default=10, help="gradient clipping")
@@ -120,6 +124,8 @@ def create_pipeline(num_samples, batch_size, num_gpus, input_dropout, data_prefi
         mode=data_prefix,
         is_training=is_training,
         input_dropout=input_dropout,
+        use_cache=args.use_cache,
+        use_bucketing=args.use_bucketing and is_training,
     )
 
     src_ids, src_lens, tgt_ids, tgt_lens, gate_labels, turn_domain = data_layer()
@@ -62,6 +62,9 @@ parser.add_argument("--predict_last_k", default=16, type=int)
 parser.add_argument("--save_epoch_freq", default=1, type=int)
 parser.add_argument("--save_step_freq", default=-1, type=int)
 parser.add_argument("--interactive", action="store_true")
+parser.add_argument(
+    "--use_memmap", action="store_true", help="tokenize once into a memory-mapped token stream shared by all workers"
+)
 args = parser.parse_args()
 
 """
@@ -118,11 +121,26 @@ log_softmax.mlp.last_linear_layer.weight = encoder.embedding_layer.token_embeddi
 
 
 def create_pipeline(
-    dataset, max_seq_length=args.max_seq_length, batch_step=args.max_seq_length, batch_size=args.batch_size
+    dataset,
+    max_seq_length=args.max_seq_length,
+    batch_step=args.max_seq_length,
+    batch_size=args.batch_size,
+    is_training=False,
 ):
-    data_layer = nemo.collections.nlp.nm.data_layers.lm_transformer_datalayer.LanguageModelingDataLayer(
-        dataset, tokenizer, max_seq_length, batch_size, batch_step
-    )
+    if args.use_memmap:
+        data_layer = nemo.collections.nlp.nm.data_layers.lm_transformer_datalayer.MemmapLanguageModelingDataLayer(
+            dataset,
+            tokenizer,
+            max_seq_length,
+            batch_size,
+            batch_step,
+            shuffle=is_training,
+            random_offset=is_training,
+        )
+    else:
+        data_layer = nemo.collections.nlp.nm.data_layers.lm_transformer_datalayer.LanguageModelingDataLayer(
+            dataset, tokenizer, max_seq_length, batch_size, batch_step
+        )
     src, src_mask, labels = data_layer()
     src_hiddens = encoder(input_ids=src, input_mask_src=src_mask)
     logits = log_softmax(hidden_states=src_hiddens)
@@ -134,6 +152,7 @@ train_loss = create_pipeline(
     args.max_seq_length,
     batch_step=args.max_seq_length,
     batch_size=args.batch_size,
+    is_training=True,
 )
 eval_loss = create_pipeline(
     f"{args.data_dir}/{args.eval_dataset}",
@@ -3,7 +3,15 @@
 This package provides Neural Modules building blocks for building Software
 2.0 projects
 """
-from . import torchvision, tutorials
+from . import tutorials
 from .actions import PtActions
 from .common import *
 from .nm import DataLayerNM, LossNM, NonTrainableNM, TrainableNM
+from .profiler import StepProfiler
+from nemo.utils.lazy_import import lazy_attributes
+
+# torchvision is slow to import and is only needed by its image modules
+__getattr__, __dir__ = lazy_attributes(__name__, submodules=["torchvision"])
+
+# star imports export the eagerly imported names and torchvision, but not the helper
+__all__ = [name for name in globals() if not name.startswith("_") and name != "lazy_attributes"] + ["torchvision"]
@@ -5,6 +5,7 @@ import itertools
 import json
 import os
 from collections import defaultdict
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -14,9 +15,20 @@ import torch.nn as nn
 import torch.optim as optim
 
 from nemo import logging
+from nemo.backends.pytorch.distributed import (
+    DDP_IMPLEMENTATIONS,
+    GradientAccumulator,
+    convert_sync_batchnorm,
+    is_distributed,
+    wrap_ddp,
+)
+from nemo.backends.pytorch.inference import CompiledInference
+from nemo.backends.pytorch.loss_guard import NonFiniteLossGuard
 from nemo.backends.pytorch.module_wrapper import TrainableNeuralModuleWrapper
 from nemo.backends.pytorch.nm import DataLayerNM, TrainableNM
 from nemo.backends.pytorch.optimizers import AdamW, Novograd, master_params
+from nemo.backends.pytorch.samplers import ResumableSampler, find_sampler, items_per_batch
+from nemo.backends.pytorch.streaming import cycle_batches, is_streaming, make_dataloader, num_batches
 from nemo.core import DeploymentFormat, DeviceType, NeuralModule, NmTensor
 from nemo.core.callbacks import ActionCallback, EvaluatorCallback, SimpleLossLoggerCallback
 from nemo.core.neural_factory import Actions, ModelMode, Optimization
@@ -25,9 +37,6 @@ from nemo.utils.helpers import get_checkpoint_from_dir
 
 # these imports will happen on as-needed basis
 amp = None
-convert_syncbn = None
-create_syncbn_process_group = None
-DDP = None
 LARC = None
 FusedLAMB = None
 FusedAdam = None
@@ -40,6 +49,23 @@ AmpOptimizations = {
     Optimization.mxprO3: "O3",
 }
 
+_NO_RECORD = nullcontext()
+
+
+def _no_record(name):
+    return _NO_RECORD
+
+
+def _log_eval_progress(batch, total_batches):
+    """Logs about ten times per evaluation, or at batches 0, 1, 2, 4, 8, ...
+    if the number of batches is not known"""
+    if total_batches is None:
+        if batch & (batch - 1) == 0:
+            logging.info(f"Evaluating batch {batch}")
+    elif total_batches < 10 or batch % int(total_batches / 10) == 0:
+        logging.info(f"Evaluating batch {batch} out of {total_batches}")
+
+
 _float_2_half_req = {
     Optimization.mxprO1,
     Optimization.mxprO2,
@@ -59,29 +85,28 @@ class PtActions(Actions):
                     global amp
                     amp = importlib.import_module('apex.amp')
                 if local_rank is not None:
-                    global convert_syncbn
-                    global create_syncbn_process_group
-                    global DDP
                     global LARC
                     global FusedLAMB
                     global FusedAdam
                     global FusedNovoGrad
                     parallel = importlib.import_module('apex.parallel')
                     apex_optimizer = importlib.import_module('apex.optimizers')
-                    convert_syncbn = parallel.convert_syncbn_model
-                    create_syncbn_process_group = parallel.create_syncbn_process_group
-                    DDP = parallel.DistributedDataParallel
                     LARC = parallel.LARC
                     FusedLAMB = apex_optimizer.FusedLAMB
                     FusedAdam = apex_optimizer.FusedAdam
                     FusedNovoGrad = apex_optimizer.FusedNovoGrad
 
             except ImportError:
-                raise ImportError(
-                    "NVIDIA Apex is necessary for distributed training and"
-                    "mixed precision training. It only works on GPUs."
-                    "Please install Apex from "
-                    "https://www.github.com/nvidia/apex"
+                if optimization_level != Optimization.mxprO0:
+                    raise ImportError(
+                        "NVIDIA Apex is necessary for distributed training and"
+                        "mixed precision training. It only works on GPUs."
+                        "Please install Apex from "
+                        "https://www.github.com/nvidia/apex"
+                    )
+                # distributed float32 training still works with torch DDP
+                logging.warning(
+                    "NVIDIA Apex is not available, distributed training is only supported with train(ddp='torch')"
                 )
 
         super(PtActions, self).__init__(
@@ -97,11 +122,21 @@ class PtActions(Actions):
         self._modules = set()
         self.cache = None
         self.amp_initialized = False
+        self._loss_guard = None
+        self._train_data_layer = None
+        self._train_sampler = None
+        self._pending_data_state = None
 
     @property
     def modules(self):
         return self._modules
 
+    @property
+    def skipped_steps(self):
+        """Number of optimizer steps skipped because of NaN or Inf losses
+        which were read back from the device so far"""
+        return 0 if self._loss_guard is None else self._loss_guard.skipped_steps
+
     def __get_top_sorted_modules_and_dataloader(self, hook):
         """
         Constructs DAG leading to hook and creates its topological order.
@@ -379,8 +414,14 @@ class PtActions(Actions):
         return optimizer
 
     def __nm_graph_forward_pass(
-        self, call_chain, registered_tensors, mode=ModelMode.train, disable_allreduce=False, use_cache=False,
+        self,
+        call_chain,
+        registered_tensors,
+        mode=ModelMode.train,
+        use_cache=False,
+        profiler=None,
     ):
+        record = profiler.record if profiler is not None else _no_record
         for ind in range(1, len(call_chain)):
             if use_cache:
                 in_cache = True
@@ -399,13 +440,6 @@ class PtActions(Actions):
             m_id = call_chain[ind][0].unique_instance_id
             pmodule = self.module_reference_table[m_id][1]
 
-            if self._local_rank is not None:
-                if isinstance(pmodule, DDP):
-                    if disable_allreduce:
-                        pmodule.disable_allreduce()
-                    else:
-                        pmodule.enable_allreduce()
-
             if mode == ModelMode.train:
                 # if module.is_trainable():
                 if isinstance(pmodule, nn.Module):
@@ -423,10 +457,11 @@ class PtActions(Actions):
                 key = nmtensor.unique_name
                 call_set[tensor_name] = registered_tensors[key]
             # actual PyTorch module call with signature
-            if isinstance(self.module_reference_table[m_id][0], TrainableNeuralModuleWrapper,):
-                new_tensors = pmodule(**call_set)
-            else:
-                new_tensors = pmodule(force_pt=True, **call_set)
+            with record(f"forward/{call_chain[ind][0]}"):
+                if isinstance(self.module_reference_table[m_id][0], TrainableNeuralModuleWrapper,):
+                    new_tensors = pmodule(**call_set)
+                else:
+                    new_tensors = pmodule(force_pt=True, **call_set)
 
             if not isinstance(new_tensors, List):
                 if not isinstance(new_tensors, tuple):
@@ -512,30 +547,14 @@ class PtActions(Actions):
                 #     )
                 # )
                 if dl_nm.dataset is not None:
-                    sampler = torch.utils.data.distributed.DistributedSampler(
-                        dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
-                    )
-                    eval_dataloader = torch.utils.data.DataLoader(
-                        dataset=dl_nm.dataset,
-                        sampler=sampler,
-                        num_workers=dl_nm.num_workers,
-                        batch_size=dl_nm.batch_size,
-                        shuffle=False,
-                    )
+                    eval_dataloader, _ = make_dataloader(dl_nm, distributed=True)
                 else:
                     eval_dataloader = dl_nm.data_iterator
-                if hasattr(eval_dataloader, 'sampler'):
+                if hasattr(getattr(eval_dataloader, 'sampler', None), 'set_epoch'):
                     eval_dataloader.sampler.set_epoch(0)
             else:  # Not distributed
                 if dl_nm.dataset is not None:
-                    # Todo: remove local_parameters
-                    eval_dataloader = torch.utils.data.DataLoader(
-                        dataset=dl_nm.dataset,
-                        sampler=None,  # not distributed sampler
-                        num_workers=dl_nm.num_workers,
-                        batch_size=dl_nm.batch_size,
-                        shuffle=dl_nm.shuffle,
-                    )
+                    eval_dataloader, _ = make_dataloader(dl_nm, distributed=False)
                 else:
                     eval_dataloader = dl_nm.data_iterator
             # after this eval_dataloader is ready to be used
@@ -546,10 +565,10 @@ class PtActions(Actions):
             dl_device = dl_nm._device
 
             # Evaluation mini-batch for loop
-            num_batches = len(eval_dataloader)
+            total_batches = num_batches(eval_dataloader)
             for epoch_i, data in enumerate(eval_dataloader, 0):
-                if verbose and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0)):
-                    logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
+                if verbose:
+                    _log_eval_progress(epoch_i, total_batches)
                 tensors = []
                 if isinstance(data, torch.Tensor):
                     data = (data,)
@@ -669,31 +688,16 @@ class PtActions(Actions):
                 #     )
                 # )
                 if dl_nm.dataset is not None:
-                    sampler = torch.utils.data.distributed.DistributedSampler(
-                        dataset=dl_nm.dataset, shuffle=dl_nm.shuffle
-                    )
-                    eval_dataloader = torch.utils.data.DataLoader(
-                        dataset=dl_nm.dataset,
-                        sampler=sampler,
-                        num_workers=dl_nm.num_workers,
-                        batch_size=dl_nm.batch_size,
-                        shuffle=False,
-                    )
+                    eval_dataloader, _ = make_dataloader(dl_nm, distributed=True)
                 else:
                     eval_dataloader = dl_nm.data_iterator
-                eval_dataloader.sampler.set_epoch(0)
+                if hasattr(getattr(eval_dataloader, 'sampler', None), 'set_epoch'):
+                    eval_dataloader.sampler.set_epoch(0)
             elif not use_cache:  # Not distributed and not using cache
                 # Dataloaders are only used if use_cache is False
                 # When caching, the DAG must cache all outputs from dataloader
                 if dl_nm.dataset is not None:
-                    # Todo: remove local_parameters
-                    eval_dataloader = torch.utils.data.DataLoader(
-                        dataset=dl_nm.dataset,
-                        sampler=None,  # not distributed sampler
-                        num_workers=dl_nm.num_workers,
-                        batch_size=dl_nm.batch_size,
-                        shuffle=dl_nm.shuffle,
-                    )
+                    eval_dataloader, _ = make_dataloader(dl_nm, distributed=False)
                 else:
                     eval_dataloader = dl_nm.data_iterator
             # after this eval_dataloader is ready to be used
@@ -708,15 +712,15 @@ class PtActions(Actions):
 
             # Evaluation mini-batch for loop
             if use_cache:
-                num_batches = len(self.cache)
+                total_batches = len(self.cache)
                 loop_iterator = self.cache
             else:
-                num_batches = len(eval_dataloader)
+                total_batches = num_batches(eval_dataloader)
                 loop_iterator = eval_dataloader
 
             for epoch_i, data in enumerate(loop_iterator, 0):
-                if verbose and (num_batches < 10 or (epoch_i % int(num_batches / 10) == 0)):
-                    logging.info(f"Evaluating batch {epoch_i} out of {num_batches}")
+                if verbose:
+                    _log_eval_progress(epoch_i, total_batches)
                 tensors = []
                 if use_cache:
                     registered_e_tensors = data
@@ -815,12 +819,74 @@ class PtActions(Actions):
         """
         self.cache.append(registered_tensors)
 
+    def compile_inference(self, inputs, outputs, device=None):
+        """See NeuralModuleFactory.compile_inference()
+        """
+        return CompiledInference(inputs=inputs, outputs=outputs, device=device)
+
     def clear_cache(self):
         """ Simple helpful function to clear cache by setting self.cache to
         None
         """
         self.cache = None
 
+    def get_state(self, optimizer_state=True):
+        """
+        Returns current state such as step, epoch, optimizer parameters and
+        the position of training in the data
+        Args:
+          optimizer_state (bool): whether to include states of optimizers
+
+        Returns:
+          dict with the state
+        """
+        return {
+            "step": self.step,
+            "epoch_num": self.epoch_num,
+            "optimizer_state": [opt.state_dict() for opt in self.optimizers] if optimizer_state else None,
+            "data_state": self._get_data_state(),
+        }
+
+    def _get_data_state(self):
+        if self._train_data_layer is None:
+            return None
+        return {
+            "sampler": self._train_sampler.state_dict() if self._train_sampler is not None else None,
+            "data_layer": self._train_data_layer.get_state(),
+        }
+
+    def _restore_data_state(self):
+        """Applies the data state of the last set_state to the training data.
+        Samplers continue after the last consumed item of the saved epoch."""
+        data_state, self._pending_data_state = self._pending_data_state, None
+        if data_state is None:
+            return
+        if data_state.get("sampler") is not None:
+            if self._train_sampler is not None:
+                self._train_sampler.load_state_dict(data_state["sampler"])
+            else:
+                logging.warning("The sampler of the training data is not resumable, restarting the epoch.")
+        if data_state.get("data_layer") is not None:
+            self._train_data_layer.set_state(data_state["data_layer"])
+
+    def set_state(self, state: dict):
+        """
+        Sets state returned by get_state(). Missing or empty entries are
+        left unchanged.
+        Args:
+          state (dict): state to set
+        """
+        if "step" in state:
+            self.step = state["step"]
+        if "epoch_num" in state:
+            self.epoch_num = state["epoch_num"]
+        if state.get("optimizer_state"):
+            for opt, opt_chkpt in zip(self.optimizers, state["optimizer_state"]):
+                opt.load_state_dict(opt_chkpt)
+        if state.get("data_state"):
+            # applied to the training data by train()
+            self._pending_data_state = state["data_state"]
+
     def save_state_to(self, path: str):
         """
         Saves current state such as step, epoch and optimizer parameters
@@ -830,12 +896,7 @@ class PtActions(Actions):
         Returns:
 
         """
-        state = {
-            "step": self.step,
-            "epoch_num": self.epoch_num,
-            "optimizer_state": [opt.state_dict() for opt in self.optimizers],
-        }
-        torch.save(state, path)
+        torch.save(self.get_state(), path)
 
     def restore_state_from(self, path: str):
         """
@@ -850,12 +911,7 @@ class PtActions(Actions):
             # map_location could be cuda:<device_id> but cpu seems to be more
             # general since we are also saving step and epoch_num
             # load_state_dict should move the variables to the relevant device
-            checkpoint = torch.load(path, map_location="cpu")
-            self.step = checkpoint["step"]
-            self.epoch_num = checkpoint["epoch_num"]
-            if checkpoint["optimizer_state"]:
-                for opt, opt_chkpt in zip(self.optimizers, checkpoint["optimizer_state"]):
-                    opt.load_state_dict(opt_chkpt)
+            self.set_state(torch.load(path, map_location="cpu"))
         else:
             raise FileNotFoundError("Could not find checkpoint file: {0}".format(path))
 
@@ -1061,23 +1117,30 @@ class PtActions(Actions):
         lr_policy=None,
         batches_per_step=None,
         stop_on_nan_loss=False,
+        rollback_on_nan_loss=False,
         synced_batchnorm=False,
         synced_batchnorm_groupsize=0,
         gradient_predivide=False,
         amp_max_loss_scale=2.0 ** 24,
+        profiler=None,
+        ddp="apex",
+        ddp_bucket_cap_mb=None,
+        ddp_fp16_compression=False,
     ):
         if not optimization_params:
             optimization_params = {}
         num_epochs = optimization_params.get("num_epochs", None)
         max_steps = optimization_params.get("max_steps", None)
+        # epochs of a fixed number of steps, e.g. for streaming datasets
+        steps_per_epoch = optimization_params.get("steps_per_epoch", None)
         if num_epochs is None and max_steps is None:
             raise ValueError("You must specify either max_steps or num_epochs")
         grad_norm_clip = optimization_params.get('grad_norm_clip', None)
 
         if batches_per_step is None:
             batches_per_step = 1
-        # this is necessary because we average gradients over batch
-        bps_scale = torch.FloatTensor([1.0 / batches_per_step]).squeeze()
+        if ddp not in DDP_IMPLEMENTATIONS:
+            raise ValueError(f"ddp must be one of {DDP_IMPLEMENTATIONS}, got {ddp}")
 
         if tensors_to_optimize is None:
             # This is Evaluation Mode
@@ -1177,43 +1240,28 @@ class PtActions(Actions):
                 )
 
         dataNM = training_loop[0][2][0][0]
-        if dataNM.placement == DeviceType.AllGpu:
+        if dataNM.placement == DeviceType.AllGpu or (self._local_rank is not None and dist.is_initialized()):
             # if len(training_loop) > 1:
             #     raise NotImplementedError(
             #         "Distributed training does nor work with multiple "
             #         "optimizers")
             logging.info("Doing distributed training")
             if t_dataset is not None:
-                train_sampler = torch.utils.data.distributed.DistributedSampler(
-                    dataset=t_dataset, shuffle=dataNM.shuffle
-                )
-                train_dataloader = torch.utils.data.DataLoader(
-                    dataset=t_dataset,
-                    sampler=train_sampler,
-                    num_workers=dataNM.num_workers,
-                    batch_size=dataNM.batch_size,
-                    shuffle=False,
-                )
+                train_dataloader, train_sampler = make_dataloader(dataNM, distributed=True)
             else:
                 train_dataloader = dataNM.data_iterator
-                if hasattr(train_dataloader, 'sampler'):
-                    train_sampler = train_dataloader.sampler
-                else:
-                    train_sampler = None
+                train_sampler = find_sampler(train_dataloader)
 
             for train_iter in training_loop:
                 call_chain = train_iter[2]
                 for i in range(1, len(call_chain) - 1):
                     key = call_chain[i][0].unique_instance_id
                     pmodule = self.module_reference_table[key][1]
-                    if not isinstance(pmodule, DDP) and isinstance(pmodule, torch.nn.Module):
-                        gpf = 1
-                        if gradient_predivide:
-                            gpf = dist.get_world_size()
-                        pmodule = DDP(pmodule, gradient_predivide_factor=gpf)
+                    if is_distributed(pmodule) or not isinstance(pmodule, torch.nn.Module):
+                        continue
 
                     # Convert batchnorm modules to synced if applicable
-                    if synced_batchnorm and isinstance(pmodule, torch.nn.Module):
+                    if synced_batchnorm:
                         world_size = dist.get_world_size()
                         if synced_batchnorm_groupsize > 0 and world_size % synced_batchnorm_groupsize != 0:
                             raise ValueError(
@@ -1222,8 +1270,18 @@ class PtActions(Actions):
                                 f" or divide total number of GPUs"
                                 f" ({world_size})."
                             )
-                        process_group = create_syncbn_process_group(synced_batchnorm_groupsize)
-                        pmodule = convert_syncbn(pmodule, process_group=process_group)
+                        pmodule = convert_sync_batchnorm(pmodule, ddp, synced_batchnorm_groupsize)
+
+                    gpf = 1
+                    if gradient_predivide:
+                        gpf = dist.get_world_size()
+                    pmodule = wrap_ddp(
+                        pmodule,
+                        implementation=ddp,
+                        bucket_cap_mb=ddp_bucket_cap_mb,
+                        fp16_compression=ddp_fp16_compression,
+                        gradient_predivide_factor=gpf,
+                    )
 
                     self.module_reference_table[key] = (
                         self.module_reference_table[key][0],
@@ -1232,26 +1290,48 @@ class PtActions(Actions):
         # single GPU/CPU training
         else:
             if t_dataset is not None:
-                train_sampler = None
-                train_dataloader = torch.utils.data.DataLoader(
-                    dataset=t_dataset,
-                    sampler=None,
-                    num_workers=dataNM.num_workers,
-                    batch_size=dataNM.batch_size,
-                    shuffle=dataNM.shuffle,
-                )
+                train_dataloader, train_sampler = make_dataloader(dataNM, distributed=False)
             else:
                 train_dataloader = dataNM.data_iterator
-                train_sampler = None
+                train_sampler = find_sampler(train_dataloader)
+
+        # position in the current epoch, saved in checkpoints by get_state
+        self._train_data_layer = dataNM
+        self._train_sampler = train_sampler if isinstance(train_sampler, ResumableSampler) else None
+        sampled_per_batch = items_per_batch(train_dataloader, train_sampler)
+
+        if steps_per_epoch is not None:
+            # epochs are cut out of one continuing stream of batches
+            train_batches = cycle_batches(train_dataloader, train_sampler)
+        elif is_streaming(dataNM) and dist.is_initialized() and dist.get_world_size() > 1:
+            # ranks run out of their shards of the stream at different steps,
+            # and the others would wait for them in the gradient all-reduce
+            raise ValueError(
+                "Distributed training on a streaming dataset needs steps_per_epoch in optimization_params, so that "
+                "all ranks take the same number of steps."
+            )
+        elif max_steps is None and is_streaming(dataNM):
+            logging.warning(
+                "Training on a streaming dataset without max_steps or steps_per_epoch, epochs end only when "
+                "the stream is exhausted."
+            )
 
         self._init_callbacks(callbacks)
         # Do action start callbacks
         self._perform_on_action_start(callbacks=callbacks)
+        # callbacks may have restored a checkpoint
+        self._restore_data_state()
+
+        record = profiler.record if profiler is not None else _no_record
+        accumulator = GradientAccumulator(
+            batches_per_step, modules=[pmodule for _, pmodule in self.module_reference_table.values()]
+        )
+        use_amp = self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0
 
         # MAIN TRAINING LOOP
         # iteration over epochs
         while num_epochs is None or self.epoch_num < num_epochs:
-            if train_sampler is not None:
+            if train_sampler is not None and steps_per_epoch is None:
                 train_sampler.set_epoch(self.epoch_num)
             if max_steps is not None and self.step >= max_steps:
                 break
@@ -1261,16 +1341,24 @@ class PtActions(Actions):
 
             # iteration over batches in epoch
             batch_counter = 0
-            for _, data in enumerate(train_dataloader, 0):
+            if steps_per_epoch is not None:
+                batches = itertools.islice(train_batches, steps_per_epoch * batches_per_step)
+            else:
+                batches = train_dataloader
+            batches = profiler.iterate(batches) if profiler is not None else batches
+            for _, data in enumerate(batches, 0):
                 if max_steps is not None and self.step >= max_steps:
                     break
+                if self._train_sampler is not None:
+                    self._train_sampler.advance(sampled_per_batch)
 
                 if batch_counter == 0:
                     # Started step, zero gradients
                     curr_optimizer = training_loop[self.step % len(training_loop)][0]
                     curr_optimizer.zero_grad()
                     # Register iteration start with callbacks
-                    self._perform_on_iteration_start(callbacks=callbacks)
+                    with record("callbacks"):
+                        self._perform_on_iteration_start(callbacks=callbacks)
 
                 # set learning rate policy
                 if lr_policy is not None:
@@ -1291,80 +1379,75 @@ class PtActions(Actions):
                 tensors = []
                 if isinstance(data, torch.Tensor):
                     data = (data,)
-                for d in data:
-                    if isinstance(d, torch.Tensor):
-                        tensors.append(d.to(dl_device))
-                    else:
-                        tensors.append(d)
+                with record("to_device"):
+                    for d in data:
+                        if isinstance(d, torch.Tensor):
+                            tensors.append(d.to(dl_device))
+                        else:
+                            tensors.append(d)
 
                 registered_tensors = {
                     t.unique_name: d for t, d in zip(curr_call_chain[0][2].values(), tensors) if t is not None
                 }
-                disable_allreduce = batch_counter < (batches_per_step - 1)
-                self.__nm_graph_forward_pass(
-                    call_chain=curr_call_chain,
-                    registered_tensors=registered_tensors,
-                    disable_allreduce=disable_allreduce,
-                )
-
-                curr_tensors_to_optimize = training_loop[self.step % len(training_loop)][1]
-                final_loss = 0
-                nan = False
-                for tensor in curr_tensors_to_optimize:
-                    if (
-                        torch.isnan(registered_tensors[tensor.unique_name]).any()
-                        or torch.isinf(registered_tensors[tensor.unique_name]).any()
-                    ):
-                        if stop_on_nan_loss:
-                            raise ValueError('Loss is NaN or inf - exiting')
-                        logging.warning('Loss is NaN or inf')
-                        curr_optimizer.zero_grad()
-                        nan = True
-                        break
-                    final_loss += registered_tensors[tensor.unique_name]
-                if nan:
-                    continue
-                if self._optim_level in AmpOptimizations and self._optim_level != Optimization.mxprO0:
-                    with amp.scale_loss(final_loss, curr_optimizer, delay_unscale=disable_allreduce,) as scaled_loss:
-                        if torch.isnan(scaled_loss).any() or torch.isinf(scaled_loss).any():
-                            if stop_on_nan_loss:
-                                raise ValueError('Loss is NaN or inf -' ' exiting')
-                            logging.warning('WARNING: Loss is NaN or inf')
-                            curr_optimizer.zero_grad()
-                            continue
-                        scaled_loss.backward(bps_scale.to(scaled_loss.get_device()))
-                # no AMP optimizations needed
-                else:
-                    # multi-GPU, float32
-                    if self._local_rank is not None:
-                        final_loss.backward(bps_scale.to(final_loss.get_device()))
-                    # single device (CPU or GPU)
+                # gradients are all-reduced only in the last micro-batch of a step
+                with accumulator.micro_batch(batch_counter) as sync:
+                    with record("forward"):
+                        self.__nm_graph_forward_pass(
+                            call_chain=curr_call_chain,
+                            registered_tensors=registered_tensors,
+                            profiler=profiler,
+                        )
+
+                    curr_tensors_to_optimize = training_loop[self.step % len(training_loop)][1]
+                    final_loss = 0
+                    for tensor in curr_tensors_to_optimize:
+                        final_loss += registered_tensors[tensor.unique_name]
+                    if self._loss_guard is None:
+                        self._loss_guard = NonFiniteLossGuard(final_loss.device)
+                    self._loss_guard.stop_on_nonfinite = stop_on_nan_loss
+                    self._loss_guard.rollback = rollback_on_nan_loss
+                    # one check of the summed loss, read back asynchronously
+                    self._loss_guard.check(final_loss)
+                    final_loss = accumulator.scale_loss(final_loss)
+                    if use_amp:
+                        with record("backward"), amp.scale_loss(
+                            final_loss, curr_optimizer, delay_unscale=not sync,
+                        ) as scaled_loss:
+                            scaled_loss.backward()
+                    # no AMP optimizations needed
                     else:
-                        # Fix (workaround?) enabling to backpropagate gradiens on CPUs.
-                        if final_loss.get_device() < 0:
-                            final_loss.backward(bps_scale)
-                        else:
-                            final_loss.backward(bps_scale.to(final_loss.get_device()))
+                        with record("backward"):
+                            final_loss.backward()
 
                 batch_counter += 1
 
                 if batch_counter == batches_per_step:
                     # Ended step. Do optimizer update
-                    if grad_norm_clip is not None:
-                        torch.nn.utils.clip_grad_norm_(master_params(curr_optimizer), grad_norm_clip)
-                    curr_optimizer.step()
+                    with record("optimizer_step"):
+                        if grad_norm_clip is not None:
+                            torch.nn.utils.clip_grad_norm_(master_params(curr_optimizer), grad_norm_clip)
+                        # the step is skipped on the device if the loss was not finite
+                        self._loss_guard.step(curr_optimizer, list(master_params(curr_optimizer)), amp=use_amp)
+                    self._loss_guard.end_step(self.step)
                     batch_counter = 0
                     # Register iteration end with callbacks
-                    self._update_callbacks(
-                        callbacks=callbacks, registered_tensors=registered_tensors,
-                    )
-                    self._perform_on_iteration_end(callbacks=callbacks)
+                    with record("callbacks"):
+                        self._update_callbacks(
+                            callbacks=callbacks, registered_tensors=registered_tensors,
+                        )
+                        self._perform_on_iteration_end(callbacks=callbacks)
+                    if profiler is not None:
+                        profiler.end_step(self.step)
                     self.step += 1
             # End of epoch for loop
             # Register epochs end with callbacks
             self._perform_on_epoch_end(callbacks=callbacks)
             self.epoch_num += 1
+        if self._loss_guard is not None:
+            self._loss_guard.flush()
         self._perform_on_action_end(callbacks=callbacks)
+        if profiler is not None:
+            profiler.close()
 
     def infer(
         self,
@@ -0,0 +1,141 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import numpy as np
+import torch
+from torch.utils.data import Dataset, IterableDataset
+
+from ....core import DeviceType
+from ...pytorch.nm import DataLayerNM
+from ...pytorch.samplers import MixtureSampler
+
+__all__ = ['MixtureDataLayer']
+
+
+class _MixtureDataset(Dataset):
+    """Reads (source, index) items of MixtureSampler from the source datasets"""
+
+    def __init__(self, datasets):
+        Dataset.__init__(self)
+        self.datasets = datasets
+
+    def __getitem__(self, index):
+        source, index = index
+        return self.datasets[source][index]
+
+    def __len__(self):
+        return sum(len(dataset) for dataset in self.datasets)
+
+
+def _dataset_and_collate_fn(data_layer):
+    """Map-style dataset of a data layer and the collate_fn of its DataLoader"""
+    dataset, collate_fn = data_layer.dataset, None
+    if dataset is None:
+        dataset = getattr(data_layer.data_iterator, 'dataset', None)
+        collate_fn = getattr(data_layer.data_iterator, 'collate_fn', None)
+    if dataset is None or isinstance(dataset, IterableDataset):
+        raise ValueError(f"{data_layer} has no map-style dataset and can not be mixed.")
+    return dataset, collate_fn
+
+
+class MixtureDataLayer(DataLayerNM):
+    """
+    Data layer which mixes the datasets of several data layers of the same
+    kind, e.g. AudioToTextDataLayers of different corpora, with given
+    sampling rates.
+
+    The sources are sampled lazily: every epoch draws `num_samples` samples,
+    the source of each with the probability of its source, and reads them by
+    their index in the source dataset. No concatenated list of the sources is
+    built. The mixture only depends on `seed` and the epoch, also in
+    distributed training, where every rank reads its own share of it, and its
+    position is saved in checkpoints (see MixtureSampler).
+
+    Batches are collated with the collate_fn of the DataLoader of the first
+    data layer, if it has one. The data layers to mix are only used for their
+    datasets and must have the same output ports.
+
+    Args:
+        data_layers (list): data layers to mix
+        batch_size (int): batch size
+        weights (list of float): sampling rates of the data layers, normalized
+            to probabilities. Defaults to None, which samples with temperature.
+        temperature (float): if weights are not given, a source of size n is
+            drawn with a probability proportional to n^(1/temperature). 1 samples
+            in proportion to the source sizes, larger temperatures up-sample
+            small sources, up to uniform sampling of the sources.
+            Defaults to 1.0.
+        num_samples (int): number of samples of an epoch over all ranks.
+            Defaults to None, the sum of the sizes of the sources.
+        seed (int): seed of the mixture.
+            Defaults to 0.
+        drop_last (bool): See PyTorch DataLoader.
+            Defaults to False.
+        num_workers (int): See PyTorch DataLoader.
+            Defaults to 0.
+    """
+
+    @property
+    def output_ports(self):
+        """Returns the output ports of the mixed data layers"""
+        return self._data_layers[0].output_ports
+
+    def __init__(
+        self,
+        data_layers,
+        batch_size,
+        weights=None,
+        temperature=1.0,
+        num_samples=None,
+        seed=0,
+        drop_last=False,
+        num_workers=0,
+    ):
+        if not data_layers:
+            raise ValueError("MixtureDataLayer needs at least one data layer.")
+        ports = set(data_layers[0].output_ports)
+        for data_layer in data_layers[1:]:
+            if set(data_layer.output_ports) != ports:
+                raise ValueError(
+                    f"Output ports {sorted(data_layer.output_ports)} of {data_layer} differ from {sorted(ports)}."
+                )
+        self._data_layers = data_layers
+        super().__init__()
+
+        datasets, collate_fns = zip(*(_dataset_and_collate_fn(data_layer) for data_layer in data_layers))
+        sizes = [len(dataset) for dataset in datasets]
+        if weights is None:
+            if temperature <= 0:
+                raise ValueError(f"temperature must be positive, got {temperature}.")
+            weights = np.asarray(sizes, dtype=np.float64) ** (1.0 / temperature)
+        self._dataset = _MixtureDataset(list(datasets))
+        self._num_samples = num_samples if num_samples is not None else sum(sizes)
+
+        if self._placement == DeviceType.AllGpu:
+            sampler = MixtureSampler(sizes, weights, self._num_samples, seed=seed)
+        else:
+            sampler = MixtureSampler(sizes, weights, self._num_samples, num_replicas=1, rank=0, seed=seed)
+        self._batch_size = batch_size
+        self._num_workers = num_workers
+        self._dataloader = torch.utils.data.DataLoader(
+            dataset=self._dataset,
+            batch_size=batch_size,
+            collate_fn=collate_fns[0],
+            drop_last=drop_last,
+            sampler=sampler,
+            num_workers=num_workers,
+        )
+
+    @property
+    def probabilities(self):
+        """Probability of every data layer to be sampled"""
+        return self._dataloader.sampler.probabilities.tolist()
+
+    def __len__(self):
+        return self._num_samples
+
+    @property
+    def dataset(self):
+        return None
+
+    @property
+    def data_iterator(self):
+        return self._dataloader
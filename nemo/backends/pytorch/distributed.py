@@ -0,0 +1,170 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import importlib
+from contextlib import ExitStack, contextmanager
+
+import torch
+import torch.distributed as dist
+from torch.nn.parallel import DistributedDataParallel as TorchDDP
+
+__all__ = ['DDP_IMPLEMENTATIONS', 'GradientAccumulator', 'convert_sync_batchnorm', 'is_distributed', 'wrap_ddp']
+
+DDP_IMPLEMENTATIONS = ("apex", "torch")
+
+_apex_parallel = None
+
+
+def _get_apex_parallel(required=True):
+    global _apex_parallel
+    if _apex_parallel is None:
+        try:
+            _apex_parallel = importlib.import_module('apex.parallel')
+        except ImportError:
+            if required:
+                raise ImportError(
+                    "NVIDIA Apex is necessary for ddp='apex'. Please install Apex from "
+                    "https://www.github.com/nvidia/apex or use ddp='torch'."
+                )
+            return None
+    return _apex_parallel
+
+
+def is_distributed(module):
+    """True if module is wrapped into apex or torch DistributedDataParallel"""
+    if isinstance(module, TorchDDP):
+        return True
+    apex_parallel = _get_apex_parallel(required=False)
+    return apex_parallel is not None and isinstance(module, apex_parallel.DistributedDataParallel)
+
+
+def wrap_ddp(
+    module, implementation="apex", bucket_cap_mb=None, fp16_compression=False, gradient_predivide_factor=1.0,
+):
+    """
+    Wraps module into DistributedDataParallel. Both implementations all-reduce
+    gradients in buckets while the backward pass is still running, so that
+    communication overlaps with computation.
+
+    Args:
+        module (torch.nn.Module): module to wrap
+        implementation (str): "apex" for apex.parallel.DistributedDataParallel
+            or "torch" for torch.nn.parallel.DistributedDataParallel, which
+            also works with the gloo backend on CPU
+        bucket_cap_mb (float): size of gradient buckets in megabytes.
+            Defaults to the implementation's default (25MB for torch, 1e7
+            elements for apex). Larger buckets mean fewer, more efficient
+            all-reduce calls but less overlap with the backward pass.
+        fp16_compression (bool): cast gradients to fp16 for the all-reduce
+            and back afterwards, which halves the communication volume.
+            Only supported with implementation="torch".
+        gradient_predivide_factor (float): apex only, divide gradients by
+            this factor before and by world_size / factor after all-reduce.
+            torch DistributedDataParallel always divides before all-reduce.
+
+    Returns:
+        wrapped module or module itself if it has no trainable parameters and
+        implementation is "torch"
+    """
+    if implementation not in DDP_IMPLEMENTATIONS:
+        raise ValueError(
+            f"Unknown DistributedDataParallel implementation {implementation}, use one of {DDP_IMPLEMENTATIONS}"
+        )
+    if implementation == "apex":
+        if fp16_compression:
+            raise ValueError("fp16 gradient compression is only supported with ddp='torch'")
+        kwargs = {"gradient_predivide_factor": gradient_predivide_factor}
+        if bucket_cap_mb is not None:
+            # apex measures buckets in number of elements
+            kwargs["message_size"] = int(bucket_cap_mb * 2 ** 20 / 4)
+        return _get_apex_parallel().DistributedDataParallel(module, **kwargs)
+
+    params = [p for p in module.parameters() if p.requires_grad]
+    if not params:
+        # torch DDP refuses modules without trainable parameters
+        return module
+    kwargs = {}
+    if bucket_cap_mb is not None:
+        kwargs["bucket_cap_mb"] = bucket_cap_mb
+    device_ids = [params[0].device.index] if params[0].is_cuda else None
+    ddp_module = TorchDDP(module, device_ids=device_ids, **kwargs)
+    if fp16_compression:
+        from torch.distributed.algorithms.ddp_comm_hooks import default_hooks
+
+        ddp_module.register_comm_hook(state=None, hook=default_hooks.fp16_compress_hook)
+    return ddp_module
+
+
+def _torch_syncbn_process_group(group_size):
+    if group_size == 0:
+        return None
+    world_size, rank = dist.get_world_size(), dist.get_rank()
+    process_group = None
+    # every rank has to take part in the creation of every group
+    for start in range(0, world_size, group_size):
+        ranks = list(range(start, start + group_size))
+        group = dist.new_group(ranks)
+        if rank in ranks:
+            process_group = group
+    return process_group
+
+
+def convert_sync_batchnorm(module, implementation="apex", group_size=0):
+    """Converts batch norm layers of module to synchronized batch norm
+    layers, which compute statistics over groups of group_size workers (or
+    all workers if group_size is 0). Must be called before wrap_ddp()."""
+    if implementation == "apex":
+        apex_parallel = _get_apex_parallel()
+        process_group = apex_parallel.create_syncbn_process_group(group_size)
+        return apex_parallel.convert_syncbn_model(module, process_group=process_group)
+    return torch.nn.SyncBatchNorm.convert_sync_batchnorm(module, _torch_syncbn_process_group(group_size))
+
+
+class GradientAccumulator:
+    """
+    Accumulates gradients of `batches_per_step` micro-batches before every
+    optimizer step.
+
+    Gradients of distributed modules are all-reduced only in the backward
+    pass of the last micro-batch of a step, which overlaps the bucketed
+    all-reduce with that backward pass. Earlier micro-batches run inside
+    `no_sync()` of torch DistributedDataParallel or with disabled all-reduce
+    of apex DistributedDataParallel, so they don't communicate at all.
+
+    Losses are scaled by 1 / batches_per_step with a python float, so the
+    accumulated gradients are averages over the micro-batches without any
+    host to device copies.
+
+    Args:
+        batches_per_step (int): number of micro-batches per optimizer step
+        modules (list): modules of the DAG, wrapped ones are synchronized
+    """
+
+    def __init__(self, batches_per_step=1, modules=()):
+        if batches_per_step < 1:
+            raise ValueError(f"batches_per_step must be positive, got {batches_per_step}")
+        self.batches_per_step = batches_per_step
+        self.distributed_modules = [module for module in modules if is_distributed(module)]
+
+    def is_last(self, batch_counter):
+        """True if batch_counter-th (0-based) micro-batch ends the step"""
+        return batch_counter == self.batches_per_step - 1
+
+    def scale_loss(self, loss):
+        if self.batches_per_step == 1:
+            return loss
+        return loss * (1.0 / self.batches_per_step)
+
+    @contextmanager
+    def micro_batch(self, batch_counter):
+        """Context for forward and backward pass of a micro-batch. Gradients
+        are all-reduced only if it is the last micro-batch of the step."""
+        sync = self.is_last(batch_counter)
+        with ExitStack() as stack:
+            for module in self.distributed_modules:
+                if isinstance(module, TorchDDP):
+                    if not sync:
+                        stack.enter_context(module.no_sync())
+                elif sync:
+                    module.enable_allreduce()
+                else:
+                    module.disable_allreduce()
+            yield sync
@@ -0,0 +1,163 @@
+# Copyright (c) 2020 NVIDIA Corporation
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from nemo.backends.pytorch.module_wrapper import TrainableNeuralModuleWrapper
+from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.core import NmTensor
+
+__all__ = ['CompiledInference']
+
+
+class CompiledInference:
+    """
+    Callable which runs a fixed part of a NeMo DAG on in-memory values.
+
+    The DAG between `inputs` and `outputs` is traversed and sorted only once,
+    when the object is created. Each call then just feeds the given values
+    through the precomputed list of module calls, without data layers,
+    DataLoaders or callbacks, so the per-call overhead is a few microseconds
+    per module. Use NeuralModuleFactory.compile_inference() to create it.
+
+    Args:
+        inputs: dict of name -> NmTensor, or list of NmTensors (in which case
+            their port names are used as names). Values for these tensors are
+            passed to __call__, either by name or positionally in this order.
+        outputs: NmTensor or list of NmTensors to compute
+        device (torch.device): device to move inputs to. Defaults to the
+            device of the first module with parameters.
+    """
+
+    def __init__(self, inputs, outputs, device=None):
+        if isinstance(inputs, (list, tuple)):
+            named_inputs = OrderedDict()
+            for tensor in inputs:
+                if tensor.name in named_inputs:
+                    raise ValueError(
+                        f"Two input tensors are named '{tensor.name}', "
+                        "please pass inputs as a dict of name -> NmTensor"
+                    )
+                named_inputs[tensor.name] = tensor
+            inputs = named_inputs
+        self._single_output = isinstance(outputs, NmTensor)
+        outputs = [outputs] if self._single_output else list(outputs)
+
+        self.input_names = list(inputs.keys())
+        slots = {}
+        for tensor in inputs.values():
+            slots.setdefault(tensor.unique_name, len(slots))
+        self._input_slots = [slots[tensor.unique_name] for tensor in inputs.values()]
+
+        # Nodes are (module, call arguments) pairs, as the same module can be
+        # called several times inside one DAG
+        nodes = OrderedDict()
+
+        def visit(tensor):
+            if tensor.unique_name in slots:
+                return
+            producer = tensor.producer
+            args = tensor.producer_args or {}
+            if not args:
+                kind = "data layer" if isinstance(producer, DataLayerNM) else "module without inputs"
+                raise ValueError(
+                    f"Output depends on '{tensor.name}' produced by {kind} {producer}, which is not among inputs"
+                )
+            for arg in args.values():
+                visit(arg)
+            key = (producer.unique_instance_id, tuple((port, arg.unique_name) for port, arg in args.items()))
+            if key not in nodes:
+                nodes[key] = (producer, args, {})
+            nodes[key][2][tensor.name] = tensor
+            # produced tensors get their slots after all the arguments
+            for name, node_tensor in nodes[key][2].items():
+                slots.setdefault(node_tensor.unique_name, len(slots))
+
+        for tensor in outputs:
+            visit(tensor)
+
+        self._plan = []
+        self._modules = []
+        for module, args, produced in nodes.values():
+            if isinstance(module, TrainableNeuralModuleWrapper):
+                call, pt_module = module._pt_module, module._pt_module
+            else:
+                call = module
+                pt_module = module if isinstance(module, nn.Module) else None
+            if pt_module is not None and pt_module not in self._modules:
+                self._modules.append(pt_module)
+            port_names = list(module.output_ports.keys())
+            call_args = tuple((port, slots[arg.unique_name]) for port, arg in args.items())
+            results = tuple((port_names.index(name), slots[tensor.unique_name]) for name, tensor in produced.items())
+            force_pt = not isinstance(module, TrainableNeuralModuleWrapper)
+            self._plan.append((call, force_pt, call_args, results))
+        self._output_slots = [slots[tensor.unique_name] for tensor in outputs]
+        self._num_slots = len(slots)
+
+        if device is None:
+            device = torch.device("cpu")
+            for module in self._modules:
+                parameter = next(module.parameters(), None)
+                if parameter is not None:
+                    device = parameter.device
+                    break
+        self.device = device
+        self.eval()
+
+    @property
+    def modules(self):
+        """PyTorch modules used by this callable."""
+        return list(self._modules)
+
+    def eval(self):
+        for module in self._modules:
+            module.eval()
+        return self
+
+    def _to_tensor(self, value):
+        if isinstance(value, torch.Tensor):
+            return value.to(self.device, non_blocking=True)
+        if isinstance(value, np.ndarray):
+            return torch.from_numpy(value).to(self.device, non_blocking=True)
+        return torch.as_tensor(value, device=self.device)
+
+    def __call__(self, *args, **kwargs):
+        """Computes outputs for the given input values, which can be torch
+        tensors or numpy arrays.
+
+        Returns:
+            torch tensor if a single NmTensor was passed as outputs, list of
+            torch tensors otherwise
+        """
+        if len(args) + len(kwargs) != len(self.input_names):
+            raise ValueError(f"Expected values for {self.input_names}, got {len(args) + len(kwargs)} values")
+        values = [None] * self._num_slots
+        for slot, value in zip(self._input_slots, args):
+            values[slot] = self._to_tensor(value)
+        for name, slot in zip(self.input_names[len(args) :], self._input_slots[len(args) :]):
+            if name not in kwargs:
+                raise ValueError(f"Missing value for input '{name}'")
+            values[slot] = self._to_tensor(kwargs[name])
+
+        # modules could have been switched to training mode since the last call
+        for module in self._modules:
+            if module.training:
+                module.eval()
+
+        with torch.no_grad():
+            for call, force_pt, call_args, results in self._plan:
+                call_set = {port: values[slot] for port, slot in call_args}
+                if force_pt:
+                    new_tensors = call(force_pt=True, **call_set)
+                else:
+                    new_tensors = call(**call_set)
+                if not isinstance(new_tensors, (list, tuple)):
+                    new_tensors = (new_tensors,)
+                for index, slot in results:
+                    values[slot] = new_tensors[index]
+
+        if self._single_output:
+            return values[self._output_slots[0]]
+        return [values[slot] for slot in self._output_slots]
@@ -0,0 +1,175 @@
+# Copyright (c) 2020 NVIDIA Corporation
+from collections import deque
+
+import torch
+import torch.distributed as dist
+
+from nemo import logging
+
+__all__ = ['NonFiniteLossGuard']
+
+
+class NonFiniteLossGuard:
+    """
+    Detects NaN or Inf losses without blocking the host on the device.
+
+    Finiteness of all micro-batch losses of a step is folded into a single
+    boolean tensor on the device, which gates the optimizer step on the
+    device as well:
+
+    * optimizers which support AMP's inf check, like the fused torch
+      optimizers, get the flag as their `found_inf` and skip the whole step,
+      state included
+    * the gradients of other optimizers are zeroed, so a non-finite loss
+      never reaches the parameters. Momentum and weight decay of the step
+      still apply.
+    * under apex AMP, a non-finite loss overflows the scaled gradients and
+      amp skips the step itself
+
+    With `rollback`, the parameters and the optimizer state on the device are
+    instead copied before every step and selected back if the step saw a
+    non-finite loss, so a skipped step changes neither the parameters nor
+    momentum or running averages. This costs a copy of the parameters and
+    of the optimizer state in memory and time on every step.
+
+    The outcome of every step is copied to pinned host memory asynchronously
+    and inspected once the copy has finished, usually during one of the
+    following steps. This updates the counters `skipped_steps` and
+    `nonfinite_steps` (list of skipped step numbers), which callbacks can
+    read through `ActionCallback.skipped_steps`.
+
+    Args:
+        device (torch.device): device of the losses
+        stop_on_nonfinite (bool): raise ValueError once a non-finite loss is
+            read back, which can happen a few steps after it occurred
+        rollback (bool): undo skipped steps from copies of the parameters and
+            the optimizer state
+        max_pending (int): number of steps whose outcome may be in flight,
+            the guard waits for the oldest one if there are more
+    """
+
+    def __init__(self, device, stop_on_nonfinite=False, rollback=False, max_pending=8):
+        self.device = torch.device(device)
+        self.stop_on_nonfinite = stop_on_nonfinite
+        self.rollback = rollback
+        self.skipped_steps = 0
+        self.nonfinite_steps = []
+        self._finite = torch.ones((), dtype=torch.bool, device=self.device)
+        self._use_events = self.device.type == "cuda"
+        # ring of preallocated host buffers for the readback
+        self._buffers = [
+            torch.ones((), dtype=torch.bool, pin_memory=self._use_events) for _ in range(max_pending)
+        ]
+        self._next_buffer = 0
+        self._pending = deque()
+        # id of optimizer -> tensors updated by its step and preallocated copies of them
+        self._snapshots = {}
+
+    def check(self, loss):
+        """Folds finiteness of loss into the flag of the current step. NaN and
+        Inf propagate through sums, so one check of the summed loss covers all
+        losses of a micro-batch."""
+        self._finite.logical_and_(torch.isfinite(loss.detach()).all())
+
+    def step(self, optimizer, params, amp=False):
+        """Takes the step of optimizer, which updates params, unless the step
+        saw a non-finite loss. Call after all backward passes of the step,
+        with amp=True if gradients are scaled by apex amp."""
+        if dist.is_available() and dist.is_initialized() and dist.get_world_size() > 1:
+            # all ranks have to skip together since their gradients are averaged
+            finite = self._finite.to(torch.uint8)
+            dist.all_reduce(finite, op=dist.ReduceOp.MIN)
+            self._finite.copy_(finite)
+        if self.rollback:
+            self._step_with_rollback(optimizer, params)
+        elif amp:
+            optimizer.step()
+        elif getattr(optimizer, "_step_supports_amp_scaling", False):
+            # the same on-device skip as torch.amp.GradScaler
+            optimizer.grad_scale = None
+            optimizer.found_inf = self._finite.logical_not().float()
+            try:
+                optimizer.step()
+            finally:
+                del optimizer.grad_scale
+                del optimizer.found_inf
+        else:
+            skip = self._finite.logical_not()
+            with torch.no_grad():
+                for p in params:
+                    if p.grad is not None:
+                        p.grad.masked_fill_(skip, 0)
+            optimizer.step()
+
+    def _step_with_rollback(self, optimizer, params):
+        tensors = self._step_tensors(optimizer, params)
+        cached, snapshot = self._snapshots.get(id(optimizer), ([], []))
+        if len(tensors) != len(cached) or any(a is not b for a, b in zip(tensors, cached)):
+            # optimizer state is created lazily by the first step
+            snapshot = [torch.empty_like(t) for t in tensors]
+            self._snapshots[id(optimizer)] = (tensors, snapshot)
+        with torch.no_grad():
+            _copy(snapshot, tensors)
+            optimizer.step()
+            # where() does not propagate NaN or Inf of the discarded update
+            for tensor, old in zip(tensors, snapshot):
+                torch.where(self._finite, tensor, old, out=tensor)
+
+    def _step_tensors(self, optimizer, params):
+        """params and their optimizer state which are tensors on the device"""
+        tensors = []
+        for p in params:
+            if p.device != self.device:
+                continue
+            tensors.append(p)
+            for value in optimizer.state.get(p, {}).values():
+                if isinstance(value, torch.Tensor) and value.device == self.device:
+                    tensors.append(value)
+        return tensors
+
+    def end_step(self, step):
+        """Starts the readback of the outcome of step and resets the flag for
+        the next one."""
+        if len(self._pending) == len(self._buffers):
+            self._resolve(self._pending.popleft(), wait=True)
+        buffer = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        buffer.copy_(self._finite, non_blocking=self._use_events)
+        event = None
+        if self._use_events:
+            event = torch.cuda.Event()
+            event.record()
+        self._pending.append((step, buffer, event))
+        self._finite.fill_(True)
+        self.poll()
+
+    def poll(self):
+        """Updates counters with all readbacks which have finished"""
+        while self._pending and (self._pending[0][2] is None or self._pending[0][2].query()):
+            self._resolve(self._pending.popleft())
+
+    def flush(self):
+        """Waits for all pending readbacks"""
+        while self._pending:
+            self._resolve(self._pending.popleft(), wait=True)
+
+    def _resolve(self, pending, wait=False):
+        step, buffer, event = pending
+        if wait and event is not None:
+            event.synchronize()
+        if bool(buffer):
+            return
+        self.skipped_steps += 1
+        self.nonfinite_steps.append(step)
+        if self.stop_on_nonfinite:
+            raise ValueError(f'Loss is NaN or inf at step {step} - exiting')
+        logging.warning(f'Loss is NaN or inf at step {step}, skipped optimizer step')
+
+
+def _copy(dst, src):
+    if hasattr(torch, '_foreach_copy_'):
+        # one fused copy for all tensors of the same device and dtype
+        torch._foreach_copy_(dst, src)
+    else:
+        for d, s in zip(dst, src):
+            d.copy_(s)
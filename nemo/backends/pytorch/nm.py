@@ -188,6 +188,18 @@ class DataLayerNM(NeuralModule):
     """A helper Base class for creating Pytorch-based data layers.
     You must implement __len__ method to return dataset size and
     data_iterator property to return iterator over the dataset.
+
+    Streaming data layers may return a torch.utils.data.IterableDataset as
+    `dataset`. Such datasets are read in order, must split their items between
+    ranks and DataLoader workers themselves (see
+    nemo.backends.pytorch.streaming.shard_for_worker) and may not know their
+    length. Their epochs are bounded by `max_steps` or `steps_per_epoch` of the
+    optimization parameters, or end when the stream is exhausted.
+
+    Training resumed from a checkpoint continues in the middle of the epoch if
+    the sampler of the data is a
+    nemo.backends.pytorch.samplers.ResumableSampler, which is the case for
+    `dataset` based data layers. Other state can be saved with get_state().
     """
 
     def __init__(self):
@@ -248,6 +260,23 @@ class DataLayerNM(NeuralModule):
         raise NotImplementedError("Data Layer could not be restored from any saved " "state.")
         return None
 
+    def get_state(self):
+        """Returns the state of the data layer which is saved in trainer
+        checkpoints, e.g. the position of a streaming dataset. The position of
+        samplers derived from
+        nemo.backends.pytorch.samplers.ResumableSampler is saved by the
+        trainer itself.
+
+        Returns:
+            picklable state or None
+        """
+        return None
+
+    def set_state(self, state):
+        """Restores a state returned by get_state() when training resumes
+        from a checkpoint"""
+        return None
+
     def freeze(self, weights: Set[str] = None):
         # nemo.logging.warning(
         #     "Data Layer does not have any weights to freeze. "
@@ -268,13 +297,15 @@ class DataLayerNM(NeuralModule):
 
     @abstractmethod
     def __len__(self):
-        """Dataset size"""
+        """Dataset size. Streaming data layers which do not know their size
+        raise TypeError."""
         pass
 
     @property
     @abstractmethod
     def dataset(self):
-        """Should return an instance of torch.utils.data.Dataset. Should
+        """Should return an instance of torch.utils.data.Dataset or
+        torch.utils.data.IterableDataset. Should
         implement
         either this or `data_iterator`. If this is implemented, `data_iterator`
         should return None."""
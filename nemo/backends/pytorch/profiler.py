@@ -0,0 +1,192 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+import torch
+
+from nemo import logging
+
+__all__ = ['StepProfiler']
+
+_INACTIVE = nullcontext()
+
+
+class StepProfiler:
+    """
+    Times stages of training steps, such as data loading, forward passes of
+    individual modules, backward pass, optimizer step and callbacks.
+
+    Only every `sample_every`-th step is timed, all other steps cost one
+    attribute lookup per stage, so the profiler can be left on for long runs.
+    Timings of `window` sampled steps are aggregated into percentiles and
+    written to TensorBoard and/or to a JSON-lines file. Sampled steps are also
+    kept as Chrome trace events (open in chrome://tracing or Perfetto).
+
+    Durations are measured with CUDA events if CUDA is available, which
+    gives the time spent by the GPU between the start and the end of a stage,
+    and with wall-clock time otherwise. The only synchronization happens at
+    the end of sampled steps.
+
+    Args:
+        sample_every (int): time one in `sample_every` steps
+        window (int): number of sampled steps aggregated into one report
+        percentiles (tuple): percentiles to report
+        use_cuda_events (bool): defaults to torch.cuda.is_available()
+        tb_writer: optional SummaryWriter for the reports
+        jsonl_path (str): optional file to append the reports to
+        chrome_trace_path (str): optional file to write Chrome trace to
+        max_trace_steps (int): maximum number of sampled steps kept for
+            Chrome trace
+        rank (int): process id used in Chrome trace
+    """
+
+    def __init__(
+        self,
+        sample_every=100,
+        window=20,
+        percentiles=(50, 90, 99),
+        use_cuda_events=None,
+        tb_writer=None,
+        jsonl_path=None,
+        chrome_trace_path=None,
+        max_trace_steps=50,
+        rank=0,
+    ):
+        if sample_every < 1 or window < 1:
+            raise ValueError("sample_every and window must be positive")
+        self.sample_every = sample_every
+        self.window = window
+        self.percentiles = percentiles
+        self.use_cuda_events = torch.cuda.is_available() if use_cuda_events is None else use_cuda_events
+        self.tb_writer = tb_writer
+        self.jsonl_path = jsonl_path
+        self.chrome_trace_path = chrome_trace_path
+        self.max_trace_steps = max_trace_steps
+        self.rank = rank
+
+        self._num_steps = 0
+        self.active = True
+        # (name, cpu start in seconds, start event or None, end event or cpu end)
+        self._records = []
+        self._window = defaultdict(list)
+        self._num_sampled = 0
+        self._trace_events = []
+        self._num_traced = 0
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def _record(self, name):
+        start = time.perf_counter()
+        if self.use_cuda_events:
+            start_event = torch.cuda.Event(enable_timing=True)
+            end_event = torch.cuda.Event(enable_timing=True)
+            start_event.record()
+            yield
+            end_event.record()
+            self._records.append((name, start, start_event, end_event))
+        else:
+            yield
+            self._records.append((name, start, None, time.perf_counter()))
+
+    def record(self, name):
+        """Context manager timing the enclosed code as stage `name` if the
+        current step is sampled, no-op otherwise."""
+        if not self.active:
+            return _INACTIVE
+        return self._record(name)
+
+    def iterate(self, iterable, name="data"):
+        """Yields items of iterable, timing each next() as stage `name`."""
+        iterator = iter(iterable)
+        while True:
+            with self.record(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def end_step(self, step=None):
+        """Finishes the current step. Returns dict of stage -> duration in ms
+        if the step was sampled, None otherwise."""
+        step = self._num_steps if step is None else step
+        durations = None
+        if self.active:
+            durations = self._collect(step)
+        self._num_steps += 1
+        self.active = self._num_steps % self.sample_every == 0
+        return durations
+
+    def _collect(self, step):
+        if self.use_cuda_events and self._records:
+            torch.cuda.synchronize()
+        durations = defaultdict(float)
+        trace = self.chrome_trace_path is not None and self._num_traced < self.max_trace_steps
+        for name, start, start_event, end in self._records:
+            if start_event is not None:
+                duration = start_event.elapsed_time(end)
+            else:
+                duration = (end - start) * 1000.0
+            durations[name] += duration
+            if trace:
+                self._trace_events.append(
+                    {
+                        "name": name,
+                        "ph": "X",
+                        "ts": (start - self._origin) * 1e6,
+                        "dur": duration * 1000.0,
+                        "pid": self.rank,
+                        "tid": 0,
+                        "args": {"step": step},
+                    }
+                )
+        self._records = []
+        self._num_traced += trace
+
+        for name, duration in durations.items():
+            self._window[name].append(duration)
+        self._num_sampled += 1
+        if self._num_sampled % self.window == 0:
+            self._report(step)
+        return dict(durations)
+
+    def summary(self):
+        """Returns dict of stage -> statistics in ms over the sampled steps
+        since the last report."""
+        summary = {}
+        for name, durations in self._window.items():
+            durations = np.array(durations)
+            stats = {"count": len(durations), "mean_ms": float(durations.mean())}
+            for p, value in zip(self.percentiles, np.percentile(durations, self.percentiles)):
+                stats[f"p{p}_ms"] = float(value)
+            summary[name] = stats
+        return summary
+
+    def _report(self, step):
+        summary = self.summary()
+        self._window = defaultdict(list)
+        if self.tb_writer is not None:
+            for name, stats in summary.items():
+                for key, value in stats.items():
+                    if key != "count":
+                        self.tb_writer.add_scalar(f"profile/{name}/{key}", value, step)
+        if self.jsonl_path is not None:
+            with open(self.jsonl_path, "a") as f:
+                f.write(json.dumps({"step": step, "rank": self.rank, "stages": summary}) + "\n")
+        return summary
+
+    def close(self):
+        """Reports remaining sampled steps and writes Chrome trace."""
+        if self._window:
+            self._report(self._num_steps)
+        if self.chrome_trace_path is not None:
+            directory = os.path.dirname(self.chrome_trace_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.chrome_trace_path, "w") as f:
+                json.dump({"traceEvents": self._trace_events, "displayTimeUnit": "ms"}, f)
+            logging.info(f"Saved Chrome trace of {self._num_traced} steps to {self.chrome_trace_path}")
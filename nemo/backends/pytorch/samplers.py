@@ -0,0 +1,228 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import math
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.utils.data import Sampler
+
+__all__ = [
+    'ResumableSampler',
+    'ResumableDistributedSampler',
+    'MixtureSampler',
+    'sampler_seed',
+    'make_sampler',
+    'find_sampler',
+    'items_per_batch',
+]
+
+
+class ResumableSampler(Sampler):
+    """
+    Base class of samplers whose position within an epoch can be saved and
+    restored, so that a training resumed from a checkpoint continues with the
+    next unseen sample of the interrupted epoch.
+
+    The order of an epoch must only depend on `seed` and `epoch`. The trainer
+    calls `advance` with the number of consumed items (indices, or batches for
+    batch samplers) as it takes batches from the DataLoader, which prefetches
+    ahead of it, and saves `state_dict()` in its checkpoints. A pass over the
+    sampler starts at `offset`, skipped items are never generated or read.
+
+    Subclasses implement `_epoch_items`.
+
+    Args:
+        seed (int): seed of the order, combined with the epoch
+    """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+        self.epoch = 0
+        self.offset = 0
+        self._resuming = False
+
+    def _epoch_items(self):
+        """Returns the list of all items of the current epoch"""
+        raise NotImplementedError
+
+    def set_epoch(self, epoch):
+        """Starts epoch from its beginning, or from the restored offset if it
+        is the epoch of a state loaded by load_state_dict"""
+        if not (self._resuming and epoch == self.epoch):
+            self.offset = 0
+        self._resuming = False
+        self.epoch = epoch
+
+    def advance(self, num_items):
+        """Marks num_items more items of the current epoch as consumed"""
+        self.offset += num_items
+
+    def state_dict(self):
+        return {'seed': self.seed, 'epoch': self.epoch, 'offset': self.offset}
+
+    def load_state_dict(self, state):
+        self.seed = state['seed']
+        self.epoch = state['epoch']
+        self.offset = state['offset']
+        self._resuming = True
+
+    def __iter__(self):
+        return iter(self._epoch_items()[self.offset :])
+
+    def __len__(self):
+        return len(self._epoch_items())
+
+
+class ResumableDistributedSampler(ResumableSampler):
+    """
+    Resumable replacement of torch.utils.data.distributed.DistributedSampler.
+    Indices are padded to a multiple of num_replicas and every replica takes
+    every num_replicas-th index of the (shuffled) epoch order.
+
+    Args:
+        dataset: dataset to sample from
+        num_replicas (int): number of distributed processes, defaults to the world size
+        rank (int): rank of the current process, defaults to the global rank
+        shuffle (bool): shuffle indices every epoch
+        seed (int): seed of the shuffling, combined with the epoch
+    """
+
+    def __init__(self, dataset, num_replicas=None, rank=None, shuffle=True, seed=0):
+        super().__init__(seed)
+        if num_replicas is None:
+            num_replicas = dist.get_world_size() if dist.is_available() and dist.is_initialized() else 1
+        if rank is None:
+            rank = dist.get_rank() if dist.is_available() and dist.is_initialized() else 0
+        self.dataset = dataset
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.shuffle = shuffle
+        self.num_samples = int(math.ceil(len(dataset) / num_replicas))
+        self.total_size = self.num_samples * num_replicas
+
+    def _epoch_items(self):
+        if self.shuffle:
+            generator = torch.Generator()
+            generator.manual_seed(self.seed + self.epoch)
+            indices = torch.randperm(len(self.dataset), generator=generator).tolist()
+        else:
+            indices = list(range(len(self.dataset)))
+        if indices:
+            indices = (indices * math.ceil(self.total_size / len(indices)))[: self.total_size]
+        return indices[self.rank : self.total_size : self.num_replicas]
+
+    def __len__(self):
+        return self.num_samples
+
+
+class MixtureSampler(ResumableSampler):
+    """
+    Samples from several datasets with given probabilities. Items are
+    (source, index) pairs, see nemo.backends.pytorch.common.MixtureDataLayer.
+
+    Every epoch draws the source of each of its samples, then the indices of
+    every source: a source drawn k times yields k distinct indices of a random
+    permutation of its dataset, continuing with new permutations when k
+    exceeds its size. Only the drawn indices are generated, so small samples
+    of large corpora are cheap. All ranks compute the same epoch from `seed`
+    and `epoch` and every replica takes every num_replicas-th sample of it.
+
+    Args:
+        sizes (list of int): number of samples of every source dataset
+        probabilities (list of float): probability to draw from every source
+        num_samples (int): number of samples of an epoch over all replicas
+        num_replicas (int): number of distributed processes, defaults to the world size
+        rank (int): rank of the current process, defaults to the global rank
+        seed (int): seed of the mixture, combined with the epoch
+    """
+
+    def __init__(self, sizes, probabilities, num_samples, num_replicas=None, rank=None, seed=0):
+        super().__init__(seed)
+        if num_replicas is None:
+            num_replicas = dist.get_world_size() if dist.is_available() and dist.is_initialized() else 1
+        if rank is None:
+            rank = dist.get_rank() if dist.is_available() and dist.is_initialized() else 0
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        if len(probabilities) != len(sizes) or (probabilities < 0).any():
+            raise ValueError(f"Invalid probabilities {list(probabilities)} for {len(sizes)} sources.")
+        # empty sources can not be drawn
+        probabilities = np.where(np.asarray(sizes) > 0, probabilities, 0.0)
+        if probabilities.sum() <= 0:
+            raise ValueError("All sources with a probability above 0 are empty.")
+        self.sizes = list(sizes)
+        self.probabilities = probabilities / probabilities.sum()
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.num_samples = int(math.ceil(num_samples / num_replicas))
+        self.total_size = self.num_samples * num_replicas
+
+    def _source_indices(self, source, count):
+        """count indices of source, distinct within every pass over it"""
+        size = self.sizes[source]
+        passes = []
+        for p in range(int(math.ceil(count / size))):
+            rng = np.random.default_rng([self.seed, self.epoch, source, p])
+            passes.append(rng.choice(size, size=min(size, count - p * size), replace=False))
+        return np.concatenate(passes)
+
+    def _epoch_items(self):
+        rng = np.random.default_rng([self.seed, self.epoch])
+        sources = rng.choice(len(self.sizes), size=self.total_size, p=self.probabilities)
+        indices = np.empty(self.total_size, dtype=np.int64)
+        for source in range(len(self.sizes)):
+            drawn = sources == source
+            count = int(drawn.sum())
+            if count > 0:
+                indices[drawn] = self._source_indices(source, count)
+        mine = slice(self.rank, self.total_size, self.num_replicas)
+        return list(zip(sources[mine].tolist(), indices[mine].tolist()))
+
+    def __len__(self):
+        return self.num_samples
+
+
+def sampler_seed(factory):
+    """Seed of the samplers of a single process: the random_seed of factory,
+    or a seed derived from the torch seed of the process if it has none, so
+    that unseeded runs read their data in different orders. The seed is saved
+    in the state_dict of the sampler and restored with it."""
+    if factory is not None and factory.random_seed is not None:
+        return factory.random_seed
+    return torch.initial_seed() % 2 ** 31
+
+
+def make_sampler(dataset, shuffle, factory, distributed=False):
+    """
+    Creates the ResumableDistributedSampler of a data layer.
+
+    Distributed samplers split dataset between ranks and keep seed 0, since
+    all ranks have to agree on the order even if they seed their random
+    generators differently. Samplers of a single process read all of dataset
+    in the order of sampler_seed(factory).
+
+    Args:
+        dataset: dataset to sample from
+        shuffle (bool): shuffle indices every epoch
+        factory (NeuralModuleFactory): factory of the data layer
+        distributed (bool): split dataset between all ranks
+    """
+    if distributed:
+        return ResumableDistributedSampler(dataset, shuffle=shuffle)
+    return ResumableDistributedSampler(dataset, num_replicas=1, rank=0, shuffle=shuffle, seed=sampler_seed(factory))
+
+
+def find_sampler(dataloader):
+    """Returns the batch sampler, sampler or streaming dataset of a DataLoader
+    which supports set_epoch, if any"""
+    for name in ('batch_sampler', 'sampler', 'dataset'):
+        sampler = getattr(dataloader, name, None)
+        if hasattr(sampler, 'set_epoch'):
+            return sampler
+    return None
+
+
+def items_per_batch(dataloader, sampler):
+    """Number of sampler items in a batch of dataloader"""
+    if sampler is getattr(dataloader, 'batch_sampler', None) or dataloader.batch_size is None:
+        return 1
+    return dataloader.batch_size
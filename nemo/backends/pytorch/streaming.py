@@ -0,0 +1,111 @@
+# Copyright (c) 2020 NVIDIA Corporation
+import itertools
+
+import torch.distributed as dist
+from torch.utils.data import DataLoader, IterableDataset, get_worker_info
+
+from nemo.backends.pytorch.samplers import find_sampler, make_sampler
+
+__all__ = ['worker_index', 'shard_for_worker', 'is_streaming', 'num_batches', 'make_dataloader', 'cycle_batches']
+
+
+def worker_index(rank=None, world_size=None):
+    """
+    Returns the index of the calling DataLoader worker among all workers of
+    all ranks, and the number of those workers.
+
+    Args:
+        rank (int): rank of this process, defaults to the rank in the
+            initialized default process group or 0
+        world_size (int): number of ranks, defaults to the size of the
+            initialized default process group or 1
+    """
+    if rank is None or world_size is None:
+        distributed = dist.is_available() and dist.is_initialized()
+        rank = dist.get_rank() if distributed else 0
+        world_size = dist.get_world_size() if distributed else 1
+    worker = get_worker_info()
+    num_workers, worker_id = (1, 0) if worker is None else (worker.num_workers, worker.id)
+    return rank * num_workers + worker_id, world_size * num_workers
+
+
+def shard_for_worker(iterable, rank=None, world_size=None):
+    """
+    Yields the items of iterable which belong to the calling process.
+
+    Streaming datasets (torch.utils.data.IterableDataset) are iterated by
+    every DataLoader worker of every rank. Calling this in `__iter__` splits
+    the items round-robin between all workers of all ranks, so that every item
+    is read once. Sharding the cheapest level, e.g. a list of files instead of
+    decoded samples, avoids reading data which is thrown away.
+
+    Args:
+        iterable: items to split, every process must see the same items in
+            the same order
+        rank (int): rank of this process, defaults to the rank in the
+            initialized default process group or 0
+        world_size (int): number of ranks, defaults to the size of the
+            initialized default process group or 1
+    """
+    index, count = worker_index(rank, world_size)
+    return itertools.islice(iterable, index, None, count)
+
+
+def is_streaming(dl_nm):
+    """Whether a data layer reads a streaming dataset without random access"""
+    dataset = dl_nm.dataset
+    if dataset is None:
+        dataset = getattr(dl_nm.data_iterator, 'dataset', None)
+    return isinstance(dataset, IterableDataset)
+
+
+def num_batches(dataloader):
+    """Number of batches of a data loader, None if the length is not known"""
+    try:
+        return len(dataloader)
+    except TypeError:
+        return None
+
+
+def make_dataloader(dl_nm, distributed):
+    """
+    Creates the DataLoader over the `dataset` of a data layer.
+
+    Map-style datasets get a resumable sampler (see make_sampler), which splits them
+    between ranks in distributed runs. Streaming datasets shard themselves in
+    their iterators (see shard_for_worker) and are read in order.
+
+    Returns:
+        the DataLoader and its sampler, if any, or its streaming dataset if
+        that supports set_epoch
+    """
+    dataset = dl_nm.dataset
+    if isinstance(dataset, IterableDataset):
+        loader = DataLoader(dataset=dataset, num_workers=dl_nm.num_workers, batch_size=dl_nm.batch_size)
+        return loader, find_sampler(loader)
+    sampler = make_sampler(dataset, dl_nm.shuffle, dl_nm.factory, distributed=distributed)
+    loader = DataLoader(dataset=dataset, sampler=sampler, num_workers=dl_nm.num_workers, batch_size=dl_nm.batch_size)
+    return loader, sampler
+
+
+def cycle_batches(dataloader, sampler=None, epoch=None):
+    """
+    Yields the batches of dataloader over and over, so that epochs of a fixed
+    number of steps can be cut out of it. Passes over the data are numbered
+    from epoch for the sampler, which defaults to the epoch of the sampler
+    when the first batch is requested (e.g. restored from a checkpoint). Stops
+    if a pass from the beginning of the data yields no batches.
+    """
+    if epoch is None:
+        epoch = getattr(sampler, 'epoch', 0)
+    while True:
+        if sampler is not None:
+            sampler.set_epoch(epoch)
+        resumed = getattr(sampler, 'offset', 0) > 0
+        empty = True
+        for batch in dataloader:
+            empty = False
+            yield batch
+        if empty and not resumed:
+            return
+        epoch += 1
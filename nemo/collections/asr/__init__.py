@@ -12,33 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # =============================================================================
-from .audio_preprocessing import *
-from .beam_search_decoder import BeamSearchDecoderWithLM
-from .data_layer import AudioToTextDataLayer, KaldiFeatureDataLayer, TranscriptDataLayer
-from .greedy_ctc_decoder import GreedyCTCDecoder
-from .jasper import JasperDecoderForCTC, JasperEncoder
-from .las.misc import JasperRNNConnector
-from .losses import CTCLossNM
 from nemo.core import Backend
+from nemo.utils.lazy_import import lazy_attributes
 
-__all__ = [
-    'Backend',
-    'AudioToTextDataLayer',
-    'AudioPreprocessing',
-    'AudioPreprocessor',
-    'AudioToMFCCPreprocessor',
-    'AudioToMelSpectrogramPreprocessor',
-    'AudioToSpectrogramPreprocessor',
-    'MultiplyBatch',
-    'SpectrogramAugmentation',
-    'KaldiFeatureDataLayer',
-    'TranscriptDataLayer',
-    'GreedyCTCDecoder',
-    'BeamSearchDecoderWithLM',
-    'JasperEncoder',
-    'JasperDecoderForCTC',
-    'JasperRNNConnector',
-    'CTCLossNM',
-]
+# Modules are imported on first access of their attributes, see lazy_attributes
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.core": ["Backend"],
+        ".data_layer": [
+            "AudioToTextDataLayer",
+            "KaldiFeatureDataLayer",
+            "TarredAudioToTextDataLayer",
+            "TranscriptDataLayer",
+        ],
+        ".audio_preprocessing": "*",
+        ".greedy_ctc_decoder": ["GreedyCTCDecoder"],
+        ".beam_search_decoder": ["BeamSearchDecoderWithLM"],
+        ".jasper": ["JasperEncoder", "JasperDecoderForCTC"],
+        ".las.misc": ["JasperRNNConnector"],
+        ".losses": ["CTCLossNM"],
+    },
+)
 
 backend = Backend.PyTorch
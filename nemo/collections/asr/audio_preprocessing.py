@@ -570,6 +570,13 @@ class SpectrogramAugmentation(NonTrainableNM):
         rect_time (int): maximum size of cut rectangles along the time
             dimension
             Defaults to 25.
+        rng: torch.Generator or random.Random used to sample the masks.
+            Masks are sampled with the global torch RNG if None.
+            Defaults to None.
+
+    Masks are sampled for the whole batch at once on the device of
+    `input_spec`. If the optional `length` input is connected, masks are only
+    placed within the valid frames of every utterance and never in padding.
     """
 
     @property
@@ -583,9 +590,15 @@ class SpectrogramAugmentation(NonTrainableNM):
 
             2: AxisType(TimeTag)
 
+        length (optional):
+            0: AxisType(BatchTag)
+
         """
         return {
-            "input_spec": NeuralType({0: AxisType(BatchTag), 1: AxisType(SpectrogramSignalTag), 2: AxisType(TimeTag),})
+            "input_spec": NeuralType(
+                {0: AxisType(BatchTag), 1: AxisType(SpectrogramSignalTag), 2: AxisType(TimeTag),}
+            ),
+            "length": NeuralType({0: AxisType(BatchTag)}, optional=True),
         }
 
     @property
@@ -624,7 +637,7 @@ class SpectrogramAugmentation(NonTrainableNM):
             self.spec_cutout = SpecCutout(rect_masks=rect_masks, rect_time=rect_time, rect_freq=rect_freq, rng=rng,)
             self.spec_cutout.to(self._device)
         else:
-            self.spec_cutout = lambda x: x
+            self.spec_cutout = lambda x, length=None: x
 
         if freq_masks + time_masks > 0:
             self.spec_augment = SpecAugment(
@@ -632,11 +645,11 @@ class SpectrogramAugmentation(NonTrainableNM):
             )
             self.spec_augment.to(self._device)
         else:
-            self.spec_augment = lambda x: x
+            self.spec_augment = lambda x, length=None: x
 
-    def forward(self, input_spec):
-        augmented_spec = self.spec_cutout(input_spec)
-        augmented_spec = self.spec_augment(augmented_spec)
+    def forward(self, input_spec, length=None):
+        augmented_spec = self.spec_cutout(input_spec, length=length)
+        augmented_spec = self.spec_augment(augmented_spec, length=length)
         return augmented_spec
 
 
@@ -1,14 +1,17 @@
 # Copyright (c) 2019 NVIDIA Corporation
 """This package contains Neural Modules responsible for ASR data layers."""
 
+import glob
 from functools import partial
 
 import torch
 
 import nemo
-from .parts.dataset import AudioDataset, KaldiFeatureDataset, TranscriptDataset, seq_collate_fn
+from .parts.dataset import AudioDataset, KaldiFeatureDataset, TarredAudioDataset, TranscriptDataset, seq_collate_fn
 from .parts.features import WaveformFeaturizer
+from .parts.perturb import AudioAugmentor
 from nemo.backends.pytorch import DataLayerNM
+from nemo.backends.pytorch.samplers import make_sampler, sampler_seed
 from nemo.core import DeviceType
 from nemo.core.neural_types import *
 from nemo.utils.misc import pad_to
@@ -16,6 +19,7 @@ from nemo.utils.misc import pad_to
 __all__ = [
     'AudioToTextDataLayer',
     'KaldiFeatureDataLayer',
+    'TarredAudioToTextDataLayer',
     'TranscriptDataLayer',
 ]
 
@@ -147,9 +151,7 @@ transcript_n}
         # Set up data loader
         if self._placement == DeviceType.AllGpu:
             nemo.logging.info("Parallelizing Datalayer.")
-            sampler = torch.utils.data.distributed.DistributedSampler(self._dataset)
-        else:
-            sampler = None
+        sampler = make_sampler(self._dataset, shuffle, self._factory, distributed=self._placement == DeviceType.AllGpu)
 
         pad_id = 0 if pad_id is None else pad_id
         self._dataloader = torch.utils.data.DataLoader(
@@ -157,7 +159,6 @@ transcript_n}
             batch_size=batch_size,
             collate_fn=partial(seq_collate_fn, token_pad_value=pad_id),
             drop_last=drop_last,
-            shuffle=shuffle if sampler is None else False,
             sampler=sampler,
             num_workers=num_workers,
         )
@@ -174,6 +175,190 @@ transcript_n}
         return self._dataloader
 
 
+class TarredAudioToTextDataLayer(DataLayerNM):
+    """Data Layer for ASR tasks which reads audio from tar shards.
+
+    Instead of opening one audio file per utterance, utterances are read
+    sequentially from a list of .tar shards, which is much faster on network
+    file systems. Shards are created from a manifest with
+    scripts/convert_to_tarred_audio_dataset.py.
+
+    The dataset is streamed: shards are permuted every epoch and split
+    between all workers of all ranks, and utterances are shuffled within a
+    bounded buffer. The layer has
+    no length, so training needs `max_steps` or `steps_per_epoch`
+    optimization parameters unless epochs should end with the data.
+    Distributed training needs `steps_per_epoch` and at least one shard per
+    rank, ideally one per worker of every rank.
+
+    Args:
+        shard_paths (str or list): Paths to the .tar shards. A string can hold
+            comma-separated paths and glob patterns, e.g.
+            "/data/train/audio_*.tar".
+        labels (list): List of characters that can be output by the ASR
+            model.
+        batch_size (int): batch size
+        sample_rate (int): Target sampling rate for data. Audio will be
+            resampled to sample_rate if it is not already.
+            Defaults to 16000.
+        int_values (bool): If true, load samples as 32-bit integers.
+            Defauts to False.
+        perturbation_configs (list): Configs of the AudioAugmentor
+            perturbations applied to the audio, see AudioAugmentor.from_config.
+            Defaults to None.
+        bos_id (id): Dataset parameter.
+            Beginning of string symbol id used for seq2seq models.
+            Defaults to None.
+        eos_id (id): Dataset parameter.
+            End of string symbol id used for seq2seq models.
+            Defaults to None.
+        pad_id (id): Token used to pad when collating samples in batches.
+            If this is None, pads using 0s.
+            Defaults to None.
+        min_duration (float): Dataset parameter.
+            All training files which have a duration less than min_duration
+            are dropped. Note: Duration is read from the manifest JSON.
+            Defaults to 0.1.
+        max_duration (float): Dataset parameter.
+            All training files which have a duration more than max_duration
+            are dropped. Note: Duration is read from the manifest JSON.
+            Defaults to None.
+        normalize_transcripts (bool): Dataset parameter.
+            Whether to use automatic text cleaning.
+            Defaults to True.
+        trim_silence (bool): Whether to use trim silence from beginning and end
+            of audio signal using librosa.effects.trim().
+            Defaults to False.
+        shuffle_buffer (int): Number of utterances every worker shuffles
+            over. 0 reads utterances in the order of the shards.
+            Defaults to 0.
+        shuffle_shards (bool): Whether to permute the shards every epoch.
+            Defaults to True.
+        seed (int): Seed of the shuffling, which has to be the same on all
+            ranks. Defaults to None, the random_seed of the factory. Without
+            one, distributed runs use 0 and single processes draw a seed.
+        drop_last (bool): See PyTorch DataLoader.
+            Defaults to False.
+        num_workers (int): See PyTorch DataLoader.
+            Defaults to 0.
+    """
+
+    @property
+    def output_ports(self):
+        """Returns definitions of module output ports.
+
+        audio_signal:
+            0: AxisType(BatchTag)
+
+            1: AxisType(TimeTag)
+
+        a_sig_length:
+            0: AxisType(BatchTag)
+
+        transcripts:
+            0: AxisType(BatchTag)
+
+            1: AxisType(TimeTag)
+
+        transcript_length:
+            0: AxisType(BatchTag)
+
+        """
+        return {
+            'audio_signal': NeuralType({0: AxisType(BatchTag), 1: AxisType(TimeTag)}),
+            'a_sig_length': NeuralType({0: AxisType(BatchTag)}),
+            'transcripts': NeuralType({0: AxisType(BatchTag), 1: AxisType(TimeTag)}),
+            'transcript_length': NeuralType({0: AxisType(BatchTag)}),
+        }
+
+    def __init__(
+        self,
+        shard_paths,
+        labels,
+        batch_size,
+        sample_rate=16000,
+        int_values=False,
+        perturbation_configs=None,
+        bos_id=None,
+        eos_id=None,
+        pad_id=None,
+        min_duration=0.1,
+        max_duration=None,
+        normalize_transcripts=True,
+        trim_silence=False,
+        shuffle_buffer=0,
+        shuffle_shards=True,
+        seed=None,
+        drop_last=False,
+        num_workers=0,
+    ):
+        super().__init__()
+
+        if isinstance(shard_paths, str):
+            patterns, shard_paths = shard_paths.split(','), []
+            for pattern in patterns:
+                shard_paths.extend(sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern])
+        if not shard_paths:
+            raise ValueError("No tar shards were found.")
+
+        if self._placement == DeviceType.AllGpu and torch.distributed.is_initialized():
+            world_size = torch.distributed.get_world_size()
+        else:
+            world_size = 1
+        if len(shard_paths) < world_size:
+            raise ValueError(
+                f"{len(shard_paths)} tar shards can not be split between {world_size} ranks, every rank needs at "
+                "least one shard."
+            )
+        if len(shard_paths) < world_size * max(num_workers, 1):
+            nemo.logging.warning(
+                f"Only {len(shard_paths)} tar shards for {world_size} ranks with {num_workers} workers each, some "
+                "workers will not read any data."
+            )
+        if seed is None:
+            # all ranks have to permute the shards alike
+            seed = 0 if world_size > 1 and self._factory.random_seed is None else sampler_seed(self._factory)
+        augmentor = AudioAugmentor.from_config(perturbation_configs) if perturbation_configs else None
+        self._featurizer = WaveformFeaturizer(sample_rate=sample_rate, int_values=int_values, augmentor=augmentor)
+
+        self._dataset = TarredAudioDataset(
+            shard_paths=shard_paths,
+            labels=labels,
+            featurizer=self._featurizer,
+            shuffle_buffer=shuffle_buffer,
+            shuffle_shards=shuffle_shards,
+            max_duration=max_duration,
+            min_duration=min_duration,
+            normalize=normalize_transcripts,
+            trim=trim_silence,
+            bos_id=bos_id,
+            eos_id=eos_id,
+            seed=seed,
+        )
+
+        # The dataset shards itself between ranks and workers, so there is
+        # no sampler
+        pad_id = 0 if pad_id is None else pad_id
+        self._dataloader = torch.utils.data.DataLoader(
+            dataset=self._dataset,
+            batch_size=batch_size,
+            collate_fn=partial(seq_collate_fn, token_pad_value=pad_id),
+            drop_last=drop_last,
+            num_workers=num_workers,
+        )
+
+    def __len__(self):
+        raise TypeError("TarredAudioToTextDataLayer streams its data and has no length")
+
+    @property
+    def dataset(self):
+        return None
+
+    @property
+    def data_iterator(self):
+        return self._dataloader
+
+
 class KaldiFeatureDataLayer(DataLayerNM):
     """Data layer for reading generic Kaldi-formatted data.
 
@@ -206,6 +391,9 @@ class KaldiFeatureDataLayer(DataLayerNM):
         drop_last (bool): See PyTorch DataLoader. Defaults to False.
         shuffle (bool): See PyTorch DataLoader. Defaults to True.
         num_workers (int): See PyTorch DataLoader. Defaults to 0.
+        cache_size (int): Number of most recently read feature matrices every
+            worker keeps in memory. Features are otherwise read from the
+            memory mapped .ark files on every access. Defaults to 0.
     """
 
     @property
@@ -251,6 +439,7 @@ class KaldiFeatureDataLayer(DataLayerNM):
         drop_last=False,
         shuffle=True,
         num_workers=0,
+        cache_size=0,
     ):
         super().__init__()
 
@@ -261,22 +450,20 @@ class KaldiFeatureDataLayer(DataLayerNM):
             "min_duration": min_duration,
             "max_duration": max_duration,
             "normalize": normalize_transcripts,
+            "cache_size": cache_size,
         }
         self._dataset = KaldiFeatureDataset(**dataset_params)
 
         # Set up data loader
         if self._placement == DeviceType.AllGpu:
             nemo.logging.info("Parallelizing DATALAYER")
-            sampler = torch.utils.data.distributed.DistributedSampler(self._dataset)
-        else:
-            sampler = None
+        sampler = make_sampler(self._dataset, shuffle, self._factory, distributed=self._placement == DeviceType.AllGpu)
 
         self._dataloader = torch.utils.data.DataLoader(
             dataset=self._dataset,
             batch_size=batch_size,
             collate_fn=self._collate_fn,
             drop_last=drop_last,
-            shuffle=shuffle if sampler is None else False,
             sampler=sampler,
             num_workers=num_workers,
         )
@@ -391,10 +578,7 @@ class TranscriptDataLayer(DataLayerNM):
         self._dataset = TranscriptDataset(**dataset_params)
 
         # Set up data loader
-        if self._placement == DeviceType.AllGpu:
-            sampler = torch.utils.data.distributed.DistributedSampler(self._dataset)
-        else:
-            sampler = None
+        sampler = make_sampler(self._dataset, shuffle, self._factory, distributed=self._placement == DeviceType.AllGpu)
 
         pad_id = 0 if pad_id is None else pad_id
 
@@ -404,7 +588,6 @@ class TranscriptDataLayer(DataLayerNM):
             batch_size=batch_size,
             collate_fn=partial(self._collate_fn, pad_id=pad_id, pad8=True),
             drop_last=drop_last,
-            shuffle=shuffle if sampler is None else False,
             sampler=sampler,
             num_workers=num_workers,
         )
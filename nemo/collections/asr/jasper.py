@@ -5,7 +5,7 @@ import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
-from .parts.jasper import JasperBlock, init_weights, jasper_activations
+from .parts.jasper import FusedJasperEncoder, JasperBlock, init_weights, jasper_activations
 from nemo.backends.pytorch.nm import TrainableNM
 from nemo.core.neural_types import (
     AxisType,
@@ -186,6 +186,27 @@ class JasperEncoder(TrainableNM):
             return s_input[-1]
         return s_input[-1], length
 
+    def fused_for_inference(self, script=False):
+        """Returns a torch.nn.Module for fast inference with the current
+        weights of the encoder, see FusedJasperEncoder. Batch norms are folded
+        into the convolutions, sequence masks are shared between convolutions
+        which keep the lengths and residual adds run in place.
+
+        The module is a snapshot, it doesn't follow later changes of the
+        encoder's weights.
+
+        Args:
+            script (bool): compile the module with torch.jit.script()
+
+        Returns:
+            module with forward(audio_signal, length) returning the tuple
+            (outputs, encoded_lengths)
+        """
+        fused = FusedJasperEncoder(self.encoder)
+        if script:
+            fused = torch.jit.script(fused)
+        return fused
+
 
 class JasperDecoderForCTC(TrainableNM):
     """
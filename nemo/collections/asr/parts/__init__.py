@@ -1,4 +1,5 @@
-from .dataset import AudioDataset
-from .features import WaveformFeaturizer
+from nemo.utils.lazy_import import lazy_attributes
 
-__all__ = ['AudioDataset', 'WaveformFeaturizer']
+__getattr__, __dir__ = lazy_attributes(
+    __name__, {".dataset": ["AudioDataset"], ".features": ["WaveformFeaturizer"]}
+)
@@ -1,8 +1,8 @@
 # Copyright (c) 2019 NVIDIA Corporation
 
 import re
+from functools import lru_cache
 
-import inflect
 from unidecode import unidecode
 
 from nemo import logging
@@ -75,7 +75,13 @@ ABBREVIATIONS_EXPANDED = [
     ]
 ]
 
-inflect = inflect.engine()
+
+@lru_cache(maxsize=None)
+def _inflect():
+    # inflect is slow to import, so it is loaded when numbers are cleaned
+    import inflect
+
+    return inflect.engine()
 
 
 def clean_text(string, table, punctuation_to_replace):
@@ -128,10 +134,10 @@ class NumberCleaner:
 
     def format_final_number(self, whole_num, decimal):
         if self.currency:
-            return_string = inflect.number_to_words(whole_num)
+            return_string = _inflect().number_to_words(whole_num)
             return_string += " dollar" if whole_num == 1 else " dollars"
             if decimal:
-                return_string += " and " + inflect.number_to_words(decimal)
+                return_string += " and " + _inflect().number_to_words(decimal)
                 return_string += " cent" if whole_num == decimal else " cents"
             self.reset()
             return return_string
@@ -139,11 +145,11 @@ class NumberCleaner:
         self.reset()
         if decimal:
             whole_num += "." + decimal
-            return inflect.number_to_words(whole_num)
+            return _inflect().number_to_words(whole_num)
         else:
             # Check if there are non-numbers
             def convert_to_word(match):
-                return " " + inflect.number_to_words(match.group(0)) + " "
+                return " " + _inflect().number_to_words(match.group(0)) + " "
 
             return re.sub(r'[0-9,]+', convert_to_word, whole_num)
 
@@ -154,11 +160,11 @@ class NumberCleaner:
 
         time_match = TIME_CHECK.match(number)
         if time_match:
-            string = ws + inflect.number_to_words(time_match.group(1)) + "{}{}"
+            string = ws + _inflect().number_to_words(time_match.group(1)) + "{}{}"
             mins = int(time_match.group(2))
             min_string = ""
             if mins != 0:
-                min_string = " " + inflect.number_to_words(time_match.group(2))
+                min_string = " " + _inflect().number_to_words(time_match.group(2))
             ampm_string = ""
             if time_match.group(3):
                 ampm_string = " " + time_match.group(3)
@@ -166,7 +172,7 @@ class NumberCleaner:
 
         ord_match = ORD_CHECK.match(number)
         if ORD_CHECK.match(number):
-            return ws + inflect.number_to_words(ord_match.group(0))
+            return ws + _inflect().number_to_words(ord_match.group(0))
 
         if self.currency is None:
             # Check if it is a currency
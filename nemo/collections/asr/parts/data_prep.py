@@ -0,0 +1,241 @@
+# Copyright (c) 2020 NVIDIA Corporation. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Parallel, resumable building blocks of the dataset preparation scripts.
+
+Jobs are processed in a process pool and their results are consumed in job
+order, so the output does not depend on the number of workers. Manifests are
+written incrementally next to a journal of finished jobs, which lets an
+interrupted run continue where it stopped.
+"""
+
+import io
+import itertools
+import json
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import soundfile as sf
+from tqdm import tqdm
+
+from nemo import logging
+
+__all__ = [
+    'audio_duration',
+    'atomic_output',
+    'write_wav',
+    'convert_to_wav',
+    'parallel_map',
+    'write_manifest',
+    'write_tarred_shard',
+]
+
+
+def audio_duration(path):
+    """Duration in seconds, read from the header of an audio file"""
+    info = sf.info(path)
+    return info.frames / info.samplerate
+
+
+@contextmanager
+def atomic_output(path):
+    """Yields a temporary path which is renamed to path on success, so that
+    an interrupted job never leaves a partial output file behind"""
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.tmp{os.getpid()}{ext}"
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_wav(path, audio, sample_rate):
+    """Atomically writes audio samples to a .wav file"""
+    with atomic_output(path) as tmp_path:
+        sf.write(tmp_path, audio, sample_rate, format='WAV')
+
+
+def convert_to_wav(src_path, dst_path):
+    """Converts any audio file readable by soundfile (e.g. FLAC) to .wav with
+    the same sample rate and bit depth. Existing outputs are kept.
+
+    Returns:
+        duration of the audio in seconds
+    """
+    if not os.path.exists(dst_path):
+        info = sf.info(src_path)
+        subtype = info.subtype if sf.check_format('WAV', info.subtype) else None
+        audio, sample_rate = sf.read(src_path, dtype='int16' if subtype == 'PCM_16' else 'float64')
+        with atomic_output(dst_path) as tmp_path:
+            sf.write(tmp_path, audio, sample_rate, subtype=subtype, format='WAV')
+    return audio_duration(dst_path)
+
+
+def _run_chunk(worker, chunk):
+    return [worker(*args) for args in chunk]
+
+
+def parallel_map(worker, jobs, num_workers=None, chunksize=16, desc=None):
+    """Yields worker(*args) for every args tuple of jobs, in job order.
+
+    Only a few chunks of jobs per worker are in flight at any time, so that
+    stopping the iteration does not wait for all remaining jobs.
+
+    Args:
+        worker: picklable (module level) function
+        jobs: sequence of argument tuples
+        num_workers (int): size of the process pool, defaults to the number
+            of CPUs. 0 or 1 runs the jobs in-process.
+        chunksize (int): number of jobs sent to a worker at once
+        desc (str): description of the progress bar
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count()
+    chunks = [jobs[i : i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    with tqdm(total=len(jobs), desc=desc, unit="job") as progress:
+        if num_workers <= 1 or len(chunks) <= 1:
+            for args in jobs:
+                result = worker(*args)
+                progress.update()
+                yield result
+            return
+
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            pending = deque()
+            chunks = iter(chunks)
+            try:
+                for chunk in itertools.islice(chunks, 2 * num_workers):
+                    pending.append(executor.submit(_run_chunk, worker, chunk))
+                while pending:
+                    results = pending.popleft().result()
+                    for chunk in itertools.islice(chunks, 1):
+                        pending.append(executor.submit(_run_chunk, worker, chunk))
+                    for result in results:
+                        progress.update()
+                        yield result
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+def _read_journal(journal_path):
+    """Returns ids of finished jobs and the manifest size after the last one.
+    A last line cut off by the interruption is removed from the journal."""
+    done, offset, valid = set(), 0, 0
+    with open(journal_path, 'r+b') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            job_id, offset = json.loads(line.decode('utf-8'))
+            done.add(job_id)
+            valid += len(line)
+        f.truncate(valid)
+    return done, offset
+
+
+def write_manifest(manifest_path, jobs, worker, num_workers=None, chunksize=16, desc=None):
+    """Writes the manifest entries returned by a worker for every job.
+
+    Entries are appended to the manifest in job order as jobs finish. After
+    the entries of a job, its id and the manifest size are appended to the
+    journal `<manifest_path>.journal`. If a journal exists when starting, the
+    manifest is cut back to the last journaled job and finished jobs are
+    skipped, so that an interrupted run produces the same manifest as an
+    uninterrupted one. The journal is removed once all jobs are done.
+
+    Args:
+        manifest_path (str): path of the .json manifest
+        jobs: sequence of (job_id, args) pairs, job_id is a unique string
+        worker: picklable function, worker(*args) returns a list of manifest
+            entries (dicts)
+        num_workers, chunksize, desc: see parallel_map
+
+    Returns:
+        number of entries written in this run
+    """
+    journal_path = manifest_path + '.journal'
+    done, offset = set(), 0
+    if os.path.exists(journal_path) and os.path.exists(manifest_path):
+        done, offset = _read_journal(journal_path)
+        logging.info(f"Resuming {manifest_path} after {len(done)} finished jobs.")
+    else:
+        open(journal_path, 'w').close()
+
+    with open(manifest_path, 'a+b') as manifest:
+        manifest.truncate(offset)
+    jobs = [(job_id, args) for job_id, args in jobs if job_id not in done]
+
+    num_entries = 0
+    with open(manifest_path, 'ab') as manifest, open(journal_path, 'a', encoding='utf-8') as journal:
+        results = parallel_map(worker, [args for _, args in jobs], num_workers, chunksize, desc)
+        for (job_id, _), entries in zip(jobs, results):
+            for entry in entries:
+                manifest.write((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+            manifest.flush()
+            journal.write(json.dumps([job_id, manifest.tell()]) + '\n')
+            journal.flush()
+            num_entries += len(entries)
+
+    os.remove(journal_path)
+    return num_entries
+
+
+def _add_to_tar(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_tarred_shard(shard_path, items, first_key=0):
+    """Atomically packs manifest items into a tar shard, in order.
+
+    Every item is stored as `<key><audio extension>` followed by
+    `<key>.json` with its text and duration, keys are 9 digit numbers counting
+    from first_key. Audio files are copied as they are, items with an offset
+    are cut out of their file and stored as .wav.
+
+    Args:
+        shard_path (str): path of the .tar file
+        items: dicts with audio_file, duration, text and offset (may be None)
+            as returned by nemo.collections.asr.parts.manifest.item_iter
+        first_key (int): key of the first item
+
+    Returns:
+        number of items written
+    """
+    with atomic_output(shard_path) as tmp_path, tarfile.open(tmp_path, 'w') as tar:
+        for key, item in enumerate(items, start=first_key):
+            audio_file = item['audio_file']
+            if item.get('offset') is None:
+                ext = os.path.splitext(audio_file)[1]
+                with open(audio_file, 'rb') as f:
+                    audio = f.read()
+            else:
+                ext = '.wav'
+                with sf.SoundFile(audio_file) as f:
+                    f.seek(int(item['offset'] * f.samplerate))
+                    samples = f.read(int(item['duration'] * f.samplerate), dtype='float32')
+                    subtype = f.subtype if sf.check_format('WAV', f.subtype) else None
+                    buf = io.BytesIO()
+                    sf.write(buf, samples, f.samplerate, subtype=subtype, format='WAV')
+                    audio = buf.getvalue()
+            entry = {'audio_filepath': audio_file, 'duration': item['duration'], 'text': item['text']}
+            _add_to_tar(tar, f'{key:09d}{ext}', audio)
+            _add_to_tar(tar, f'{key:09d}.json', json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+    return len(items)
@@ -1,14 +1,20 @@
 # Audio dataset and corresponding functions taken from Patter
 # https://github.com/ryanleary/patter
 # TODO: review, and copyright and fix/add comments
+import io
+import json
 import os
+import random
+import tarfile
 
-import kaldi_io
+import numpy as np
 import torch
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, IterableDataset
 
 from nemo import logging
+from nemo.backends.pytorch.streaming import shard_for_worker, worker_index
 from nemo.collections.asr.parts import collections, parsers
+from nemo.collections.asr.parts.kaldi_ark import KaldiArkReader
 
 
 def seq_collate_fn(batch, token_pad_value=0):
@@ -171,6 +177,154 @@ class AudioDataset(Dataset):
         return len(self.collection)
 
 
+class TarredAudioDataset(IterableDataset):
+    """
+    Streaming dataset that reads audio and transcripts sequentially from tar
+    shards, as written by scripts/convert_to_tarred_audio_dataset.py. Every
+    utterance is stored as two consecutive members sharing a key, e.g.
+    `000000123.wav` with the audio and `000000123.json` with its manifest
+    entry:
+
+    {"text": "the transcription", "duration": 0.82, "audio_filepath":
+    "/original/path/to/audio.wav"}
+
+    Shards are split between all DataLoader workers of all ranks, so that
+    every process reads whole shards front to back. With shuffle_shards, the
+    shards are permuted every pass first, from seed and the epoch set by
+    set_epoch, so all ranks agree on the permutation and every pass splits
+    them differently. Utterances are shuffled with a bounded buffer: the
+    buffer is filled first, then every new utterance replaces a random one of
+    it, which is returned. The buffer of every worker of every rank draws
+    from seed, the epoch and the index of the worker.
+
+    Args:
+        shard_paths: List of paths to the .tar shards. The number of shards
+            should be a multiple of the number of workers times the number
+            of ranks, otherwise some processes get an extra shard.
+        labels: String containing all the possible characters to map to
+        featurizer: Initialized featurizer class that converts audio to
+            feature tensors
+        shuffle_buffer: Number of utterances to shuffle over, 0 keeps the
+            order of the shards
+        shuffle_shards: Permute the shards every pass
+        max_duration: If audio exceeds this length, skip it
+        min_duration: If audio is less than this length, skip it
+        blank_index: blank character index, default = -1
+        unk_index: unk_character index, default = -1
+        normalize: whether to normalize transcript text (default): True
+        trim: whether to trim silence from beginning and end of audio
+        bos_id: Id of beginning of sequence symbol to append if not None
+        eos_id: Id of end of sequence symbol to append if not None
+        seed: Seed of the shuffling, which has to be the same on all ranks.
+            None draws one.
+    """
+
+    def __init__(
+        self,
+        shard_paths,
+        labels,
+        featurizer,
+        shuffle_buffer=0,
+        shuffle_shards=True,
+        max_duration=None,
+        min_duration=None,
+        blank_index=-1,
+        unk_index=-1,
+        normalize=True,
+        trim=False,
+        bos_id=None,
+        eos_id=None,
+        seed=None,
+    ):
+        self.shard_paths = list(shard_paths)
+        self.parser = parsers.ENCharParser(
+            labels=labels, unk_id=unk_index, blank_id=blank_index, do_normalize=normalize,
+        )
+        self.featurizer = featurizer
+        self.shuffle_buffer = shuffle_buffer
+        self.shuffle_shards = shuffle_shards
+        self.max_duration = max_duration
+        self.min_duration = min_duration
+        self.trim = trim
+        self.bos_id = bos_id
+        self.eos_id = eos_id
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Sets the epoch of the next pass, which seeds its shuffling"""
+        self.epoch = epoch
+
+    def _members(self, shard_path):
+        """Yields (audio bytes, manifest entry) pairs of a shard"""
+        audio, entry, key = None, None, None
+        with tarfile.open(shard_path, mode='r|*') as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                member_key, ext = os.path.splitext(member.name)
+                if member_key != key:
+                    if audio is not None or entry is not None:
+                        logging.warning(f"Skipping incomplete utterance {key} of {shard_path}.")
+                    audio, entry, key = None, None, member_key
+                data = tar.extractfile(member).read()
+                if ext == '.json':
+                    entry = json.loads(data.decode('utf-8'))
+                else:
+                    audio = data
+                if audio is not None and entry is not None:
+                    yield audio, entry
+                    audio, entry, key = None, None, None
+
+    def _utterances(self):
+        shard_paths = self.shard_paths
+        if self.shuffle_shards:
+            order = np.random.default_rng([self.seed, self.epoch]).permutation(len(shard_paths))
+            shard_paths = [shard_paths[i] for i in order]
+        for shard_path in shard_for_worker(shard_paths):
+            for audio, entry in self._members(shard_path):
+                duration = entry['duration']
+                if self.min_duration is not None and duration < self.min_duration:
+                    continue
+                if self.max_duration is not None and duration > self.max_duration:
+                    continue
+                tokens = self.parser(entry['text'])
+                if tokens is None:
+                    continue
+                yield audio, tokens
+
+    def _shuffled(self, utterances):
+        if self.shuffle_buffer <= 1:
+            yield from utterances
+            return
+        rng = np.random.default_rng([self.seed, self.epoch, worker_index()[0]])
+        buffer = []
+        for utterance in utterances:
+            if len(buffer) < self.shuffle_buffer:
+                buffer.append(utterance)
+                continue
+            i = int(rng.integers(len(buffer)))
+            buffer[i], utterance = utterance, buffer[i]
+            yield utterance
+        for i in rng.permutation(len(buffer)):
+            yield buffer[i]
+
+    def __iter__(self):
+        for audio, t in self._shuffled(self._utterances()):
+            features = self.featurizer.process(io.BytesIO(audio), trim=self.trim)
+            f, fl = features, torch.tensor(features.shape[0]).long()
+
+            tl = len(t)
+            if self.bos_id is not None:
+                t = [self.bos_id] + t
+                tl += 1
+            if self.eos_id is not None:
+                t = t + [self.eos_id]
+                tl += 1
+
+            yield f, fl, torch.tensor(t).long(), torch.tensor(tl).long()
+
+
 class KaldiFeatureDataset(Dataset):
     """
     Dataset that provides basic Kaldi-compatible dataset loading. Assumes that
@@ -189,6 +343,11 @@ class KaldiFeatureDataset(Dataset):
         blank_index: blank character index, default = -1
         normalize: whether to normalize transcript text. Defaults to True.
         eos_id: Id of end of sequence symbol to append if not None.
+        cache_size: Number of most recently read feature matrices every
+            worker keeps in memory. Defaults to 0 (no cache).
+
+    Only `feats.scp` is parsed on construction, the feature matrices are
+    read from the memory mapped .ark files in `__getitem__`.
     """
 
     def __init__(
@@ -202,6 +361,7 @@ class KaldiFeatureDataset(Dataset):
         blank_index=-1,
         normalize=True,
         eos_id=None,
+        cache_size=0,
     ):
         self.eos_id = eos_id
         self.unk_index = unk_index
@@ -212,27 +372,24 @@ class KaldiFeatureDataset(Dataset):
         duration = 0.0
         filtered_duration = 0.0
 
-        # Read Kaldi features (MFCC, PLP) using feats.scp
-        feats_path = os.path.join(kaldi_dir, 'feats.scp')
-        id2feats = {utt_id: torch.from_numpy(feats) for utt_id, feats in kaldi_io.read_mat_scp(feats_path)}
+        # Locate Kaldi features (MFCC, PLP) using feats.scp
+        self.feats = KaldiArkReader(os.path.join(kaldi_dir, 'feats.scp'), cache_size=cache_size)
 
-        # Get durations, if utt2dur exists
+        # Get durations, if filtering by duration
         utt2dur_path = os.path.join(kaldi_dir, 'utt2dur')
         id2dur = {}
-        if os.path.exists(utt2dur_path):
+        if not (max_duration or min_duration):
+            logging.info(f"No duration filter set for {kaldi_dir}. Skipping dataset duration calculations.")
+        elif os.path.exists(utt2dur_path):
             with open(utt2dur_path, 'r') as f:
                 for line in f:
                     utt_id, dur = line.split()
                     id2dur[utt_id] = float(dur)
-        elif max_duration or min_duration:
+        else:
             raise ValueError(
                 f"KaldiFeatureDataset max_duration or min_duration is set but"
                 f" utt2dur file not found in {kaldi_dir}."
             )
-        else:
-            logging.info(
-                f"Did not find utt2dur when loading data from " f"{kaldi_dir}. Skipping dataset duration calculations."
-            )
 
         # Match transcripts to features
         text_path = os.path.join(kaldi_dir, 'text')
@@ -242,9 +399,7 @@ class KaldiFeatureDataset(Dataset):
                 split_idx = line.find(' ')
                 utt_id = line[:split_idx]
 
-                audio_features = id2feats.get(utt_id)
-
-                if audio_features is not None:
+                if utt_id in self.feats:
 
                     text = line[split_idx:].strip()
                     if normalize:
@@ -265,12 +420,12 @@ class KaldiFeatureDataset(Dataset):
                         'utt_id': utt_id,
                         'text': text,
                         'tokens': parser(text),
-                        'audio': audio_features.t(),
                         'duration': dur,
                     }
 
                     data.append(sample)
-                    duration += dur
+                    if dur is not None:
+                        duration += dur
 
                     if max_utts > 0 and len(data) >= max_utts:
                         logging.warning(f"Stop parsing due to max_utts ({max_utts})")
@@ -286,12 +441,12 @@ class KaldiFeatureDataset(Dataset):
 
     def __getitem__(self, index):
         sample = self.data[index]
-        f = sample['audio']
+        f = torch.from_numpy(self.feats[sample['utt_id']]).t()
         fl = torch.tensor(f.shape[1]).long()
         t, tl = sample['tokens'], len(sample['tokens'])
 
         if self.eos_id is not None:
-            t.append(self.eos_id)
+            t = t + [self.eos_id]
             tl += 1
 
         return f, fl, torch.tensor(t).long(), torch.tensor(tl).long()
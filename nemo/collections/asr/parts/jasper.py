@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import copy
 from typing import List, Optional, Tuple
 
 import torch
@@ -399,3 +400,230 @@ class JasperBlock(nn.Module):
             return xs + [out], lens
 
         return [out], lens
+
+
+def _plain_conv(conv):
+    """Returns the nn.Conv1d computing conv, depthwise convolutions with
+    shared heads are expanded to one filter per channel"""
+    if isinstance(conv, nn.Conv1d):
+        return copy.deepcopy(conv)
+    if conv.heads == -1:
+        return copy.deepcopy(conv.conv)
+    channels = conv.real_out_channels
+    repeats = channels // conv.heads
+    plain = nn.Conv1d(
+        channels,
+        channels,
+        conv.conv.kernel_size,
+        stride=conv.conv.stride,
+        padding=conv.conv.padding,
+        dilation=conv.conv.dilation,
+        groups=channels,
+        bias=conv.conv.bias is not None,
+    ).to(conv.conv.weight.device)
+    # channel c of the input is convolved with head c % heads
+    plain.weight.data.copy_(conv.conv.weight.data.repeat(repeats, 1, 1))
+    if conv.conv.bias is not None:
+        plain.bias.data.copy_(conv.conv.bias.data.repeat(repeats))
+    return plain
+
+
+def fuse_conv_bn(conv, bn):
+    """Returns a nn.Conv1d with bias which computes bn(conv(x)) of bn in
+    inference mode, i.e. with its running statistics folded into the weights"""
+    fused = nn.Conv1d(
+        conv.in_channels,
+        conv.out_channels,
+        conv.kernel_size,
+        stride=conv.stride,
+        padding=conv.padding,
+        dilation=conv.dilation,
+        groups=conv.groups,
+        bias=True,
+    ).to(conv.weight.device)
+    with torch.no_grad():
+        scale = torch.rsqrt(bn.running_var + bn.eps)
+        shift = -bn.running_mean * scale
+        if bn.affine:
+            scale = scale * bn.weight
+            shift = shift * bn.weight + bn.bias
+        fused.weight.copy_(conv.weight * scale.view(-1, 1, 1))
+        bias = shift if conv.bias is None else conv.bias * scale + shift
+        fused.bias.copy_(bias)
+    return fused
+
+
+class FusedMaskedConv1d(nn.Module):
+    """
+    Inference version of a convolution of JasperBlock together with the
+    layers following it (normalization, group shuffle and activation).
+
+    The input is masked beyond the sequence lengths before the convolution
+    like in MaskedConv1d. Masks are passed on to the next convolution and
+    rebuilt only when the convolution changes lengths, i.e. has a stride or
+    doesn't keep the size.
+    """
+
+    __constants__ = ["masked", "updates_length", "length_offset", "stride"]
+
+    def __init__(self, conv, post=(), masked=False):
+        super(FusedMaskedConv1d, self).__init__()
+        self.conv = conv
+        self.post = nn.Sequential(*post)
+        self.masked = masked
+        self.length_offset = 2 * conv.padding[0] - conv.dilation[0] * (conv.kernel_size[0] - 1) - 1
+        self.stride = conv.stride[0]
+        self.updates_length = self.stride != 1 or self.length_offset != -1
+
+    def forward(self, x, lens, mask, inplace=False):
+        # type: (Tensor, Optional[Tensor], Optional[Tensor], bool) -> Tuple[Tensor, Optional[Tensor], Optional[Tensor]] # nopep8
+        if self.masked and lens is not None:
+            if mask is None:
+                mask = length_mask(lens, x.size(2))
+            if inplace:
+                x = x.masked_fill_(mask, 0.0)
+            else:
+                x = x.masked_fill(mask, 0.0)
+            if self.updates_length:
+                lens = (lens.to(dtype=torch.long) + self.length_offset) / self.stride + 1
+                mask = None
+        return self.post(self.conv(x)), lens, mask
+
+
+def length_mask(lens, max_len):
+    # type: (Tensor, int) -> Tensor
+    """Boolean mask (batch, 1, max_len) of the positions beyond lens"""
+    positions = torch.arange(max_len, device=lens.device)
+    return (positions >= lens.to(dtype=torch.long).unsqueeze(1)).unsqueeze(1)
+
+
+def _fuse_layers(layers, masked):
+    """Groups layers of a JasperBlock into FusedMaskedConv1d, folding batch
+    norms into the preceding convolution and dropping dropout"""
+    fused = []
+    for layer in layers:
+        if isinstance(layer, (MaskedConv1d, nn.Conv1d)):
+            use_mask = layer.use_mask if isinstance(layer, MaskedConv1d) else False
+            fused.append(FusedMaskedConv1d(_plain_conv(layer), masked=masked and use_mask))
+            continue
+        last = fused[-1]
+        if isinstance(layer, nn.Dropout):
+            continue
+        if isinstance(layer, nn.BatchNorm1d) and layer.track_running_stats and len(last.post) == 0:
+            last.conv = fuse_conv_bn(last.conv, layer)
+        elif isinstance(layer, (nn.Hardtanh, nn.ReLU, nn.SELU)):
+            last.post.append(_inplace_activation(layer))
+        else:
+            last.post.append(copy.deepcopy(layer))
+    return fused
+
+
+def _inplace_activation(activation):
+    activation = copy.deepcopy(activation)
+    activation.inplace = True
+    return activation
+
+
+class FusedJasperBlock(nn.Module):
+    """
+    Inference version of JasperBlock created by FusedJasperBlock.from_block().
+
+    Batch norms are folded into convolutions, dropout is removed and
+    activations run in place. With residual_mode 'add', biases of the
+    residual branches are added to the bias of the last convolution if
+    nothing but a folded batch norm follows it, and residual outputs are
+    added in place.
+    """
+
+    __constants__ = ["residual_mode", "dense_residual", "has_residual", "masked"]
+
+    def __init__(self, mconv, res, activation, residual_mode="add", dense_residual=False):
+        super(FusedJasperBlock, self).__init__()
+        self.mconv = nn.ModuleList(mconv)
+        self.has_residual = res is not None
+        self.res = nn.ModuleList(res if res is not None else [])
+        self.mout = activation
+        self.residual_mode = residual_mode
+        self.dense_residual = dense_residual
+        self.masked = any(conv.masked for conv in mconv)
+
+    @classmethod
+    def from_block(cls, block):
+        masked = block.conv_mask
+        mconv = _fuse_layers(block.mconv, masked)
+        res = None
+        if block.res is not None:
+            res = [_fuse_layers(layers, masked)[0] for layers in block.res]
+            if block.residual_mode == 'add' and len(mconv[-1].post) == 0 and all(len(r.post) == 0 for r in res):
+                # y = conv(x) + b + sum(res_conv(x_i) + b_i)
+                bias = mconv[-1].conv.bias
+                for r in res:
+                    bias.data.add_(r.conv.bias.data)
+                    r.conv.bias = None
+        activation = _inplace_activation(block.mout[0])
+        return cls(mconv, res, activation, residual_mode=block.residual_mode, dense_residual=block.dense_residual)
+
+    def forward(self, xs, lens, mask):
+        # type: (List[Tensor], Optional[Tensor], Optional[Tensor]) -> Tuple[List[Tensor], Optional[Tensor], Optional[Tensor]] # nopep8
+        lens_orig = lens
+        if self.masked and lens is not None and mask is None:
+            # shared by the first convolution and the residual branches
+            mask = length_mask(lens, xs[-1].size(2))
+        mask_orig = mask
+
+        out = xs[-1]
+        inplace = False
+        for conv in self.mconv:
+            out, lens, mask = conv(out, lens, mask, inplace)
+            inplace = True
+
+        if self.has_residual:
+            for i, res in enumerate(self.res):
+                res_out, _, _ = res(xs[i], lens_orig, mask_orig)
+                if self.residual_mode == 'add':
+                    out.add_(res_out)
+                else:
+                    out = torch.max(out, res_out)
+
+        out = self.mout(out)
+        if self.has_residual and self.dense_residual:
+            return xs + [out], lens, mask
+        return [out], lens, mask
+
+
+class FusedJasperEncoder(nn.Module):
+    """
+    Inference version of the blocks of JasperEncoder, see
+    JasperEncoder.fused_for_inference(). It computes the same outputs as
+    the encoder in eval mode and can be compiled with torch.jit.script().
+
+    forward(audio_signal, length) returns the tuple (outputs, lengths).
+    """
+
+    __constants__ = ["masked", "truncate_lengths"]
+
+    def __init__(self, blocks):
+        super(FusedJasperEncoder, self).__init__()
+        self.blocks = nn.ModuleList([FusedJasperBlock.from_block(block) for block in blocks])
+        masked_convs = [conv for block in self.blocks for conv in block.mconv if conv.masked]
+        self.masked = len(masked_convs) > 0
+        # masked convolutions truncate incoming lengths, which is skipped by
+        # the ones keeping lengths
+        self.truncate_lengths = self.masked and not masked_convs[-1].updates_length
+        for p in self.parameters():
+            p.requires_grad_(False)
+        self.eval()
+
+    def forward(self, audio_signal, length=None):
+        # type: (Tensor, Optional[Tensor]) -> Tuple[Tensor, Optional[Tensor]]
+        xs = [audio_signal]
+        lens = length
+        mask: Optional[Tensor] = None
+        for block in self.blocks:
+            xs, lens, mask = block(xs, lens, mask)
+        if self.masked and lens is not None:
+            # masked convolutions return lengths as floats
+            if self.truncate_lengths:
+                lens = lens.to(dtype=torch.long)
+            lens = lens.to(dtype=torch.float)
+        return xs[-1], lens
@@ -0,0 +1,176 @@
+# Copyright (c) 2020 NVIDIA Corporation. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Lazy random access to Kaldi matrices stored in .ark files"""
+
+import mmap
+import re
+from collections import OrderedDict
+
+import kaldi_io
+import numpy as np
+
+_RANGE = re.compile(r'^(.+)\[(.+)\]$')
+
+_COMPRESSED_HEADER = np.dtype([('min_value', '<f4'), ('range', '<f4'), ('num_rows', '<i4'), ('num_cols', '<i4')])
+_SIZES = np.dtype('i1,<i4,i1,<i4')
+_COLUMN_HEADER = np.dtype([('p0', '<u2'), ('p25', '<u2'), ('p75', '<u2'), ('p100', '<u2')])
+
+
+def parse_scp(scp_path):
+    """Parses a Kaldi .scp file into {key: (ark_path, byte_offset, range)}.
+
+    range is None or a tuple of slices for entries with a matrix range, e.g.
+    `feats.ark:13[10:19]`. No matrix is read.
+    """
+    entries = OrderedDict()
+    with open(scp_path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            key, rxfile = line.split(maxsplit=1)
+            range_slice = None
+            match = _RANGE.match(rxfile)
+            if match is not None:
+                rxfile, range_str = match.groups()
+                range_slice = tuple(
+                    slice(int(start) if start else None, int(end) if end else None)
+                    for start, end in (r.split(':') for r in range_str.split(','))
+                )
+            if rxfile.endswith('|'):
+                raise ValueError(f"Piped entry '{rxfile}' of {scp_path} can not be read lazily.")
+            path, sep, offset = rxfile.rpartition(':')
+            if not sep or not offset.isdigit():
+                path, offset = rxfile, 0
+            entries[key] = (path, int(offset), range_slice)
+    return entries
+
+
+class KaldiArkReader:
+    """Reads the matrices of a Kaldi .scp file on demand.
+
+    Only the .scp file is parsed on construction. The .ark files are memory
+    mapped on first access and every matrix is decoded from its byte offset
+    when requested, so that memory use does not grow with the corpus size.
+    Binary float/double matrices and the compressed formats (CM, CM2, CM3)
+    are decoded directly from the mapping, text matrices through kaldi_io.
+
+    Memory maps and the cache are not pickled, so that every DataLoader
+    worker opens its own maps and keeps its own cache.
+
+    Args:
+        scp_path (str): Path to the .scp file.
+        cache_size (int): Number of most recently read matrices to keep in
+            memory. Defaults to 0, which disables the cache.
+    """
+
+    def __init__(self, scp_path, cache_size=0):
+        self.entries = parse_scp(scp_path)
+        self.cache_size = cache_size
+        self._maps = {}
+        self._cache = OrderedDict()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_maps'] = {}
+        state['_cache'] = OrderedDict()
+        return state
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def keys(self):
+        return self.entries.keys()
+
+    def __getitem__(self, key):
+        """Returns the matrix of key as a writable float numpy array"""
+        mat = self._cache.get(key)
+        if mat is not None:
+            self._cache.move_to_end(key)
+            return mat
+
+        path, offset, range_slice = self.entries[key]
+        mat = self._read(path, offset)
+        if range_slice is not None:
+            mat = np.ascontiguousarray(mat[range_slice])
+
+        if self.cache_size > 0:
+            self._cache[key] = mat
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return mat
+
+    def _map(self, path):
+        buf = self._maps.get(path)
+        if buf is None:
+            with open(path, 'rb') as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[path] = buf
+        return buf
+
+    def _read(self, path, offset):
+        buf = self._map(path)
+        if buf[offset : offset + 2] != b'\0B':
+            return kaldi_io.read_mat(f'{path}:{offset}')
+
+        header = buf[offset + 2 : offset + 5]
+        if header in (b'FM ', b'DM '):
+            # sizes are stored as '\4' followed by an int32
+            _, rows, _, cols = np.frombuffer(buf, dtype=_SIZES, count=1, offset=offset + 5)[0]
+            dtype = '<f4' if header == b'FM ' else '<f8'
+            data = np.frombuffer(buf, dtype=dtype, count=rows * cols, offset=offset + 15)
+            return data.reshape(rows, cols).copy()
+        if header.startswith(b'CM'):
+            return self._read_compressed(buf, offset + 2, header)
+        raise ValueError(f"Unknown matrix header {header} at {path}:{offset}.")
+
+    @staticmethod
+    def _read_compressed(buf, offset, header):
+        """See CompressedMatrix::CopyToMat in Kaldi's compressed-matrix.cc"""
+        # 'CM ' is followed directly by the global header, 'CM2' and 'CM3'
+        # by a space
+        offset += len(header) if header == b'CM ' else len(header) + 1
+        min_value, value_range, rows, cols = np.frombuffer(buf, dtype=_COMPRESSED_HEADER, count=1, offset=offset)[0]
+        offset += _COMPRESSED_HEADER.itemsize
+
+        if header == b'CM2':
+            data = np.frombuffer(buf, dtype='<u2', count=rows * cols, offset=offset)
+            return (min_value + data.reshape(rows, cols) * np.float32(value_range / 65535.0)).astype(np.float32)
+        if header == b'CM3':
+            data = np.frombuffer(buf, dtype=np.uint8, count=rows * cols, offset=offset)
+            return (min_value + data.reshape(rows, cols) * np.float32(value_range / 255.0)).astype(np.float32)
+
+        # speech feature format: per column percentiles followed by
+        # column-major uint8 data interpolated piecewise between them, with
+        # the float32 arithmetic of kaldi_io
+        columns = np.frombuffer(buf, dtype=_COLUMN_HEADER, count=cols, offset=offset)
+        offset += _COLUMN_HEADER.itemsize * cols
+        data = np.frombuffer(buf, dtype=np.uint8, count=rows * cols, offset=offset).reshape(cols, rows)
+        p0, p25, p75, p100 = (
+            (columns[name].astype(np.float32) * value_range * np.float32(1.52590218966964e-05) + min_value)[:, None]
+            for name in ('p0', 'p25', 'p75', 'p100')
+        )
+        data = data.astype(np.float32)
+        mat = np.where(
+            data <= 64,
+            p0 + (p25 - p0) / 64.0 * data,
+            np.where(data <= 192, p25 + (p75 - p25) / 128.0 * (data - 64), p75 + (p100 - p75) / 63.0 * (data - 192)),
+        )
+        return np.ascontiguousarray(mat.T, dtype=np.float32)
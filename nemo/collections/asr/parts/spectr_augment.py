@@ -1,28 +1,87 @@
-import random
-
 import torch
 import torch.nn as nn
 
 
-class SpecAugment(nn.Module):
+class _MaskSampler(nn.Module):
+    """
+    Base class of the spectrogram masks, which samples mask positions on the
+    device of the spectrogram.
+
+    rng can be a torch.Generator, which is used as is, or a random.Random
+    instance (kept for backward compatibility), which seeds one
+    torch.Generator per device. Without rng the global torch RNG is used.
+    """
+
+    def __init__(self, rng=None):
+        super().__init__()
+        self._generator = None
+        self._seed = None
+        self._generators = {}
+        if isinstance(rng, torch.Generator):
+            self._generator = rng
+        elif rng is not None:
+            self._seed = rng.getrandbits(63)
+
+    def _uniform(self, shape, device):
+        if self._generator is not None:
+            u = torch.rand(shape, generator=self._generator, device=self._generator.device)
+            return u.to(device)
+        generator = None
+        if self._seed is not None:
+            generator = self._generators.get(device)
+            if generator is None:
+                generator = torch.Generator(device=device)
+                generator.manual_seed(self._seed)
+                self._generators[device] = generator
+        return torch.rand(shape, generator=generator, device=device)
+
+    @staticmethod
+    def _scale(u, high):
+        """int(uniform(0, high)) for uniform samples u, high is clamped to be
+        non-negative and may be a tensor broadcastable to u"""
+        if torch.is_tensor(high):
+            high = high.clamp(min=0).to(u.dtype)
+        else:
+            high = max(high, 0)
+        return (u * high).long()
+
+    @staticmethod
+    def _segments(starts, widths, size):
+        """Boolean mask (*starts.shape, size) of [start, start + width) ranges"""
+        positions = torch.arange(size, device=starts.device)
+        starts, ends = starts.unsqueeze(-1), (starts + widths).unsqueeze(-1)
+        return (positions >= starts) & (positions < ends)
+
+    @staticmethod
+    def _valid_time(x, length):
+        if length is None:
+            return None
+        positions = torch.arange(x.shape[2], device=x.device)
+        return positions < length.to(x.device).unsqueeze(-1)
+
+
+class SpecAugment(_MaskSampler):
     """
     Zeroes out(cuts) random continuous horisontal or
     vertical segments of the spectrogram as described in
     SpecAugment (https://arxiv.org/abs/1904.08779).
 
+    Masks of the whole batch are sampled at once on the device of the input.
+    If per-utterance lengths are given, time masks are placed and frequency
+    masks applied only within the valid frames of every utterance.
+
     params:
     freq_masks - how many frequency segments should be cut
     time_masks - how many time segments should be cut
     freq_width - maximum number of frequencies to be cut in one segment
     time_width - maximum number of time steps to be cut in one segment
+    rng - torch.Generator or random.Random used for sampling
     """
 
     def __init__(
         self, freq_masks=0, time_masks=0, freq_width=10, time_width=10, rng=None,
     ):
-        super(SpecAugment, self).__init__()
-
-        self._rng = random.Random() if rng is None else rng
+        super(SpecAugment, self).__init__(rng=rng)
 
         self.freq_masks = freq_masks
         self.time_masks = time_masks
@@ -31,67 +90,74 @@ class SpecAugment(nn.Module):
         self.time_width = time_width
 
     @torch.no_grad()
-    def forward(self, x):
-        sh = x.shape
-
-        mask = torch.zeros(x.shape).byte()
-
-        for idx in range(sh[0]):
-            for i in range(self.freq_masks):
-                x_left = int(self._rng.uniform(0, sh[1] - self.freq_width))
-
-                w = int(self._rng.uniform(0, self.freq_width))
+    def forward(self, x, length=None):
+        batch_size, num_freqs, num_frames = x.shape
+        u = self._uniform((4, batch_size, max(self.freq_masks, self.time_masks)), x.device)
 
-                mask[idx, x_left : x_left + w, :] = 1
+        freq_starts = self._scale(u[0, :, : self.freq_masks], num_freqs - self.freq_width)
+        freq_widths = self._scale(u[1, :, : self.freq_masks], self.freq_width)
+        freq_mask = self._segments(freq_starts, freq_widths, num_freqs).any(dim=1)
 
-            for i in range(self.time_masks):
-                y_left = int(self._rng.uniform(0, sh[2] - self.time_width))
+        time_limit = num_frames if length is None else length.to(x.device).unsqueeze(-1)
+        time_starts = self._scale(u[2, :, : self.time_masks], time_limit - self.time_width)
+        time_widths = self._scale(u[3, :, : self.time_masks], self.time_width)
+        time_mask = self._segments(time_starts, time_widths, num_frames).any(dim=1)
 
-                w = int(self._rng.uniform(0, self.time_width))
+        valid = self._valid_time(x, length)
+        if valid is not None:
+            time_mask &= valid
+            freq_mask = freq_mask.unsqueeze(-1) & valid.unsqueeze(1)
+        else:
+            freq_mask = freq_mask.unsqueeze(-1)
 
-                mask[idx, :, y_left : y_left + w] = 1
+        return x.masked_fill(freq_mask | time_mask.unsqueeze(1), 0)
 
-        x = x.masked_fill(mask.type(torch.bool).to(device=x.device), 0)
 
-        return x
-
-
-class SpecCutout(nn.Module):
+class SpecCutout(_MaskSampler):
     """
     Zeroes out(cuts) random rectangles in the spectrogram
     as described in (https://arxiv.org/abs/1708.04552).
 
+    Rectangles of the whole batch are sampled at once on the device of the
+    input. If per-utterance lengths are given, rectangles are placed within
+    the valid frames of every utterance.
+
     params:
     rect_masks - how many rectangular masks should be cut
     rect_freq - maximum size of cut rectangles along the frequency dimension
     rect_time - maximum size of cut rectangles along the time dimension
+    rng - torch.Generator or random.Random used for sampling
     """
 
     def __init__(self, rect_masks=0, rect_time=5, rect_freq=20, rng=None):
-        super(SpecCutout, self).__init__()
-
-        self._rng = random.Random() if rng is None else rng
+        super(SpecCutout, self).__init__(rng=rng)
 
         self.rect_masks = rect_masks
         self.rect_time = rect_time
         self.rect_freq = rect_freq
 
     @torch.no_grad()
-    def forward(self, x):
-        sh = x.shape
-
-        mask = torch.zeros(x.shape).byte()
-
-        for idx in range(sh[0]):
-            for i in range(self.rect_masks):
-                rect_x = int(self._rng.uniform(0, sh[1] - self.rect_freq))
-                rect_y = int(self._rng.uniform(0, sh[2] - self.rect_time))
-
-                w_x = int(self._rng.uniform(0, self.rect_time))
-                w_y = int(self._rng.uniform(0, self.rect_freq))
-
-                mask[idx, rect_x : rect_x + w_x, rect_y : rect_y + w_y] = 1
-
-        x = x.masked_fill(mask.type(torch.bool).to(device=x.device), 0)
-
-        return x
+    def forward(self, x, length=None):
+        batch_size, num_freqs, num_frames = x.shape
+        u = self._uniform((4, batch_size, self.rect_masks), x.device)
+
+        time_limit = num_frames if length is None else length.to(x.device).unsqueeze(-1)
+        rect_x = self._scale(u[0], num_freqs - self.rect_freq)
+        rect_y = self._scale(u[1], time_limit - self.rect_time)
+        # the widths keep the sampling of earlier versions, which draws the
+        # extent along frequencies from rect_time and along time from rect_freq
+        w_x = self._scale(u[2], self.rect_time)
+        w_y = self._scale(u[3], self.rect_freq)
+
+        freq_segments = self._segments(rect_x, w_x, num_freqs)
+        time_segments = self._segments(rect_y, w_y, num_frames)
+        # (B, F, M) x (B, M, T) counts the rectangles covering every bin
+        # without materializing a (B, M, F, T) mask
+        coverage = torch.bmm(freq_segments.transpose(1, 2).float(), time_segments.float())
+        mask = coverage > 0
+
+        valid = self._valid_time(x, length)
+        if valid is not None:
+            mask &= valid.unsqueeze(1)
+
+        return x.masked_fill(mask, 0)
@@ -15,6 +15,11 @@
 # =============================================================================
 
 import nemo
-from nemo.collections.nlp import callbacks, data, nm, utils
+from nemo.utils.lazy_import import lazy_attributes
+
+__all__ = ["backend", "callbacks", "data", "metrics", "nm", "utils"]
+
+# callbacks, data, metrics, nm and utils are imported on first access
+__getattr__, __dir__ = lazy_attributes(__name__, submodules=["callbacks", "data", "metrics", "nm", "utils"])
 
 backend = nemo.core.Backend.PyTorch
@@ -14,12 +14,30 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.callbacks.glue_benchmark_callback import *
-from nemo.collections.nlp.callbacks.joint_intent_slot_callback import *
-from nemo.collections.nlp.callbacks.lm_bert_callback import *
-from nemo.collections.nlp.callbacks.lm_transformer_callback import *
-from nemo.collections.nlp.callbacks.machine_translation_callback import *
-from nemo.collections.nlp.callbacks.punctuation_capitalization_callback import *
-from nemo.collections.nlp.callbacks.qa_squad_callback import *
-from nemo.collections.nlp.callbacks.text_classification_callback import *
-from nemo.collections.nlp.callbacks.token_classification_callback import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.collections.nlp.callbacks.glue_benchmark_callback": "*",
+        "nemo.collections.nlp.callbacks.joint_intent_slot_callback": "*",
+        "nemo.collections.nlp.callbacks.lm_bert_callback": "*",
+        "nemo.collections.nlp.callbacks.lm_transformer_callback": "*",
+        "nemo.collections.nlp.callbacks.machine_translation_callback": "*",
+        "nemo.collections.nlp.callbacks.punctuation_capitalization_callback": "*",
+        "nemo.collections.nlp.callbacks.qa_squad_callback": "*",
+        "nemo.collections.nlp.callbacks.text_classification_callback": "*",
+        "nemo.collections.nlp.callbacks.token_classification_callback": "*",
+    },
+    submodules=[
+        "glue_benchmark_callback",
+        "joint_intent_slot_callback",
+        "lm_bert_callback",
+        "lm_transformer_callback",
+        "machine_translation_callback",
+        "punctuation_capitalization_callback",
+        "qa_squad_callback",
+        "text_classification_callback",
+        "token_classification_callback",
+    ],
+)
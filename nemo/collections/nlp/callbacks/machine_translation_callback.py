@@ -18,7 +18,7 @@ import numpy as np
 
 from nemo import logging
 from nemo.collections.asr.metrics import word_error_rate
-from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu
+from nemo.collections.nlp.metrics.fast_bleu import fast_corpus_bleu
 
 __all__ = ['eval_iter_callback', 'eval_epochs_done_callback']
 
@@ -59,7 +59,7 @@ def eval_iter_callback(tensors, global_vars, tgt_tokenizer):
                 global_vars["eval_loss"].append(eval_loss.item())
 
 
-def eval_epochs_done_callback(global_vars, validation_dataset=None):
+def eval_epochs_done_callback(global_vars, validation_dataset=None, num_workers=0):
     losses = np.array(global_vars["eval_loss"])
     counts = np.array(global_vars["nonpad_tokens"])
     eval_loss = np.sum(losses * counts) / np.sum(counts)
@@ -75,8 +75,8 @@ def eval_epochs_done_callback(global_vars, validation_dataset=None):
     else:
         all_ref = [[j for i in global_vars["ref"] for j in i]]
 
-    token_bleu = corpus_bleu(all_sys, all_ref, tokenize="fairseq").score
-    sacre_bleu = corpus_bleu(all_sys, all_ref, tokenize="13a").score
+    token_bleu = fast_corpus_bleu(all_sys, all_ref, tokenize="fairseq", num_workers=num_workers).score
+    sacre_bleu = fast_corpus_bleu(all_sys, all_ref, tokenize="13a", num_workers=num_workers).score
 
     for i in range(3):
         sent_id = np.random.randint(len(all_sys))
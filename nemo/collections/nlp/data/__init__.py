@@ -14,5 +14,10 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.data.datasets import *
-from nemo.collections.nlp.data.tokenizers import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {"nemo.collections.nlp.data.datasets": "*", "nemo.collections.nlp.data.tokenizers": "*"},
+    submodules=["datasets", "tokenizers"],
+)
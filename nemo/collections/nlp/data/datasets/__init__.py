@@ -14,26 +14,40 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.data.datasets import datasets_utils
-from nemo.collections.nlp.data.datasets.glue_benchmark_dataset import GLUEDataset
-from nemo.collections.nlp.data.datasets.joint_intent_slot_dataset import (
-    BertJointIntentSlotDataset,
-    BertJointIntentSlotInferDataset,
-)
-from nemo.collections.nlp.data.datasets.lm_bert_dataset import (
-    BertPretrainingDataset,
-    BertPretrainingPreprocessedDataset,
-)
-from nemo.collections.nlp.data.datasets.lm_transformer_dataset import LanguageModelingDataset
-from nemo.collections.nlp.data.datasets.machine_translation_dataset import TranslationDataset
-from nemo.collections.nlp.data.datasets.punctuation_capitalization_dataset import (
-    BertPunctuationCapitalizationDataset,
-    BertPunctuationCapitalizationInferDataset,
-)
-from nemo.collections.nlp.data.datasets.qa_squad_dataset import SquadDataset
-from nemo.collections.nlp.data.datasets.state_tracking_trade_dataset import *
-from nemo.collections.nlp.data.datasets.text_classification_dataset import BertTextClassificationDataset
-from nemo.collections.nlp.data.datasets.token_classification_dataset import (
-    BertTokenClassificationDataset,
-    BertTokenClassificationInferDataset,
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        ".glue_benchmark_dataset": ["GLUEDataset"],
+        ".joint_intent_slot_dataset": ["BertJointIntentSlotDataset", "BertJointIntentSlotInferDataset"],
+        ".lm_bert_dataset": ["BertPretrainingDataset", "BertPretrainingPreprocessedDataset", "WholeWordMasking"],
+        ".lm_transformer_dataset": [
+            "LanguageModelingDataset",
+            "MemmapLanguageModelingDataset",
+            "ShardedWindowSampler",
+        ],
+        ".machine_translation_dataset": ["TranslationDataset"],
+        ".punctuation_capitalization_dataset": [
+            "BertPunctuationCapitalizationDataset",
+            "BertPunctuationCapitalizationInferDataset",
+        ],
+        ".qa_squad_dataset": ["SquadDataset"],
+        ".state_tracking_trade_dataset": "*",
+        ".text_classification_dataset": ["BertTextClassificationDataset"],
+        ".token_classification_dataset": ["BertTokenClassificationDataset", "BertTokenClassificationInferDataset"],
+    },
+    submodules=[
+        "datasets_utils",
+        "glue_benchmark_dataset",
+        "joint_intent_slot_dataset",
+        "lm_bert_dataset",
+        "lm_transformer_dataset",
+        "machine_translation_dataset",
+        "punctuation_capitalization_dataset",
+        "qa_squad_dataset",
+        "state_tracking_trade_dataset",
+        "text_classification_dataset",
+        "token_classification_dataset",
+    ],
 )
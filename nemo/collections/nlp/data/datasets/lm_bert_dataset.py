@@ -24,6 +24,7 @@ import random
 
 import h5py
 import numpy as np
+import torch
 from torch.utils.data import Dataset
 from tqdm import tqdm
 
@@ -31,10 +32,100 @@ from nemo import logging
 from nemo.collections.nlp.data.datasets.datasets_utils import download_wkt2
 from nemo.collections.nlp.data.datasets.lm_transformer_dataset import create_vocab_mlm
 
-__all__ = ['BertPretrainingDataset', 'BertPretrainingPreprocessedDataset']
+__all__ = ['BertPretrainingDataset', 'BertPretrainingPreprocessedDataset', 'WholeWordMasking']
+
+
+class WholeWordMasking:
+    """
+    Whole-word masking of token ids for masked language modeling, which
+    works on numpy arrays of a single sequence or a whole batch at once.
+
+    Words are groups of tokens where every token starting with '\u2581' is
+    grouped with its previous token. Word boundaries are looked up in a table
+    over the vocabulary which is built once. Every word which doesn't start
+    with [CLS], [SEP] or [PAD] is selected with probability
+    mask_probability, and the tokens of a selected word are replaced with
+    1) the [MASK] token 80% of the time,
+    2) random tokens other than [CLS] and [SEP] 10% of the time,
+    3) the same tokens 10% of the time.
+
+    Args:
+        tokenizer (TokenizerSpec): tokenizer with [CLS], [SEP], [PAD] and
+            [MASK] tokens
+        mask_probability (float): probability of selecting a word
+    """
+
+    def __init__(self, tokenizer, mask_probability=0.15):
+        self.mask_probability = mask_probability
+        self.vocab_size = tokenizer.vocab_size
+        self.cls_id = tokenizer.token_to_id("[CLS]")
+        self.sep_id = tokenizer.token_to_id("[SEP]")
+        self.pad_id = tokenizer.token_to_id("[PAD]")
+        self.mask_id = tokenizer.token_to_id("[MASK]")
+        tokens = tokenizer.ids_to_tokens(list(range(self.vocab_size)))
+        self.continues_word = np.array([token.startswith('\u2581') for token in tokens], dtype=bool)
+        self.special_ids = np.array([self.cls_id, self.sep_id, self.pad_id])
+        # ids which random replacements skip, in ascending order
+        self._excluded_ids = sorted({self.cls_id, self.sep_id})
+
+    def __call__(self, ids, rng=None):
+        """
+        Args:
+            ids: token ids (seq_length,) or (batch_size, seq_length), a batch
+                is padded with [PAD]
+            rng (numpy.random.Generator): random generator, by default one
+                seeded from python's random module, so that random.seed()
+                and the seeding of DataLoader workers apply
+        Returns:
+            masked ids and output mask (1 for tokens of selected words) of
+            the same shape as ids
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if rng is None:
+            rng = np.random.default_rng(random.getrandbits(64))
+        flat_ids = ids.reshape(-1)
+        if flat_ids.size == 0:
+            return ids.copy(), np.zeros(ids.shape, dtype=np.int64)
+
+        word_starts = ~self.continues_word[flat_ids]
+        # every sequence starts a new word
+        word_starts.reshape(-1, ids.shape[-1])[:, 0] = True
+        word_ids = np.cumsum(word_starts) - 1
+        num_words = word_ids[-1] + 1
+
+        selected = rng.random(num_words) <= self.mask_probability
+        selected &= ~np.isin(flat_ids[word_starts], self.special_ids)
+        replacement = rng.random(num_words)
+
+        token_selected = selected[word_ids]
+        token_replacement = replacement[word_ids]
+        masked_ids = flat_ids.copy()
+        masked_ids[token_selected & (token_replacement < 0.8)] = self.mask_id
+        random_positions = np.flatnonzero(token_selected & (token_replacement >= 0.8) & (token_replacement < 0.9))
+        random_ids = rng.integers(0, self.vocab_size - len(self._excluded_ids), len(random_positions))
+        for excluded_id in self._excluded_ids:
+            random_ids += random_ids >= excluded_id
+        masked_ids[random_positions] = random_ids
+
+        return masked_ids.reshape(ids.shape), token_selected.astype(np.int64).reshape(ids.shape)
 
 
 class BertPretrainingDataset(Dataset):
+    """
+    Dataset of BERT pretraining examples sampled from text documents.
+
+    Args:
+        tokenizer (TokenizerSpec): tokenizer
+        dataset (str): directory or a single file with dataset documents
+        max_seq_length (int): maximum length of the text segments
+        mask_probability (float): probability of masking a word
+        short_seq_prob (float): probability of creating shorter sequences
+        seq_a_ratio (float): length ratio of the first sequence
+        sentence_idx_file (str): file with cached offsets of the lines
+        mask_per_batch (bool): return examples without masking and mask
+            whole batches in collate_fn() instead
+    """
+
     def __init__(
         self,
         tokenizer,
@@ -44,11 +135,14 @@ class BertPretrainingDataset(Dataset):
         short_seq_prob=0.1,
         seq_a_ratio=0.6,
         sentence_idx_file=None,
+        mask_per_batch=False,
     ):
         self.tokenizer = tokenizer
         self.cls_id = tokenizer.token_to_id("[CLS]")
         self.sep_id = tokenizer.token_to_id("[SEP]")
         self.pad_id = tokenizer.token_to_id("[PAD]")
+        self.masking = WholeWordMasking(tokenizer, mask_probability)
+        self.mask_per_batch = mask_per_batch
 
         # Loading enormous datasets into RAM isn't always feasible -- for
         # example, the pubmed corpus is 200+ GB, which doesn't fit into RAM on
@@ -256,31 +350,45 @@ class BertPretrainingDataset(Dataset):
         truncate_seq_pair(a_document, b_document, max_num_tokens)
 
         output_ids = [self.cls_id] + a_document + [self.sep_id] + b_document + [self.sep_id]
+        num_tokens = len(output_ids)
 
-        input_ids, output_mask = self.mask_ids(output_ids)
-
-        input_mask = np.zeros(self.max_seq_length, dtype=np.long)
-        input_mask[: len(input_ids)] = 1
+        padded_output_ids = np.full(max(self.max_seq_length, num_tokens), self.pad_id, dtype=np.int64)
+        padded_output_ids[:num_tokens] = output_ids
+        input_ids = padded_output_ids.copy()
+        output_mask = np.zeros(len(padded_output_ids), dtype=np.float32)
+        if not self.mask_per_batch:
+            input_ids[:num_tokens], output_mask[:num_tokens] = self.masking(padded_output_ids[:num_tokens])
 
-        input_type_ids = np.zeros(self.max_seq_length, dtype=np.int)
-        input_type_ids[len(a_document) + 2 : len(output_ids) + 1] = 1
+        input_mask = np.zeros(self.max_seq_length, dtype=np.int64)
+        input_mask[:num_tokens] = 1
 
-        padding_length = max(0, self.max_seq_length - len(input_ids))
-        if padding_length > 0:
-            input_ids.extend([self.pad_id] * padding_length)
-            output_ids.extend([self.pad_id] * padding_length)
-            output_mask.extend([0] * padding_length)
+        input_type_ids = np.zeros(self.max_seq_length, dtype=np.int64)
+        input_type_ids[len(a_document) + 2 : num_tokens + 1] = 1
 
         # TODO: wrap the return value with () for consistent style.
         return (
-            np.array(input_ids),
+            input_ids,
             input_type_ids,
-            np.array(input_mask, dtype=np.long),
-            np.array(output_ids),
-            np.array(output_mask, dtype=np.float32),
+            input_mask,
+            padded_output_ids,
+            output_mask,
             is_next,
         )
 
+    def collate_fn(self, batch):
+        """Stacks examples into tensors like the default collate function and,
+        with mask_per_batch, masks the whole batch at once"""
+        input_ids, input_type_ids, input_mask, output_ids, output_mask, is_next = [
+            np.stack(component) for component in zip(*batch)
+        ]
+        if self.mask_per_batch:
+            input_ids, output_mask = self.masking(output_ids)
+            output_mask = output_mask.astype(np.float32)
+        return tuple(
+            torch.from_numpy(component)
+            for component in (input_ids, input_type_ids, input_mask, output_ids, output_mask, is_next)
+        )
+
     def mask_ids(self, ids):
         """
         Args:
@@ -294,46 +402,11 @@ class BertPretrainingDataset(Dataset):
             3) the same token 10% of the time.
           output_mask: list of binary variables which indicate what tokens has
             been masked (to calculate the loss function for these tokens only)
-        """
 
-        # Whole-word masking by default, as it gives better performance.
-        cand_indexes = [[ids[0]]]
-        for tid in ids[1:]:
-            token = self.tokenizer.ids_to_tokens([tid])[0]
-            is_suffix = token.startswith('\u2581')
-            if is_suffix:
-                # group together with its previous token to form a whole-word
-                cand_indexes[-1].append(tid)
-            else:
-                cand_indexes.append([tid])
-
-        masked_ids, output_mask = [], []
-        mask_id = self.tokenizer.token_to_id("[MASK]")
-
-        for word_ids in cand_indexes:
-            is_special = (word_ids[0] == self.cls_id) or (word_ids[0] == self.sep_id)
-            if is_special or (random.random() > self.mask_probability):
-                output_mask.extend([0] * len(word_ids))
-                masked_ids.extend(word_ids)
-            else:
-                output_mask.extend([1] * len(word_ids))
-                p = random.random()
-                # for 80%, replace with mask
-                if p < 0.8:
-                    masked_ids.extend([mask_id] * len(word_ids))
-                # for 10%, replace by a random token
-                elif p < 0.9:
-                    for _ in word_ids:
-                        # randomly select a valid word
-                        random_word = random.randrange(self.vocab_size)
-                        while random_word in (self.cls_id, self.sep_id):
-                            random_word = random.randrange(self.vocab_size)
-                        masked_ids.append(random_word)
-                # for 10%, use same token
-                else:
-                    masked_ids.extend(word_ids)
-
-        return masked_ids, output_mask
+        Whole-word masking is done by WholeWordMasking.
+        """
+        masked_ids, output_mask = self.masking(ids)
+        return masked_ids.tolist(), output_mask.tolist()
 
 
 class BertPretrainingPreprocessedDataset(Dataset):
@@ -16,20 +16,23 @@
 
 """Pytorch Dataset for training Neural Machine Translation."""
 import glob
+import hashlib
 import os
 import pickle
 import re
 
 import numpy as np
+import torch
 from sentencepiece import SentencePieceTrainer as SPT
 from torch.utils.data import Dataset
 from tqdm import tqdm
 
 from nemo import logging
+from nemo.backends.pytorch.samplers import ResumableSampler
 from nemo.collections.nlp.data.datasets.datasets_utils import DATABASE_EXISTS_TMP, download_wkt2
 from nemo.collections.nlp.utils.common_nlp_utils import if_exist
 
-__all__ = ['LanguageModelingDataset']
+__all__ = ['LanguageModelingDataset', 'MemmapLanguageModelingDataset', 'ShardedWindowSampler']
 
 
 class LanguageModelingDataset(Dataset):
@@ -52,6 +55,123 @@ class LanguageModelingDataset(Dataset):
         return src_ids, src_mask, labels
 
 
+class MemmapLanguageModelingDataset(Dataset):
+    """
+    Language modeling dataset over a contiguous token stream memory-mapped from disk.
+
+    The text file is tokenized once into {dataset}.{digest}.uint16.bin (or .uint32.bin
+    for vocabularies larger than 65536 tokens, see dataset_to_memmap) and shared by all
+    processes through the page cache. Windows are sliced from the memory map and only
+    the window itself is converted to int64.
+
+    Args:
+        tokenizer: tokenizer to convert text into ids
+        dataset (str): path to text document with data
+        max_seq_length (int): length of the text segments
+        batch_step (int): how many tokens to skip between two successive segments
+        random_offset (bool): if True, all windows are shifted by a random offset
+            in [0, batch_step) drawn anew for every epoch, see set_epoch
+        seed (int): seed of the random offsets
+        add_bos_eos (bool): whether to add <s> and </s> around every line
+    """
+
+    def __init__(
+        self, tokenizer, dataset, max_seq_length=512, batch_step=None, random_offset=False, seed=0, add_bos_eos=False
+    ):
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.batch_step = batch_step or self.max_seq_length
+        self.random_offset = random_offset
+        self.seed = seed
+        self.ids = dataset_to_memmap(dataset, tokenizer, add_bos_eos=add_bos_eos)
+        self.offset = 0
+        self.pad_id = tokenizer.pad_id()
+
+    def __getstate__(self):
+        # workers re-open the memory map instead of receiving a pickled copy of the data,
+        # and only need pad_id from the tokenizer, which is not always picklable
+        state = self.__dict__.copy()
+        state['tokenizer'] = None
+        if isinstance(self.ids, np.memmap):
+            state['ids'] = (self.ids.filename, self.ids.dtype)
+        return state
+
+    def __setstate__(self, state):
+        if isinstance(state['ids'], tuple):
+            filename, dtype = state['ids']
+            state['ids'] = np.memmap(filename, dtype=dtype, mode='r')
+        self.__dict__.update(state)
+
+    def set_epoch(self, epoch):
+        """Draws the window offset of the given epoch."""
+        if self.random_offset:
+            self.offset = np.random.RandomState(self.seed + epoch).randint(self.batch_step)
+
+    def __len__(self):
+        # leave room for the largest offset so the length does not change between epochs
+        max_offset = self.batch_step - 1 if self.random_offset else 0
+        return max((len(self.ids) - self.max_seq_length - max_offset) // self.batch_step, 0)
+
+    def __getitem__(self, idx):
+        left = self.offset + idx * self.batch_step
+        right = left + self.max_seq_length
+        window = self.ids[left : right + 1].astype(np.int64)
+        src_ids = window[:-1]
+        labels = window[1:]
+        src_mask = (src_ids != self.pad_id).astype(np.float32)
+        return src_ids, src_mask, labels
+
+
+class ShardedWindowSampler(ResumableSampler):
+    """
+    Sampler which splits dataset indices into contiguous, equally sized shards,
+    one per distributed rank, and optionally shuffles the indices inside a shard.
+
+    Contiguous shards keep the reads of every rank local to its part of the token
+    stream. The tail which does not divide evenly across ranks is dropped.
+    set_epoch is forwarded to the dataset when it supports it, e.g. to draw new
+    window offsets.
+
+    Args:
+        dataset: dataset to sample from
+        shuffle (bool): shuffle indices inside the shard of this rank
+        num_replicas (int): number of distributed processes, defaults to the world size
+        rank (int): rank of the current process, defaults to the global rank
+        seed (int): seed of the shuffling, combined with the epoch
+    """
+
+    def __init__(self, dataset, shuffle=True, num_replicas=None, rank=None, seed=0):
+        if num_replicas is None:
+            num_replicas = torch.distributed.get_world_size() if torch.distributed.is_initialized() else 1
+        if rank is None:
+            rank = torch.distributed.get_rank() if torch.distributed.is_initialized() else 0
+        super().__init__(seed)
+        self.dataset = dataset
+        self.shuffle = shuffle
+        self.num_replicas = num_replicas
+        self.rank = rank
+
+    def set_epoch(self, epoch):
+        super().set_epoch(epoch)
+        if hasattr(self.dataset, 'set_epoch'):
+            self.dataset.set_epoch(epoch)
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        if hasattr(self.dataset, 'set_epoch'):
+            self.dataset.set_epoch(self.epoch)
+
+    def __len__(self):
+        return len(self.dataset) // self.num_replicas
+
+    def _epoch_items(self):
+        shard_size = len(self)
+        indices = np.arange(self.rank * shard_size, (self.rank + 1) * shard_size)
+        if self.shuffle:
+            np.random.RandomState(self.seed + self.epoch).shuffle(indices)
+        return indices.tolist()
+
+
 class LanguageModelDataDesc:
     def __init__(self, dataset_name, data_dir, do_lower_case):
         if dataset_name == 'wikitext-2':
@@ -155,6 +275,65 @@ def dataset_to_ids(dataset, tokenizer, cache_ids=False, add_bos_eos=True):
     return ids
 
 
+def dataset_to_memmap(dataset, tokenizer, add_bos_eos=False, chunk_size=1 << 20):
+    """
+    Tokenizes dataset from file line by line into a flat binary token stream
+    next to it and returns it as a read-only memory map. The stream is written
+    once, to a temporary file renamed when complete, and reused afterwards.
+    Its name contains a digest of the tokenizer vocabulary and of add_bos_eos,
+    so a different tokenizer writes a new stream instead of reading stale ids.
+    In distributed runs only rank 0 tokenizes while the others wait for it.
+
+    Args:
+        dataset: path to dataset
+        tokenizer: tokenizer to convert text into ids
+        add_bos_eos: bool, whether to add <s> and </s> symbols around each line
+        chunk_size: number of tokens buffered in memory before writing
+    Returns:
+        ids: np.memmap of uint16 ids if the vocabulary fits into 16 bits, uint32 otherwise
+    """
+    vocab_size = getattr(tokenizer, 'vocab_size', None)
+    dtype = np.uint16 if vocab_size is not None and vocab_size <= np.iinfo(np.uint16).max + 1 else np.uint32
+    digest = _tokenizer_digest(tokenizer, add_bos_eos)
+    cached_ids_dataset = f'{dataset}.{digest}.{np.dtype(dtype).name}.bin'
+
+    is_distributed = torch.distributed.is_available() and torch.distributed.is_initialized()
+    rank = torch.distributed.get_rank() if is_distributed else 0
+    if rank == 0 and not os.path.isfile(cached_ids_dataset):
+        logging.info(f"Tokenizing dataset into {cached_ids_dataset} ...")
+        tmp_file = f'{cached_ids_dataset}.tmp'
+        buffer = []
+        with open(dataset, "rb") as f_in, open(tmp_file, "wb") as f_out:
+            for sentence in f_in:
+                sent_ids = tokenizer.text_to_ids(sentence.decode("utf-8"))
+                if add_bos_eos:
+                    sent_ids = [tokenizer.bos_id()] + sent_ids + [tokenizer.eos_id()]
+                buffer.extend(sent_ids)
+                if len(buffer) >= chunk_size:
+                    np.array(buffer, dtype=dtype).tofile(f_out)
+                    buffer = []
+            np.array(buffer, dtype=dtype).tofile(f_out)
+        os.replace(tmp_file, cached_ids_dataset)
+    if is_distributed:
+        torch.distributed.barrier()
+
+    logging.info(f"Memory-mapping tokenized dataset {cached_ids_dataset}")
+    if os.path.getsize(cached_ids_dataset) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(cached_ids_dataset, dtype=dtype, mode='r')
+
+
+def _tokenizer_digest(tokenizer, add_bos_eos):
+    """Short digest of the tokens of all ids of tokenizer and of the ids added around lines."""
+    vocab_size = getattr(tokenizer, 'vocab_size', None)
+    parts = [type(tokenizer).__name__, vocab_size, add_bos_eos]
+    if vocab_size is not None:
+        parts.extend(tokenizer.ids_to_tokens(list(range(vocab_size))))
+    if add_bos_eos:
+        parts.extend([tokenizer.bos_id(), tokenizer.eos_id()])
+    return hashlib.md5('\n'.join(map(str, parts)).encode('utf-8')).hexdigest()[:12]
+
+
 def create_vocab_lm(data_dir, do_lower_case):
     if if_exist(data_dir, ['train.txt', 'vocab.txt']):
         logging.info("Vocabulary has been created.")
@@ -36,25 +36,52 @@
 # THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 # =============================================================================
 
+import hashlib
 import json
+import math
 import os
 import pickle
-import random
 
+import numpy as np
+import torch
 from torch.utils.data import Dataset
 
 from nemo import logging
+from nemo.backends.pytorch.samplers import ResumableSampler
 
-__all__ = ['MultiWOZDataset', 'MultiWOZDataDesc']
+__all__ = ['MultiWOZDataset', 'MultiWOZDataDesc', 'BucketingBatchSampler']
 
 
 class MultiWOZDataset(Dataset):
     """
     By default, use only vocab from training data
     Need to modify the code a little bit to create the vocab from all files
+
+    Features are stored as flat integer arrays with offsets instead of
+    per-turn dictionaries of lists:
+        context_ids[context_offsets[i]:context_offsets[i + 1]] is the dialogue history of turn i,
+        responses_ids[responses_offsets[i * S + j]:responses_offsets[i * S + j + 1]]
+            is the value of slot j of turn i (S is the number of slots),
+        gating_labels[i] and turn_domains[i] are the labels of turn i.
+
+    Args:
+        use_cache (bool): if True, the arrays are saved to and restored from
+            {data_dir}/{mode}_trade_features.pkl
     """
 
-    def __init__(self, data_dir, mode, domains, all_domains, vocab, gating_dict, slots, num_samples=-1, shuffle=False):
+    def __init__(
+        self,
+        data_dir,
+        mode,
+        domains,
+        all_domains,
+        vocab,
+        gating_dict,
+        slots,
+        num_samples=-1,
+        shuffle=False,
+        use_cache=False,
+    ):
 
         logging.info(f'Processing {mode} data')
         self.data_dir = data_dir
@@ -65,10 +92,53 @@ class MultiWOZDataset(Dataset):
         self.vocab = vocab
         self.slots = slots
 
-        self.features, self.max_len = self.get_features(num_samples, shuffle)
-        logging.info("Sample 0: " + str(self.features[0]))
+        cache_key = {
+            'num_samples': num_samples,
+            'slots': list(slots),
+            'domains': sorted(domains),
+            'vocab': _vocab_digest(vocab),
+        }
+        features_pkl = os.path.join(data_dir, f'{mode}_trade_features.pkl')
+        features = None
+        if use_cache and os.path.exists(features_pkl):
+            with open(features_pkl, 'rb') as f:
+                features = pickle.load(f)
+            if features.get('cache_key') != cache_key:
+                logging.info(f'Cached features in {features_pkl} do not match the dataset parameters, rebuilding')
+                features = None
+            else:
+                logging.info(f'Features restored from {features_pkl}')
+
+        if features is None:
+            features = self.get_features(num_samples)
+            features['cache_key'] = cache_key
+            if use_cache:
+                with open(features_pkl, 'wb') as f:
+                    pickle.dump(features, f)
+                logging.info(f'Features saved to {features_pkl}')
+
+        self.context_ids = features['context_ids']
+        self.context_offsets = features['context_offsets']
+        self.responses_ids = features['responses_ids']
+        self.responses_offsets = features['responses_offsets']
+        self.gating_labels = features['gating_labels']
+        self.turn_domains = features['turn_domains']
+        self.dialog_ids = features['dialog_ids']
+        self.turn_ids = features['turn_ids']
+        self.turn_beliefs = features['turn_beliefs']
+        self.max_len = features['max_len']
+
+        self.context_lens = np.diff(self.context_offsets)
+        self.responses_lens = np.diff(self.responses_offsets).reshape(-1, len(self.slots))
+
+        self.order = np.arange(len(self.context_lens))
+        if shuffle:
+            logging.info(f'Shuffling samples.')
+            np.random.shuffle(self.order)
+
+        logging.info("Sample 0: " + str(self[0]))
 
-    def get_features(self, num_samples, shuffle):
+    def get_features(self, num_samples):
         if num_samples == 0:
             raise ValueError("num_samples has to be positive", num_samples)
 
@@ -77,11 +147,16 @@ class MultiWOZDataset(Dataset):
         dialogs = json.load(open(filename, 'r'))
 
         domain_count = {}
-        data = []
-        max_resp_len, max_value_len = 0, 0
+        max_resp_len = 0
+        num_turns = 0
+
+        context_ids, context_lens = [], []
+        responses_ids, responses_lens = [], []
+        gating_labels, turn_domains = [], []
+        dialog_ids, turn_ids, turn_beliefs = [], [], []
 
         for dialog_dict in dialogs:
-            if num_samples > 0 and len(data) >= num_samples:
+            if num_samples > 0 and num_turns >= num_samples:
                 break
 
             dialog_history = ""
@@ -93,80 +168,182 @@ class MultiWOZDataset(Dataset):
                 domain_count[domain] += 1
 
             for turn in dialog_dict['dialogue']:
-                if num_samples > 0 and len(data) >= num_samples:
+                if num_samples > 0 and num_turns >= num_samples:
                     break
 
-                turn_uttr = turn['system_transcript'] + ' ; ' + turn['transcript']
-                turn_uttr_strip = turn_uttr.strip()
                 dialog_history += turn["system_transcript"] + " ; " + turn["transcript"] + " ; "
-                source_text = dialog_history.strip()
-
-                turn_beliefs = fix_general_label_error_multiwoz(turn['belief_state'], self.slots)
+                source_tokens = dialog_history.split()
 
-                turn_belief_list = [f'{k}-{v}' for k, v in turn_beliefs.items()]
+                turn_beliefs_dict = fix_general_label_error_multiwoz(turn['belief_state'], self.slots)
 
-                gating_label, responses = [], []
                 for slot in self.slots:
-                    if slot in turn_beliefs:
-                        responses.append(str(turn_beliefs[slot]))
-                        if turn_beliefs[slot] == "dontcare":
-                            gating_label.append(self.gating_dict["dontcare"])
-                        elif turn_beliefs[slot] == "none":
-                            gating_label.append(self.gating_dict["none"])
+                    if slot in turn_beliefs_dict:
+                        response = str(turn_beliefs_dict[slot])
+                        if turn_beliefs_dict[slot] == "dontcare":
+                            gating_labels.append(self.gating_dict["dontcare"])
+                        elif turn_beliefs_dict[slot] == "none":
+                            gating_labels.append(self.gating_dict["none"])
                         else:
-                            gating_label.append(self.gating_dict["ptr"])
+                            gating_labels.append(self.gating_dict["ptr"])
                     else:
-                        responses.append("none")
-                        gating_label.append(self.gating_dict["none"])
-
-                sample = {
-                    'ID': dialog_dict['dialogue_idx'],
-                    'domains': dialog_dict['domains'],
-                    'turn_domain': turn['domain'],
-                    'turn_id': turn['turn_idx'],
-                    'dialogue_history': source_text,
-                    'turn_belief': turn_belief_list,
-                    'gating_label': gating_label,
-                    'turn_uttr': turn_uttr_strip,
-                    'responses': responses,
-                }
-
-                sample['context_ids'] = self.vocab.tokens2ids(sample['dialogue_history'].split())
-                sample['responses_ids'] = [
-                    self.vocab.tokens2ids(y.split() + [self.vocab.eos]) for y in sample['responses']
-                ]
-                sample['turn_domain'] = self.all_domains[sample['turn_domain']]
-
-                data.append(sample)
-
-                resp_len = len(sample['dialogue_history'].split())
-                max_resp_len = max(max_resp_len, resp_len)
+                        response = "none"
+                        gating_labels.append(self.gating_dict["none"])
+                    response_ids = self.vocab.tokens2ids(response.split() + [self.vocab.eos])
+                    responses_ids.extend(response_ids)
+                    responses_lens.append(len(response_ids))
+
+                context_ids.extend(self.vocab.tokens2ids(source_tokens))
+                context_lens.append(len(source_tokens))
+                turn_domains.append(self.all_domains[turn['domain']])
+                dialog_ids.append(dialog_dict['dialogue_idx'])
+                turn_ids.append(turn['turn_idx'])
+                turn_beliefs.append([f'{k}-{v}' for k, v in turn_beliefs_dict.items()])
+
+                num_turns += 1
+                max_resp_len = max(max_resp_len, len(source_tokens))
 
         logging.info(f'Domain count{domain_count}')
         logging.info(f'Max response length{max_resp_len}')
-        logging.info(f'Processing {len(data)} samples')
-
-        if shuffle:
-            logging.info(f'Shuffling samples.')
-            random.shuffle(data)
+        logging.info(f'Processing {num_turns} samples')
 
-        return data, max_resp_len
+        return {
+            'context_ids': np.array(context_ids, dtype=np.int32),
+            'context_offsets': _lengths_to_offsets(context_lens),
+            'responses_ids': np.array(responses_ids, dtype=np.int32),
+            'responses_offsets': _lengths_to_offsets(responses_lens),
+            'gating_labels': np.array(gating_labels, dtype=np.int64).reshape(num_turns, len(self.slots)),
+            'turn_domains': np.array(turn_domains, dtype=np.int64),
+            'dialog_ids': dialog_ids,
+            'turn_ids': turn_ids,
+            'turn_beliefs': turn_beliefs,
+            'max_len': max_resp_len,
+        }
 
     def __len__(self):
-        return len(self.features)
+        return len(self.order)
 
     def __getitem__(self, idx):
-        item = self.features[idx]
+        """Returns views into the feature arrays, responses_ids holds the values of all slots back to back."""
+        i = self.order[idx]
+        num_slots = len(self.slots)
         return {
-            'dialog_id': item['ID'],
-            'turn_id': item['turn_id'],
-            'turn_belief': item['turn_belief'],
-            'gating_label': item['gating_label'],
-            'context_ids': item['context_ids'],
-            'turn_domain': item['turn_domain'],
-            'responses_ids': item['responses_ids'],
+            'dialog_id': self.dialog_ids[i],
+            'turn_id': self.turn_ids[i],
+            'turn_belief': self.turn_beliefs[i],
+            'gating_label': self.gating_labels[i],
+            'context_ids': self.context_ids[self.context_offsets[i] : self.context_offsets[i + 1]],
+            'turn_domain': self.turn_domains[i],
+            'responses_ids': self.responses_ids[
+                self.responses_offsets[i * num_slots] : self.responses_offsets[(i + 1) * num_slots]
+            ],
+            'responses_lens': self.responses_lens[i],
         }
 
+    def lengths(self):
+        """Returns the dialogue history length of every sample in dataset order."""
+        return self.context_lens[self.order]
+
+
+def _vocab_digest(vocab):
+    """Digest of the words of vocab and their ids, so that cached ids are rebuilt when the vocab changes."""
+    return hashlib.md5('\n'.join(vocab.idx2word).encode('utf-8')).hexdigest()
+
+
+def _lengths_to_offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class BucketingBatchSampler(ResumableSampler):
+    """
+    Batch sampler which groups samples of similar length to reduce padding.
+
+    Indices are shuffled and split into buckets of batch_size * bucket_size_multiplier
+    samples, every bucket is sorted by length and cut into batches, and the order of
+    all batches is shuffled again. When running distributed, every replica takes
+    every num_replicas-th batch. The first batches are repeated to fill up the last
+    round, so each rank gets the same number of batches and collectives do not hang.
+
+    Args:
+        lengths (array): length of every sample of the dataset
+        batch_size (int): number of samples in a batch
+        shuffle (bool): if False, batches are formed over the whole dataset sorted by length
+        bucket_size_multiplier (int): number of batches in a bucket
+        num_replicas (int): number of distributed processes, defaults to the world size
+        rank (int): rank of the current process, defaults to the global rank
+        drop_last (bool): drop the last incomplete batch
+        seed (int): seed of the permutation, combined with the epoch
+    """
+
+    def __init__(
+        self,
+        lengths,
+        batch_size,
+        shuffle=True,
+        bucket_size_multiplier=100,
+        num_replicas=None,
+        rank=None,
+        drop_last=False,
+        seed=0,
+    ):
+        if num_replicas is None:
+            num_replicas = torch.distributed.get_world_size() if torch.distributed.is_initialized() else 1
+        if rank is None:
+            rank = torch.distributed.get_rank() if torch.distributed.is_initialized() else 0
+        super().__init__(seed)
+        self.lengths = np.asarray(lengths)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.bucket_size = batch_size * bucket_size_multiplier
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.drop_last = drop_last
+
+    def _batches(self):
+        rng = np.random.RandomState(self.seed + self.epoch)
+        if self.shuffle:
+            indices = rng.permutation(len(self.lengths))
+            bucket_size = self.bucket_size
+        else:
+            indices = np.arange(len(self.lengths))
+            bucket_size = max(len(indices), 1)
+
+        batches = []
+        for start in range(0, len(indices), bucket_size):
+            bucket = indices[start : start + bucket_size]
+            bucket = bucket[np.argsort(-self.lengths[bucket], kind='stable')]
+            for b in range(0, len(bucket), self.batch_size):
+                batch = bucket[b : b + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch)
+
+        if self.shuffle:
+            batches = [batches[i] for i in rng.permutation(len(batches))]
+        # every replica gets the same number of batches, the first batches are
+        # repeated to fill up the last round
+        total = self._num_batches_per_replica(len(batches)) * self.num_replicas
+        if batches:
+            batches = (batches * math.ceil(total / len(batches)))[:total]
+        return batches[self.rank : total : self.num_replicas]
+
+    def _num_batches_per_replica(self, num_batches):
+        return math.ceil(num_batches / self.num_replicas)
+
+    def _epoch_items(self):
+        return [batch.tolist() for batch in self._batches()]
+
+    def __len__(self):
+        num_samples = len(self.lengths)
+        bucket_size = self.bucket_size if self.shuffle else max(num_samples, 1)
+        full_buckets, last_bucket = divmod(num_samples, bucket_size)
+        if self.drop_last:
+            num_batches = full_buckets * (bucket_size // self.batch_size) + last_bucket // self.batch_size
+        else:
+            num_batches = full_buckets * -(-bucket_size // self.batch_size) + -(-last_bucket // self.batch_size)
+        return self._num_batches_per_replica(num_batches)
+
 
 class Vocab:
     """
@@ -220,7 +397,8 @@ class Vocab:
 
     def tokens2ids(self, tokens):
         """Converts list of tokens to list of ids."""
-        return [self.word2idx[w] if w in self.word2idx else self.unk_id for w in tokens]
+        word2idx_get, unk_id = self.word2idx.get, self.unk_id
+        return [word2idx_get(w, unk_id) for w in tokens]
 
 
 class MultiWOZDataDesc:
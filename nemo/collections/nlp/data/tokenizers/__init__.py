@@ -14,9 +14,26 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.data.tokenizers.bert_tokenizer import NemoBertTokenizer
-from nemo.collections.nlp.data.tokenizers.char_tokenizer import CharTokenizer
-from nemo.collections.nlp.data.tokenizers.gpt2_tokenizer import NemoGPT2Tokenizer
-from nemo.collections.nlp.data.tokenizers.sentencepiece_tokenizer import SentencePieceTokenizer
-from nemo.collections.nlp.data.tokenizers.word_tokenizer import WordTokenizer
-from nemo.collections.nlp.data.tokenizers.youtokentome_tokenizer import YouTokenToMeTokenizer
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        ".bert_tokenizer": ["NemoBertTokenizer"],
+        ".char_tokenizer": ["CharTokenizer"],
+        ".gpt2_tokenizer": ["NemoGPT2Tokenizer"],
+        ".sentencepiece_tokenizer": ["SentencePieceTokenizer"],
+        ".word_tokenizer": ["WordTokenizer"],
+        ".youtokentome_tokenizer": ["YouTokenToMeTokenizer"],
+    },
+    submodules=[
+        "bert_tokenizer",
+        "char_tokenizer",
+        "fairseq_tokenizer",
+        "gpt2_tokenizer",
+        "sentencepiece_tokenizer",
+        "tokenizer_spec",
+        "word_tokenizer",
+        "youtokentome_tokenizer",
+    ],
+)
@@ -33,6 +33,8 @@ class NemoGPT2Tokenizer(TokenizerSpec):
     ):
         if pretrained_model:
             self.tokenizer = GPT2Tokenizer.from_pretrained(pretrained_model)
+        else:
+            self.tokenizer = GPT2Tokenizer(vocab_file, merges_file, errors=errors)
         self.vocab_size = self.tokenizer.vocab_size
         special_tokens_dict = {}
         if self.tokenizer.unk_token is None:
@@ -0,0 +1,330 @@
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+"""Integer-keyed n-gram engine for corpus BLEU and chrF.
+
+Produces exactly the same scores as :func:`sacrebleu.corpus_bleu` and
+:func:`sacrebleu.corpus_chrf`, but instead of joining tokens into string keys
+every segment is mapped to integer ids and n-grams are encoded as exact
+base-V integers, built incrementally from the (n-1)-gram keys. Per-segment
+sufficient statistics are independent, so they can be computed in chunks
+across a process pool and summed.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
+from typing import Iterable, List, Union
+
+from nemo import logging
+from nemo.collections.nlp.metrics.sacrebleu import (
+    CHRF_BETA,
+    CHRF_ORDER,
+    DEFAULT_TOKENIZER,
+    NGRAM_ORDER,
+    SMOOTH_VALUE_DEFAULT,
+    TOKENIZERS,
+    _avg_precision_and_recall,
+    _chrf,
+    compute_bleu,
+    delete_whitespace,
+)
+
+__all__ = ['CorpusBLEU', 'CorpusChrF', 'fast_corpus_bleu', 'fast_corpus_chrf']
+
+# Number of segments processed by a single worker task.
+DEFAULT_CHUNK_SIZE = 1024
+
+# Unicode code points are < 0x110000, so this base encodes character n-grams exactly.
+_CHAR_BASE = 0x110000
+
+
+def _ngram_counts(ids: List[int], base: int, max_order: int) -> List[Counter]:
+    """Counts n-grams of orders 1..max_order over a sequence of positive integer ids.
+
+    The key of the n-gram starting at position i is built from the key of the
+    (n-1)-gram at the same position as ``key * base + ids[i + n - 1]``, which
+    is collision-free as long as every id is in [1, base).
+    """
+    counts = []
+    keys = list(ids)
+    for n in range(1, max_order + 1):
+        if n > 1:
+            keys = [keys[i] * base + ids[i + n - 1] for i in range(len(keys) - 1)]
+        counts.append(Counter(keys))
+    return counts
+
+
+def _segment_bleu_stats(output: str, refs: List[str], max_order: int = NGRAM_ORDER) -> List[int]:
+    """Computes BLEU sufficient statistics of one tokenized segment.
+
+    Returns:
+        a list ``[sys_len, ref_len, correct_1..correct_N, total_1..total_N]``
+    """
+    vocab = {}
+    sys_tokens = output.split()
+    sys_ids = [vocab.setdefault(t, len(vocab) + 1) for t in sys_tokens]
+    refs_ids = [[vocab.setdefault(t, len(vocab) + 1) for t in ref.split()] for ref in refs]
+    base = len(vocab) + 1
+
+    sys_len = len(sys_ids)
+    closest_diff = None
+    closest_len = None
+    ref_counts = [Counter() for _ in range(max_order)]
+    for ref_ids in refs_ids:
+        reflen = len(ref_ids)
+        diff = abs(sys_len - reflen)
+        if closest_diff is None or diff < closest_diff:
+            closest_diff = diff
+            closest_len = reflen
+        elif diff == closest_diff and reflen < closest_len:
+            closest_len = reflen
+
+        for merged, counts in zip(ref_counts, _ngram_counts(ref_ids, base, max_order)):
+            merged |= counts
+
+    correct = [0] * max_order
+    total = [0] * max_order
+    for n, (sys_counts, counts) in enumerate(zip(_ngram_counts(sys_ids, base, max_order), ref_counts)):
+        total[n] = len(sys_ids) - n if len(sys_ids) > n else 0
+        correct[n] = sum(min(c, counts[k]) for k, c in sys_counts.items() if k in counts)
+
+    return [sys_len, closest_len] + correct + total
+
+
+def _bleu_chunk_stats(lines_chunk, lowercase: bool, tokenize: str) -> List[int]:
+    """Sums BLEU statistics over a chunk of ``(sys, ref_1, ..., ref_k)`` tuples."""
+    stats = [0] * (2 + 2 * NGRAM_ORDER)
+    tokenizer = TOKENIZERS[tokenize]
+    for lines in lines_chunk:
+        if lowercase:
+            lines = [x.lower() for x in lines]
+        output, *refs = [tokenizer(x.rstrip()) for x in lines]
+        for i, value in enumerate(_segment_bleu_stats(output, refs)):
+            stats[i] += value
+    return stats
+
+
+def _segment_chrf_stats(hypothesis: str, reference: str, order: int, remove_whitespace: bool) -> List[int]:
+    """Computes chrF statistics of one segment in the layout of ``sacrebleu.get_sentence_statistics``."""
+    if remove_whitespace:
+        hypothesis = delete_whitespace(hypothesis)
+        reference = delete_whitespace(reference)
+    hyp_counts = _ngram_counts([ord(c) for c in hypothesis], _CHAR_BASE, order)
+    ref_counts = _ngram_counts([ord(c) for c in reference], _CHAR_BASE, order)
+
+    statistics = [0] * (order * 3)
+    for i in range(order):
+        statistics[3 * i + 0] = max(len(hypothesis) - i, 0)
+        statistics[3 * i + 1] = max(len(reference) - i, 0)
+        ref_i = ref_counts[i]
+        statistics[3 * i + 2] = sum(min(c, ref_i[k]) for k, c in hyp_counts[i].items() if k in ref_i)
+    return statistics
+
+
+def _chrf_chunk_stats(pairs_chunk, order: int, remove_whitespace: bool) -> List[int]:
+    """Sums chrF statistics over a chunk of ``(hypothesis, reference)`` pairs."""
+    stats = [0] * (order * 3)
+    for hypothesis, reference in pairs_chunk:
+        for i, value in enumerate(_segment_chrf_stats(hypothesis, reference, order, remove_whitespace)):
+            stats[i] += value
+    return stats
+
+
+def _map_chunks(fn, items: List, args: tuple, num_workers: int, chunk_size: int) -> List[List[int]]:
+    """Applies ``fn(chunk, *args)`` to consecutive chunks of items, optionally in a process pool."""
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    if num_workers <= 1 or len(chunks) <= 1:
+        return [fn(chunk, *args) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(fn, chunk, *args) for chunk in chunks]
+        return [f.result() for f in futures]
+
+
+class CorpusBLEU:
+    """Accumulates BLEU sufficient statistics over several calls to :meth:`update`.
+
+    Args:
+        smooth_method (str): smoothing method, see ``sacrebleu.compute_bleu``
+        smooth_value (float): smoothing value for 'floor' and 'add-k'
+        force (bool): do not warn about data that looks already tokenized
+        lowercase (bool): lowercase the data
+        tokenize (str): name of the tokenizer in ``sacrebleu.TOKENIZERS``
+        use_effective_order (bool): scale the n-gram order to the observed maximum
+        num_workers (int): size of the process pool, 0 or 1 computes in-process
+        chunk_size (int): number of segments per worker task
+    """
+
+    def __init__(
+        self,
+        smooth_method='exp',
+        smooth_value=SMOOTH_VALUE_DEFAULT,
+        force=False,
+        lowercase=False,
+        tokenize=DEFAULT_TOKENIZER,
+        use_effective_order=False,
+        num_workers=0,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        if tokenize not in TOKENIZERS:
+            raise ValueError(f"Unknown tokenizer {tokenize}, expected one of {list(TOKENIZERS.keys())}")
+        self.smooth_method = smooth_method
+        self.smooth_value = smooth_value
+        self.force = force
+        self.lowercase = lowercase
+        self.tokenize = tokenize
+        self.use_effective_order = use_effective_order
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.sys_len = 0
+        self.ref_len = 0
+        self.correct = [0] * NGRAM_ORDER
+        self.total = [0] * NGRAM_ORDER
+        self._tokenized_count = 0
+
+    def update(self, sys_stream: Union[str, Iterable[str]], ref_streams: Union[str, List[Iterable[str]]]):
+        """Adds the statistics of a batch of segments.
+
+        Args:
+            sys_stream: the system stream (a sequence of segments)
+            ref_streams: a list of one or more reference streams (each a sequence of segments)
+        """
+        if isinstance(sys_stream, str):
+            sys_stream = [sys_stream]
+        if isinstance(ref_streams, str):
+            ref_streams = [[ref_streams]]
+
+        all_lines = []
+        for lines in zip_longest(sys_stream, *ref_streams):
+            if None in lines:
+                raise EOFError("Source and reference streams have different lengths!")
+            all_lines.append(lines)
+            if not (self.force or self.tokenize == 'none') and lines[0].rstrip().endswith(' .'):
+                self._tokenized_count += 1
+                if self._tokenized_count == 100:
+                    logging.warning('That\'s 100 lines that end in a tokenized period (\'.\')')
+                    logging.warning(
+                        'It looks like you forgot to detokenize your test data, which may hurt your score.'
+                    )
+                    logging.warning('If you insist your data is detokenized, or don\'t care, set force=True.')
+
+        for stats in _map_chunks(
+            _bleu_chunk_stats, all_lines, (self.lowercase, self.tokenize), self.num_workers, self.chunk_size
+        ):
+            self.sys_len += stats[0]
+            self.ref_len += stats[1]
+            for n in range(NGRAM_ORDER):
+                self.correct[n] += stats[2 + n]
+                self.total[n] += stats[2 + NGRAM_ORDER + n]
+
+    def compute(self):
+        """Returns a ``sacrebleu.BLEU`` computed from the accumulated statistics."""
+        # compute_bleu modifies the counts in place for add-k smoothing
+        return compute_bleu(
+            list(self.correct),
+            list(self.total),
+            self.sys_len,
+            self.ref_len,
+            smooth_method=self.smooth_method,
+            smooth_value=self.smooth_value,
+            use_effective_order=self.use_effective_order,
+        )
+
+
+class CorpusChrF:
+    """Accumulates chrF statistics over several calls to :meth:`update`.
+
+    Args:
+        order (int): maximum character n-gram order
+        beta (float): importance of recall w.r.t. precision
+        remove_whitespace (bool): delete all whitespace from hypotheses and references
+        num_workers (int): size of the process pool, 0 or 1 computes in-process
+        chunk_size (int): number of segments per worker task
+    """
+
+    def __init__(
+        self,
+        order=CHRF_ORDER,
+        beta=CHRF_BETA,
+        remove_whitespace=True,
+        num_workers=0,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        self.order = order
+        self.beta = beta
+        self.remove_whitespace = remove_whitespace
+        self.num_workers = num_workers
+        self.chunk_size = chunk_size
+        self.reset()
+
+    def reset(self):
+        self.statistics = [0] * (self.order * 3)
+
+    def update(self, hypotheses: Iterable[str], references: Iterable[str]):
+        """Adds the statistics of a batch of ``(hypothesis, reference)`` segments."""
+        pairs = list(zip(hypotheses, references))
+        for stats in _map_chunks(
+            _chrf_chunk_stats, pairs, (self.order, self.remove_whitespace), self.num_workers, self.chunk_size
+        ):
+            for i, value in enumerate(stats):
+                self.statistics[i] += value
+
+    def compute(self) -> float:
+        """Returns the chrF score of the accumulated statistics."""
+        avg_precision, avg_recall = _avg_precision_and_recall(self.statistics, self.order)
+        return _chrf(avg_precision, avg_recall, beta=self.beta)
+
+
+def fast_corpus_bleu(
+    sys_stream: Union[str, Iterable[str]],
+    ref_streams: Union[str, List[Iterable[str]]],
+    smooth_method='exp',
+    smooth_value=SMOOTH_VALUE_DEFAULT,
+    force=False,
+    lowercase=False,
+    tokenize=DEFAULT_TOKENIZER,
+    use_effective_order=False,
+    num_workers=0,
+):
+    """Drop-in replacement for ``sacrebleu.corpus_bleu`` with an optional process pool."""
+    scorer = CorpusBLEU(
+        smooth_method=smooth_method,
+        smooth_value=smooth_value,
+        force=force,
+        lowercase=lowercase,
+        tokenize=tokenize,
+        use_effective_order=use_effective_order,
+        num_workers=num_workers,
+    )
+    scorer.update(sys_stream, ref_streams)
+    return scorer.compute()
+
+
+def fast_corpus_chrf(
+    hypotheses: Iterable[str],
+    references: Iterable[str],
+    order: int = CHRF_ORDER,
+    beta: float = CHRF_BETA,
+    remove_whitespace: bool = True,
+    num_workers=0,
+) -> float:
+    """Drop-in replacement for ``sacrebleu.corpus_chrf`` with an optional process pool."""
+    scorer = CorpusChrF(order=order, beta=beta, remove_whitespace=remove_whitespace, num_workers=num_workers)
+    scorer.update(hypotheses, references)
+    return scorer.compute()
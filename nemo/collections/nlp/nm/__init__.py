@@ -14,6 +14,7 @@
 # limitations under the License.
 # =============================================================================
 
-import nemo.collections.nlp.nm.data_layers
-import nemo.collections.nlp.nm.losses
-import nemo.collections.nlp.nm.trainables
+from nemo.utils.lazy_import import lazy_attributes
+
+# data_layers, losses and trainables are imported on first access
+__getattr__, __dir__ = lazy_attributes(__name__, submodules=["data_layers", "losses", "trainables"])
@@ -14,14 +14,34 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.nm.data_layers.glue_benchmark_datalayer import *
-from nemo.collections.nlp.nm.data_layers.joint_intent_slot_datalayer import *
-from nemo.collections.nlp.nm.data_layers.lm_bert_datalayer import *
-from nemo.collections.nlp.nm.data_layers.lm_transformer_datalayer import *
-from nemo.collections.nlp.nm.data_layers.machine_translation_datalayer import *
-from nemo.collections.nlp.nm.data_layers.punctuation_capitalization_datalayer import *
-from nemo.collections.nlp.nm.data_layers.qa_squad_datalayer import *
-from nemo.collections.nlp.nm.data_layers.state_tracking_trade_datalayer import *
-from nemo.collections.nlp.nm.data_layers.text_classification_datalayer import *
-from nemo.collections.nlp.nm.data_layers.text_datalayer import *
-from nemo.collections.nlp.nm.data_layers.token_classification_datalayer import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.collections.nlp.nm.data_layers.glue_benchmark_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.joint_intent_slot_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.lm_bert_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.lm_transformer_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.machine_translation_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.punctuation_capitalization_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.qa_squad_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.state_tracking_trade_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.text_classification_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.text_datalayer": "*",
+        "nemo.collections.nlp.nm.data_layers.token_classification_datalayer": "*",
+    },
+    submodules=[
+        "glue_benchmark_datalayer",
+        "joint_intent_slot_datalayer",
+        "lm_bert_datalayer",
+        "lm_transformer_datalayer",
+        "machine_translation_datalayer",
+        "punctuation_capitalization_datalayer",
+        "qa_squad_datalayer",
+        "state_tracking_trade_datalayer",
+        "text_classification_datalayer",
+        "text_datalayer",
+        "token_classification_datalayer",
+    ],
+)
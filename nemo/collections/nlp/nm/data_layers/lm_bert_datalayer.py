@@ -23,9 +23,10 @@ import torch
 from torch.utils import data as pt_data
 
 from nemo.backends.pytorch import DataLayerNM
+from nemo.backends.pytorch.samplers import ResumableDistributedSampler, make_sampler
 from nemo.collections.nlp.data import BertPretrainingDataset, BertPretrainingPreprocessedDataset
 from nemo.collections.nlp.nm.data_layers.text_datalayer import TextDataLayer
-from nemo.core import AxisType, BatchTag, NeuralType, TimeTag
+from nemo.core import AxisType, BatchTag, DeviceType, NeuralType, TimeTag
 
 __all__ = ['BertPretrainingDataLayer', 'BertPretrainingPreprocessedDataLayer']
 
@@ -43,6 +44,9 @@ class BertPretrainingDataLayer(TextDataLayer):
         short_seeq_prob (float): Probability of creating sequences which are
             shorter than the maximum length.
             Defualts to 0.1.
+        mask_per_batch (bool): mask whole batches at once when collating
+            them instead of every example separately.
+            Defaults to False.
     """
 
     @property
@@ -89,16 +93,50 @@ class BertPretrainingDataLayer(TextDataLayer):
             "labels": NeuralType({0: AxisType(BatchTag)}),
         }
 
-    def __init__(self, tokenizer, dataset, max_seq_length, mask_probability, short_seq_prob=0.1, batch_size=64):
+    def __init__(
+        self,
+        tokenizer,
+        dataset,
+        max_seq_length,
+        mask_probability,
+        short_seq_prob=0.1,
+        batch_size=64,
+        mask_per_batch=False,
+    ):
         dataset_params = {
             'tokenizer': tokenizer,
             'dataset': dataset,
             'max_seq_length': max_seq_length,
             'mask_probability': mask_probability,
             'short_seq_prob': short_seq_prob,
+            'mask_per_batch': mask_per_batch,
         }
         super().__init__(BertPretrainingDataset, dataset_params, batch_size, shuffle=False)
 
+        self._dataloader = None
+        if mask_per_batch:
+            # masking happens in collate_fn, which needs a DataLoader of its own
+            sampler = make_sampler(
+                self._dataset, False, self._factory, distributed=self._placement == DeviceType.AllGpu
+            )
+            self._dataloader = pt_data.DataLoader(
+                dataset=self._dataset,
+                batch_size=batch_size,
+                collate_fn=self._dataset.collate_fn,
+                sampler=sampler,
+                num_workers=self._num_workers,
+            )
+
+    @property
+    def dataset(self):
+        if self._dataloader is not None:
+            return None
+        return self._dataset
+
+    @property
+    def data_iterator(self):
+        return self._dataloader
+
 
 class BertPretrainingPreprocessedDataLayer(DataLayerNM):
     """
@@ -113,6 +151,10 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
         short_seeq_prob (float): Probability of creating sequences which are
             shorter than the maximum length.
             Defualts to 0.1.
+        seed (int): seed of the order of files and samples. The position in
+            this order is saved in checkpoints, so that resumed training
+            continues with the next unseen batch.
+            Defaults to 0.
     """
 
     @property
@@ -159,7 +201,7 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
             "labels": NeuralType({0: AxisType(BatchTag)}),
         }
 
-    def __init__(self, dataset, max_pred_length, batch_size=64, training=True):
+    def __init__(self, dataset, max_pred_length, batch_size=64, training=True, seed=0):
 
         if os.path.isdir(dataset):
             self.files = [
@@ -178,6 +220,10 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
             total_length += len(fp['input_ids'])
             fp.close()
         self.total_length = total_length
+        self.seed = seed
+        # pass over all files, file in the order of the pass and batch in the
+        # file to continue with
+        self._position = {'pass': 0, 'file': 0, 'batch': 0}
         super().__init__()
 
     def _collate_fn(self, x):
@@ -199,21 +245,39 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
     def __len__(self):
         return self.total_length
 
+    def get_state(self):
+        return dict(self._position)
+
+    def set_state(self, state):
+        self._position = dict(state)
+
     @property
     def dataset(self):
         return None
 
     @property
     def data_iterator(self):
+        # batches are counted as they are handed out, the trainer consumes
+        # them before it saves a checkpoint
+        position = self._position
         while True:
+            files = list(self.files)
             if self.training:
-                random.shuffle(self.files)
-            for f_id in range(self.num_files):
-                data_file = self.files[f_id]
+                random.Random(self.seed + position['pass']).shuffle(files)
+            while position['file'] < self.num_files:
                 train_data = BertPretrainingPreprocessedDataset(
-                    input_file=data_file, max_pred_length=self.max_pred_length
+                    input_file=files[position['file']], max_pred_length=self.max_pred_length
+                )
+                # every rank reads its own part of the file, skipping batches
+                # consumed before a restart
+                train_sampler = ResumableDistributedSampler(train_data, seed=self.seed)
+                train_sampler.load_state_dict(
+                    {
+                        'seed': self.seed,
+                        'epoch': position['pass'] * self.num_files + position['file'],
+                        'offset': position['batch'] * self._batch_size,
+                    }
                 )
-                train_sampler = pt_data.RandomSampler(train_data)
                 train_dataloader = pt_data.DataLoader(
                     dataset=train_data,
                     batch_size=self._batch_size,
@@ -222,4 +286,9 @@ class BertPretrainingPreprocessedDataLayer(DataLayerNM):
                     sampler=train_sampler,
                 )
                 for x in train_dataloader:
+                    position['batch'] += 1
                     yield x
+                position['file'] += 1
+                position['batch'] = 0
+            position['pass'] += 1
+            position['file'] = 0
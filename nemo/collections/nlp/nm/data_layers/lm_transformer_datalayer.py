@@ -14,11 +14,14 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.data import LanguageModelingDataset
+from torch.utils import data as pt_data
+
+import nemo
+from nemo.collections.nlp.data import LanguageModelingDataset, MemmapLanguageModelingDataset, ShardedWindowSampler
 from nemo.collections.nlp.nm.data_layers.text_datalayer import TextDataLayer
 from nemo.core import AxisType, BatchTag, NeuralType, TimeTag
 
-__all__ = ['LanguageModelingDataLayer']
+__all__ = ['LanguageModelingDataLayer', 'MemmapLanguageModelingDataLayer']
 
 
 class LanguageModelingDataLayer(TextDataLayer):
@@ -70,3 +73,68 @@ class LanguageModelingDataLayer(TextDataLayer):
             'batch_step': batch_step,
         }
         super().__init__(dataset_type, dataset_params, batch_size, shuffle=False)
+
+
+class MemmapLanguageModelingDataLayer(LanguageModelingDataLayer):
+    """
+    Data layer for language modeling on corpora which do not fit into memory.
+    The text is tokenized once into a memory-mapped token stream shared by
+    all processes, see MemmapLanguageModelingDataset. Every rank reads its
+    own contiguous shard of windows.
+
+    Args:
+        dataset (str): path to text document with data
+        tokenizer (TokenizerSpec): tokenizer
+        max_seq_length (int): maximum allowed length of the text segments
+        batch_size (int): batch size
+        batch_step (int): how many tokens to skip between two successive
+            segments of text when constructing batches
+        shuffle (bool): shuffle windows inside the shard of every rank
+        random_offset (bool): shift all windows by a random offset in
+            [0, batch_step) every epoch
+        num_workers (int): number of workers of the DataLoader
+        seed (int): seed of the shuffling and of the offsets
+    """
+
+    def __init__(
+        self,
+        dataset,
+        tokenizer,
+        max_seq_length,
+        batch_size,
+        batch_step=128,
+        shuffle=False,
+        random_offset=False,
+        num_workers=0,
+        seed=0,
+        dataset_type=MemmapLanguageModelingDataset,
+    ):
+        dataset_params = {
+            'dataset': dataset,
+            'tokenizer': tokenizer,
+            'max_seq_length': max_seq_length,
+            'batch_step': batch_step,
+            'random_offset': random_offset,
+            'seed': seed,
+        }
+        TextDataLayer.__init__(self, dataset_type, dataset_params, batch_size, shuffle=shuffle)
+
+        distributed = self._placement == nemo.core.DeviceType.AllGpu
+        sampler = ShardedWindowSampler(
+            self._dataset,
+            shuffle=shuffle,
+            num_replicas=None if distributed else 1,
+            rank=None if distributed else 0,
+            seed=seed,
+        )
+        self._dataloader = pt_data.DataLoader(
+            dataset=self._dataset, batch_size=batch_size, sampler=sampler, num_workers=num_workers,
+        )
+
+    @property
+    def dataset(self):
+        return None
+
+    @property
+    def data_iterator(self):
+        return self._dataloader
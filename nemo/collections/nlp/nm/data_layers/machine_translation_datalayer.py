@@ -18,6 +18,7 @@ import torch
 from torch.utils import data as pt_data
 
 import nemo
+from nemo.backends.pytorch.samplers import make_sampler
 from nemo.collections.nlp.data import TranslationDataset
 from nemo.collections.nlp.nm.data_layers.text_datalayer import TextDataLayer
 from nemo.core import AxisType, BatchTag, NeuralType, TimeTag
@@ -109,13 +110,12 @@ class TranslationDataLayer(TextDataLayer):
         }
         super().__init__(dataset_type, dataset_params, batch_size=1, shuffle=shuffle)
 
-        if self._placement == nemo.core.DeviceType.AllGpu:
-            sampler = pt_data.distributed.DistributedSampler(self._dataset)
-        else:
-            sampler = None
+        sampler = make_sampler(
+            self._dataset, True, self._factory, distributed=self._placement == nemo.core.DeviceType.AllGpu
+        )
 
         self._dataloader = pt_data.DataLoader(
-            dataset=self._dataset, batch_size=1, collate_fn=self._collate_fn, shuffle=sampler is None, sampler=sampler
+            dataset=self._dataset, batch_size=1, collate_fn=self._collate_fn, sampler=sampler
         )
 
     def _collate_fn(self, x):
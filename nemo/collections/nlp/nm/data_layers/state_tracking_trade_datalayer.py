@@ -41,7 +41,8 @@ import torch
 from torch.utils import data as pt_data
 
 import nemo
-from nemo.collections.nlp.data.datasets import MultiWOZDataset
+from nemo.backends.pytorch.samplers import make_sampler, sampler_seed
+from nemo.collections.nlp.data.datasets import BucketingBatchSampler, MultiWOZDataset
 from nemo.collections.nlp.nm.data_layers.text_datalayer import TextDataLayer
 from nemo.core.neural_types import *
 
@@ -107,6 +108,9 @@ class MultiWOZDataLayer(TextDataLayer):
         num_workers=0,
         input_dropout=0,
         is_training=False,
+        use_cache=False,
+        use_bucketing=False,
+        bucket_size_multiplier=100,
     ):
 
         dataset_params = {
@@ -119,22 +123,39 @@ class MultiWOZDataLayer(TextDataLayer):
             'vocab': vocab,
             'slots': slots,
             'gating_dict': gating_dict,
+            'use_cache': use_cache,
         }
         super().__init__(dataset_type, dataset_params, batch_size=batch_size)
 
-        if self._placement == nemo.core.DeviceType.AllGpu:
-            sampler = pt_data.distributed.DistributedSampler(self._dataset)
+        if use_bucketing:
+            # batches of dialogues with similar history lengths, shuffled and sharded across ranks
+            batch_sampler = BucketingBatchSampler(
+                self._dataset.lengths(),
+                batch_size=batch_size,
+                shuffle=True,
+                bucket_size_multiplier=bucket_size_multiplier,
+                num_replicas=None if self._placement == nemo.core.DeviceType.AllGpu else 1,
+                rank=None if self._placement == nemo.core.DeviceType.AllGpu else 0,
+                seed=0 if self._placement == nemo.core.DeviceType.AllGpu else sampler_seed(self._factory),
+            )
+            self._dataloader = pt_data.DataLoader(
+                dataset=self._dataset,
+                batch_sampler=batch_sampler,
+                num_workers=num_workers,
+                collate_fn=self._collate_fn,
+            )
         else:
-            sampler = None
-
-        self._dataloader = pt_data.DataLoader(
-            dataset=self._dataset,
-            batch_size=batch_size,
-            shuffle=sampler is None,
-            num_workers=num_workers,
-            collate_fn=self._collate_fn,
-            sampler=sampler,
-        )
+            sampler = make_sampler(
+                self._dataset, True, self._factory, distributed=self._placement == nemo.core.DeviceType.AllGpu
+            )
+
+            self._dataloader = pt_data.DataLoader(
+                dataset=self._dataset,
+                batch_size=batch_size,
+                num_workers=num_workers,
+                collate_fn=self._collate_fn,
+                sampler=sampler,
+            )
         self.pad_id = self._dataset.vocab.pad_id
         self.gating_dict = self._dataset.gating_dict
         self.input_dropout = input_dropout
@@ -143,49 +164,25 @@ class MultiWOZDataLayer(TextDataLayer):
         self.slots = self._dataset.slots
 
     def _collate_fn(self, data):
-        """ data is a list of batch_size sample
-        each sample is a dictionary of features
+        """ data is a list of batch_size samples,
+        each sample is a dictionary of views into the dataset feature arrays
         """
+        # sort by decreasing history length as required by the packed encoder inputs
+        src_lens = np.array([len(item['context_ids']) for item in data], dtype=np.int64)
+        order = np.argsort(-src_lens, kind='stable')
+        data = [data[i] for i in order]
+        src_lens = src_lens[order]
+
+        src_ids = _pad_ragged([item['context_ids'] for item in data], src_lens, pad_id=1)
+
+        # batch x nb_slot lengths, all slot values of a sample are stored back to back
+        tgt_lens = np.stack([item['responses_lens'] for item in data])
+        tgt_ids = _pad_ragged([item['responses_ids'] for item in data], tgt_lens.reshape(-1), pad_id=self.pad_id)
+        tgt_ids = tgt_ids.reshape(tgt_lens.shape[0], tgt_lens.shape[1], -1)
 
-        def pad_batch_context(sequences):
-            '''
-            merge from batch * sent_len to batch * max_len
-            '''
-            lengths = [len(seq) for seq in sequences]
-            max_len = 1 if max(lengths) == 0 else max(lengths)
-            for i, seq in enumerate(sequences):
-                sequences[i] = seq + [1] * (max_len - len(seq))
-            return torch.tensor(sequences), torch.tensor(lengths)
-
-        def pad_batch_response(sequences, pad_id):
-            '''
-            merge from batch * nb_slot * slot_len to batch * nb_slot * max_slot_len
-            '''
-            lengths = []
-            for bsz_seq in sequences:
-                length = [len(v) for v in bsz_seq]
-                lengths.append(length)
-            max_len = max([max(l) for l in lengths])
-            padded_seqs = []
-            for bsz_seq in sequences:
-                pad_seq = []
-                for v in bsz_seq:
-                    v = v + [pad_id] * (max_len - len(v))
-                    pad_seq.append(v)
-                padded_seqs.append(pad_seq)
-            padded_seqs = torch.tensor(padded_seqs)
-            lengths = torch.tensor(lengths)
-            return padded_seqs, lengths
-
-        data.sort(key=lambda x: len(x['context_ids']), reverse=True)
-        item_info = {}
-        for key in data[0]:
-            item_info[key] = [item[key] for item in data]
-
-        src_ids, src_lens = pad_batch_context(item_info['context_ids'])
-        tgt_ids, tgt_lens = pad_batch_response(item_info['responses_ids'], self._dataset.vocab.pad_id)
-        gating_label = torch.tensor(item_info['gating_label'])
-        turn_domain = torch.tensor(item_info['turn_domain'])
+        gating_label = torch.from_numpy(np.stack([item['gating_label'] for item in data]))
+        turn_domain = torch.from_numpy(np.array([item['turn_domain'] for item in data], dtype=np.int64))
+        src_ids = torch.from_numpy(src_ids)
 
         if self.input_dropout > 0 and self.is_training:
             bi_mask = np.random.binomial([np.ones(src_ids.size())], 1.0 - self.input_dropout)[0]
@@ -194,9 +191,9 @@ class MultiWOZDataLayer(TextDataLayer):
 
         return (
             src_ids.to(self._device),
-            src_lens.to(self._device),
-            tgt_ids.to(self._device),
-            tgt_lens.to(self._device),
+            torch.from_numpy(src_lens).to(self._device),
+            torch.from_numpy(tgt_ids).to(self._device),
+            torch.from_numpy(tgt_lens).to(self._device),
             gating_label.to(self._device),
             turn_domain.to(self._device),
         )
@@ -208,3 +205,12 @@ class MultiWOZDataLayer(TextDataLayer):
     @property
     def data_iterator(self):
         return self._dataloader
+
+
+def _pad_ragged(sequences, lengths, pad_id):
+    """Pads the concatenation of sequences with the given lengths into a len(lengths) x max_len array."""
+    max_len = max(int(lengths.max()) if len(lengths) > 0 else 0, 1)
+    padded = np.full((len(lengths), max_len), pad_id, dtype=np.int64)
+    mask = np.arange(max_len)[None, :] < lengths[:, None]
+    padded[mask] = np.concatenate(sequences)
+    return padded
@@ -15,7 +15,6 @@
 # =============================================================================
 
 from nemo.backends.pytorch import DataLayerNM
-from nemo.collections.nlp.data.datasets import *
 
 __all__ = ['TextDataLayer']
 
@@ -14,11 +14,28 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.nm.losses.aggregator_loss import *
-from nemo.collections.nlp.nm.losses.joint_intent_slot_loss import *
-from nemo.collections.nlp.nm.losses.masked_language_modeling_loss import *
-from nemo.collections.nlp.nm.losses.padded_smoothed_cross_entropy_loss import *
-from nemo.collections.nlp.nm.losses.qa_squad_loss import *
-from nemo.collections.nlp.nm.losses.smoothed_cross_entropy_loss import *
-from nemo.collections.nlp.nm.losses.state_tracking_trade_loss import *
-from nemo.collections.nlp.nm.losses.token_classification_loss import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.collections.nlp.nm.losses.aggregator_loss": "*",
+        "nemo.collections.nlp.nm.losses.joint_intent_slot_loss": "*",
+        "nemo.collections.nlp.nm.losses.masked_language_modeling_loss": "*",
+        "nemo.collections.nlp.nm.losses.padded_smoothed_cross_entropy_loss": "*",
+        "nemo.collections.nlp.nm.losses.qa_squad_loss": "*",
+        "nemo.collections.nlp.nm.losses.smoothed_cross_entropy_loss": "*",
+        "nemo.collections.nlp.nm.losses.state_tracking_trade_loss": "*",
+        "nemo.collections.nlp.nm.losses.token_classification_loss": "*",
+    },
+    submodules=[
+        "aggregator_loss",
+        "joint_intent_slot_loss",
+        "masked_language_modeling_loss",
+        "padded_smoothed_cross_entropy_loss",
+        "qa_squad_loss",
+        "smoothed_cross_entropy_loss",
+        "state_tracking_trade_loss",
+        "token_classification_loss",
+    ],
+)
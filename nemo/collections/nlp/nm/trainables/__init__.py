@@ -14,6 +14,14 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.nlp.nm.trainables.common import *
-from nemo.collections.nlp.nm.trainables.dialogue_state_tracking import *
-from nemo.collections.nlp.nm.trainables.joint_intent_slot import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.collections.nlp.nm.trainables.common": "*",
+        "nemo.collections.nlp.nm.trainables.dialogue_state_tracking": "*",
+        "nemo.collections.nlp.nm.trainables.joint_intent_slot": "*",
+    },
+    submodules=["common", "dialogue_state_tracking", "joint_intent_slot"],
+)
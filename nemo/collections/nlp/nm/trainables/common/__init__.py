@@ -14,8 +14,21 @@
 # limitations under the License.
 # =============================================================================
 
-import nemo.collections.nlp.nm.trainables.common.huggingface
-from nemo.collections.nlp.nm.trainables.common.sequence_classification_nm import *
-from nemo.collections.nlp.nm.trainables.common.sequence_regression_nm import *
-from nemo.collections.nlp.nm.trainables.common.token_classification_nm import *
-from nemo.collections.nlp.nm.trainables.common.transformer import *
+from nemo.utils.lazy_import import lazy_attributes
+
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        "nemo.collections.nlp.nm.trainables.common.sequence_classification_nm": "*",
+        "nemo.collections.nlp.nm.trainables.common.sequence_regression_nm": "*",
+        "nemo.collections.nlp.nm.trainables.common.token_classification_nm": "*",
+        "nemo.collections.nlp.nm.trainables.common.transformer": "*",
+    },
+    submodules=[
+        "huggingface",
+        "sequence_classification_nm",
+        "sequence_regression_nm",
+        "token_classification_nm",
+        "transformer",
+    ],
+)
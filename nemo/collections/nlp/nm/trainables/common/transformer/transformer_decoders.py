@@ -7,7 +7,11 @@ from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules i
     MultiHeadAttention,
     PositionWiseFF,
 )
-from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import form_attention_mask
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import (
+    TransformerMemsCache,
+    form_attention_mask,
+    form_packed_attention_mask,
+)
 
 __all__ = []
 
@@ -63,14 +67,23 @@ class TransformerDecoder(nn.Module):
         self.layers = nn.ModuleList([copy.deepcopy(layer) for _ in range(num_layers)])
 
     def _get_memory_states(self, decoder_states, decoder_mems_list=None, i=0):
-        if decoder_mems_list is not None:
+        if isinstance(decoder_mems_list, TransformerMemsCache):
+            memory_states = decoder_mems_list.update(i, decoder_states)
+        elif decoder_mems_list is not None:
             memory_states = torch.cat((decoder_mems_list[i], decoder_states), dim=1)
         else:
             memory_states = decoder_states
         return memory_states
 
     def forward(
-        self, decoder_states, decoder_mask, encoder_states, encoder_mask, decoder_mems_list=None, return_mems=False
+        self,
+        decoder_states,
+        decoder_mask,
+        encoder_states,
+        encoder_mask,
+        decoder_mems_list=None,
+        return_mems=False,
+        seq_lengths=None,
     ):
         """
         Args:
@@ -80,12 +93,20 @@ class TransformerDecoder(nn.Module):
             encoder_mask: encoder inputs mask (B x L_enc)
             decoder_mems_list: list of the cached decoder hidden states
                 for fast autoregressive generation which will be used instead
-                of decoder_states as keys and values if not None
+                of decoder_states as keys and values if not None, or a
+                TransformerMemsCache which is updated in place
             return_mems: bool, whether to return outputs of all decoder layers
                 or the last layer only
+            seq_lengths: lengths of the sequences packed one after another
+                into every row of decoder_states (B x S); if not None, tokens
+                only attend within their own sequence and decoder_mask is
+                ignored in self-attention
         """
 
-        decoder_attn_mask = form_attention_mask(decoder_mask, diagonal=0)
+        if seq_lengths is not None:
+            decoder_attn_mask = form_packed_attention_mask(seq_lengths, decoder_states.size(1), diagonal=0)
+        else:
+            decoder_attn_mask = form_attention_mask(decoder_mask, diagonal=0)
         encoder_attn_mask = form_attention_mask(encoder_mask)
 
         memory_states = self._get_memory_states(decoder_states, decoder_mems_list, 0)
@@ -96,6 +117,9 @@ class TransformerDecoder(nn.Module):
             memory_states = self._get_memory_states(decoder_states, decoder_mems_list, i + 1)
             cached_mems_list.append(memory_states)
 
+        if isinstance(decoder_mems_list, TransformerMemsCache):
+            decoder_mems_list.advance(decoder_states.size(1))
+
         if return_mems:
             return cached_mems_list
         else:
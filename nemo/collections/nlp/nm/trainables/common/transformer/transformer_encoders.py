@@ -8,7 +8,11 @@ from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules i
     PositionWiseFF,
     TwoStreamSelfAttention,
 )
-from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import form_attention_mask
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import (
+    TransformerMemsCache,
+    form_attention_mask,
+    form_packed_attention_mask,
+)
 
 __all__ = []
 
@@ -61,25 +65,35 @@ class TransformerEncoder(nn.Module):
         self.diag = 0 if mask_future else None
 
     def _get_memory_states(self, encoder_states, encoder_mems_list=None, i=0):
-        if encoder_mems_list is not None:
+        if isinstance(encoder_mems_list, TransformerMemsCache):
+            memory_states = encoder_mems_list.update(i, encoder_states)
+        elif encoder_mems_list is not None:
             memory_states = torch.cat((encoder_mems_list[i], encoder_states), dim=1)
         else:
             memory_states = encoder_states
         return memory_states
 
-    def forward(self, encoder_states, encoder_mask, encoder_mems_list=None, return_mems=False):
+    def forward(self, encoder_states, encoder_mask, encoder_mems_list=None, return_mems=False, seq_lengths=None):
         """
         Args:
             encoder_states: output of the embedding_layer (B x L_enc x H)
             encoder_mask: encoder inputs mask (B x L_enc)
             encoder_mems_list: list of the cached encoder hidden states
                 for fast autoregressive generation which will be used instead
-                of encoder_states as keys and values if not None
+                of encoder_states as keys and values if not None, or a
+                TransformerMemsCache which is updated in place
             return_mems: bool, whether to return outputs of all encoder layers
                 or the last layer only
+            seq_lengths: lengths of the sequences packed one after another
+                into every row of encoder_states (B x S); if not None, tokens
+                only attend within their own sequence and encoder_mask is
+                ignored
         """
 
-        encoder_attn_mask = form_attention_mask(encoder_mask, self.diag)
+        if seq_lengths is not None:
+            encoder_attn_mask = form_packed_attention_mask(seq_lengths, encoder_states.size(1), self.diag)
+        else:
+            encoder_attn_mask = form_attention_mask(encoder_mask, self.diag)
 
         memory_states = self._get_memory_states(encoder_states, encoder_mems_list, 0)
         cached_mems_list = [memory_states]
@@ -89,6 +103,9 @@ class TransformerEncoder(nn.Module):
             memory_states = self._get_memory_states(encoder_states, encoder_mems_list, i + 1)
             cached_mems_list.append(memory_states)
 
+        if isinstance(encoder_mems_list, TransformerMemsCache):
+            encoder_mems_list.advance(encoder_states.size(1))
+
         if return_mems:
             return cached_mems_list
         else:
@@ -3,7 +3,7 @@ __all__ = []
 import torch
 import torch.nn as nn
 
-from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import NEG_INF
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import NEG_INF, TransformerMemsCache
 from nemo.collections.nlp.utils.common_nlp_utils import mask_padded_tokens
 
 
@@ -69,10 +69,13 @@ class GreedySequenceGenerator(nn.Module):
                 mode (e.g., language modeling)
             encoder_input_mask: input mask used in the encoder
             decoder_mems_list: list of size num_layers with cached activations
-                of sequence (x[1], ..., x[k-1]) for fast generation of x[k]
+                of sequence (x[1], ..., x[k-1]) for fast generation of x[k],
+                or TransformerMemsCache updated in place; in the latter case
+                log_probs are only computed for the new positions
             pos: starting position in positional encoding
         """
 
+        mems_cache = decoder_mems_list if isinstance(decoder_mems_list, TransformerMemsCache) else None
         decoder_hidden_states = self.embedding.forward(decoder_input_ids, start_pos=pos)
         decoder_input_mask = mask_padded_tokens(decoder_input_ids, self.pad).float()
         # TODO: make sure float() work with mixed precision
@@ -90,6 +93,9 @@ class GreedySequenceGenerator(nn.Module):
             decoder_mems_list = self.decoder.forward(
                 decoder_hidden_states, decoder_input_mask, decoder_mems_list, return_mems=True
             )
+        if mems_cache is not None:
+            log_probs = self.log_softmax.forward(decoder_mems_list[-1][:, -decoder_input_ids.size(1) :])
+            return log_probs, mems_cache
         log_probs = self.log_softmax.forward(decoder_mems_list[-1])
         return log_probs, decoder_mems_list
 
@@ -120,31 +126,110 @@ class GreedySequenceGenerator(nn.Module):
 
         return tgt, batch_size, max_generation_length
 
+    def _init_mems_cache(self, batch_size, max_length):
+        """Allocates cached activations of all decoder layers for sequences of up to max_length tokens."""
+        token_embedding = self.embedding.token_embedding
+        return TransformerMemsCache(
+            len(self.decoder.layers) + 1,
+            batch_size,
+            max_length,
+            token_embedding.embedding_dim,
+            dtype=token_embedding.weight.dtype,
+            device=token_embedding.weight.device,
+        )
+
     def forward(self, decoder_input_ids=None, encoder_hidden_states=None, encoder_input_mask=None):
 
         tgt, batch_size, max_generation_length = self._prepare_for_search(decoder_input_ids, encoder_hidden_states)
+        tgt_len = tgt.size(1)
 
-        # pad profile tracks sequences ending with <eos> token to replace
-        # everything after <eos> with <pad> token
-        pad_profile = torch.zeros(batch_size, 1).long().to(self.device)
+        # everything after <eos> stays <pad>, finished sequences are removed
+        # from the batch and their outputs are never written again
+        output = torch.full(
+            (batch_size, tgt_len + max(max_generation_length, 0)), self.pad, dtype=tgt.dtype, device=tgt.device
+        )
+        output[:, :tgt_len] = tgt
+        active = torch.arange(batch_size, device=tgt.device)
+        decoder_mems_cache = self._init_mems_cache(batch_size, output.size(1))
 
-        decoder_mems_list = None
+        # the whole starting sequence is encoded at the first step
+        input_ids, pos, num_steps = tgt, 0, 0
         for i in range(max_generation_length):
 
-            log_probs, decoder_mems_list = self._forward(
-                tgt[:, -1:], encoder_hidden_states, encoder_input_mask, decoder_mems_list, i
+            log_probs, decoder_mems_cache = self._forward(
+                input_ids, encoder_hidden_states, encoder_input_mask, decoder_mems_cache, pos
             )
+            pos += input_ids.size(1)
+            num_steps += 1
 
-            next_tokens = torch.argmax(log_probs[:, -1], dim=-1, keepdim=True)
-            next_tokens = self.pad * pad_profile + next_tokens * (1 - pad_profile)
-            pad_profile = torch.max(pad_profile, (next_tokens == self.eos).long())
-            tgt = torch.cat((tgt, next_tokens), dim=-1)
+            next_tokens = torch.argmax(log_probs[:, -1], dim=-1)
+            output[active, tgt_len + i] = next_tokens
 
-            # abort generation if all sequences end with <eos>
-            if pad_profile.sum() == batch_size:
-                break
+            finished = next_tokens == self.eos
+            if finished.any():
+                # abort generation if all sequences end with <eos>
+                if finished.all():
+                    break
+                keep = (~finished).nonzero().squeeze(1)
+                active, next_tokens = active[keep], next_tokens[keep]
+                decoder_mems_cache.select(keep)
+                if encoder_hidden_states is not None:
+                    encoder_hidden_states = encoder_hidden_states[keep]
+                    encoder_input_mask = encoder_input_mask[keep]
+
+            input_ids = next_tokens.unsqueeze(1)
+
+        return output[:, : tgt_len + num_steps]
+
+    @torch.no_grad()
+    def generate(self, prefixes=None, encoder_hidden_states=None, encoder_input_mask=None, batch_size=None):
+        """
+        Generates sequences for plain lists of token ids.
+
+        Starting sequences of the same length are batched together, so no
+        padding is needed inside them.
+
+        Args:
+            prefixes: list of lists of token ids to continue; if None,
+                every sequence starts from <bos>
+            encoder_hidden_states: output of the encoder for conditional
+                sequence generation, one row for every generated sequence
+            encoder_input_mask: input mask used in the encoder
+            batch_size: maximum number of sequences generated at once
+        Returns:
+            list of lists of token ids which start with the corresponding
+            prefix and end with <eos> unless the maximum length is reached
+        """
 
-        return tgt
+        if prefixes is None:
+            num_sequences = encoder_hidden_states.size(0) if encoder_hidden_states is not None else self.batch_size
+            prefixes = [[self.bos]] * num_sequences
+        batch_size = batch_size or max(len(prefixes), 1)
+
+        groups, group = [], []
+        for k in sorted(range(len(prefixes)), key=lambda k: len(prefixes[k])):
+            if group and (len(group) == batch_size or len(prefixes[group[0]]) != len(prefixes[k])):
+                groups.append(group)
+                group = []
+            group.append(k)
+        if group:
+            groups.append(group)
+
+        results = [None] * len(prefixes)
+        for group in groups:
+            tgt = torch.tensor([prefixes[k] for k in group], dtype=torch.long, device=self.device)
+            src_hiddens, src_mask = None, None
+            if encoder_hidden_states is not None:
+                indices = torch.tensor(group, dtype=torch.long, device=encoder_hidden_states.device)
+                src_hiddens = encoder_hidden_states.index_select(0, indices)
+                src_mask = encoder_input_mask.index_select(0, indices)
+            prefix_len = tgt.size(1)
+            for k, ids in zip(group, self.forward(tgt, src_hiddens, src_mask).tolist()):
+                generated = ids[prefix_len:]
+                if self.eos in generated:
+                    generated = generated[: generated.index(self.eos) + 1]
+                results[k] = ids[:prefix_len] + generated
+        return results
 
 
 class TopKSequenceGenerator(GreedySequenceGenerator):
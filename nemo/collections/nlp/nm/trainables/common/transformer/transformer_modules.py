@@ -26,6 +26,7 @@ Copyright by the HuggingFace and Annotated Transformer authors.
 import math
 
 import torch
+import torch.nn.functional as F
 from torch import nn
 
 from nemo import logging
@@ -33,6 +34,9 @@ from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils imp
 
 __all__ = []
 
+# fused attention kernels are available starting from PyTorch 2.0
+_HAVE_FUSED_ATTENTION = hasattr(F, "scaled_dot_product_attention")
+
 
 try:
     from apex.normalization import FusedLayerNorm
@@ -105,16 +109,17 @@ class TransformerEmbedding(nn.Module):
         self.layer_norm = FusedLayerNorm(hidden_size, eps=1e-5)
         self.dropout = nn.Dropout(embedding_dropout)
 
-    def forward(self, input_ids, token_type_ids=None, start_pos=0):
+    def forward(self, input_ids, token_type_ids=None, start_pos=0, position_ids=None):
         seq_length = input_ids.size(1)
-        if seq_length > self.max_sequence_length:
-            raise ValueError(
-                "Input sequence is longer than maximum allowed" " sequence length for positional encoding"
+        if position_ids is None:
+            if seq_length > self.max_sequence_length:
+                raise ValueError(
+                    "Input sequence is longer than maximum allowed" " sequence length for positional encoding"
+                )
+            position_ids = torch.arange(
+                start=start_pos, end=start_pos + seq_length, dtype=torch.long, device=input_ids.device
             )
-        position_ids = torch.arange(
-            start=start_pos, end=start_pos + seq_length, dtype=torch.long, device=input_ids.device
-        )
-        position_ids = position_ids.unsqueeze(0).expand_as(input_ids)
+            position_ids = position_ids.unsqueeze(0).expand_as(input_ids)
 
         token_embeddings = self.token_embedding(input_ids)
         position_embeddings = self.position_embedding(position_ids)
@@ -140,9 +145,18 @@ class MultiHeadAttention(nn.Module):
         attn_score_dropout: probability of dropout applied to attention scores
         attn_layer_dropout: probability of dropout applied to the output of the
             whole layer, but before layer normalization
+        use_fused_attention: whether to use fused scaled dot-product attention
+            kernel if the installed PyTorch provides it
     """
 
-    def __init__(self, hidden_size, num_attention_heads, attn_score_dropout=0.0, attn_layer_dropout=0.0):
+    def __init__(
+        self,
+        hidden_size,
+        num_attention_heads,
+        attn_score_dropout=0.0,
+        attn_layer_dropout=0.0,
+        use_fused_attention=True,
+    ):
         super().__init__()
         if hidden_size % num_attention_heads != 0:
             raise ValueError(
@@ -153,6 +167,7 @@ class MultiHeadAttention(nn.Module):
         self.num_attention_heads = num_attention_heads
         self.attn_head_size = int(hidden_size / num_attention_heads)
         self.attn_scale = math.sqrt(math.sqrt(self.attn_head_size))
+        self.use_fused_attention = use_fused_attention and _HAVE_FUSED_ATTENTION
 
         self.query_net = nn.Linear(hidden_size, hidden_size)
         self.key_net = nn.Linear(hidden_size, hidden_size)
@@ -173,23 +188,19 @@ class MultiHeadAttention(nn.Module):
         # attention_mask is needed to hide the tokens which correspond to [PAD]
         # in the case of BERT, or to hide the future tokens in the case of
         # vanilla language modeling and translation
-        query = self.query_net(queries)
-        key = self.key_net(keys)
-        value = self.value_net(values)
-        query = self.transpose_for_scores(query) / self.attn_scale
-        key = self.transpose_for_scores(key) / self.attn_scale
-        value = self.transpose_for_scores(value)
-
-        # for numerical stability we pre-divide query and key by sqrt(sqrt(d))
-        # and perform attention probs computation in float32
-        attention_scores = torch.matmul(query, key.transpose(-1, -2)).float()
-        if attention_mask is not None:
-            attention_scores = attention_scores + attention_mask.float()
-        attention_probs = torch.softmax(attention_scores, dim=-1).to(key.dtype)
-        attention_probs = self.attn_dropout(attention_probs)
+        query = self.transpose_for_scores(self.query_net(queries))
+        key = self.transpose_for_scores(self.key_net(keys))
+        value = self.transpose_for_scores(self.value_net(values))
+
+        if self.use_fused_attention:
+            if attention_mask is not None:
+                attention_mask = attention_mask.to(query.dtype)
+            dropout_p = self.attn_dropout.p if self.training else 0.0
+            context = F.scaled_dot_product_attention(query, key, value, attn_mask=attention_mask, dropout_p=dropout_p)
+        else:
+            context = self._attention(query, key, value, attention_mask)
 
-        context = torch.matmul(attention_probs, value)
-        context = context.permute(0, 2, 1, 3).contiguous()
+        context = context.transpose(1, 2).contiguous()
         new_context_shape = context.size()[:-2] + (self.hidden_size,)
         context = context.view(*new_context_shape)
 
@@ -200,6 +211,18 @@ class MultiHeadAttention(nn.Module):
 
         return output_states
 
+    def _attention(self, query, key, value, attention_mask):
+        # for numerical stability we pre-divide query and key by sqrt(sqrt(d))
+        # and perform attention probs computation in float32
+        query = query / self.attn_scale
+        key = key / self.attn_scale
+        attention_scores = torch.matmul(query, key.transpose(-1, -2)).float()
+        if attention_mask is not None:
+            attention_scores = attention_scores + attention_mask.float()
+        attention_probs = torch.softmax(attention_scores, dim=-1).to(key.dtype)
+        attention_probs = self.attn_dropout(attention_probs)
+        return torch.matmul(attention_probs, value)
+
 
 class LightweightConv1d(nn.Module):
     """
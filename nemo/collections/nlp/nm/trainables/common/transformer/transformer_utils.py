@@ -29,15 +29,133 @@ def form_attention_mask(input_mask, diagonal=None):
 
     if input_mask is None:
         return None
-    attn_shape = (1, input_mask.shape[1], input_mask.shape[1])
     attn_mask = input_mask.byte().unsqueeze(1)
     if diagonal is not None:
-        future_mask = torch.tril(torch.ones(attn_shape).byte().to(input_mask.device), diagonal)
-        attn_mask = attn_mask & future_mask
+        future_mask = get_future_mask(input_mask.shape[1], diagonal, input_mask.device)
+        attn_mask = attn_mask & future_mask.unsqueeze(0)
     attention_mask = (1 - attn_mask.to(torch.float)) * NEG_INF
     return attention_mask.unsqueeze(1)
 
 
+_FUTURE_MASKS = {}
+
+
+def get_future_mask(length, diagonal=0, device=None):
+    """
+    Returns L x L binary mask with 1s on and below the given diagonal.
+
+    Masks are cached per diagonal and device; the cached mask is only rebuilt
+    when a longer sequence comes and is truncated for shorter ones.
+    """
+
+    key = (diagonal, torch.device(device) if device is not None else torch.device("cpu"))
+    future_mask = _FUTURE_MASKS.get(key)
+    if future_mask is None or future_mask.size(0) < length:
+        future_mask = torch.tril(torch.ones(length, length, dtype=torch.uint8, device=device), diagonal)
+        _FUTURE_MASKS[key] = future_mask
+    return future_mask[:length, :length]
+
+
+def packed_segment_ids(seq_lengths, max_length):
+    """
+    Args:
+        seq_lengths: B x S lengths of the sequences packed one after another
+            into every row of the batch, 0s for unused slots
+        max_length: length of the rows of the batch
+    Returns:
+        segment_ids: B x max_length index of the packed sequence every token
+            belongs to, S for padding tokens
+    """
+
+    ends = torch.cumsum(seq_lengths, dim=-1)
+    positions = torch.arange(max_length, device=seq_lengths.device)
+    return (positions[None, :, None] >= ends[:, None, :]).sum(dim=-1)
+
+
+def packed_position_ids(seq_lengths, max_length):
+    """
+    Returns B x max_length positions of tokens within their own packed
+    sequence, i.e. positions start from 0 at the beginning of every sequence.
+    """
+
+    starts = torch.cumsum(seq_lengths, dim=-1) - seq_lengths
+    segment_ids = packed_segment_ids(seq_lengths, max_length)
+    starts = torch.cat((starts, starts.new_zeros(starts.size(0), 1)), dim=-1)
+    positions = torch.arange(max_length, device=seq_lengths.device).unsqueeze(0)
+    return (positions - starts.gather(1, segment_ids)).masked_fill(segment_ids == seq_lengths.size(1), 0)
+
+
+def form_packed_attention_mask(seq_lengths, max_length, diagonal=None):
+    """
+    Build attention mask for packed batches where every row holds several
+    sequences one after another instead of a single padded sequence.
+    Tokens only attend to the tokens of their own sequence.
+
+    Args:
+        seq_lengths: B x S lengths of the packed sequences, 0s for unused slots
+        max_length: length of the rows of the batch
+        diagonal: diagonal where triangular future mask starts, see
+            form_attention_mask
+    Returns:
+        attention_mask: mask of size B x 1 x L x L with 0s corresponding to
+            tokens we plan to attend to and -10000 otherwise
+    """
+
+    segment_ids = packed_segment_ids(seq_lengths, max_length)
+    valid = segment_ids < seq_lengths.size(1)
+    attn_mask = (segment_ids.unsqueeze(2) == segment_ids.unsqueeze(1)) & valid.unsqueeze(1)
+    if diagonal is not None:
+        future_mask = get_future_mask(max_length, diagonal, seq_lengths.device)
+        attn_mask = attn_mask & future_mask.bool().unsqueeze(0)
+    attention_mask = (1 - attn_mask.to(torch.float)) * NEG_INF
+    return attention_mask.unsqueeze(1)
+
+
+class TransformerMemsCache:
+    """
+    Preallocated per-layer hidden states for fast autoregressive generation.
+
+    Can be passed as decoder_mems_list/encoder_mems_list to TransformerDecoder
+    and TransformerEncoder instead of a list of tensors. New states are written
+    in place into buffers of size max_length rather than concatenated to the
+    cached ones, which would reallocate the whole cache on every step.
+
+    Args:
+        num_states: number of cached states, i.e. num_layers + 1
+        batch_size: number of generated sequences
+        max_length: maximum total length of the generated sequences
+        hidden_size: size of the hidden states
+        dtype: dtype of the hidden states
+        device: device of the hidden states
+    """
+
+    def __init__(self, num_states, batch_size, max_length, hidden_size, dtype=torch.float, device=None):
+        self.buffers = torch.zeros(num_states, batch_size, max_length, hidden_size, dtype=dtype, device=device)
+        self.length = 0
+
+    def __len__(self):
+        return self.buffers.size(0)
+
+    def __getitem__(self, i):
+        return self.buffers[i, :, : self.length]
+
+    def update(self, i, states):
+        """Writes states of the new positions of the i-th layer and returns all states of the layer."""
+        end = self.length + states.size(1)
+        if end > self.buffers.size(2):
+            raise ValueError(f"Cache of length {self.buffers.size(2)} can not hold {end} positions")
+        self.buffers[i, :, self.length : end] = states
+        return self.buffers[i, :, :end]
+
+    def advance(self, num_positions):
+        """Marks num_positions written through update() as part of the cache."""
+        self.length += num_positions
+
+    def select(self, indices):
+        """Keeps only the sequences with the given batch indices, e.g. to drop finished sequences."""
+        self.buffers = self.buffers[:, indices]
+
+
 def transformer_weights_init(module, std_init_range=0.02, xavier=True):
     """
     Initialize different weights in Transformer model.
@@ -51,6 +51,27 @@ __all__ = ['TRADEGenerator']
 
 
 class TRADEGenerator(TrainableNM):
+    """
+    The generator of TRADE, which decodes the values of all slots in
+    parallel, see TRADE (https://arxiv.org/abs/1905.08743).
+
+    All slots of all dialogues are decoded as one batch of
+    len(slots) * batch_size rows. Attention over the encoder outputs is
+    computed with batched matrix products per dialogue, so encoder outputs
+    are never copied per slot, and the copy distribution of the pointer is
+    scattered directly into the output distribution.
+
+    Args:
+        vocab (Vocab): vocabulary of the decoder
+        embeddings (nn.Embedding): word embeddings shared with the encoder
+        hid_size (int): hidden size
+        dropout (float): dropout probability
+        slots (list): names of the slots as "domain-slot"
+        nb_gate (int): number of gating classes
+        teacher_forcing (float): probability of teacher forcing in training
+        max_res_len (int): number of decoding steps if no targets are given
+    """
+
     @property
     def input_ports(self):
         """Returns definitions of module input ports.
@@ -77,7 +98,8 @@ class TRADEGenerator(TrainableNM):
 
             1: AxisType(TimeTag)
 
-        targets: targets for the output of the generator
+        targets (optional): targets for the output of the generator, set
+        the number of decoding steps and are used for teacher forcing
             0: AxisType(BatchTag)
 
             1: AxisType(BatchTag)
@@ -90,7 +112,9 @@ class TRADEGenerator(TrainableNM):
             'encoder_outputs': NeuralType({0: AxisType(BatchTag), 1: AxisType(TimeTag), 2: AxisType(ChannelTag)}),
             'input_lens': NeuralType({0: AxisType(BatchTag)}),
             'src_ids': NeuralType({0: AxisType(BatchTag), 1: AxisType(TimeTag)}),
-            'targets': NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag), 2: AxisType(TimeTag)}),
+            'targets': NeuralType(
+                {0: AxisType(BatchTag), 1: AxisType(ChannelTag), 2: AxisType(TimeTag)}, optional=True
+            ),
         }
 
     @property
@@ -121,7 +145,7 @@ class TRADEGenerator(TrainableNM):
             'gate_outputs': NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag), 2: AxisType(ChannelTag)}),
         }
 
-    def __init__(self, vocab, embeddings, hid_size, dropout, slots, nb_gate, teacher_forcing=0.5):
+    def __init__(self, vocab, embeddings, hid_size, dropout, slots, nb_gate, teacher_forcing=0.5, max_res_len=10):
         super().__init__()
         self.vocab_size = len(vocab)
         self.vocab = vocab
@@ -136,6 +160,7 @@ class TRADEGenerator(TrainableNM):
         self.sigmoid = nn.Sigmoid()
         self.slots = slots
         self.teacher_forcing = teacher_forcing
+        self.max_res_len = max_res_len
 
         self._slots_split_to_index()
         self.slot_emb = nn.Embedding(len(self.slot_w2i), hid_size)
@@ -151,81 +176,154 @@ class TRADEGenerator(TrainableNM):
         self.domain_idx = torch.tensor([self.slot_w2i[domain] for domain in domains], device=self._device)
         self.subslot_idx = torch.tensor([self.slot_w2i[slot] for slot in slots], device=self._device)
 
+    def _init_decoding(self, encoder_hidden, encoder_outputs, input_lens, src_ids):
+        """Returns the first decoder input and hidden state of every slot and
+        dialogue (row slot * batch_size + dialogue) and the step invariant
+        attention mask and pointer indices"""
+        num_slots, batch_size = len(self.slots), encoder_hidden.shape[0]
+
+        slot_emb = self.slot_emb(self.domain_idx) + self.slot_emb(self.subslot_idx)
+        slot_emb = slot_emb.unsqueeze(1).expand(num_slots, batch_size, self.hidden_size)
+        decoder_input = self.dropout(slot_emb).reshape(-1, self.hidden_size)
+        hidden = encoder_hidden.transpose(0, 1).repeat(num_slots, 1, 1)
+        hidden = hidden.view(-1, self.hidden_size).unsqueeze(0)
+
+        # one additive mask per dialogue, broadcast over slots
+        maxlen = encoder_outputs.size(1)
+        padding_mask_bool = ~(torch.arange(maxlen, device=self._device)[None, :] <= input_lens[:, None])
+        padding_mask = torch.zeros_like(padding_mask_bool, dtype=encoder_outputs.dtype, device=self._device)
+        padding_mask.masked_fill_(mask=padding_mask_bool, value=-np.inf)
+        padding_mask = padding_mask.unsqueeze(1)
+
+        src_rows = src_ids.repeat(num_slots, 1)
+        return decoder_input, hidden, padding_mask, src_rows
+
+    def _attend_rows(self, encoder_outputs, rows, padding_mask):
+        """Attention of rows (slot * batch_size + dialogue) over the encoder
+        outputs of their dialogue, returns contexts and probabilities by row"""
+        num_slots, batch_size = len(self.slots), encoder_outputs.shape[0]
+        query = rows.view(num_slots, batch_size, -1).transpose(0, 1)
+        context, _, prob = TRADEGenerator.attend(encoder_outputs, query, padding_mask)
+        context = context.transpose(0, 1).reshape(num_slots * batch_size, -1)
+        prob = prob.transpose(0, 1).reshape(num_slots * batch_size, -1)
+        return context, prob
+
+    def _final_distribution(self, dec_state, hidden, context_vec, decoder_input, prob, src_rows):
+        p_vocab = TRADEGenerator.attend_vocab(self.embedding.weight, hidden)
+        p_gen_vec = torch.cat([dec_state, context_vec, decoder_input], -1)
+        vocab_pointer_switches = self.sigmoid(self.w_ratio(p_gen_vec))
+        # (1 - switch) * p_context + switch * p_vocab, where p_context is the
+        # attention scattered to the source tokens
+        final_p_vocab = vocab_pointer_switches * p_vocab
+        final_p_vocab.scatter_add_(1, src_rows, (1 - vocab_pointer_switches) * prob)
+        return final_p_vocab
+
     def forward(self, encoder_hidden, encoder_outputs, input_lens, src_ids, targets=None):
 
-        if (not self.training) or (random.random() > self.teacher_forcing):
+        if (not self.training) or targets is None or (random.random() > self.teacher_forcing):
             use_teacher_forcing = False
         else:
             use_teacher_forcing = True
 
-        # TODO: set max_res_len to 10 in evaluation mode or
-        #  when targets are not provided
-        max_res_len = targets.shape[2]
-        batch_size = encoder_hidden.shape[0]
+        max_res_len = self.max_res_len if targets is None else targets.shape[2]
+        num_slots, batch_size = len(self.slots), encoder_hidden.shape[0]
+
+        decoder_input, hidden, padding_mask, src_rows = self._init_decoding(
+            encoder_hidden, encoder_outputs, input_lens, src_ids
+        )
+        # written step by step in the final layout, no transposed copy
+        all_point_outputs = torch.empty(batch_size, num_slots, max_res_len, self.vocab_size, device=self._device)
+        all_gate_outputs = None
 
-        targets = targets.transpose(0, 1)
+        for wi in range(max_res_len):
+            dec_state, hidden = self.rnn(decoder_input.unsqueeze(1), hidden)
+            context_vec, prob = self._attend_rows(encoder_outputs, hidden.squeeze(0), padding_mask)
 
-        all_point_outputs = torch.zeros(len(self.slots), batch_size, max_res_len, self.vocab_size, device=self._device)
-        all_gate_outputs = torch.zeros(len(self.slots), batch_size, self.nb_gate, device=self._device)
+            if wi == 0:
+                all_gate_outputs = self.w_gate(context_vec).view(num_slots, batch_size, self.nb_gate).transpose(0, 1)
 
-        domain_emb = self.slot_emb(self.domain_idx).to(self._device)
-        subslot_emb = self.slot_emb(self.subslot_idx).to(self._device)
-        slot_emb = domain_emb + subslot_emb
-        slot_emb = slot_emb.unsqueeze(1)
-        slot_emb = slot_emb.repeat(1, batch_size, 1)
-        decoder_input = self.dropout(slot_emb).view(-1, self.hidden_size)
-        hidden = encoder_hidden.transpose(0, 1).repeat(len(self.slots), 1, 1)
+            final_p_vocab = self._final_distribution(
+                dec_state.squeeze(1), hidden.squeeze(0), context_vec, decoder_input, prob, src_rows
+            )
+            all_point_outputs[:, :, wi, :] = final_p_vocab.view(num_slots, batch_size, self.vocab_size).transpose(0, 1)
 
-        hidden = hidden.view(-1, self.hidden_size).unsqueeze(0)
+            if use_teacher_forcing:
+                decoder_input = self.embedding(torch.flatten(targets[:, :, wi].transpose(0, 1)))
+            else:
+                decoder_input = self.embedding(torch.argmax(final_p_vocab, dim=1))
 
-        enc_len = input_lens.repeat(len(self.slots))
+        return all_point_outputs, all_gate_outputs.contiguous()
 
-        maxlen = encoder_outputs.size(1)
-        padding_mask_bool = ~(torch.arange(maxlen, device=self._device)[None, :] <= enc_len[:, None])
-        padding_mask = torch.zeros_like(padding_mask_bool, dtype=encoder_outputs.dtype, device=self._device)
-        padding_mask.masked_fill_(mask=padding_mask_bool, value=-np.inf)
+    @torch.no_grad()
+    def decode(self, encoder_hidden, encoder_outputs, input_lens, src_ids, max_res_len=None, eos_id=None):
+        """
+        Greedy decoding for inference, which returns token ids instead of
+        distributions over the vocabulary. Every slot stops once it emitted
+        EOS, later steps only run the GRU and the vocabulary projection for
+        the unfinished slots and decoding ends when all slots have finished.
+
+        Args:
+            encoder_hidden, encoder_outputs, input_lens, src_ids: tensors of
+                the input ports
+            max_res_len (int): maximal number of decoding steps, defaults to
+                max_res_len of the module
+            eos_id (int): id of EOS, defaults to vocab.eos_id
+
+        Returns:
+            token ids (batch_size, num_slots, max_res_len) padded with
+            vocab.pad_id after EOS, gate outputs (batch_size, num_slots,
+            nb_gate)
+        """
+        max_res_len = max_res_len or self.max_res_len
+        eos_id = self.vocab.eos_id if eos_id is None else eos_id
+        num_slots, batch_size = len(self.slots), encoder_hidden.shape[0]
+        num_rows = num_slots * batch_size
+
+        decoder_input, hidden, padding_mask, src_rows = self._init_decoding(
+            encoder_hidden, encoder_outputs, input_lens, src_ids
+        )
+        tokens = torch.full((num_rows, max_res_len), self.vocab.pad_id, dtype=torch.long, device=self._device)
+        active = torch.arange(num_rows, device=self._device)
+        query = hidden.new_zeros(num_rows, self.hidden_size)
+        gate_outputs = None
 
         for wi in range(max_res_len):
             dec_state, hidden = self.rnn(decoder_input.unsqueeze(1), hidden)
-
-            enc_out = encoder_outputs.repeat(len(self.slots), 1, 1)
-            context_vec, logits, prob = TRADEGenerator.attend(enc_out, hidden.squeeze(0), padding_mask)
+            # attention is batched per dialogue, finished rows attend with a
+            # zero query and are dropped afterwards
+            query.index_copy_(0, active, hidden.squeeze(0))
+            context_vec, prob = self._attend_rows(encoder_outputs, query, padding_mask)
 
             if wi == 0:
-                all_gate_outputs = torch.reshape(self.w_gate(context_vec), all_gate_outputs.size())
-
-            p_vocab = TRADEGenerator.attend_vocab(self.embedding.weight, hidden.squeeze(0))
-            p_gen_vec = torch.cat([dec_state.squeeze(1), context_vec, decoder_input], -1)
-            vocab_pointer_switches = self.sigmoid(self.w_ratio(p_gen_vec))
-            p_context_ptr = torch.zeros(p_vocab.size(), device=self._device)
-
-            p_context_ptr.scatter_add_(1, src_ids.repeat(len(self.slots), 1), prob)
-
-            final_p_vocab = (1 - vocab_pointer_switches).expand_as(
-                p_context_ptr
-            ) * p_context_ptr + vocab_pointer_switches.expand_as(p_context_ptr) * p_vocab
-            pred_word = torch.argmax(final_p_vocab, dim=1)
+                gate_outputs = self.w_gate(context_vec).view(num_slots, batch_size, self.nb_gate).transpose(0, 1)
+            else:
+                context_vec, prob = context_vec[active], prob[active]
 
-            all_point_outputs[:, :, wi, :] = torch.reshape(
-                final_p_vocab, (len(self.slots), batch_size, self.vocab_size)
+            final_p_vocab = self._final_distribution(
+                dec_state.squeeze(1), hidden.squeeze(0), context_vec, decoder_input, prob, src_rows[active]
             )
+            pred_word = torch.argmax(final_p_vocab, dim=1)
+            tokens[active, wi] = pred_word
 
-            if use_teacher_forcing:
-                decoder_input = self.embedding(torch.flatten(targets[:, :, wi]))
-            else:
-                decoder_input = self.embedding(pred_word)
+            unfinished = pred_word != eos_id
+            if not unfinished.any():
+                break
+            active, pred_word = active[unfinished], pred_word[unfinished]
+            hidden = hidden[:, unfinished]
+            query.zero_()
+            decoder_input = self.embedding(pred_word)
 
-            decoder_input = decoder_input.to(self._device)
-        all_point_outputs = all_point_outputs.transpose(0, 1).contiguous()
-        all_gate_outputs = all_gate_outputs.transpose(0, 1).contiguous()
-        return all_point_outputs, all_gate_outputs
+        tokens = tokens.view(num_slots, batch_size, max_res_len).transpose(0, 1).contiguous()
+        return tokens, gate_outputs.contiguous()
 
     @staticmethod
     def attend(seq, cond, padding_mask):
-        scores_ = cond.unsqueeze(1).expand_as(seq).mul(seq).sum(2)
+        """Attention of queries cond (batch, num_queries, hidden) over seq
+        (batch, time, hidden) with additive padding_mask (batch, 1, time)"""
+        scores_ = torch.bmm(cond, seq.transpose(1, 2))
         scores_ = scores_ + padding_mask
-        scores = F.softmax(scores_, dim=1)
-        context = scores.unsqueeze(2).expand_as(seq).mul(seq).sum(1)
+        scores = F.softmax(scores_, dim=-1)
+        context = torch.bmm(scores, seq)
         return context, scores_, scores
 
     @staticmethod
@@ -13,15 +13,17 @@
 # limitations under the License.
 # =============================================================================
 
-from nemo.collections.tts.data_layers import AudioDataLayer
-from nemo.collections.tts.parts.helpers import *
-from nemo.collections.tts.parts.helpers import __all__ as helpers__all__
-from nemo.collections.tts.tacotron2_modules import *
-from nemo.collections.tts.tacotron2_modules import __all__ as tacotron2__all__
-from nemo.collections.tts.waveglow_modules import *
-from nemo.collections.tts.waveglow_modules import __all__ as waveglow__all__
 from nemo.core import Backend
+from nemo.utils.lazy_import import lazy_attributes
 
-backend = Backend.PyTorch
+__getattr__, __dir__ = lazy_attributes(
+    __name__,
+    {
+        ".data_layers": ["AudioDataLayer"],
+        ".parts.helpers": "*",
+        ".tacotron2_modules": "*",
+        ".waveglow_modules": "*",
+    },
+)
 
-__all__ = ["AudioDataLayer"] + helpers__all__ + tacotron2__all__ + waveglow__all__
+backend = Backend.PyTorch
@@ -4,6 +4,7 @@ import torch
 import nemo
 from .parts.datasets import AudioOnlyDataset
 from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.backends.pytorch.samplers import make_sampler
 from nemo.core import DeviceType
 from nemo.core.neural_types import *
 
@@ -84,17 +85,15 @@ class AudioDataLayer(DataLayerNM):
             n_segments=n_segments,
         )
 
-        sampler = None
         if self._placement == DeviceType.AllGpu:
             nemo.logging.info('Parallelizing DATALAYER')
-            sampler = torch.utils.data.distributed.DistributedSampler(self._dataset)
+        sampler = make_sampler(self._dataset, shuffle, self._factory, distributed=self._placement == DeviceType.AllGpu)
 
         self._dataloader = torch.utils.data.DataLoader(
             dataset=self._dataset,
             batch_size=batch_size,
             collate_fn=self._dataset.AudioCollateFunc,
             drop_last=drop_last,
-            shuffle=shuffle if sampler is None else False,
             sampler=sampler,
             num_workers=num_workers,
         )
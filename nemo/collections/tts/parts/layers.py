@@ -52,6 +52,6 @@ class ConvNorm(torch.nn.Module):
 def get_mask_from_lengths(lengths, max_len=None):
     if not max_len:
         max_len = torch.max(lengths).item()
-    ids = torch.arange(0, max_len, out=torch.cuda.LongTensor(max_len))
+    ids = torch.arange(0, max_len, dtype=torch.long, device=lengths.device)
     mask = (ids < lengths.unsqueeze(1)).bool()
     return mask
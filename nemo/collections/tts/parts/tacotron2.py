@@ -6,6 +6,8 @@ from torch import nn
 from torch.autograd import Variable
 from torch.nn import functional as F
 
+from nemo import logging
+
 from .layers import ConvNorm, LinearNorm, get_mask_from_lengths
 
 
@@ -250,6 +252,7 @@ class Decoder(nn.Module):
         p_decoder_dropout,
         early_stopping,
         prenet_p_dropout=0.5,
+        infer_steps_per_token=8,
     ):
         super(Decoder, self).__init__()
         self.n_mel_channels = n_mel_channels
@@ -263,6 +266,7 @@ class Decoder(nn.Module):
         self.p_attention_dropout = p_attention_dropout
         self.p_decoder_dropout = p_decoder_dropout
         self.early_stopping = early_stopping
+        self.infer_steps_per_token = infer_steps_per_token
 
         self.prenet = Prenet(n_mel_channels * n_frames_per_step, [prenet_dim, prenet_dim], prenet_p_dropout,)
 
@@ -445,53 +449,117 @@ class Decoder(nn.Module):
 
     def infer(self, memory, memory_lengths):
         """ Decoder inference
+        Outputs are written into buffers preallocated for
+        infer_steps_per_token decoder steps per encoder output and grown if
+        needed. Finished utterances are removed from the decoded batch if
+        early_stopping is set, their outputs after the stop frame are zeros
+        (gate outputs are set to 1e3 as for padding in Tacotron2Loss).
         PARAMS
         ------
         memory: Encoder outputs
+        memory_lengths: Encoder output lengths for attention masking
         RETURNS
         -------
         mel_outputs: mel outputs from the decoder
         gate_outputs: gate outputs from the decoder
         alignments: sequence of attention weights from the decoder
+        mel_lengths: number of decoder steps before the stop frame
         """
+        batch_size, max_time = memory.size(0), memory.size(1)
+        device = memory.device
         decoder_input = self.get_go_frame(memory)
 
-        if memory.size(0) > 1:
+        if batch_size > 1:
             mask = ~get_mask_from_lengths(memory_lengths)
         else:
             mask = None
 
         self.initialize_decoder_states(memory, mask=mask)
 
-        mel_lengths = torch.zeros([memory.size(0)], dtype=torch.int32)
-        not_finished = torch.ones([memory.size(0)], dtype=torch.int32)
-        if torch.cuda.is_available():
-            mel_lengths = mel_lengths.cuda()
-            not_finished = not_finished.cuda()
-
-        mel_outputs, gate_outputs, alignments = [], [], []
+        capacity = min(self.max_decoder_steps, max(1, int(self.infer_steps_per_token * max_time)))
+        mel_outputs = memory.new_zeros(capacity, batch_size, self.n_mel_channels * self.n_frames_per_step)
+        gate_outputs = memory.new_full((capacity, batch_size), 1e3)
+        alignments = memory.new_zeros(capacity, batch_size, max_time)
+
+        mel_lengths = torch.zeros([batch_size], dtype=torch.int32, device=device)
+        # indices of utterances which are still being decoded
+        active = torch.arange(batch_size, device=device)
+        active_memory_lengths = memory_lengths.to(device) if memory_lengths is not None else None
+        not_finished = torch.ones([batch_size], dtype=torch.bool, device=device)
+        num_steps = 0
         while True:
             decoder_input = self.prenet(decoder_input, inference=True)
             mel_output, gate_output, alignment = self.decode(decoder_input)
 
-            dec = torch.le(torch.sigmoid(gate_output.data), self.gate_threshold).to(torch.int32).squeeze(1)
+            dec = torch.le(torch.sigmoid(gate_output.data), self.gate_threshold).squeeze(1)
+            not_finished = not_finished & dec
+            mel_lengths[active] += not_finished.to(torch.int32)
 
-            not_finished = not_finished * dec
-            mel_lengths += not_finished
-
-            if self.early_stopping and torch.sum(not_finished) == 0:
+            num_not_finished = int(not_finished.sum())
+            if self.early_stopping and num_not_finished == 0:
                 break
 
-            mel_outputs += [mel_output.squeeze(1)]
-            gate_outputs += [gate_output]
-            alignments += [alignment]
+            if num_steps == capacity:
+                capacity = min(self.max_decoder_steps, 2 * capacity)
+                mel_outputs = self._grow_buffer(mel_outputs, capacity, 0.0)
+                gate_outputs = self._grow_buffer(gate_outputs, capacity, 1e3)
+                alignments = self._grow_buffer(alignments, capacity, 0.0)
 
-            if len(mel_outputs) == self.max_decoder_steps:
+            mel_outputs[num_steps, active] = mel_output
+            gate_outputs[num_steps, active] = gate_output.squeeze(1)
+            alignments[num_steps, active, : alignment.size(1)] = alignment
+            num_steps += 1
+
+            if num_steps == self.max_decoder_steps:
                 logging.warning("Reached max decoder steps")
                 break
 
             decoder_input = mel_output
-
-        mel_outputs, gate_outputs, alignments = self.parse_decoder_outputs(mel_outputs, gate_outputs, alignments)
+            if self.early_stopping and num_not_finished < active.size(0):
+                keep = not_finished.nonzero().squeeze(1)
+                active, not_finished = active[keep], not_finished[keep]
+                decoder_input = decoder_input[keep]
+                max_active_time = None
+                if active_memory_lengths is not None:
+                    active_memory_lengths = active_memory_lengths[keep]
+                    max_active_time = int(active_memory_lengths.max())
+                self._select_decoder_states(keep, max_active_time)
+
+        mel_outputs = mel_outputs[:num_steps]
+        # (T_out, B, n_mel_channels) -> (B, T_out, n_mel_channels)
+        mel_outputs = mel_outputs.transpose(0, 1).contiguous()
+        # decouple frames per step
+        mel_outputs = mel_outputs.view(mel_outputs.size(0), -1, self.n_mel_channels)
+        # (B, T_out, n_mel_channels) -> (B, n_mel_channels, T_out)
+        mel_outputs = mel_outputs.transpose(1, 2)
+        gate_outputs = gate_outputs[:num_steps].transpose(0, 1).contiguous()
+        alignments = alignments[:num_steps].transpose(0, 1)
 
         return mel_outputs, gate_outputs, alignments, mel_lengths
+
+    @staticmethod
+    def _grow_buffer(buffer, capacity, value):
+        grown = buffer.new_full((capacity,) + buffer.shape[1:], value)
+        grown[: buffer.size(0)] = buffer
+        return grown
+
+    def _select_decoder_states(self, indices, max_time=None):
+        """ Keeps decoder states of the given utterances only
+        PARAMS
+        ------
+        indices: indices of the kept utterances in the current batch
+        max_time: if not None, memory and attention weights are truncated to
+            the longest kept encoder output
+        """
+        self.attention_hidden = self.attention_hidden[indices]
+        self.attention_cell = self.attention_cell[indices]
+        self.decoder_hidden = self.decoder_hidden[indices]
+        self.decoder_cell = self.decoder_cell[indices]
+        self.attention_context = self.attention_context[indices]
+
+        self.attention_weights = self.attention_weights[indices, :max_time]
+        self.attention_weights_cum = self.attention_weights_cum[indices, :max_time]
+        self.memory = self.memory[indices, :max_time]
+        self.processed_memory = self.processed_memory[indices, :max_time]
+        if self.mask is not None:
+            self.mask = self.mask[indices, :max_time]
@@ -237,6 +237,37 @@ class WaveGlow(torch.nn.Module):
         audio = audio.permute(0, 2, 1).contiguous().view(audio.size(0), -1).data
         return audio
 
+    def infer_chunks(self, spect, sigma=1.0, chunk_size=256, overlap=16):
+        """
+        Vocodes mel spectrogram in windows of chunk_size frames and yields
+        audio chunks as soon as they are ready. Consecutive windows overlap by
+        overlap frames and their audio is linearly crossfaded in the overlap.
+        Concatenation of all chunks has the same length as infer() output.
+        """
+        if chunk_size - overlap <= 0:
+            raise ValueError(f"chunk_size ({chunk_size}) should be larger than overlap ({overlap})")
+        if overlap < 0 or 2 * overlap > chunk_size:
+            raise ValueError(f"overlap ({overlap}) should be in [0, chunk_size / 2] for chunk_size {chunk_size}")
+
+        hop_length = self.upsample.stride[0]
+        num_frames = spect.size(2)
+        fade_length = overlap * hop_length
+        fade_in = torch.linspace(0.0, 1.0, fade_length + 2, device=spect.device, dtype=spect.dtype)[1:-1]
+
+        start, tail = 0, None
+        while True:
+            end = min(num_frames, start + chunk_size)
+            audio = self.infer(spect[:, :, start:end], sigma=sigma)
+            if tail is not None and fade_length > 0:
+                head = tail * (1.0 - fade_in) + audio[:, :fade_length] * fade_in
+                audio = torch.cat((head, audio[:, fade_length:]), dim=1)
+            if end == num_frames:
+                yield audio
+                return
+            yield audio[:, : audio.size(1) - fade_length]
+            tail = audio[:, audio.size(1) - fade_length :]
+            start = end - overlap
+
     @staticmethod
     def remove_weightnorm(model):
         waveglow = model
@@ -254,3 +285,150 @@ def remove(conv_list):
         old_conv = torch.nn.utils.remove_weight_norm(old_conv)
         new_conv_list.append(old_conv)
     return new_conv_list
+
+
+class STFTBiasDenoiser:
+    """
+    Subtracts the spectrum of WaveGlow bias (audio generated from zero mel
+    spectrogram) from the magnitude spectrum of the audio.
+
+    Audio can either be denoised at once with denoise() or chunk by chunk
+    with update() and flush(), which give the same result up to numerical
+    precision while only keeping n_fft samples of the audio in memory.
+
+    Args:
+        bias_audio: audio generated from zero mel spectrogram (1 x T)
+        strength: multiplier of the subtracted bias spectrum
+        n_fft: size of the FFT, window length is the same
+        hop_length: number of samples between STFT frames, n_fft // 4 if None
+    """
+
+    def __init__(self, bias_audio, strength=0.1, n_fft=1024, hop_length=None):
+        self.strength = strength
+        self.n_fft = n_fft
+        self.hop_length = hop_length or n_fft // 4
+        self.window = torch.hann_window(n_fft, device=bias_audio.device)
+        bias_spec = torch.stft(
+            bias_audio.float().view(1, -1),
+            n_fft,
+            self.hop_length,
+            window=self.window,
+            center=True,
+            pad_mode="reflect",
+            return_complex=True,
+        ).abs()
+        # B x F x T -> F
+        self.bias_spec = bias_spec[0, :, 0]
+        self.reset()
+
+    def _stft(self, audio):
+        return torch.stft(
+            audio,
+            self.n_fft,
+            self.hop_length,
+            window=self.window,
+            center=True,
+            pad_mode="reflect",
+            return_complex=True,
+        )
+
+    def _subtract_bias(self, spec, dim):
+        shape = [1] * spec.dim()
+        shape[dim] = -1
+        magnitude = spec.abs()
+        denoised = torch.clamp(magnitude - self.bias_spec.view(shape) * self.strength, min=0.0)
+        return spec * (denoised / torch.clamp(magnitude, min=1e-8))
+
+    def denoise(self, audio):
+        """Denoises the whole audio (B x T) at once."""
+        spec = self._subtract_bias(self._stft(audio.float()), dim=1)
+        return torch.istft(
+            spec, self.n_fft, self.hop_length, window=self.window, center=True, length=audio.size(-1)
+        ).to(audio.dtype)
+
+    def reset(self):
+        """Starts denoising of new audio with update()."""
+        # beginning of the audio until there is enough samples for padding
+        self._head = None
+        # reflection padded audio which is not fully processed yet
+        self._input = None
+        # overlap-added frames and window normalization which are not final yet
+        self._output = None
+        self._window_sum = None
+        self._num_samples = 0
+        self._num_emitted = 0
+
+    def update(self, audio):
+        """Adds next chunk of the audio (B x T) and returns its denoised part
+        that does not depend on the following audio anymore."""
+        audio = audio.float()
+        self._num_samples += audio.size(-1)
+        if self._input is not None:
+            self._input = torch.cat((self._input, audio), dim=-1)
+            return self._process()
+
+        # reflection padding at the beginning of the audio as in torch.stft
+        pad = self.n_fft // 2
+        self._head = audio if self._head is None else torch.cat((self._head, audio), dim=-1)
+        if self._head.size(-1) <= pad:
+            return audio.new_zeros(audio.size(0), 0)
+        left_pad = self._head[:, 1 : pad + 1].flip(-1)
+        self._input = torch.cat((left_pad, self._head), dim=-1)
+        self._output = self._input.new_zeros(self._input.size(0), 0)
+        self._window_sum = self._input.new_zeros(0)
+        self._head = None
+        return self._process()
+
+    def flush(self):
+        """Returns the rest of the denoised audio and resets the denoiser."""
+        if self._input is None:
+            # audio is too short to be processed in chunks
+            audio = self._head
+            self.reset()
+            if audio is None:
+                # no audio was added
+                return self.window.new_zeros(1, 0)
+            return self.denoise(audio)
+
+        pad = self.n_fft // 2
+        right_pad = self._input[:, -pad - 1 : -1].flip(-1)
+        self._input = torch.cat((self._input, right_pad), dim=-1)
+        audio = self._process()
+
+        tail = self._output / torch.clamp(self._window_sum, min=1e-11)
+        skip = max(0, pad - self._num_emitted)
+        remaining = pad + self._num_samples - max(pad, self._num_emitted)
+        tail = tail[:, skip : skip + remaining]
+        self.reset()
+        return torch.cat((audio, tail), dim=-1)
+
+    def _process(self):
+        num_frames = max(0, (self._input.size(-1) - self.n_fft) // self.hop_length + 1)
+        batch_size = self._input.size(0)
+        if num_frames == 0:
+            return self._input.new_zeros(batch_size, 0)
+
+        frames = self._input.unfold(-1, self.n_fft, self.hop_length)[:, :num_frames]
+        spec = self._subtract_bias(torch.fft.rfft(frames * self.window, dim=-1), dim=2)
+        frames = torch.fft.irfft(spec, n=self.n_fft, dim=-1) * self.window
+
+        # overlap-add of the new frames to the not yet final output
+        length = (num_frames - 1) * self.hop_length + self.n_fft
+        fold_params = dict(output_size=(1, length), kernel_size=(1, self.n_fft), stride=(1, self.hop_length))
+        output = F.fold(frames.transpose(1, 2), **fold_params).view(batch_size, length)
+        window_sum = self.window.pow(2).view(1, -1, 1).expand(1, -1, num_frames)
+        window_sum = F.fold(window_sum, **fold_params).view(length)
+        output[:, : self._output.size(-1)] += self._output
+        window_sum[: self._window_sum.size(-1)] += self._window_sum
+
+        # samples before the next frame do not get any more contributions
+        ready = num_frames * self.hop_length
+        audio = output[:, :ready] / torch.clamp(window_sum[:ready], min=1e-11)
+        self._output, self._window_sum = output[:, ready:], window_sum[ready:]
+        self._input = self._input[:, ready:]
+
+        # drop reflection padding at the beginning of the audio
+        skip = max(0, self.n_fft // 2 - self._num_emitted)
+        audio = audio[:, skip:]
+        self._num_emitted += ready
+        return audio
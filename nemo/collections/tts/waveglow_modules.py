@@ -5,7 +5,7 @@ import torch
 
 from nemo import logging
 from nemo.backends.pytorch.nm import LossNM, TrainableNM
-from nemo.collections.tts.parts.waveglow import WaveGlow
+from nemo.collections.tts.parts.waveglow import STFTBiasDenoiser, WaveGlow
 from nemo.core.neural_types import *
 
 __all__ = ["WaveGlowNM", "WaveGlowInferNM", "WaveGlowLoss"]
@@ -214,6 +214,7 @@ class WaveGlowInferNM(WaveGlowNM):
         with torch.no_grad():
             mel_input = torch.zeros((1, 80, 88), device=self._device)
             bias_audio = self.waveglow.infer(mel_input, sigma=0.0).float()
+            self.bias_audio = bias_audio
             bias_audio = bias_audio.squeeze().cpu().numpy()
             bias_spec, _ = librosa.core.magphase(librosa.core.stft(bias_audio, n_fft=1024))
             self.bias_spec = np.expand_dims(bias_spec[:, 0], axis=-1)
@@ -225,13 +226,56 @@ class WaveGlowInferNM(WaveGlowNM):
         audio_denoised = librosa.core.istft(audio_spec_denoised * audio_angles)
         return audio_denoised, audio_spec_denoised
 
-    def forward(self, mel_spectrogram):
+    def _prepare_for_inference(self):
         if not self._removed_weight_norm:
             logging.info("remove WN")
             self.waveglow = self.waveglow.remove_weightnorm(self.waveglow)
             self._removed_weight_norm = True
         if self.training:
             raise ValueError("You are using the WaveGlow Infer Neural Module " "in training mode.")
+
+    def stream(self, mel_spectrogram, chunk_size=256, overlap=16, denoiser_strength=0.0):
+        """
+        Generator which vocodes mel spectrogram in chunks of chunk_size frames
+        overlapping by overlap frames and yields audio as soon as it is ready,
+        so that time to the first audio and memory usage do not depend on the
+        length of the utterance.
+
+        Args:
+            mel_spectrogram (torch.Tensor): batch x n_mel_channels x frames
+            chunk_size (int): number of mel frames vocoded at once
+            overlap (int): number of mel frames the audio of consecutive
+                chunks is crossfaded over
+            denoiser_strength (float): if positive, the audio is denoised
+                on the fly, setup_denoiser() has to be called first
+        Yields:
+            audio (torch.Tensor): batch x time chunks of the audio
+        """
+        self._prepare_for_inference()
+
+        denoiser = None
+        if denoiser_strength > 0:
+            if getattr(self, "bias_audio", None) is None:
+                raise ValueError("Denoiser is not set up, call setup_denoiser() first.")
+            denoiser = STFTBiasDenoiser(self.bias_audio, strength=denoiser_strength)
+
+        chunks = self.waveglow.infer_chunks(mel_spectrogram, sigma=self._sigma, chunk_size=chunk_size, overlap=overlap)
+        while True:
+            # gradients are only disabled around the computation, so that
+            # the caller does not run with them disabled between chunks
+            with torch.no_grad():
+                audio = next(chunks, None)
+                if audio is None:
+                    break
+                if denoiser is not None:
+                    audio = denoiser.update(audio)
+            if audio.size(-1) > 0:
+                yield audio
+        if denoiser is not None:
+            yield denoiser.flush()
+
+    def forward(self, mel_spectrogram):
+        self._prepare_for_inference()
         with torch.no_grad():
             audio = self.waveglow.infer(mel_spectrogram, sigma=self._sigma)
         return audio
@@ -6,9 +6,12 @@ import time
 import warnings
 from abc import ABC, abstractmethod
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
 
 import nemo
-from ..utils import get_checkpoint_from_dir
+from ..utils import atomic_save, get_checkpoint_from_dir, state_to_cpu
 
 
 class ActionCallback(ABC):
@@ -27,6 +30,13 @@ class ActionCallback(ABC):
     def epoch_num(self):
         return self.action.epoch_num
 
+    @property
+    def skipped_steps(self):
+        """Number of optimizer steps skipped because of NaN or Inf losses.
+        Losses are read back from the device asynchronously, so this can lag
+        behind by a few steps."""
+        return getattr(self.action, "skipped_steps", 0)
+
     @property
     def registered_tensors(self):
         return self._registered_tensors
@@ -215,10 +225,30 @@ class CheckpointCallback(ActionCallback):
     """
     For callback documentation: please see
     https://nvidia.github.io/NeMo/tutorials/callbacks.html
+
+    Checkpoints are always written to a temporary file first and then renamed,
+    so an interrupted save never leaves a truncated checkpoint behind.
+
+    Args:
+        async_save (bool): if True, module and trainer states are only copied
+            to cpu memory on the training thread, while serialization and
+            removal of old checkpoints happen on a background thread. A new
+            save waits for the previous one to finish.
+        shard_optimizer_state (bool): if True, every rank saves its own
+            optimizer states to optimizer-rank<rank>-STEP-<step>.pt instead of
+            rank 0 saving them to the trainer checkpoint.
     """
 
     def __init__(
-        self, folder, load_from_folder=None, step_freq=-1, epoch_freq=-1, checkpoints_to_keep=4, force_load=False,
+        self,
+        folder,
+        load_from_folder=None,
+        step_freq=-1,
+        epoch_freq=-1,
+        checkpoints_to_keep=4,
+        force_load=False,
+        async_save=False,
+        shard_optimizer_state=False,
     ):
         super().__init__()
         if step_freq == -1 and epoch_freq == -1:
@@ -236,43 +266,98 @@ class CheckpointCallback(ActionCallback):
         self._saved_ckpts = []
         # If True, run will fail if we cannot load module weights
         self._force_load = force_load
+        self._async_save = async_save
+        self._shard_optimizer_state = shard_optimizer_state
+        self._executor = None
+        self._pending_save = None
+
+    @property
+    def _rank(self):
+        return self.global_rank if self.global_rank is not None else 0
+
+    @staticmethod
+    def _module_state(module):
+        """Returns cpu copy of module's weights or None if the module can
+        only be saved with save_to()."""
+        pt_module = getattr(module, "_pt_module", module)
+        if not hasattr(pt_module, "state_dict"):
+            return None
+        return state_to_cpu(pt_module.state_dict())
 
     def __save_to(self, path):
-        if self.global_rank is not None and self.global_rank != 0:
+        if self._rank != 0 and not self._shard_optimizer_state:
             return
         if not os.path.isdir(path):
             nemo.logging.info(f"Creating {path} folder")
             os.makedirs(path, exist_ok=True)
-        unique_mod_names = set()
-        for module in self.action.modules:
-            if module.num_weights > 0:
-                if str(module) in unique_mod_names:
-                    raise NotImplementedError(
-                        "There were two instances of the same module. Please "
-                        "overwrite __str__() of one of the modules."
-                    )
-                unique_mod_names.add(str(module))
-                if self._step_freq > -1:
-                    filename = f"{module}-STEP-{self.step}.pt"
-                else:
-                    filename = f"{module}-EPOCH-{self.epoch_num}.pt"
-                module.save_to(os.path.join(path, filename))
-
         if self._step_freq > -1:
-            filename = f"trainer-STEP-{self.step}.pt"
-            self.action.save_state_to(f'{path}/{filename}')
-            self._saved_ckpts.append(f'-{self.step}.pt')
+            suffix = f"-STEP-{self.step}.pt"
         else:
-            filename = f"trainer-EPOCH-{self.epoch_num}.pt"
-            self.action.save_state_to(f'{path}/{filename}')
-            self._saved_ckpts.append(f'-{self.epoch_num}.pt')
+            suffix = f"-EPOCH-{self.epoch_num}.pt"
 
+        # (state, function saving to the given path if state is None, file)
+        to_save = []
+        if self._rank == 0:
+            unique_mod_names = set()
+            for module in self.action.modules:
+                if module.num_weights > 0:
+                    if str(module) in unique_mod_names:
+                        raise NotImplementedError(
+                            "There were two instances of the same module. Please "
+                            "overwrite __str__() of one of the modules."
+                        )
+                    unique_mod_names.add(str(module))
+                    state = self._module_state(module) if self._async_save else None
+                    to_save.append((state, module.save_to, os.path.join(path, f"{module}{suffix}")))
+
+            if self._shard_optimizer_state or self._async_save:
+                state = self.action.get_state(optimizer_state=not self._shard_optimizer_state)
+                to_save.append((state_to_cpu(state), None, os.path.join(path, f"trainer{suffix}")))
+            else:
+                to_save.append((None, self.action.save_state_to, os.path.join(path, f"trainer{suffix}")))
+
+        if self._shard_optimizer_state:
+            state = {"optimizer_state": self.action.get_state()["optimizer_state"]}
+            to_save.append((state_to_cpu(state), None, os.path.join(path, f"optimizer-rank{self._rank}{suffix}")))
+
+        # every rank removes the files it wrote itself, so that ranks do not
+        # race on removing each other's optimizer shards
+        self._saved_ckpts.append([filename for _, _, filename in to_save])
+        to_remove = []
         if len(self._saved_ckpts) > self._ckpt2keep:
-            for end in self._saved_ckpts[: -self._ckpt2keep]:
-                for file in glob.glob(f'{path}/*{end}'):
-                    os.remove(file)
+            to_remove = [filename for files in self._saved_ckpts[: -self._ckpt2keep] for filename in files]
             self._saved_ckpts = self._saved_ckpts[-self._ckpt2keep :]
-        nemo.logging.info(f'Saved checkpoint: {path}/{filename}')
+
+        if self._async_save:
+            self.wait_for_save()
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="CheckpointWriter")
+            self._pending_save = self._executor.submit(self._write, to_save, to_remove)
+        else:
+            self._write(to_save, to_remove)
+
+    @staticmethod
+    def _write(to_save, to_remove):
+        for state, save_fn, filename in to_save:
+            if state is not None:
+                atomic_save(state, filename)
+            else:
+                tmp_filename = os.path.join(os.path.dirname(filename), f".{os.path.basename(filename)}.tmp")
+                save_fn(tmp_filename)
+                # save_fn may not write anything, e.g. if there is nothing to save
+                if os.path.exists(tmp_filename):
+                    os.replace(tmp_filename, filename)
+        for filename in to_remove:
+            if os.path.exists(filename):
+                os.remove(filename)
+        nemo.logging.info(f'Saved checkpoint: {to_save[-1][2]}')
+
+    def wait_for_save(self):
+        """Blocks until the checkpoint which is being saved in background is
+        written. Re-raises errors of the background save."""
+        if self._pending_save is not None:
+            pending_save, self._pending_save = self._pending_save, None
+            pending_save.result()
 
     def __restore_from(self, path):
         if not os.path.isdir(path):
@@ -312,6 +397,14 @@ class CheckpointCallback(ActionCallback):
                 nemo.logging.warning("Trainer state wasn't restored")
                 return
 
+            if self._shard_optimizer_state:
+                directory, filename = os.path.split(trainer_checkpoints[0])
+                shard = os.path.join(directory, filename.replace("trainer", f"optimizer-rank{self._rank}", 1))
+                if os.path.isfile(shard):
+                    self.action.set_state(torch.load(shard, map_location="cpu"))
+                else:
+                    nemo.logging.warning(f"Optimizer state shard {shard} not found, optimizer state wasn't restored")
+
     def on_action_start(self):
         num_parameters = 0
         unique_mod_names = set()
@@ -338,6 +431,10 @@ class CheckpointCallback(ActionCallback):
     def on_action_end(self):
         if self._step_freq > 0 or self._epoch_freq > 0:
             self.__save_to(path=self._folder)
+        self.wait_for_save()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
 
     def on_epoch_start(self):
         self._last_epoch_start = time.time()
@@ -347,8 +444,8 @@ class CheckpointCallback(ActionCallback):
             if self.global_rank is None or self.global_rank == 0:
                 run_time = time.time() - self._last_epoch_start
                 nemo.logging.info(f'Finished epoch {self.epoch_num} in {run_time}')
-                if (self.epoch_num + 1) % self._epoch_freq == 0:
-                    self.__save_to(path=self._folder)
+            if (self.epoch_num + 1) % self._epoch_freq == 0:
+                self.__save_to(path=self._folder)
 
 
 class EvaluatorCallback(ActionCallback):
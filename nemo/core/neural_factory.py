@@ -100,6 +100,7 @@ class Actions(ABC):
         lr_policy=None,
         batches_per_step=None,
         stop_on_nan_loss=False,
+        rollback_on_nan_loss=False,
     ):
         """This action executes training and (optionally) evaluation.
 
@@ -117,8 +118,15 @@ class Actions(ABC):
                 batch_size
             stop_on_nan_loss: (default: False) If set to True, the training
                 will stop if loss=nan. If set to False, the training will
-                continue, but the gradients will be zeroed before next
-                mini-batch.
+                continue, but the gradients of the step will be zeroed before
+                the optimizer step, or the step is skipped by optimizers which
+                support AMP's inf check (e.g. fused torch optimizers). Losses are checked on the device and read
+                back asynchronously, so training may stop a few steps later.
+            rollback_on_nan_loss: (default: False) If set to True, steps
+                with loss=nan are undone from copies of the parameters and the
+                optimizer state taken before every step, so that they do not
+                advance momentum or weight decay either. This doubles the
+                memory of parameters and optimizer state.
 
         Returns:
             None
@@ -280,6 +288,7 @@ class NeuralModuleFactory(object):
         if isinstance(optimization_level, str):
             optimization_level = _str_to_opt_level(optimization_level)
         self._optim_level = optimization_level
+        self._random_seed = random_seed
 
         if placement is None:
             if local_rank is not None:
@@ -321,34 +330,38 @@ class NeuralModuleFactory(object):
                 random.seed(random_seed)
 
             if self._local_rank is not None:
-                torch.distributed.init_process_group(backend="nccl", init_method="env://")
-
-                cuda_set = True
-                # Try to set cuda device. This should fail if self._local_rank
-                # is greater than the number of available GPUs
-                try:
-                    torch.cuda.set_device(self._local_rank)
-                except RuntimeError:
-                    # Note in this case, all tensors are now sent to GPU 0
-                    # who could crash because of OOM. Thus init_process_group()
-                    # must be done before any cuda tensors are allocated
-                    cuda_set = False
-                cuda_set_t = torch.cuda.IntTensor([cuda_set])
-
-                # Do an all_reduce to ensure all workers obtained a GPU
-                # For the strangest reason, BAND doesn't work so I am resorting
-                # to MIN.
-                torch.distributed.all_reduce(cuda_set_t, op=torch.distributed.ReduceOp.MIN)
-                if cuda_set_t.item() == 0:
-                    raise RuntimeError(
-                        "There was an error initializing distributed training."
-                        " Perhaps you specified more gpus than you have "
-                        "available"
-                    )
+                if self._placement == DeviceType.CPU:
+                    # gloo works without GPUs, e.g. to test distributed training on CPU
+                    torch.distributed.init_process_group(backend="gloo", init_method="env://")
+                else:
+                    torch.distributed.init_process_group(backend="nccl", init_method="env://")
+
+                    cuda_set = True
+                    # Try to set cuda device. This should fail if self._local_rank
+                    # is greater than the number of available GPUs
+                    try:
+                        torch.cuda.set_device(self._local_rank)
+                    except RuntimeError:
+                        # Note in this case, all tensors are now sent to GPU 0
+                        # who could crash because of OOM. Thus init_process_group()
+                        # must be done before any cuda tensors are allocated
+                        cuda_set = False
+                    cuda_set_t = torch.cuda.IntTensor([cuda_set])
+
+                    # Do an all_reduce to ensure all workers obtained a GPU
+                    # For the strangest reason, BAND doesn't work so I am resorting
+                    # to MIN.
+                    torch.distributed.all_reduce(cuda_set_t, op=torch.distributed.ReduceOp.MIN)
+                    if cuda_set_t.item() == 0:
+                        raise RuntimeError(
+                            "There was an error initializing distributed training."
+                            " Perhaps you specified more gpus than you have "
+                            "available"
+                        )
 
-                del cuda_set_t
-                torch.cuda.empty_cache()
-                # Remove test tensor from memory
+                    del cuda_set_t
+                    torch.cuda.empty_cache()
+                    # Remove test tensor from memory
 
                 self._world_size = torch.distributed.get_world_size()
                 self._global_rank = torch.distributed.get_rank()
@@ -357,11 +370,12 @@ class NeuralModuleFactory(object):
                     """Wrapper function to broadcast string values across all
                     workers
                     """
-                    # Create byte cuda torch tensor
+                    # Create byte torch tensor on the device of the backend
+                    device = "cpu" if self._placement == DeviceType.CPU else "cuda"
                     if string is not None:
-                        string_tensor = torch.tensor(list(string.encode()), dtype=torch.uint8).cuda()
+                        string_tensor = torch.tensor(list(string.encode()), dtype=torch.uint8, device=device)
                     else:
-                        string_tensor = torch.tensor([0] * str_len, dtype=torch.uint8).cuda()
+                        string_tensor = torch.tensor([0] * str_len, dtype=torch.uint8, device=device)
                     # Run broadcast
                     torch.distributed.broadcast(string_tensor, src)
                     # turn byte tensor back to string
@@ -549,11 +563,16 @@ class NeuralModuleFactory(object):
         lr_policy=None,
         batches_per_step=None,
         stop_on_nan_loss=False,
+        rollback_on_nan_loss=False,
         synced_batchnorm=False,
         synced_batchnorm_groupsize=0,
         gradient_predivide=False,
         amp_max_loss_scale=2.0 ** 24,
         reset=False,
+        profiler=None,
+        ddp="apex",
+        ddp_bucket_cap_mb=None,
+        ddp_fp16_compression=False,
     ):
         if reset:
             self.reset_trainer()
@@ -565,10 +584,15 @@ class NeuralModuleFactory(object):
             lr_policy=lr_policy,
             batches_per_step=batches_per_step,
             stop_on_nan_loss=stop_on_nan_loss,
+            rollback_on_nan_loss=rollback_on_nan_loss,
             synced_batchnorm=synced_batchnorm,
             synced_batchnorm_groupsize=synced_batchnorm_groupsize,
             gradient_predivide=gradient_predivide,
             amp_max_loss_scale=amp_max_loss_scale,
+            profiler=profiler,
+            ddp=ddp,
+            ddp_bucket_cap_mb=ddp_bucket_cap_mb,
+            ddp_fp16_compression=ddp_fp16_compression,
         )
 
     def eval(self, callbacks: List[EvaluatorCallback]):
@@ -668,6 +692,38 @@ class NeuralModuleFactory(object):
             modules_to_restore=modules_to_restore,
         )
 
+    def compile_inference(self, inputs, outputs, device=None):
+        """Prepares a callable which computes `outputs` from values of
+        `inputs` directly, without data layers.
+
+        The DAG leading from `inputs` to `outputs` is sorted only once, so
+        calling the result adds just a few microseconds of overhead on top of
+        the modules' forward passes. Modules are run in eval mode and without
+        gradients. This is meant for serving and interactive use, e.g.:
+
+        .. code-block:: python
+
+            audio, audio_len, _, _ = data_layer()
+            processed, processed_len = preprocessor(input_signal=audio, length=audio_len)
+            encoded, encoded_len = encoder(audio_signal=processed, length=processed_len)
+            log_probs = decoder(encoder_output=encoded)
+            run = nf.compile_inference(inputs=[audio, audio_len], outputs=[log_probs, encoded_len])
+            log_probs, encoded_len = run(signal, lengths)
+
+        Args:
+            inputs: dict of name -> NmTensor, or list of NmTensors named by
+                their port names. Values of these tensors are passed to the
+                callable by name or positionally in the same order.
+            outputs: NmTensor or list of NmTensors to compute
+            device (torch.device): device where inputs are moved to. Defaults
+                to the device of the modules' parameters.
+
+        Returns:
+            Callable which takes torch tensors or numpy arrays and returns a
+            torch tensor or list of torch tensors, matching `outputs`.
+        """
+        return self._trainer.compile_inference(inputs=inputs, outputs=outputs, device=device)
+
     def clear_cache(self):
         """Helper function to clean inference cache."""
         self._trainer.clear_cache()
@@ -748,6 +804,10 @@ class NeuralModuleFactory(object):
     def optim_level(self):
         return self._optim_level
 
+    @property
+    def random_seed(self):
+        return self._random_seed
+
     @property
     @deprecated(version=0.11, explanation="Please use ``nemo.logging instead``")
     def logger(self):
@@ -1,4 +1,5 @@
 # Copyright (c) 2019 NVIDIA Corporation
+import copy
 import functools
 import glob
 import os
@@ -61,6 +62,39 @@ def get_checkpoint_from_dir(module_names, cpkt_dir, ckpt_pattern=''):
     return ckpts
 
 
+def state_to_cpu(state):
+    """Returns a copy of (possibly nested) state dict with all tensors copied
+    to cpu memory, so that it can be serialized while training goes on."""
+    if isinstance(state, torch.Tensor):
+        return state.detach().to("cpu", copy=True)
+    if isinstance(state, dict):
+        # a shallow copy keeps the type and attributes of the container, like
+        # _metadata of the OrderedDict returned by Module.state_dict()
+        state = copy.copy(state)
+        for k, v in state.items():
+            state[k] = state_to_cpu(v)
+        return state
+    if isinstance(state, tuple) and hasattr(state, '_fields'):
+        return type(state)(*(state_to_cpu(v) for v in state))
+    if isinstance(state, (list, tuple)):
+        return type(state)(state_to_cpu(v) for v in state)
+    return state
+
+
+def atomic_save(obj, path):
+    """Saves obj with torch.save() to a hidden temporary file next to path
+    and renames it to path, so that path never holds a partially written
+    checkpoint."""
+    directory, filename = os.path.split(path)
+    tmp_path = os.path.join(directory, f".{filename}.tmp")
+    try:
+        torch.save(obj, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
 def _call_args_to_string(call_args):
     call_dict = {inport: value.name for inport, value in call_args.items()}
     result = "(force_pt=True,"
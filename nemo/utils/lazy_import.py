@@ -0,0 +1,145 @@
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import ast
+import importlib
+import importlib.util
+import sys
+
+__all__ = ['lazy_attributes']
+
+
+def _literal_all(module_name):
+    """Returns __all__ of a (non-package) module if it is assigned a literal
+    list of strings, without importing the module. Returns None otherwise."""
+    spec = importlib.util.find_spec(module_name)
+    if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+        return None
+    if spec.submodule_search_locations is not None:
+        # packages may compute __all__ lazily themselves
+        return None
+    with open(spec.origin) as f:
+        tree = ast.parse(f.read(), spec.origin)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__all__" for t in node.targets):
+            try:
+                return list(ast.literal_eval(node.value))
+            except ValueError:
+                return None
+    return None
+
+
+def _star_names(module_name):
+    """Names which `from module_name import *` would bind."""
+    names = _literal_all(module_name)
+    if names is None:
+        module = importlib.import_module(module_name)
+        names = getattr(module, "__all__", None)
+        if names is None:
+            names = [name for name in vars(module) if not name.startswith("_")]
+    return list(names)
+
+
+def lazy_attributes(package_name, exports=None, submodules=()):
+    """
+    Creates module level ``__getattr__`` and ``__dir__`` (PEP 562) for a
+    package which imports its submodules only when one of their attributes is
+    accessed for the first time. This keeps heavy optional dependencies of
+    collections (transformers, librosa, ...) out of processes which never use
+    them.
+
+    Usage in a package's __init__.py::
+
+        __getattr__, __dir__ = lazy_attributes(
+            __name__, {".jasper": ["JasperEncoder"], ".audio_preprocessing": "*"}
+        )
+
+    is the lazy equivalent of::
+
+        from .jasper import JasperEncoder
+        from .audio_preprocessing import *
+
+    Names of "*" exports are read from the literal ``__all__`` of the
+    submodule without importing it, so modules exported this way should
+    define one. Accessing any other attribute imports the submodule of the
+    same name, if it exists. Resolved attributes are cached in the package.
+
+    Args:
+        package_name (str): __name__ of the package
+        exports (dict): submodule (relative to the package or absolute) ->
+            list of exported names or "*" for the names a star import of the
+            submodule would bind. Explicitly listed names take precedence
+            over star exports.
+        submodules (list): names of submodules which are exported too, i.e.
+            listed in the package's ``__all__``. Star imports of the package
+            import them, as eager imports of the submodules did.
+
+    Returns:
+        tuple of __getattr__ and __dir__ functions for the package
+    """
+    exports = exports or {}
+    explicit = {}
+    stars = []
+    for submodule, names in exports.items():
+        module_name = importlib.util.resolve_name(submodule, package_name)
+        if names == "*":
+            stars.append(module_name)
+        else:
+            for name in names:
+                explicit[name] = module_name
+    star_index = None
+
+    def _star_index():
+        nonlocal star_index
+        if star_index is None:
+            index = {}
+            for module_name in stars:
+                for name in _star_names(module_name):
+                    index[name] = module_name
+            star_index = index
+        return star_index
+
+    def _all():
+        names = list(explicit) + [name for name in _star_index() if name not in explicit]
+        return names + [name for name in submodules if name not in names]
+
+    def __getattr__(name):
+        if name == "__all__" and (exports or submodules):
+            value = _all()
+        elif name.startswith("__"):
+            raise AttributeError(f"module {package_name!r} has no attribute {name!r}")
+        else:
+            module_name = explicit.get(name)
+            if module_name is None and stars and name not in submodules:
+                module_name = _star_index().get(name)
+            if module_name is not None:
+                value = getattr(importlib.import_module(module_name), name)
+            else:
+                try:
+                    value = importlib.import_module(f"{package_name}.{name}")
+                except ModuleNotFoundError as e:
+                    if e.name != f"{package_name}.{name}":
+                        raise
+                    raise AttributeError(f"module {package_name!r} has no attribute {name!r}") from None
+        setattr(sys.modules[package_name], name, value)
+        return value
+
+    def __dir__():
+        names = set(vars(sys.modules[package_name])) | set(explicit) | set(submodules)
+        if stars:
+            names |= set(_star_index())
+        return sorted(names)
+
+    return __getattr__, __dir__
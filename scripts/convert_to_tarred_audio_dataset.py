@@ -0,0 +1,64 @@
+# Copyright (c) 2020 NVIDIA Corporation
+#
+# USAGE: python convert_to_tarred_audio_dataset.py
+#        --manifest_path=<manifest of the dataset> --target_dir=<output dir>
+#        --num_shards=<number of .tar shards>
+# Packs the audio and transcripts of a manifest into .tar shards
+# audio_0.tar ... audio_<num_shards - 1>.tar of target_dir, which are read by
+# nemo.collections.asr.TarredAudioToTextDataLayer with
+# shard_paths="<target_dir>/audio_*.tar".
+# The number of shards should be a multiple of the number of data loader
+# workers times the number of GPUs used for training. Utterances are shuffled
+# before packing with --shuffle, otherwise shards hold consecutive utterances
+# of the manifest. Shards are written by --num_workers processes (all CPUs by
+# default), existing shards are kept.
+import argparse
+import logging
+import os
+import random
+
+from nemo.collections.asr.parts.data_prep import parallel_map, write_tarred_shard
+from nemo.collections.asr.parts.manifest import item_iter
+
+parser = argparse.ArgumentParser(description='Convert a manifest to tarred audio shards')
+parser.add_argument("--manifest_path", required=True, type=str, help="Comma-separated manifest paths.")
+parser.add_argument("--target_dir", required=True, type=str)
+parser.add_argument("--num_shards", default=64, type=int)
+parser.add_argument("--shuffle", action='store_true', help="Shuffle utterances before packing.")
+parser.add_argument("--shuffle_seed", default=0, type=int)
+parser.add_argument("--min_duration", default=None, type=float)
+parser.add_argument("--max_duration", default=None, type=float)
+parser.add_argument("--num_workers", default=None, type=int, help="Number of packing processes.")
+args = parser.parse_args()
+
+
+def __write_shard(shard_path, items, first_key):
+    if os.path.exists(shard_path):
+        return len(items)
+    return write_tarred_shard(shard_path, items, first_key)
+
+
+def main():
+    items = [
+        item
+        for item in item_iter(args.manifest_path.split(','))
+        if (args.min_duration is None or item['duration'] >= args.min_duration)
+        and (args.max_duration is None or item['duration'] <= args.max_duration)
+    ]
+    if args.shuffle:
+        random.Random(args.shuffle_seed).shuffle(items)
+    num_shards = min(args.num_shards, len(items))
+
+    os.makedirs(args.target_dir, exist_ok=True)
+    jobs, start = [], 0
+    for i in range(num_shards):
+        end = len(items) * (i + 1) // num_shards
+        jobs.append((os.path.join(args.target_dir, f'audio_{i}.tar'), items[start:end], start))
+        start = end
+
+    num_items = sum(parallel_map(__write_shard, jobs, args.num_workers, chunksize=1, desc="Shards"))
+    logging.info(f"Packed {num_items} utterances into {num_shards} shards in {args.target_dir}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,21 +6,21 @@
 # test_other, train_clean_100, train_clean_360, train_other_500 or ALL
 # You can also put more than one data_set comma-separated:
 # --data_set=dev_clean,train_clean_100
+# Audio is converted by --num_workers processes (all CPUs by default). An
+# interrupted conversion continues where it stopped when run again.
 import argparse
 import fnmatch
-import json
 import logging
 import os
-import subprocess
 import tarfile
 import urllib.request
 
-from sox import Transformer
-from tqdm import tqdm
+from nemo.collections.asr.parts.data_prep import convert_to_wav, write_manifest
 
 parser = argparse.ArgumentParser(description='LibriSpeech Data download')
 parser.add_argument("--data_root", required=True, default=None, type=str)
 parser.add_argument("--data_sets", default="dev_clean", type=str)
+parser.add_argument("--num_workers", default=None, type=int, help="Number of conversion processes.")
 args = parser.parse_args()
 
 URLS = {
@@ -65,13 +65,22 @@ def __extract_file(filepath: str, data_dir: str):
         logging.info('Not extracting. Maybe already there?')
 
 
-def __process_data(data_folder: str, dst_folder: str, manifest_file: str):
+def __process_utterance(flac_file: str, wav_file: str, transcript_text: str):
+    """
+    Converts one flac file to wav and returns its manifest entry
+    """
+    duration = convert_to_wav(flac_file, wav_file)
+    return [{'audio_filepath': os.path.abspath(wav_file), 'duration': duration, 'text': transcript_text}]
+
+
+def __process_data(data_folder: str, dst_folder: str, manifest_file: str, num_workers: int = None):
     """
     Converts flac to wav and build manifests's json
     Args:
         data_folder: source with flac files
         dst_folder: where wav files will be stored
         manifest_file: where to store manifest
+        num_workers: number of conversion processes
 
     Returns:
 
@@ -81,35 +90,23 @@ def __process_data(data_folder: str, dst_folder: str, manifest_file: str):
         os.makedirs(dst_folder)
 
     files = []
-    entries = []
+    jobs = []
 
     for root, dirnames, filenames in os.walk(data_folder):
         for filename in fnmatch.filter(filenames, '*.trans.txt'):
             files.append((os.path.join(root, filename), root))
 
-    for transcripts_file, root in tqdm(files):
+    for transcripts_file, root in sorted(files):
         with open(transcripts_file, encoding="utf-8") as fin:
             for line in fin:
                 id, text = line[: line.index(" ")], line[line.index(" ") + 1 :]
                 transcript_text = text.lower().strip()
 
-                # Convert FLAC file to WAV
                 flac_file = os.path.join(root, id + ".flac")
                 wav_file = os.path.join(dst_folder, id + ".wav")
-                if not os.path.exists(wav_file):
-                    Transformer().build(flac_file, wav_file)
-                # check duration
-                duration = subprocess.check_output("soxi -D {0}".format(wav_file), shell=True)
-
-                entry = dict()
-                entry['audio_filepath'] = os.path.abspath(wav_file)
-                entry['duration'] = float(duration)
-                entry['text'] = transcript_text
-                entries.append(entry)
+                jobs.append((id, (flac_file, wav_file, transcript_text)))
 
-    with open(manifest_file, 'w') as fout:
-        for m in entries:
-            fout.write(json.dumps(m) + '\n')
+    write_manifest(manifest_file, jobs, __process_utterance, num_workers=num_workers, desc="Converting to wav")
 
 
 def main():
@@ -131,6 +128,7 @@ def main():
             os.path.join(os.path.join(data_root, "LibriSpeech"), data_set.replace("_", "-"),),
             os.path.join(os.path.join(data_root, "LibriSpeech"), data_set.replace("_", "-"),) + "-processed",
             os.path.join(data_root, data_set + ".json"),
+            args.num_workers,
         )
     logging.info('Done!')
 
@@ -4,16 +4,10 @@
 
 import argparse
 import fnmatch
-import json
 import logging
 import os
-import subprocess
-import sys
-import tarfile
-import urllib.request
 
-from sox import Transformer
-from tqdm import tqdm
+from nemo.collections.asr.parts.data_prep import audio_duration, write_manifest
 
 #
 # This script proposes to create the *json manifest necessary to use the TIMIT
@@ -184,15 +178,39 @@ TEST_LIST = {
 parser = argparse.ArgumentParser(description='TIMIT data processing')
 parser.add_argument("--data_root", required=True, default=None, type=str)
 parser.add_argument("--data_new_root", required=True, default=None, type=str)
+parser.add_argument("--num_workers", default=None, type=int, help="Number of processes.")
 args = parser.parse_args()
 
 
-def __process_data(data_folder: str, dst_folder: str):
+def __process_utterance(transcripts_file: str):
+    """
+    Maps the phonemes of one utterance to the 39 phoneme set and returns its
+    manifest entry
+    """
+    with open(transcripts_file, encoding="utf-8") as fin:
+
+        phn_transcript = ""
+        for line in fin:
+            # MAPPING TO THE 39 PHN SET
+            phn = line.split(" ")[2].split("\n")[0]
+            mapped = PHN_DICT[phn]
+            phn_transcript += mapped + " "
+
+    wav_file = transcripts_file.split(".")[0] + ".WAV"
+    entry = dict()
+    entry['audio_filepath'] = os.path.abspath(wav_file)
+    entry['duration'] = audio_duration(wav_file)
+    entry['text'] = phn_transcript
+    return [entry]
+
+
+def __process_data(data_folder: str, dst_folder: str, num_workers: int = None):
     """
     Build manifests's json
     Args:
         data_folder: timit root
         dst_folder: where json manifests will be stored
+        num_workers: number of processes
 
     Returns:
 
@@ -225,7 +243,6 @@ def __process_data(data_folder: str, dst_folder: str):
     for data_set in ['train', 'dev', 'test']:
 
         logging.info("Processing: " + data_set)
-        entries = []
         if data_set == 'train':
             files = files_train
         elif data_set == 'dev':
@@ -233,34 +250,22 @@ def __process_data(data_folder: str, dst_folder: str):
         else:
             files = files_test
 
-        for transcripts_file in tqdm(files):
-            with open(transcripts_file, encoding="utf-8") as fin:
-
-                phn_transcript = ""
-                for line in fin:
-                    # MAPPING TO THE 39 PHN SET
-                    phn = line.split(" ")[2].split("\n")[0]
-                    mapped = PHN_DICT[phn]
-                    phn_transcript += mapped + " "
-
-                wav_file = transcripts_file.split(".")[0] + ".WAV"
-                duration = subprocess.check_output("soxi -D {0}".format(wav_file), shell=True)
-                entry = dict()
-                entry['audio_filepath'] = os.path.abspath(wav_file)
-                entry['duration'] = float(duration)
-                entry['text'] = phn_transcript
-                entries.append(entry)
-
-        with open(os.path.join(dst_folder, data_set + ".json"), 'w') as fout:
-            for m in entries:
-                fout.write(json.dumps(m) + '\n')
+        jobs = [(transcripts_file, (transcripts_file,)) for transcripts_file in sorted(files)]
+        write_manifest(
+            os.path.join(dst_folder, data_set + ".json"),
+            jobs,
+            __process_utterance,
+            num_workers=num_workers,
+            chunksize=64,
+            desc=data_set,
+        )
 
 
 def main():
     data_root = args.data_root
     data_new_root = args.data_new_root
 
-    __process_data(data_root, data_new_root)
+    __process_data(data_root, data_new_root, args.num_workers)
     logging.info('Done!')
 
 
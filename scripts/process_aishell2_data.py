@@ -4,11 +4,10 @@
 #                   --audio_folder=<source data>
 #                   --dest_folder=<where to store the results>
 import argparse
-import json
 import logging
 import os
-import subprocess
-import sys
+
+from nemo.collections.asr.parts.data_prep import audio_duration, write_manifest
 
 parser = argparse.ArgumentParser(description="Processing Aishell2 Data")
 parser.add_argument(
@@ -17,15 +16,26 @@ parser.add_argument(
 parser.add_argument(
     "--dest_folder", default=None, type=str, required=True, help="Destination directory.",
 )
+parser.add_argument(
+    "--num_workers", default=None, type=int, help="Number of processes, defaults to the number of CPUs.",
+)
 args = parser.parse_args()
 
 
-def __process_data(data_folder: str, dst_folder: str):
+def __process_utterance(audio_filepath: str, text: str):
+    """
+    Reads the duration of one wav file and returns its manifest entry
+    """
+    return [{"audio_filepath": audio_filepath, "duration": audio_duration(audio_filepath), "text": text}]
+
+
+def __process_data(data_folder: str, dst_folder: str, num_workers: int = None):
     """
     To generate manifest
     Args:
         data_folder: source with wav files
         dst_folder: where manifest files will be stored
+        num_workers: number of processes reading durations
     Returns:
 
     """
@@ -34,7 +44,7 @@ def __process_data(data_folder: str, dst_folder: str):
     data_type = ['dev', 'test', 'train']
     for data in data_type:
         dst_file = os.path.join(dst_folder, data + ".json")
-        uttrances = []
+        jobs = []
         wav_dir = os.path.join(data_folder, "wav", data)
         transcript_file = os.path.join(data_folder, "transcript", data, "trans.txt")
         trans_text = {}
@@ -43,23 +53,14 @@ def __process_data(data_folder: str, dst_folder: str):
                 line = line.strip().split()
                 utterance_id, text = line[0], " ".join(line[1:])
                 trans_text[utterance_id] = text.upper()
-        session_list = os.listdir(wav_dir)
+        session_list = sorted(os.listdir(wav_dir))
         for sessions in session_list:
             cur_dir = os.path.join(wav_dir, sessions)
-            for wavs in os.listdir(cur_dir):
+            for wavs in sorted(os.listdir(cur_dir)):
                 audio_id = wavs.strip(".wav")
                 audio_filepath = os.path.abspath(os.path.join(cur_dir, wavs))
-                duration = subprocess.check_output('soxi -D {0}'.format(audio_filepath), shell=True)
-                duration = float(duration)
-                text = trans_text[audio_id]
-                uttrances.append(
-                    json.dumps(
-                        {"audio_filepath": audio_filepath, "duration": duration, "text": text,}, ensure_ascii=False,
-                    )
-                )
-        with open(dst_file, "w") as f:
-            for line in uttrances:
-                f.write(line + "\n")
+                jobs.append((audio_filepath, (audio_filepath, trans_text[audio_id])))
+        write_manifest(dst_file, jobs, __process_utterance, num_workers=num_workers, chunksize=64, desc=data)
 
 
 def __get_vocab(data_folder: str, des_dir: str):
@@ -95,7 +96,7 @@ def main():
     source_data = args.audio_folder
     des_dir = args.dest_folder
     logging.info("begin to process data...")
-    __process_data(source_data, des_dir)
+    __process_data(source_data, des_dir, args.num_workers)
     __get_vocab(source_data, des_dir)
     logging.info("finish all!")
 
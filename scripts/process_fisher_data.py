@@ -11,20 +11,22 @@
 # Matches Fisher dataset transcripts to the corresponding audio file (.wav),
 # and slices them into min_slice_duration segments with one speaker.
 # Also performs some other processing on transcripts.
+# Files are segmented by --num_workers processes (all CPUs by default), an
+# interrupted run continues where it stopped when run again.
 #
 # Heavily derived from Patter's Fisher processing script.
 
 import argparse
 import glob
-import io
-import json
 import os
 import re
+from functools import partial
 from math import ceil, floor
 
 import numpy as np
 import scipy.io.wavfile as wavfile
-from tqdm import tqdm
+
+from nemo.collections.asr.parts.data_prep import write_manifest, write_wav
 
 parser = argparse.ArgumentParser(description="Fisher Data Processing")
 parser.add_argument(
@@ -54,6 +56,9 @@ parser.add_argument(
 parser.add_argument(
     "--noises_to_emoji", action="store_true", help="Converts transcripts for noises to an emoji character.",
 )
+parser.add_argument(
+    "--num_workers", default=None, type=int, help="Number of processes, defaults to the number of CPUs.",
+)
 args = parser.parse_args()
 
 # Total number of files before segmenting, and train/val/test splits
@@ -107,38 +112,33 @@ TAG_MAP = {
 }
 
 
-def __write_sample(dest, file_id, count, file_count, sample_rate, audio, duration, transcript):
+def __write_sample(dest, file_id, count, partition, sample_rate, audio, duration, transcript):
     """
     Writes one slice to the given target directory.
     Args:
         dest: the destination directory
         file_id: name of the transcript/audio file for this block
         count: the count of segments in the file so far
-        file_count: the total number of filse processed so far
+        partition: the partition (train, val or test) of this file
         sample rate: sample rate of the audio data
         audio: audio data of the current sample
         duration: audio duration of the current sample
         transcript: transcript of the current sample
+    Returns:
+        the manifest entry of the slice
     """
-    partition = __partition_name(file_count)
     audio_path = os.path.join(dest, partition, f"{file_id}_{count:03}.wav")
 
     # Write audio
-    wavfile.write(audio_path, sample_rate, audio)
+    write_wav(audio_path, audio, sample_rate)
 
-    # Write transcript info
-    transcript = {
+    # Transcript info
+    return {
         "audio_filepath": audio_path,
         "duration": duration,
         "text": transcript,
     }
 
-    # Append to manifest
-    manifest_path = os.path.join(dest, f"manifest_{partition}.json")
-    with open(manifest_path, 'a') as f:
-        json.dump(transcript, f)
-        f.write('\n')
-
 
 def __normalize(utt):
     replace_table = str.maketrans(dict.fromkeys('()*;:"!&{},.-?'))
@@ -212,32 +212,26 @@ def __process_utterance(file_id, trans_path, line, keep_low_conf, rem_noises, em
 
 
 def __process_one_file(
-    trans_path,
-    sample_rate,
-    audio_data,
-    file_id,
-    dst_root,
-    min_slice_duration,
-    file_count,
-    keep_low_conf,
-    rem_noises,
-    emojify,
+    trans_path, audio_path, file_id, partition, dst_root, min_slice_duration, keep_low_conf, rem_noises, emojify,
 ):
     """
     Creates one block of audio slices and their corresponding transcripts.
     Args:
         trans_path: filepath to transcript
-        sample_rate: sample rate of the audio
-        audio_data: numpy array of shape [samples, channels]
+        audio_path: filepath to the (wav) audio
         file_id: identifying label, e.g. 'fe_03_01102'
+        partition: the partition (train, val or test) of this file
         dst_root: path to destination directory
         min_slice_duration: min number of seconds for an audio slice
-        file_count: total number of files processed so far
         keep_low_conf: keep utterances with low-confidence transcripts
         rem_noises: remove noise symbols
         emojify: convert noise symbols into emoji characters
+    Returns:
+        the manifest entries of the slices
     """
     count = 0
+    entries = []
+    sample_rate, audio_data = wavfile.read(audio_path)
 
     with open(trans_path, encoding="utf-8") as fin:
         fin.readline()  # Comment w/ corresponding sph filename
@@ -269,15 +263,17 @@ def __process_one_file(
             else:
                 # Write out segment and transcript
                 count += 1
-                __write_sample(
-                    dst_root,
-                    file_id,
-                    count,
-                    file_count,
-                    sample_rate,
-                    np.concatenate(audio_buffers[idx], axis=0),
-                    buffer_durations[idx],
-                    transcript_buffers[idx],
+                entries.append(
+                    __write_sample(
+                        dst_root,
+                        file_id,
+                        count,
+                        partition,
+                        sample_rate,
+                        np.concatenate(audio_buffers[idx], axis=0),
+                        buffer_durations[idx],
+                        transcript_buffers[idx],
+                    )
                 )
 
                 # Clear buffers
@@ -288,6 +284,8 @@ def __process_one_file(
             # Note: We drop any shorter "scraps" at the end of the file, if
             #   they end up shorter than min_slice_duration.
 
+    return entries
+
 
 def __partition_name(file_count):
     if file_count >= VAL_END_IDX:
@@ -298,21 +296,15 @@ def __partition_name(file_count):
         return "train"
 
 
-def __process_data(
-    audio_root, transcript_root, dst_root, min_slice_duration, file_count, keep_low_conf, rem_noises, emojify,
-):
+def __process_data(audio_root, transcript_root):
     """
-    Converts Fisher wav files to numpy arrays, segments audio and transcripts.
+    Matches Fisher transcripts to their wav files.
     Args:
         audio_root: source directory with the wav files
         transcript_root: source directory with the transcript files
             (can be the same as audio_root)
-        dst_root: where the processed and segmented files will be stored
-        min_slice_duration: minimum number of seconds for a slice of output
-        file_count: total number of files processed so far
-        keep_low_conf: whether or not to keep low confidence transcriptions
-        rem_noises: whether to remove noise symbols
-        emojify: whether to convert noise symbols to emoji, lower precedence
+    Returns:
+        sorted list of (transcript path, audio path, file id) tuples
     Assumes:
         1. There is exactly one transcripts directory in data_folder
         2. Audio files are all: <audio_root>/audio-wav/fe_03_xxxxx.wav
@@ -320,31 +312,14 @@ def __process_data(
     transcript_list = glob.glob(os.path.join(transcript_root, "fe_03_p*_tran*", "data", "trans", "*", "*.txt"))
     print("Found {} transcripts.".format(len(transcript_list)))
 
-    count = file_count
-
-    # Grab audio file associated with each transcript, and slice
-    for trans_path in tqdm(transcript_list, desc="Matching and segmenting"):
+    # Grab audio file associated with each transcript
+    files = []
+    for trans_path in sorted(transcript_list):
         file_id, _ = os.path.splitext(os.path.basename(trans_path))
         audio_path = os.path.join(audio_root, "audio_wav", file_id + ".wav")
+        files.append((trans_path, audio_path, file_id))
 
-        sample_rate, audio_data = wavfile.read(audio_path)
-
-        # Create a set of segments (a block) for each file
-        __process_one_file(
-            trans_path,
-            sample_rate,
-            audio_data,
-            file_id,
-            dst_root,
-            min_slice_duration,
-            count,
-            keep_low_conf,
-            rem_noises,
-            emojify,
-        )
-        count += 1
-
-    return count
+    return files
 
 
 def main():
@@ -364,33 +339,41 @@ def main():
     print(f"Number of validation files: {VAL_END_IDX - TRAIN_END_IDX}")
     print(f"Number of test files: {NUM_FILES - VAL_END_IDX}")
 
-    if not os.path.exists(os.path.join(dest_root, 'train/')):
-        os.makedirs(os.path.join(dest_root, 'train/'))
-        os.makedirs(os.path.join(dest_root, 'val/'))
-        os.makedirs(os.path.join(dest_root, 'test/'))
-    else:
-        # Wipe manifest contents first
-        open(os.path.join(dest_root, "manifest_train.json"), 'w').close()
-        open(os.path.join(dest_root, "manifest_val.json"), 'w').close()
-        open(os.path.join(dest_root, "manifest_test.json"), 'w').close()
+    for partition in ['train', 'val', 'test']:
+        os.makedirs(os.path.join(dest_root, partition), exist_ok=True)
 
-    file_count = 0
+    files = []
 
     for data_set in ['LDC2004S13-Part1', 'LDC2005S13-Part2']:
         print(f"\n\nWorking on dataset: {data_set}")
-        file_count = __process_data(
-            os.path.join(audio_root, data_set),
-            os.path.join(transcript_root, data_set),
-            dest_root,
-            min_slice_duration,
-            file_count,
-            keep_low_conf,
-            rem_noises,
-            emojify,
+        files.extend(__process_data(os.path.join(audio_root, data_set), os.path.join(transcript_root, data_set)))
+
+        print(f"Total file count so far: {len(files)}")
+
+    # Create a set of segments (a block) for each file
+    process_one_file = partial(
+        __process_one_file,
+        dst_root=dest_root,
+        min_slice_duration=min_slice_duration,
+        keep_low_conf=keep_low_conf,
+        rem_noises=rem_noises,
+        emojify=emojify,
+    )
+    for partition in ['train', 'val', 'test']:
+        jobs = [
+            (file_id, (trans_path, audio_path, file_id, partition))
+            for file_count, (trans_path, audio_path, file_id) in enumerate(files)
+            if __partition_name(file_count) == partition
+        ]
+        write_manifest(
+            os.path.join(dest_root, f"manifest_{partition}.json"),
+            jobs,
+            process_one_file,
+            num_workers=args.num_workers,
+            chunksize=1,
+            desc=f"Matching and segmenting {partition}",
         )
 
-        print(f"Total file count so far: {file_count}")
-
 
 if __name__ == "__main__":
     main()
@@ -7,25 +7,29 @@
 #
 # Converts the .sph audio files in the HUB5 dataset to .wav, and performs some
 # extra processing to segment audio files and prepare transcripts.
-# Requires sph2pipe to be installed.
+# Requires sph2pipe to be installed. Files are converted and segmented by
+# --num_workers processes (all CPUs by default), an interrupted run continues
+# where it stopped when run again.
 #
 # This script is heavily derived from the Patter HUB5 processing script written
 # by Ryan Leary
 
 import argparse
 import glob
-import json
+import itertools
 import os
 import re
 import subprocess
 import sys
 from collections import namedtuple
+from functools import partial
 from math import ceil, floor
 from operator import attrgetter
 
 import numpy as np
 import scipy.io.wavfile as wavfile
-from tqdm import tqdm
+
+from nemo.collections.asr.parts.data_prep import atomic_output, parallel_map, write_manifest, write_wav
 
 parser = argparse.ArgumentParser(description="Prepare HUB5 data for training/eval")
 parser.add_argument(
@@ -43,6 +47,9 @@ parser.add_argument(
 parser.add_argument(
     "--min_slice_duration", default=10.0, type=float, help="Minimum audio slice duration after processing.",
 )
+parser.add_argument(
+    "--num_workers", default=None, type=int, help="Number of processes, defaults to the number of CPUs.",
+)
 
 args = parser.parse_args()
 
@@ -64,25 +71,30 @@ def get_utt_id(segment):
 
 def convert_utterances(sph_path, wav_path):
     """
-    Converts a sphere audio file to wav.
+    Converts a sphere audio file to wav, unless the wav file exists.
     """
-    cmd = ["sph2pipe", "-f", "wav", "-p", sph_path, wav_path]
-    subprocess.run(cmd)
+    if os.path.exists(wav_path):
+        return
+    with atomic_output(wav_path) as tmp_path:
+        cmd = ["sph2pipe", "-f", "wav", "-p", sph_path, tmp_path]
+        subprocess.run(cmd, check=True)
 
 
-def create_wavs(data_root, dest_root):
+def create_wavs(data_root, dest_root, num_workers=None):
     """
     Converts the English sph files to wav using sph2pipe.
     """
     sph_root = os.path.join(data_root, "hub5e_00", "english")
-    sph_list = glob.glob(os.path.join(sph_root, "*.sph"))
+    sph_list = sorted(glob.glob(os.path.join(sph_root, "*.sph")))
 
-    # Iterate over each sphere file and conver to wav
-    for sph_path in tqdm(sph_list, desc="Converting to wav", unit="file"):
+    # Convert each sphere file to wav
+    jobs = []
+    for sph_path in sph_list:
         sph_name, _ = os.path.splitext(os.path.basename(sph_path))
         wav_path = os.path.join(dest_root, 'full_audio_wav', sph_name + ".wav")
-        cmd = ["sph2pipe", "-f", "wav", "-p", sph_path, wav_path]
-        subprocess.run(cmd)
+        jobs.append((sph_path, wav_path))
+    for _ in parallel_map(convert_utterances, jobs, num_workers, chunksize=1, desc="Converting to wav"):
+        pass
 
 
 def process_transcripts(dataset_root):
@@ -129,8 +141,7 @@ def process_transcripts(dataset_root):
 
 def write_one_segment(dest_root, speaker_id, count, audio, sr, duration, transcript):
     """
-    Writes out one segment of audio, and writes its corresponding transcript
-    in the manifest.
+    Writes out one segment of audio, and returns its manifest entry.
 
     Args:
         dest_root: the path to the output directory root
@@ -143,54 +154,38 @@ def write_one_segment(dest_root, speaker_id, count, audio, sr, duration, transcr
     """
     audio_path = os.path.join(dest_root, "audio", f"{speaker_id}_{count:03}.wav")
 
-    manifest_path = os.path.join(dest_root, "manifest_hub5.json")
-
     # Write audio
-    wavfile.write(audio_path, sr, audio)
+    write_wav(audio_path, audio, sr)
 
-    # Write transcript
-    transcript = {
+    # Transcript
+    return {
         "audio_filepath": audio_path,
         "duration": duration,
         "text": transcript,
     }
-    with open(manifest_path, 'a') as f:
-        json.dump(transcript, f)
-        f.write('\n')
 
 
-def segment_audio(info_list, dest_root, min_slice_duration):
+def segment_speaker(info_list, dest_root, min_slice_duration):
     """
-    Combines audio into >= min_slice_duration segments of the same speaker,
-    and writes the combined transcripts into a manifest.
+    Combines the audio of one speaker into >= min_slice_duration segments,
+    and returns the manifest entries of the segments. The remainder shorter
+    than min_slice_duration is dropped.
 
     Args:
-        info_list: list of StmUtterance objects with transcript information.
+        info_list: StmUtterance objects of one speaker, ordered by begin.
         dest_root: path to output destination
         min_slice_duration: min number of seconds per output audio slice
     """
-    info_list = sorted(info_list, key=attrgetter('speaker_id', 'begin'))
-
-    prev_id = None  # For checking audio concatenation
+    entries = []
     id_count = 0
 
-    sample_rate, audio_data = None, None
+    sample_rate, audio_data = wavfile.read(os.path.join(dest_root, 'full_audio_wav', info_list[0].filename + '.wav'))
     transcript_buffer = ''
     audio_buffer = []
     buffer_duration = 0.0
 
     # Iterate through utterances to build segments
     for info in info_list:
-        if info.speaker_id != prev_id:
-            # Scrap the remainder in the buffers and start next segment
-            prev_id = info.speaker_id
-            id_count = 0
-
-            sample_rate, audio_data = wavfile.read(os.path.join(dest_root, 'full_audio_wav', info.filename + '.wav'))
-            transcript_buffer = ''
-            audio_buffer = []
-            buffer_duration = 0.0
-
         # Append utterance info to buffers
         transcript_buffer += info.transcript
         channel = 0 if info.channel.lower() == 'a' else 1
@@ -204,20 +199,50 @@ def segment_audio(info_list, dest_root, min_slice_duration):
         else:
             # Write out segment and transcript
             id_count += 1
-            write_one_segment(
-                dest_root,
-                info.speaker_id,
-                id_count,
-                np.concatenate(audio_buffer, axis=0),
-                sample_rate,
-                buffer_duration,
-                transcript_buffer,
+            entries.append(
+                write_one_segment(
+                    dest_root,
+                    info.speaker_id,
+                    id_count,
+                    np.concatenate(audio_buffer, axis=0),
+                    sample_rate,
+                    buffer_duration,
+                    transcript_buffer,
+                )
             )
 
             transcript_buffer = ''
             audio_buffer = []
             buffer_duration = 0.0
 
+    return entries
+
+
+def segment_audio(info_list, dest_root, min_slice_duration, num_workers=None):
+    """
+    Combines audio into >= min_slice_duration segments of the same speaker,
+    and writes the combined transcripts into a manifest.
+
+    Args:
+        info_list: list of StmUtterance objects with transcript information.
+        dest_root: path to output destination
+        min_slice_duration: min number of seconds per output audio slice
+        num_workers: number of processes segmenting speakers
+    """
+    info_list = sorted(info_list, key=attrgetter('speaker_id', 'begin'))
+    jobs = [
+        (speaker_id, (list(speaker_info),))
+        for speaker_id, speaker_info in itertools.groupby(info_list, key=attrgetter('speaker_id'))
+    ]
+    write_manifest(
+        os.path.join(dest_root, "manifest_hub5.json"),
+        jobs,
+        partial(segment_speaker, dest_root=dest_root, min_slice_duration=min_slice_duration),
+        num_workers=num_workers,
+        chunksize=1,
+        desc="Segmenting",
+    )
+
 
 def main():
     data_root = args.data_root
@@ -230,11 +255,8 @@ def main():
     if not os.path.exists(os.path.join(dest_root, 'audio')):
         os.makedirs(os.path.join(dest_root, 'audio'))
 
-    # Create/wipe manifest contents
-    open(os.path.join(dest_root, "manifest_hub5.json"), 'w').close()
-
     # Convert full audio files from .sph to .wav
-    create_wavs(data_root, dest_root)
+    create_wavs(data_root, dest_root, args.num_workers)
 
     # Get each audio transcript from transcript file
     info_list, chars = process_transcripts(data_root)
@@ -246,7 +268,7 @@ def main():
 
     # Segment the audio data
     print("Segmenting audio and writing manifest")
-    segment_audio(info_list, dest_root, min_slice_duration)
+    segment_audio(info_list, dest_root, min_slice_duration, args.num_workers)
 
 
 if __name__ == '__main__':
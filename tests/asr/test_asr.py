@@ -16,15 +16,22 @@
 # limitations under the License.
 # =============================================================================
 import os
+import pickle
 import shutil
 import tarfile
+import tempfile
 import unittest
 
+import kaldi_io
+import numpy as np
+import torch
 from ruamel.yaml import YAML
 
 import nemo
 import nemo.collections.asr as nemo_asr
+from nemo.backends.pytorch.samplers import ResumableSampler
 from nemo.collections.asr.parts import AudioDataset, WaveformFeaturizer, collections, parsers
+from nemo.collections.asr.parts.kaldi_ark import KaldiArkReader
 from nemo.core import DeviceType
 from tests.common_setup import NeMoUnitTest
 
@@ -203,6 +210,8 @@ class TestASRPytorch(NeMoUnitTest):
             self.assertTrue(data[1].size(0) == batch_size)
             self.assertTrue(data[2].size(0) == batch_size)
             self.assertTrue(data[3].size(0) == batch_size)
+        # the order is resumable from checkpoints
+        self.assertIsInstance(dl.data_iterator.sampler, ResumableSampler)
 
     def test_preprocessor_errors(self):
         def create_broken_preprocessor_1():
@@ -254,6 +263,41 @@ class TestASRPytorch(NeMoUnitTest):
         )
         self.assertTrue(len(dl_test_max) == 19)
 
+    def test_kaldi_ark_reader(self):
+        kaldi_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../data/asr/kaldi_an4/'))
+        reader = KaldiArkReader(os.path.join(kaldi_dir, 'feats.scp'), cache_size=2)
+        expected = dict(kaldi_io.read_mat_scp(os.path.join(kaldi_dir, 'feats.scp')))
+        self.assertEqual(set(reader.keys()), set(expected))
+        for utt_id, mat in expected.items():
+            self.assertTrue(np.array_equal(reader[utt_id], mat))
+        self.assertEqual(len(reader._cache), 2)
+        # workers get a copy without the maps and the cache
+        self.assertFalse(pickle.loads(pickle.dumps(reader))._cache)
+
+        rng = np.random.RandomState(0)
+        with tempfile.TemporaryDirectory() as folder:
+            ark_path = os.path.join(folder, 'feats.ark')
+            with open(ark_path, 'wb') as f:
+                # speech feature compression of a (5, 3) matrix
+                f.write(b'cm \0BCM ' + np.array([-1.0, 4.0], dtype='<f4').tobytes())
+                f.write(np.array([5, 3], dtype='<i4').tobytes())
+                f.write(np.sort(rng.randint(0, 65536, (3, 4)), axis=1).astype('<u2').tobytes())
+                f.write(rng.randint(0, 256, 15).astype(np.uint8).tobytes())
+                cm3_offset = f.tell() + 4
+                f.write(b'cm3 \0BCM3 ' + np.array([-1.0, 4.0], dtype='<f4').tobytes())
+                f.write(np.array([2, 3], dtype='<i4').tobytes() + bytes(range(0, 256, 50)))
+                range_offset = f.tell() + 6
+                f.write(b'range ')
+                kaldi_io.write_mat(f, np.arange(12, dtype=np.float32).reshape(4, 3))
+            with open(os.path.join(folder, 'feats.scp'), 'w') as f:
+                f.write(f'cm {ark_path}:3\ncm3 {ark_path}:{cm3_offset}\n')
+                f.write(f'range {ark_path}:{range_offset}[1:3]\n')
+
+            reader = KaldiArkReader(os.path.join(folder, 'feats.scp'))
+            self.assertTrue(np.array_equal(reader['cm'], kaldi_io.read_mat(f'{ark_path}:3')))
+            self.assertTrue(np.allclose(reader['cm3'], -1.0 + np.arange(0, 256, 50).reshape(2, 3) * 4.0 / 255))
+            self.assertTrue(np.array_equal(reader['range'], np.arange(3, 9, dtype=np.float32).reshape(2, 3)))
+
     def test_trim_silence(self):
         batch_size = 4
         normal_dl = nemo_asr.AudioToTextDataLayer(
@@ -325,6 +369,32 @@ class TestASRPytorch(NeMoUnitTest):
                 self.assertTrue(spec[0].shape[1] == 201)  # n_fft // 2 + 1 bins
                 self.assertTrue(mfcc[0].shape[1] == 15)
 
+    def test_spectrogram_augmentation(self):
+        params = dict(freq_masks=2, time_masks=5, freq_width=8, time_width=10, rect_masks=5, rect_time=10, rect_freq=8)
+        input_spec = torch.rand(4, 32, 100) + 1
+        length = torch.tensor([100, 80, 31, 5])
+
+        def augment(seed):
+            generator = torch.Generator()
+            generator.manual_seed(seed)
+            spec_augment = nemo_asr.SpectrogramAugmentation(rng=generator, **params)
+            return spec_augment.forward(input_spec.to(spec_augment._device), length=length)
+
+        augmented = augment(0).cpu()
+        self.assertEqual(augmented.shape, input_spec.shape)
+        # masks are placed only within the valid frames of every utterance
+        for i, valid in enumerate(length):
+            self.assertTrue(torch.equal(augmented[i, :, valid:], input_spec[i, :, valid:]))
+        self.assertTrue((augmented == 0).any())
+        # same generator seed, same masks
+        self.assertTrue(torch.equal(augmented, augment(0).cpu()))
+        self.assertFalse(torch.equal(augmented, augment(1).cpu()))
+
+        # without lengths the whole spectrogram can be masked
+        spec_augment = nemo_asr.SpectrogramAugmentation(freq_masks=0, time_masks=20, time_width=10)
+        augmented = spec_augment.forward(input_spec.to(spec_augment._device)).cpu()
+        self.assertTrue((augmented[3] == 0).any())
+
     # @unittest.skip("Init parameters of nemo_asr.AudioToMelSpectrogramPreprocessor are invalid")
     def test_jasper_training(self):
         with open(os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/jasper_smaller.yaml"))) as file:
@@ -477,6 +547,34 @@ class TestASRPytorch(NeMoUnitTest):
             [loss], callbacks=[callback], optimizer="sgd", optimization_params={"num_epochs": 10, "lr": 0.0003},
         )
 
+    def test_jasper_fused_for_inference(self):
+        with open(os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/quartznet_test.yaml"))) as file:
+            model_definition = self.yaml.load(file)
+        jasper_encoder = nemo_asr.JasperEncoder(
+            feat_in=model_definition['AudioToMelSpectrogramPreprocessor']['features'],
+            **model_definition['JasperEncoder'],
+        )
+        for module in jasper_encoder.modules():
+            if isinstance(module, torch.nn.BatchNorm1d):
+                module.running_mean.normal_(0.0, 0.5)
+                module.running_var.uniform_(0.5, 2.0)
+                module.weight.data.normal_(1.0, 0.1)
+                module.bias.data.normal_(0.0, 0.1)
+        jasper_encoder.eval()
+
+        audio_signal = torch.randn(4, 64, 301, device=jasper_encoder._device)
+        length = torch.tensor([301, 250, 100, 17], device=jasper_encoder._device)
+        with torch.no_grad():
+            expected, expected_length = jasper_encoder.forward(audio_signal, length)
+            for script in [False, True]:
+                fused = jasper_encoder.fused_for_inference(script=script)
+                outputs, encoded_length = fused(audio_signal, length)
+                self.assertTrue(torch.allclose(outputs, expected, atol=1e-4))
+                self.assertTrue(torch.equal(encoded_length, expected_length))
+        # the fused module doesn't share parameters with the encoder
+        self.assertTrue(all(p.requires_grad for p in jasper_encoder.parameters()))
+        self.assertFalse(any(p.requires_grad for p in fused.parameters()))
+
     def test_stft_conv(self):
         with open(os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/jasper_smaller.yaml"))) as file:
             jasper_model_definition = self.yaml.load(file)
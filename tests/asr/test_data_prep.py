@@ -0,0 +1,72 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+from nemo.collections.asr.parts.data_prep import audio_duration, convert_to_wav, parallel_map, write_manifest
+from tests.common_setup import NeMoUnitTest
+
+
+def _entries(index, fail_at=None):
+    if index == fail_at:
+        raise KeyboardInterrupt
+    return [{"audio_filepath": f"{i}.wav", "duration": index + i / 10, "text": "ü" * i} for i in range(index % 3)]
+
+
+class TestDataPrep(NeMoUnitTest):
+    def test_parallel_map_keeps_order(self):
+        jobs = [(i,) for i in range(50)]
+        results = list(parallel_map(_entries, jobs, num_workers=2, chunksize=3))
+        self.assertEqual(results, [_entries(i) for i in range(50)])
+
+    def test_manifest_resumes_after_interruption(self):
+        with tempfile.TemporaryDirectory() as folder:
+            expected_path = os.path.join(folder, "expected.json")
+            write_manifest(expected_path, [(str(i), (i,)) for i in range(20)], _entries, num_workers=0)
+            self.assertFalse(os.path.exists(expected_path + ".journal"))
+
+            manifest_path = os.path.join(folder, "manifest.json")
+            with self.assertRaises(KeyboardInterrupt):
+                write_manifest(manifest_path, [(str(i), (i, 11)) for i in range(20)], _entries, num_workers=0)
+            # the process may die after writing entries of an unfinished job
+            # and in the middle of a journal line
+            with open(manifest_path, "a") as f:
+                f.write('{"audio_filepath": "0.wav"')
+            with open(manifest_path + ".journal", "a") as f:
+                f.write('["11", ')
+
+            num_entries = write_manifest(manifest_path, [(str(i), (i,)) for i in range(20)], _entries, num_workers=2)
+            self.assertEqual(num_entries, sum(len(_entries(i)) for i in range(11, 20)))
+            with open(manifest_path, "rb") as f, open(expected_path, "rb") as g:
+                self.assertEqual(f.read(), g.read())
+            self.assertFalse(os.path.exists(manifest_path + ".journal"))
+
+    def test_convert_to_wav(self):
+        with tempfile.TemporaryDirectory() as folder:
+            flac_path, wav_path = os.path.join(folder, "a.flac"), os.path.join(folder, "a.wav")
+            audio = (np.random.RandomState(0).randn(8000) * 3000).astype(np.int16)
+            sf.write(flac_path, audio, 16000)
+            self.assertAlmostEqual(convert_to_wav(flac_path, wav_path), 0.5)
+            self.assertEqual(sf.info(wav_path).subtype, "PCM_16")
+            self.assertTrue(np.array_equal(sf.read(wav_path, dtype="int16")[0], audio))
+            self.assertEqual(audio_duration(wav_path), 0.5)
+            self.assertEqual(sorted(os.listdir(folder)), ["a.flac", "a.wav"])
@@ -0,0 +1,118 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+import nemo
+import nemo.collections.asr as nemo_asr
+from nemo.backends.pytorch.samplers import find_sampler
+from nemo.collections.asr.parts.data_prep import write_tarred_shard
+from tests.common_setup import NeMoUnitTest
+
+LABELS = [" ", "a", "b", "c"]
+
+
+class TestTarredDataset(NeMoUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.TemporaryDirectory()
+        items = []
+        for i in range(12):
+            audio_file = os.path.join(self.folder.name, f"{i}.wav")
+            # utterance i has i + 1 samples of value i
+            sf.write(audio_file, np.full(i + 1, i, dtype=np.int16), 16000, subtype="PCM_16")
+            items.append({"audio_file": audio_file, "duration": (i + 1) / 16000, "text": "abc"[i % 3], "offset": None})
+        # an utterance cut out of a longer file
+        long_file = os.path.join(self.folder.name, "long.wav")
+        sf.write(long_file, np.arange(32000, dtype=np.int16) // 1000, 16000, subtype="PCM_16")
+        items.append({"audio_file": long_file, "duration": 0.5, "text": "cab", "offset": 1.0})
+
+        self.shard_paths = []
+        for i, start in enumerate(range(0, len(items), 4)):
+            shard_path = os.path.join(self.folder.name, f"audio_{i}.tar")
+            write_tarred_shard(shard_path, items[start : start + 4], start)
+            self.shard_paths.append(shard_path)
+
+    def tearDown(self):
+        self.folder.cleanup()
+        super().tearDown()
+
+    def _read(self, data_layer):
+        utterances = []
+        for audio, audio_len, tokens, tokens_len in data_layer.data_iterator:
+            for i in range(audio.shape[0]):
+                samples = (audio[i, : audio_len[i]] * 32768).round().long().tolist()
+                utterances.append((samples, tokens[i, : tokens_len[i]].tolist()))
+        return utterances
+
+    def test_tarred_data_layer(self):
+        dl = nemo_asr.TarredAudioToTextDataLayer(
+            shard_paths=os.path.join(self.folder.name, "audio_*.tar"),
+            labels=LABELS,
+            batch_size=3,
+            min_duration=None,
+            num_workers=2,
+        )
+        with self.assertRaises(TypeError):
+            len(dl)
+        utterances = self._read(dl)
+        self.assertEqual(len(utterances), 13)
+        for i in range(12):
+            self.assertIn(([i] * (i + 1), [1 + i % 3]), utterances)
+        self.assertIn(([i // 1000 for i in range(16000, 24000)], [3, 1, 2]), utterances)
+
+        # shuffling keeps every utterance and filters apply to the json
+        # durations
+        dl = nemo_asr.TarredAudioToTextDataLayer(
+            shard_paths=",".join(self.shard_paths),
+            labels=LABELS,
+            batch_size=2,
+            min_duration=5 / 16000,
+            max_duration=0.1,
+            shuffle_buffer=4,
+        )
+        shuffled = self._read(dl)
+        self.assertEqual(sorted(shuffled), sorted(u for u in utterances if 5 <= len(u[0]) <= 1600))
+
+    def test_tarred_shuffling(self):
+        nemo.core.NeuralModuleFactory(placement=self.nf.placement, random_seed=5)
+        layers = [
+            nemo_asr.TarredAudioToTextDataLayer(
+                shard_paths=self.shard_paths, labels=LABELS, batch_size=2, min_duration=None, shuffle_buffer=3,
+            )
+            for _ in range(2)
+        ]
+        # the seed defaults to the seed of the factory
+        dataset = layers[0].data_iterator.dataset
+        self.assertEqual(dataset.seed, 5)
+        self.assertIs(find_sampler(layers[0].data_iterator), dataset)
+
+        epochs = []
+        for epoch in range(2):
+            for dl in layers:
+                dl.data_iterator.dataset.set_epoch(epoch)
+            epochs.append(self._read(layers[0]))
+            self.assertEqual(self._read(layers[1]), epochs[-1])
+        # every epoch reads all utterances, in a different order
+        self.assertEqual(len(epochs[0]), 13)
+        self.assertEqual(sorted(epochs[0]), sorted(epochs[1]))
+        self.assertNotEqual(epochs[0], epochs[1])
@@ -0,0 +1,56 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import random
+
+from nemo.collections.nlp.metrics.fast_bleu import CorpusBLEU, fast_corpus_bleu, fast_corpus_chrf
+from nemo.collections.nlp.metrics.sacrebleu import corpus_bleu, corpus_chrf
+from tests.common_setup import NeMoUnitTest
+
+
+class TestFastBLEU(NeMoUnitTest):
+    def setUp(self) -> None:
+        super().setUp()
+        rng = random.Random(0)
+        words = "the a cat dog sat on mat is was ran Über straße 中文 你好 , ( )".split()
+
+        def sentence():
+            return " ".join(rng.choice(words) for _ in range(rng.randint(0, 25)))
+
+        self.sys = [sentence() for _ in range(300)]
+        self.refs = [[sentence() for _ in range(300)] for _ in range(2)]
+
+    def test_bleu_matches_sacrebleu(self):
+        for tokenize in ['13a', 'intl', 'zh', 'none']:
+            for smooth_method in ['exp', 'floor', 'add-k', 'none']:
+                expected = corpus_bleu(self.sys, self.refs, smooth_method=smooth_method, tokenize=tokenize)
+                result = fast_corpus_bleu(self.sys, self.refs, smooth_method=smooth_method, tokenize=tokenize)
+                self.assertEqual(tuple(expected), tuple(result))
+
+    def test_bleu_incremental_and_parallel(self):
+        expected = corpus_bleu(self.sys, self.refs, lowercase=True)
+        scorer = CorpusBLEU(lowercase=True, num_workers=2, chunk_size=64)
+        scorer.update(self.sys[:100], [ref[:100] for ref in self.refs])
+        scorer.update(self.sys[100:], [ref[100:] for ref in self.refs])
+        self.assertEqual(tuple(expected), tuple(scorer.compute()))
+
+    def test_chrf_matches_sacrebleu(self):
+        for remove_whitespace in [True, False]:
+            expected = corpus_chrf(self.sys, self.refs[0], remove_whitespace=remove_whitespace)
+            result = fast_corpus_chrf(self.sys, self.refs[0], remove_whitespace=remove_whitespace, num_workers=2)
+            self.assertEqual(expected, result)
@@ -0,0 +1,120 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import random
+import tempfile
+
+import numpy as np
+import torch
+
+from nemo.collections.nlp.data import SentencePieceTokenizer
+from nemo.collections.nlp.data.datasets.lm_bert_dataset import BertPretrainingDataset, WholeWordMasking
+from tests.common_setup import NeMoUnitTest
+
+TEXT = (
+    "[CLS] a quick brown fox jumps over the lazy dog [SEP] "
+    "whole word masking selects all pieces of a word together [SEP]"
+)
+
+
+class TestWholeWordMasking(NeMoUnitTest):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tokenizer = SentencePieceTokenizer("./tests/data/m_common.model")
+        self.tokenizer.add_special_tokens(["[CLS]", "[SEP]", "[PAD]", "[MASK]"])
+        self.ids = self.tokenizer.text_to_ids(TEXT)
+
+    def _words(self, ids):
+        """Word grouping of the original per-token loop"""
+        words = [[0]]
+        for i, tid in enumerate(ids[1:], 1):
+            if self.tokenizer.ids_to_tokens([tid])[0].startswith('▁'):
+                words[-1].append(i)
+            else:
+                words.append([i])
+        return words
+
+    def test_masks_whole_words(self):
+        masking = WholeWordMasking(self.tokenizer, mask_probability=0.5)
+        words = self._words(self.ids)
+        special = {masking.cls_id, masking.sep_id}
+        rng = np.random.default_rng(0)
+        counts = {"mask": 0, "random": 0, "same": 0}
+        selected_words = 0
+        for _ in range(200):
+            masked_ids, output_mask = masking(self.ids, rng=rng)
+            for word in words:
+                word_mask = output_mask[word]
+                self.assertTrue((word_mask == word_mask[0]).all())
+                if self.ids[word[0]] in special:
+                    self.assertEqual(word_mask[0], 0)
+                if not word_mask[0]:
+                    self.assertTrue(all(masked_ids[i] == self.ids[i] for i in word))
+                    continue
+                selected_words += 1
+                if all(masked_ids[i] == masking.mask_id for i in word):
+                    counts["mask"] += 1
+                elif all(masked_ids[i] == self.ids[i] for i in word):
+                    counts["same"] += 1
+                else:
+                    counts["random"] += 1
+                    self.assertTrue(all(masked_ids[i] not in special for i in word))
+        num_words = 200 * sum(self.ids[word[0]] not in special for word in words)
+        self.assertAlmostEqual(selected_words / num_words, 0.5, delta=0.05)
+        self.assertAlmostEqual(counts["mask"] / selected_words, 0.8, delta=0.05)
+        self.assertAlmostEqual(counts["random"] / selected_words, 0.1, delta=0.05)
+
+    def test_batch_never_masks_padding(self):
+        masking = WholeWordMasking(self.tokenizer, mask_probability=1.0)
+        batch = np.full((3, len(self.ids) + 5), masking.pad_id)
+        for i in range(3):
+            batch[i, : len(self.ids) - 4 * i] = self.ids[: len(self.ids) - 4 * i]
+        masked_ids, output_mask = masking(batch, rng=np.random.default_rng(0))
+        self.assertEqual(masked_ids.shape, batch.shape)
+        self.assertFalse(output_mask[batch == masking.pad_id].any())
+        self.assertTrue((masked_ids[batch == masking.pad_id] == masking.pad_id).all())
+        # every row starts a new word, so rows are masked independently
+        self.assertEqual(output_mask[:, 0].sum(), 0)
+
+    def test_masking_follows_python_seed(self):
+        masking = WholeWordMasking(self.tokenizer)
+        random.seed(1)
+        first = masking(self.ids)
+        random.seed(1)
+        second = masking(self.ids)
+        self.assertTrue(all(np.array_equal(a, b) for a, b in zip(first, second)))
+
+    def test_dataset_masks_per_batch(self):
+        with tempfile.TemporaryDirectory() as folder:
+            dataset_file = os.path.join(folder, "train.txt")
+            with open(dataset_file, "w") as f:
+                for i in range(20):
+                    f.write(f"sentence number {i} of the quick brown fox test corpus\n")
+            for mask_per_batch in [False, True]:
+                dataset = BertPretrainingDataset(
+                    self.tokenizer, dataset_file, max_seq_length=32, mask_per_batch=mask_per_batch
+                )
+                batch = dataset.collate_fn([dataset[i] for i in range(4)])
+                input_ids, input_type_ids, input_mask, output_ids, output_mask, is_next = batch
+                self.assertEqual(input_ids.shape, (4, 32))
+                self.assertEqual(output_mask.dtype, torch.float32)
+                self.assertEqual(is_next.shape, (4,))
+                unmasked = output_mask == 0
+                self.assertTrue(torch.equal(input_ids[unmasked], output_ids[unmasked]))
+                self.assertFalse(output_mask[input_mask == 0].any())
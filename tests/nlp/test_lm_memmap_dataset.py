@@ -0,0 +1,105 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import glob
+import os
+import tempfile
+
+from nemo.collections.nlp.data.datasets.lm_transformer_dataset import (
+    MemmapLanguageModelingDataset,
+    ShardedWindowSampler,
+)
+from nemo.collections.nlp.data.tokenizers import CharTokenizer
+from tests.common_setup import NeMoUnitTest
+
+
+class TestMemmapLanguageModelingDataset(NeMoUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.folder = tempfile.TemporaryDirectory()
+        self.dataset = os.path.join(self.folder.name, "train.txt")
+        with open(self.dataset, "w") as f:
+            f.write("abcdefghij\nklmnopqrst\n")
+
+    def tearDown(self):
+        self.folder.cleanup()
+        super().tearDown()
+
+    def _tokenizer(self, chars):
+        vocab_path = os.path.join(self.folder.name, f"vocab_{chars[0]}.txt")
+        with open(vocab_path, "w") as f:
+            f.write("\n".join(chars) + "\n")
+        return CharTokenizer(vocab_path)
+
+    def test_windows(self):
+        tokenizer = self._tokenizer("abcdefghijklmnopqrst")
+        # new lines are <UNK> tokens of the stream
+        ids = tokenizer.text_to_ids("abcdefghij\nklmnopqrst\n")
+        dataset = MemmapLanguageModelingDataset(tokenizer, self.dataset, max_seq_length=4, batch_step=3)
+        self.assertEqual(len(dataset), 6)
+        for i in range(len(dataset)):
+            src_ids, src_mask, labels = dataset[i]
+            self.assertEqual(src_ids.tolist(), ids[3 * i : 3 * i + 4])
+            self.assertEqual(labels.tolist(), ids[3 * i + 1 : 3 * i + 5])
+            self.assertEqual(src_mask.tolist(), [1.0] * 4)
+
+        shifted = MemmapLanguageModelingDataset(
+            tokenizer, self.dataset, max_seq_length=4, batch_step=3, random_offset=True, seed=1
+        )
+        # the length leaves room for the largest offset
+        self.assertEqual(len(shifted), 5)
+        for epoch in range(5):
+            shifted.set_epoch(epoch)
+            offset = shifted.offset
+            self.assertTrue(0 <= offset < 3)
+            self.assertEqual(shifted[3][0].tolist(), ids[offset + 9 : offset + 13])
+
+    def test_sharded_window_sampler(self):
+        dataset = list(range(23))
+        samplers = [ShardedWindowSampler(dataset, num_replicas=3, rank=rank, seed=2) for rank in range(3)]
+        shards = []
+        for sampler in samplers:
+            sampler.set_epoch(1)
+            shards.append(list(sampler))
+            self.assertEqual(len(shards[-1]), len(sampler))
+        # every rank reads its own contiguous shard, the tail is dropped
+        for rank, shard in enumerate(shards):
+            self.assertEqual(sorted(shard), list(range(7 * rank, 7 * rank + 7)))
+        samplers[0].set_epoch(2)
+        self.assertNotEqual(list(samplers[0]), shards[0])
+        self.assertEqual(sorted(samplers[0]), sorted(shards[0]))
+
+    def test_cache_invalidation(self):
+        tokenizer = self._tokenizer("abcdefghijklmnopqrst")
+        first = MemmapLanguageModelingDataset(tokenizer, self.dataset, max_seq_length=4)
+        self.assertEqual(len(glob.glob(f"{self.dataset}.*.bin")), 1)
+        # the same tokenizer reuses the token stream
+        MemmapLanguageModelingDataset(tokenizer, self.dataset, max_seq_length=4)
+        self.assertEqual(len(glob.glob(f"{self.dataset}.*.bin")), 1)
+
+        # a vocabulary of the same size with other ids is tokenized anew
+        reversed_tokenizer = self._tokenizer("tsrqponmlkjihgfedcba")
+        second = MemmapLanguageModelingDataset(reversed_tokenizer, self.dataset, max_seq_length=4)
+        self.assertEqual(len(glob.glob(f"{self.dataset}.*.bin")), 2)
+        self.assertEqual(second[0][0].tolist(), reversed_tokenizer.text_to_ids("abcd"))
+        self.assertNotEqual(second[0][0].tolist(), first[0][0].tolist())
+
+        # as is the stream with <s> and </s> around every line
+        with_bos_eos = MemmapLanguageModelingDataset(tokenizer, self.dataset, max_seq_length=4, add_bos_eos=True)
+        self.assertEqual(len(glob.glob(f"{self.dataset}.*.bin")), 3)
+        self.assertEqual(with_bos_eos[0][0].tolist(), [tokenizer.bos_id()] + tokenizer.text_to_ids("abc"))
@@ -0,0 +1,102 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from nemo.collections.nlp.data.datasets.state_tracking_trade_dataset import Vocab
+from nemo.collections.nlp.nm.trainables.dialogue_state_tracking.state_tracking_trade_nm import TRADEGenerator
+from tests.common_setup import NeMoUnitTest
+
+
+class TestTRADEGenerator(NeMoUnitTest):
+    def setUp(self) -> None:
+        super().setUp()
+        torch.manual_seed(0)
+        self.vocab = Vocab()
+        for i in range(36):
+            self.vocab.add_word(f"w{i}")
+        hidden_size, batch_size, time_steps = 16, 5, 12
+        self.slots = ["hotel-area", "hotel-name", "train-day", "taxi-leaveat"]
+        self.embedding = nn.Embedding(len(self.vocab), hidden_size)
+        self.generator = TRADEGenerator(self.vocab, self.embedding, hidden_size, 0.0, self.slots, nb_gate=3)
+        self.generator.eval()
+        device = self.generator._device
+        self.embedding.to(device)
+        self.encoder_outputs = torch.randn(batch_size, time_steps, hidden_size, device=device)
+        self.encoder_hidden = torch.randn(batch_size, 1, hidden_size, device=device)
+        self.input_lens = torch.tensor([12, 7, 3, 10, 5], device=device)
+        self.src_ids = torch.randint(0, len(self.vocab), (batch_size, time_steps), device=device)
+        self.targets = torch.randint(0, len(self.vocab), (batch_size, len(self.slots), 6), device=device)
+
+    @torch.no_grad()
+    def _reference(self, max_res_len):
+        """Greedy decoding which repeats the encoder outputs for every slot and
+        builds the dense pointer distribution at every step."""
+        g = self.generator
+        num_slots, batch_size = len(self.slots), self.encoder_outputs.size(0)
+        slot_emb = g.slot_emb(g.domain_idx) + g.slot_emb(g.subslot_idx)
+        decoder_input = slot_emb.unsqueeze(1).repeat(1, batch_size, 1).view(-1, g.hidden_size)
+        hidden = self.encoder_hidden.transpose(0, 1).repeat(num_slots, 1, 1).view(1, -1, g.hidden_size)
+        enc_out = self.encoder_outputs.repeat(num_slots, 1, 1)
+        positions = torch.arange(enc_out.size(1), device=enc_out.device)
+        padding = ~(positions[None, :] <= self.input_lens.repeat(num_slots)[:, None])
+        outputs = []
+        for _ in range(max_res_len):
+            dec_state, hidden = g.rnn(decoder_input.unsqueeze(1), hidden)
+            scores = (hidden[0].unsqueeze(1) * enc_out).sum(2).masked_fill(padding, -float("inf"))
+            prob = F.softmax(scores, dim=1)
+            context = (prob.unsqueeze(2) * enc_out).sum(1)
+            p_vocab = F.softmax(hidden[0] @ self.embedding.weight.t(), dim=1)
+            switch = torch.sigmoid(g.w_ratio(torch.cat([dec_state[:, 0], context, decoder_input], -1)))
+            p_context = torch.zeros_like(p_vocab).scatter_add_(1, self.src_ids.repeat(num_slots, 1), prob)
+            final = (1 - switch) * p_context + switch * p_vocab
+            outputs.append(final.view(num_slots, batch_size, -1).transpose(0, 1))
+            decoder_input = self.embedding(final.argmax(1))
+        return torch.stack(outputs, dim=2)
+
+    def test_forward_matches_reference(self):
+        with torch.no_grad():
+            point_outputs, gate_outputs = self.generator.forward(
+                self.encoder_hidden, self.encoder_outputs, self.input_lens, self.src_ids, self.targets
+            )
+        self.assertEqual(point_outputs.shape, (5, len(self.slots), 6, len(self.vocab)))
+        self.assertEqual(gate_outputs.shape, (5, len(self.slots), 3))
+        self.assertTrue(torch.allclose(point_outputs, self._reference(6), atol=1e-5))
+
+    def test_forward_without_targets(self):
+        with torch.no_grad():
+            point_outputs, _ = self.generator.forward(
+                self.encoder_hidden, self.encoder_outputs, self.input_lens, self.src_ids
+            )
+        self.assertEqual(point_outputs.shape, (5, len(self.slots), self.generator.max_res_len, len(self.vocab)))
+
+    def test_decode_stops_per_slot(self):
+        reference = self._reference(6).argmax(-1)
+        # use the most frequent second token as EOS, so that some slots stop early
+        eos_id = int(reference[:, :, 1].flatten().mode().values)
+        tokens, gate_outputs = self.generator.decode(
+            self.encoder_hidden, self.encoder_outputs, self.input_lens, self.src_ids, max_res_len=6, eos_id=eos_id
+        )
+        self.assertEqual(tokens.shape, (5, len(self.slots), 6))
+        self.assertTrue((tokens == self.vocab.pad_id).any())
+        for expected, decoded in zip(reference.view(-1, 6).tolist(), tokens.view(-1, 6).tolist()):
+            end = expected.index(eos_id) + 1 if eos_id in expected else len(expected)
+            self.assertEqual(decoded[:end], expected[:end])
+            self.assertTrue(all(token == self.vocab.pad_id for token in decoded[end:]))
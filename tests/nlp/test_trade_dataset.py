@@ -0,0 +1,138 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from nemo.collections.nlp.data.datasets.state_tracking_trade_dataset import (
+    BucketingBatchSampler,
+    MultiWOZDataset,
+    Vocab,
+)
+from nemo.collections.nlp.nm.data_layers.state_tracking_trade_datalayer import _pad_ragged
+from tests.common_setup import NeMoUnitTest
+
+SLOTS = ["hotel-area", "hotel-name"]
+DIALOGS = [
+    {
+        "dialogue_idx": "d0",
+        "domains": ["hotel"],
+        "dialogue": [
+            {
+                "system_transcript": "",
+                "transcript": "a hotel in the east",
+                "belief_state": [{"slots": [["hotel-area", "east"]]}],
+                "domain": "hotel",
+                "turn_idx": 0,
+            },
+            {
+                "system_transcript": "which name",
+                "transcript": "the grand",
+                "belief_state": [{"slots": [["hotel-area", "east"]]}, {"slots": [["hotel-name", "grand"]]}],
+                "domain": "hotel",
+                "turn_idx": 1,
+            },
+        ],
+    }
+]
+
+
+class TestTRADEDataset(NeMoUnitTest):
+    def setUp(self):
+        super().setUp()
+        self.data_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.data_dir.name, "train_dials.json"), "w") as f:
+            json.dump(DIALOGS, f)
+        self.vocab = Vocab()
+        for dialog in DIALOGS:
+            for turn in dialog["dialogue"]:
+                self.vocab.add_words(turn["system_transcript"] + " ; " + turn["transcript"] + " ;", "utter")
+        self.vocab.add_words("east grand", "utter")
+
+    def tearDown(self):
+        self.data_dir.cleanup()
+        super().tearDown()
+
+    def _dataset(self, vocab, use_cache=True):
+        return MultiWOZDataset(
+            self.data_dir.name,
+            "train",
+            domains={"hotel": 0},
+            all_domains={"hotel": 0},
+            vocab=vocab,
+            gating_dict={"ptr": 0, "dontcare": 1, "none": 2},
+            slots=SLOTS,
+            use_cache=use_cache,
+        )
+
+    def test_feature_arrays(self):
+        dataset = self._dataset(self.vocab)
+        self.assertEqual(len(dataset), 2)
+        turn = dataset[1]
+        history = "; a hotel in the east ; which name ; the grand ;".split()
+        self.assertEqual(turn["context_ids"].tolist(), self.vocab.tokens2ids(history))
+        self.assertEqual(turn["gating_label"].tolist(), [0, 0])
+        expected = self.vocab.tokens2ids(["east", self.vocab.eos, "grand", self.vocab.eos])
+        self.assertEqual(turn["responses_ids"].tolist(), expected)
+        self.assertEqual(turn["responses_lens"].tolist(), [2, 2])
+        self.assertEqual(dataset[0]["gating_label"].tolist(), [0, 2])
+        self.assertEqual(dataset.lengths().tolist(), [7, len(history)])
+
+    def test_cache_invalidated_by_vocab(self):
+        self._dataset(self.vocab)
+        self.assertTrue(os.path.exists(os.path.join(self.data_dir.name, "train_trade_features.pkl")))
+        restored = self._dataset(self.vocab)
+        built = self._dataset(self.vocab, use_cache=False)
+        self.assertEqual(restored[1]["context_ids"].tolist(), built[1]["context_ids"].tolist())
+
+        # the same number of words with different ids must not reuse the cached ids
+        other = Vocab()
+        other.add_words("grand east the ; a hotel in which name", "utter")
+        self.assertEqual(len(other), len(self.vocab))
+        rebuilt = self._dataset(other)
+        expected = other.tokens2ids(["east", other.eos, "grand", other.eos])
+        self.assertEqual(rebuilt[1]["responses_ids"].tolist(), expected)
+
+    def test_bucketing_batch_sampler(self):
+        lengths = np.random.RandomState(0).randint(1, 50, size=103)
+        sampler = BucketingBatchSampler(lengths, batch_size=8, bucket_size_multiplier=4, num_replicas=1, rank=0)
+        sampler.set_epoch(1)
+        batches = list(sampler)
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(sorted(sum(batches, [])), list(range(103)))
+        for batch in batches:
+            self.assertEqual(sorted(lengths[batch].tolist(), reverse=True), lengths[batch].tolist())
+
+        # fewer batches than replicas, every rank still gets a batch
+        samplers = [BucketingBatchSampler(lengths[:20], batch_size=8, num_replicas=4, rank=rank) for rank in range(4)]
+        epoch = []
+        for sampler in samplers:
+            sampler.set_epoch(1)
+            epoch.append(list(sampler))
+            self.assertEqual(len(epoch[-1]), len(sampler))
+        self.assertEqual([len(batches) for batches in epoch], [1, 1, 1, 1])
+        self.assertEqual(sorted(set(sum(sum(epoch, []), []))), list(range(20)))
+
+    def test_pad_ragged(self):
+        sequences = [np.array([1, 2, 3]), np.array([4]), np.array([], dtype=np.int64)]
+        padded = _pad_ragged(sequences, np.array([3, 1, 0]), pad_id=9)
+        self.assertEqual(padded.tolist(), [[1, 2, 3], [4, 9, 9], [9, 9, 9]])
+        self.assertEqual(_pad_ragged([np.array([], dtype=np.int64)], np.array([0]), pad_id=0).shape, (1, 1))
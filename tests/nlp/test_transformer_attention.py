@@ -0,0 +1,75 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_encoders import TransformerEncoder
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import (
+    MultiHeadAttention,
+    TransformerEmbedding,
+)
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_utils import (
+    form_attention_mask,
+    get_future_mask,
+    packed_position_ids,
+)
+from tests.common_setup import NeMoUnitTest
+
+
+class TestTransformerAttention(NeMoUnitTest):
+    def setUp(self) -> None:
+        super().setUp()
+        torch.manual_seed(0)
+
+    def test_future_mask_cache(self):
+        get_future_mask(16, 0)
+        for length in [1, 5, 16, 20]:
+            for diagonal in [-1, 0]:
+                expected = torch.tril(torch.ones(length, length).byte(), diagonal)
+                self.assertTrue(torch.equal(get_future_mask(length, diagonal), expected))
+
+    def test_fused_attention_matches_reference(self):
+        attention = MultiHeadAttention(32, 4).eval()
+        states = torch.randn(3, 7, 32)
+        input_mask = torch.ones(3, 7)
+        input_mask[1, 4:] = 0
+        for diagonal in [None, 0]:
+            attention_mask = form_attention_mask(input_mask, diagonal)
+            attention.use_fused_attention = True
+            fused = attention(states, states, states, attention_mask)
+            attention.use_fused_attention = False
+            expected = attention(states, states, states, attention_mask)
+            self.assertTrue(torch.allclose(fused, expected, atol=1e-5))
+
+    def test_packed_sequences(self):
+        embedding = TransformerEmbedding(20, 32).eval()
+        encoder = TransformerEncoder(2, 32, mask_future=True, inner_size=64, num_attention_heads=4).eval()
+        sequences = [[3, 4, 5], [6, 7], [8, 9, 10, 11]]
+
+        # first row holds two sequences, second row holds one padded sequence
+        input_ids = torch.tensor([[3, 4, 5, 6, 7], [8, 9, 10, 11, 0]])
+        seq_lengths = torch.tensor([[3, 2], [4, 0]])
+        position_ids = packed_position_ids(seq_lengths, input_ids.size(1))
+        packed = encoder(embedding(input_ids, position_ids=position_ids), None, seq_lengths=seq_lengths)
+
+        offsets = [(0, 0), (0, 3), (1, 0)]
+        for ids, (row, start) in zip(sequences, offsets):
+            ids = torch.tensor([ids])
+            expected = encoder(embedding(ids), torch.ones_like(ids))
+            result = packed[row : row + 1, start : start + ids.size(1)]
+            self.assertTrue(torch.allclose(result, expected, atol=1e-5))
@@ -0,0 +1,76 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import torch
+import torch.nn as nn
+
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_decoders import TransformerDecoder
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_generators import GreedySequenceGenerator
+from nemo.collections.nlp.nm.trainables.common.transformer.transformer_modules import TransformerEmbedding
+from nemo.collections.nlp.utils.common_nlp_utils import mask_padded_tokens
+from tests.common_setup import NeMoUnitTest
+
+
+class TestGreedySequenceGenerator(NeMoUnitTest):
+    def setUp(self) -> None:
+        super().setUp()
+        torch.manual_seed(0)
+        vocab_size, hidden_size = 40, 32
+        self.embedding = TransformerEmbedding(vocab_size, hidden_size).eval()
+        self.decoder = TransformerDecoder(2, hidden_size, inner_size=64, num_attention_heads=4).eval()
+        self.log_softmax = nn.Sequential(nn.Linear(hidden_size, vocab_size), nn.LogSoftmax(dim=-1)).eval()
+        with torch.no_grad():
+            # make some sequences finish earlier than others
+            self.log_softmax[0].bias[2] += 0.5
+        self.src = torch.randn(6, 5, hidden_size)
+        self.src_mask = torch.ones(6, 5)
+        self.src_mask[2, 3:] = 0
+        self.generator = GreedySequenceGenerator(
+            self.embedding, self.decoder, self.log_softmax, max_sequence_length=40, max_delta_length=30
+        )
+
+    @torch.no_grad()
+    def _reference(self):
+        """Greedy decoding which recomputes the whole prefix at every step."""
+        tgt = torch.ones(self.src.size(0), 1).long()
+        finished = torch.zeros(self.src.size(0)).bool()
+        for _ in range(34):
+            hiddens = self.embedding(tgt)
+            mask = mask_padded_tokens(tgt, 0).float()
+            hiddens = self.decoder(hiddens, mask, self.src, self.src_mask)
+            next_tokens = self.log_softmax(hiddens)[:, -1].argmax(-1)
+            next_tokens = next_tokens.masked_fill(finished, 0)
+            finished = finished | (next_tokens == 2)
+            tgt = torch.cat((tgt, next_tokens.unsqueeze(1)), dim=1)
+            if finished.all():
+                break
+        return tgt
+
+    def test_cached_greedy_matches_reference(self):
+        expected = self._reference()
+        result = self.generator(encoder_hidden_states=self.src, encoder_input_mask=self.src_mask)
+        self.assertTrue(torch.equal(expected, result))
+
+    def test_generate(self):
+        expected = self._reference().tolist()
+        result = self.generator.generate(
+            encoder_hidden_states=self.src, encoder_input_mask=self.src_mask, batch_size=4
+        )
+        for ids, expected_ids in zip(result, expected):
+            self.assertEqual(ids, expected_ids[: len(ids)])
+            self.assertTrue(ids[-1] == 2 or len(ids) == len(expected_ids))
@@ -0,0 +1,147 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import socket
+import tempfile
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.distributed.algorithms.ddp_comm_hooks import default_hooks
+
+import nemo
+from nemo.backends.pytorch.distributed import GradientAccumulator, wrap_ddp
+from tests.common_setup import NeMoUnitTest
+from tests.test_streaming import SineStreamDataLayer
+
+WORLD_SIZE = 2
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _set_env(rank, port):
+    os.environ.update(MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port), RANK=str(rank), WORLD_SIZE=str(WORLD_SIZE))
+
+
+def _accumulation_worker(rank, port, fp16_compression, output_dir):
+    _set_env(rank, port)
+    dist.init_process_group(backend="gloo", init_method="env://")
+    torch.manual_seed(0)
+    module = wrap_ddp(torch.nn.Linear(4, 1), implementation="torch", bucket_cap_mb=1)
+    num_allreduces = [0]
+
+    def counting_hook(state, bucket):
+        num_allreduces[0] += 1
+        if fp16_compression:
+            return default_hooks.fp16_compress_hook(state, bucket)
+        return default_hooks.allreduce_hook(state, bucket)
+
+    module.register_comm_hook(state=None, hook=counting_hook)
+    accumulator = GradientAccumulator(batches_per_step=3, modules=[module])
+    # rank dependent data, micro-batch i of rank r is filled with r + i
+    for i in range(3):
+        with accumulator.micro_batch(i):
+            loss = module(torch.full((2, 4), float(rank + i))).sum()
+            accumulator.scale_loss(loss).backward()
+    torch.save(
+        {"num_allreduces": num_allreduces[0], "grad": module.module.weight.grad.clone()},
+        os.path.join(output_dir, f"rank{rank}.pt"),
+    )
+    dist.destroy_process_group()
+
+
+def _train_worker(rank, port, output_dir):
+    _set_env(rank, port)
+    nf = nemo.core.NeuralModuleFactory(local_rank=rank, placement=nemo.core.DeviceType.CPU, random_seed=rank)
+    dl = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=64, batch_size=4)
+    fx = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+    loss = nemo.backends.pytorch.tutorials.MSELoss()
+    x, y = dl()
+    l_tensor = loss(predictions=fx(x=x), target=y)
+    nf.train(
+        [l_tensor],
+        optimizer="sgd",
+        optimization_params={"max_steps": 4, "lr": 0.01},
+        batches_per_step=2,
+        ddp="torch",
+        ddp_bucket_cap_mb=1,
+        ddp_fp16_compression=True,
+    )
+    torch.save({"step": nf._trainer.step, "state": fx.state_dict()}, os.path.join(output_dir, f"rank{rank}.pt"))
+    dist.destroy_process_group()
+
+
+def _streaming_worker(rank, port, output_dir):
+    _set_env(rank, port)
+    nf = nemo.core.NeuralModuleFactory(local_rank=rank, placement=nemo.core.DeviceType.CPU, random_seed=rank)
+    # the ranks get 21 and 20 points of the stream
+    dl = SineStreamDataLayer(batch_size=4, n=41)
+    fx = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+    loss = nemo.backends.pytorch.tutorials.MSELoss()
+    x, y = dl()
+    l_tensor = loss(predictions=fx(x=x), target=y)
+    result = {"raised": False}
+    try:
+        nf.train([l_tensor], optimizer="sgd", optimization_params={"num_epochs": 1, "lr": 0.01}, ddp="torch")
+    except ValueError:
+        result["raised"] = True
+    nf.train(
+        [l_tensor],
+        optimizer="sgd",
+        optimization_params={"num_epochs": 2, "steps_per_epoch": 7, "lr": 0.01},
+        ddp="torch",
+        reset=True,
+    )
+    result["step"] = nf._trainer.step
+    torch.save(result, os.path.join(output_dir, f"rank{rank}.pt"))
+    dist.destroy_process_group()
+
+
+class DistributedTest(NeMoUnitTest):
+    def spawn(self, worker, *args):
+        with tempfile.TemporaryDirectory() as output_dir:
+            mp.spawn(worker, args=(_free_port(),) + args + (output_dir,), nprocs=WORLD_SIZE)
+            return [torch.load(os.path.join(output_dir, f"rank{rank}.pt")) for rank in range(WORLD_SIZE)]
+
+    def test_gradient_accumulation_allreduces_once(self):
+        for fp16_compression in [False, True]:
+            results = self.spawn(_accumulation_worker, fp16_compression)
+            # inputs of all micro-batches and ranks summed: 2 rows * (0+1+2 + 1+2+3)
+            expected = torch.full((1, 4), 2.0 * 9 / 3 / WORLD_SIZE)
+            for result in results:
+                self.assertEqual(result["num_allreduces"], 1)
+                self.assertTrue(torch.allclose(result["grad"], expected))
+
+    def test_train_with_torch_ddp(self):
+        results = self.spawn(_train_worker)
+        for result in results:
+            self.assertEqual(result["step"], 4)
+        for name, value in results[0]["state"].items():
+            self.assertTrue(torch.equal(value, results[1]["state"][name]))
+
+    def test_streaming_needs_steps_per_epoch(self):
+        results = self.spawn(_streaming_worker)
+        for result in results:
+            self.assertTrue(result["raised"])
+            self.assertEqual(result["step"], 14)
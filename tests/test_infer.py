@@ -122,3 +122,34 @@ class TestInfer(NeMoUnitTest):
                 tensors=[twenty_tensor, thirty_tensor], verbose=False, cache=True, use_cache=True
             )
         self.assertEqual(evaluated_tensors[0][0].squeeze().data, 10)
+
+    def test_compile_inference(self):
+        neural_factory = nemo.core.neural_factory.NeuralModuleFactory(
+            backend=nemo.core.Backend.PyTorch, create_tb_writer=False
+        )
+
+        data_source = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=10, batch_size=2)
+        first_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        second_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=2)
+
+        x, y = data_source()
+        y_first = first_module(x=x)
+        y_pred = second_module(x=y_first)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()(predictions=y_pred, target=y)
+
+        x_value, y_value = torch.rand(5, 1), torch.rand(5, 1)
+        with torch.no_grad():
+            expected_first = first_module.forward(x_value)
+            expected = second_module.forward(expected_first)
+
+        run = neural_factory.compile_inference(inputs=[x], outputs=y_pred)
+        self.assertTrue(torch.allclose(run(x_value), expected))
+        self.assertTrue(torch.allclose(run(x=x_value.numpy()), expected))
+
+        run = neural_factory.compile_inference(inputs={"inp": x, "target": y}, outputs=[y_first, loss])
+        result_first, result_loss = run(inp=x_value, target=y_value)
+        self.assertTrue(torch.allclose(result_first, expected_first))
+        self.assertTrue(torch.allclose(result_loss, torch.nn.functional.mse_loss(expected, y_value)))
+
+        with self.assertRaisesRegex(ValueError, "not among inputs"):
+            neural_factory.compile_inference(inputs=[x], outputs=loss)
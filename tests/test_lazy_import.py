@@ -0,0 +1,99 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# =============================================================================
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import os
+import subprocess
+import sys
+
+from tests.common_setup import NeMoUnitTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LazyImportTest(NeMoUnitTest):
+    def run_python(self, code):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+        output = subprocess.check_output([sys.executable, "-c", code], env=env, cwd=ROOT, stderr=subprocess.DEVNULL)
+        return output.decode().strip().splitlines()[-1]
+
+    def test_collections_do_not_import_heavy_dependencies(self):
+        heavy = ["torchvision", "transformers", "sentencepiece", "youtokentome", "librosa", "kaldi_io", "inflect"]
+        loaded = self.run_python(
+            "import sys\n"
+            "import nemo.collections.asr, nemo.collections.nlp, nemo.collections.tts\n"
+            f"print([m for m in {heavy!r} if m in sys.modules])"
+        )
+        self.assertEqual(loaded, "[]")
+
+    def test_attributes_load_on_first_access(self):
+        loaded = self.run_python(
+            "import sys\n"
+            "import nemo.collections.asr as nemo_asr\n"
+            "assert 'nemo.collections.asr.jasper' not in sys.modules\n"
+            "encoder = nemo_asr.JasperEncoder\n"
+            "assert encoder is nemo_asr.jasper.JasperEncoder\n"
+            "print(['librosa' in sys.modules, 'nemo.collections.asr.data_layer' in sys.modules])"
+        )
+        self.assertEqual(loaded, "[False, False]")
+
+    def test_star_imports_and_submodules(self):
+        import nemo.collections.asr as nemo_asr
+        import nemo.collections.nlp as nemo_nlp
+        from nemo.collections.asr.jasper import JasperEncoder
+        from nemo.collections.nlp.data.tokenizers.bert_tokenizer import NemoBertTokenizer
+        from nemo.collections.nlp.nm.trainables.common.huggingface.bert_nm import BERT
+
+        self.assertIs(nemo_asr.JasperEncoder, JasperEncoder)
+        self.assertIn("AudioToMelSpectrogramPreprocessor", nemo_asr.__all__)
+        self.assertIn("JasperEncoder", dir(nemo_asr))
+        self.assertIs(nemo_nlp.data.NemoBertTokenizer, NemoBertTokenizer)
+        self.assertIs(nemo_nlp.nm.trainables.huggingface.BERT, BERT)
+
+        namespace = {}
+        exec("from nemo.collections.nlp.nm.trainables import *", namespace)
+        self.assertIs(namespace["huggingface"].BERT, BERT)
+        self.assertIn("TokenClassifier", namespace)
+
+        with self.assertRaises(AttributeError):
+            nemo_asr.NoSuchModule
+
+    def test_star_imports_export_submodules(self):
+        exported = self.run_python(
+            "namespace = {}\n"
+            "exec('from nemo.collections.nlp import *', namespace)\n"
+            "print(sorted(name for name in namespace if name != '__builtins__'))"
+        )
+        self.assertEqual(exported, str(["backend", "callbacks", "data", "metrics", "nm", "utils"]))
+
+        namespace = {}
+        exec("from nemo.collections.nlp.nm.losses import *", namespace)
+        self.assertIn("smoothed_cross_entropy_loss", namespace)
+        self.assertNotIn("lazy_attributes", namespace)
+        exec("from nemo.backends.pytorch import *", namespace)
+        self.assertIn("torchvision", namespace)
+        self.assertIn("PtActions", namespace)
+        self.assertNotIn("lazy_attributes", namespace)
+
+    def test_text_data_layer_does_not_import_datasets(self):
+        loaded = self.run_python(
+            "import sys\n"
+            "import nemo.collections.nlp.nm.data_layers.text_datalayer\n"
+            "print([m for m in sys.modules if m.startswith('nemo.collections.nlp.data.datasets.')])"
+        )
+        self.assertEqual(loaded, "[]")
@@ -0,0 +1,75 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+from collections import Counter
+
+import nemo
+from nemo.backends.pytorch.samplers import MixtureSampler
+from tests.common_setup import NeMoUnitTest
+
+
+class TestMixture(NeMoUnitTest):
+    def test_mixture_sampler(self):
+        sampler = MixtureSampler([10, 100000], [3, 1], num_samples=402, seed=5)
+        sampler.set_epoch(1)
+        items = list(sampler)
+        self.assertEqual(len(items), 402)
+        counts = Counter(source for source, _ in items)
+        self.assertAlmostEqual(counts[0] / 402, 0.75, delta=0.1)
+        # the small source is read in complete passes before repeating
+        small = [index for source, index in items if source == 0]
+        for start in range(0, len(small) - 10, 10):
+            self.assertEqual(sorted(small[start : start + 10]), list(range(10)))
+        large = [index for source, index in items if source == 1]
+        self.assertEqual(len(set(large)), len(large))
+        self.assertTrue(all(0 <= index < 100000 for index in large))
+
+        # same mixture for the same seed and epoch, split between ranks
+        ranks = [
+            MixtureSampler([10, 100000], [3, 1], num_samples=400, num_replicas=3, rank=rank, seed=5)
+            for rank in range(3)
+        ]
+        for rank in ranks:
+            rank.set_epoch(1)
+        self.assertEqual([len(rank) for rank in ranks], [134, 134, 134])
+        for r, rank in enumerate(ranks):
+            self.assertEqual(list(rank), items[r::3])
+        sampler.set_epoch(2)
+        self.assertNotEqual(list(sampler), items)
+
+        with self.assertRaises(ValueError):
+            MixtureSampler([10, 0], [0, 1], num_samples=10)
+
+    def test_mixture_data_layer(self):
+        sources = [nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=n, batch_size=8) for n in (40, 360)]
+        uniform = nemo.backends.pytorch.common.MixtureDataLayer(sources, batch_size=16, temperature=1000.0)
+        self.assertAlmostEqual(uniform.probabilities[0], 0.5, delta=0.01)
+        data_layer = nemo.backends.pytorch.common.MixtureDataLayer(sources, batch_size=16, num_samples=160)
+        self.assertEqual(data_layer.probabilities, [0.1, 0.9])
+        self.assertEqual(len(data_layer), 160)
+        self.assertEqual(data_layer.output_ports.keys(), sources[0].output_ports.keys())
+
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_layer()
+        loss_tensor = loss(predictions=trainable_module(x=x), target=y)
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor], optimizer="sgd", optimization_params={"lr": 0.0003, "num_epochs": 2},
+        )
+        self.assertEqual(optimizer.step, 20)
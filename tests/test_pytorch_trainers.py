@@ -16,11 +16,20 @@
 # limitations under the License.
 # =============================================================================
 
+import json
+import os
+import tempfile
+from collections import namedtuple
+
+import torch
+
 import nemo
 from tests.common_setup import NeMoUnitTest
 
 logging = nemo.logging
 
+Point = namedtuple("Point", ["x", "y"])
+
 
 class TestPytorchTrainers(NeMoUnitTest):
     def test_simple_train(self):
@@ -74,3 +83,211 @@ class TestPytorchTrainers(NeMoUnitTest):
         optimizer.train(
             tensors_to_optimize=[loss_tensor], optimizer="sgd", optimization_params={"lr": 0.0003, "num_epochs": 1},
         )
+
+    def test_async_checkpointing(self):
+        logging.info("Asynchronous checkpointing test")
+        data_source = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=640, batch_size=32)
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        loss_tensor = loss(predictions=y_pred, target=y)
+
+        with tempfile.TemporaryDirectory() as folder:
+            callback = nemo.core.CheckpointCallback(
+                folder=folder, step_freq=5, checkpoints_to_keep=2, async_save=True, shard_optimizer_state=True
+            )
+            optimizer = nemo.backends.pytorch.actions.PtActions()
+            optimizer.train(
+                tensors_to_optimize=[loss_tensor],
+                callbacks=[callback],
+                optimizer="adam",
+                optimization_params={"lr": 0.0003, "num_epochs": 1},
+            )
+            self.assertEqual(
+                sorted(os.listdir(folder)),
+                [
+                    "TaylorNet-STEP-15.pt",
+                    "TaylorNet-STEP-20.pt",
+                    "optimizer-rank0-STEP-15.pt",
+                    "optimizer-rank0-STEP-20.pt",
+                    "trainer-STEP-15.pt",
+                    "trainer-STEP-20.pt",
+                ],
+            )
+            weights = torch.load(os.path.join(folder, "TaylorNet-STEP-20.pt"))
+            for name, value in trainable_module.state_dict().items():
+                self.assertTrue(torch.equal(weights[name], value))
+
+            restored = nemo.backends.pytorch.actions.PtActions()
+            restored.create_optimizer("adam", [trainable_module], optimizer_params={"lr": 0.0003})
+            callback = nemo.core.CheckpointCallback(folder=folder, step_freq=5, shard_optimizer_state=True)
+            callback.action = restored
+            callback.on_action_start()
+            self.assertEqual(restored.step, 20)
+            self.assertEqual(restored.optimizers[0].state_dict()["state"][0]["step"], 20)
+
+            # other ranks only write and prune their own optimizer shards
+            restored._global_rank = 1
+            callback = nemo.core.CheckpointCallback(
+                folder=folder, step_freq=5, checkpoints_to_keep=1, shard_optimizer_state=True
+            )
+            callback.action = restored
+            for step in [25, 30]:
+                restored.step = step
+                callback.on_iteration_end()
+            self.assertIn("optimizer-rank1-STEP-30.pt", os.listdir(folder))
+            self.assertNotIn("optimizer-rank1-STEP-25.pt", os.listdir(folder))
+            self.assertIn("trainer-STEP-20.pt", os.listdir(folder))
+
+    def test_state_to_cpu(self):
+        state = nemo.backends.pytorch.tutorials.TaylorNet(dim=4).state_dict()
+        copied = nemo.utils.helpers.state_to_cpu({"model": state, "point": Point(torch.ones(1), [torch.zeros(2)])})
+        self.assertEqual(type(copied["model"]), type(state))
+        self.assertEqual(copied["model"]._metadata, state._metadata)
+        self.assertEqual(list(copied["model"].keys()), list(state.keys()))
+        self.assertIsNot(copied["model"]["fc1.weight"], state["fc1.weight"])
+        self.assertIsInstance(copied["point"], Point)
+        self.assertTrue(torch.equal(copied["point"].y[0], torch.zeros(2)))
+
+    def test_profiled_train(self):
+        logging.info("Profiled train test")
+        data_source = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=640, batch_size=32)
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_source()
+        y_pred = trainable_module(x=x)
+        loss_tensor = loss(predictions=y_pred, target=y)
+
+        with tempfile.TemporaryDirectory() as folder:
+            jsonl_path = os.path.join(folder, "profile.jsonl")
+            trace_path = os.path.join(folder, "trace.json")
+            profiler = nemo.backends.pytorch.StepProfiler(
+                sample_every=2, window=3, use_cuda_events=False, jsonl_path=jsonl_path, chrome_trace_path=trace_path
+            )
+            optimizer = nemo.backends.pytorch.actions.PtActions()
+            optimizer.train(
+                tensors_to_optimize=[loss_tensor],
+                optimizer="sgd",
+                optimization_params={"lr": 0.0003, "num_epochs": 1},
+                profiler=profiler,
+            )
+
+            with open(jsonl_path) as f:
+                reports = [json.loads(line) for line in f]
+            # 10 of 20 steps are sampled, reported in windows of 3 steps
+            self.assertEqual([report["step"] for report in reports], [4, 10, 16, 20])
+            stages = reports[0]["stages"]
+            for name in ["data", "to_device", "forward", "forward/TaylorNet", "backward", "optimizer_step"]:
+                self.assertEqual(stages[name]["count"], 3)
+                self.assertLessEqual(stages[name]["p50_ms"], stages[name]["p99_ms"])
+
+            with open(trace_path) as f:
+                events = json.load(f)["traceEvents"]
+            self.assertEqual(sorted({event["args"]["step"] for event in events}), list(range(0, 20, 2)))
+
+    def test_nonfinite_loss_skips_step(self):
+        data_source = nemo.backends.pytorch.tutorials.RealFunctionDataLayer(n=640, batch_size=32)
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_source()
+        loss_tensor = loss(predictions=trainable_module(x=x), target=y)
+
+        class SkippedStepsCallback(nemo.core.ActionCallback):
+            def __init__(self):
+                super().__init__()
+                self.skipped = []
+
+            def on_iteration_end(self):
+                self.skipped.append(self.skipped_steps)
+
+        callback = SkippedStepsCallback()
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        # the loss diverges to inf after a few steps with this learning rate
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor],
+            optimizer="sgd",
+            optimization_params={"lr": 1e12, "num_epochs": 1},
+            batches_per_step=2,
+            callbacks=[callback],
+        )
+        self.assertGreater(optimizer.skipped_steps, 0)
+        self.assertEqual(len(callback.skipped), 10)
+        self.assertEqual(callback.skipped[-1], optimizer.skipped_steps)
+        for parameter in trainable_module.parameters():
+            self.assertTrue(torch.isfinite(parameter).all())
+
+        with self.assertRaises(ValueError):
+            nemo.backends.pytorch.actions.PtActions().train(
+                tensors_to_optimize=[loss_tensor],
+                optimizer="sgd",
+                optimization_params={"lr": 1e12, "num_epochs": 1},
+                stop_on_nan_loss=True,
+            )
+
+    def _nonfinite_step(self, module, optimizer, guard):
+        """Takes a finite and a NaN step and returns the parameters and the
+        optimizer state from before the NaN step"""
+        x = torch.randn(8, 4)
+        for loss_scale in [1.0, float("nan")]:
+            params = [p.detach().clone() for p in module.parameters()]
+            state = [v.clone() for p in module.parameters() for v in optimizer.state[p].values()]
+            optimizer.zero_grad()
+            loss = module(x).pow(2).sum() * loss_scale
+            guard.check(loss)
+            loss.backward()
+            guard.step(optimizer, list(module.parameters()))
+            guard.end_step(0)
+        guard.flush()
+        self.assertEqual(guard.skipped_steps, 1)
+        return params, state
+
+    def test_nonfinite_loss_keeps_optimizer_state(self):
+        for optimizer_class, kwargs, rollback in [
+            (torch.optim.SGD, {"lr": 0.1, "momentum": 0.9, "weight_decay": 0.1}, True),
+            (torch.optim.Adam, {"lr": 0.1, "weight_decay": 0.1}, True),
+            # skipped on the device through found_inf, without copies
+            (torch.optim.Adam, {"lr": 0.1, "weight_decay": 0.1, "fused": True}, False),
+        ]:
+            module = torch.nn.Linear(4, 2)
+            optimizer = optimizer_class(module.parameters(), **kwargs)
+            guard = nemo.backends.pytorch.loss_guard.NonFiniteLossGuard("cpu", rollback=rollback)
+            params, state = self._nonfinite_step(module, optimizer, guard)
+            # the step with the NaN loss changed neither parameters nor momentum or running averages
+            for p, old in zip(module.parameters(), params):
+                self.assertTrue(torch.equal(p, old))
+            restored = [v for p in module.parameters() for v in optimizer.state[p].values()]
+            self.assertEqual(len(restored), len(state))
+            for v, old in zip(restored, state):
+                self.assertTrue(torch.equal(v, old))
+            self.assertFalse(hasattr(optimizer, "found_inf"))
+
+        # other optimizers step with zeroed gradients
+        module = torch.nn.Linear(4, 2)
+        optimizer = torch.optim.SGD(module.parameters(), lr=0.1)
+        guard = nemo.backends.pytorch.loss_guard.NonFiniteLossGuard("cpu")
+        params, _ = self._nonfinite_step(module, optimizer, guard)
+        for p, old in zip(module.parameters(), params):
+            self.assertTrue(torch.equal(p, old))
+            self.assertTrue(torch.equal(p.grad, torch.zeros_like(p)))
+        self.assertEqual(guard._snapshots, {})
+
+    def test_rollback_snapshots_per_optimizer(self):
+        modules = [torch.nn.Linear(4, 2), torch.nn.Linear(4, 2)]
+        optimizers = [torch.optim.Adam(module.parameters(), lr=0.1) for module in modules]
+        guard = nemo.backends.pytorch.loss_guard.NonFiniteLossGuard("cpu", rollback=True)
+        x = torch.randn(8, 4)
+        snapshots = []
+        for step in range(6):
+            module, optimizer = modules[step % 2], optimizers[step % 2]
+            optimizer.zero_grad()
+            loss = module(x).pow(2).sum()
+            guard.check(loss)
+            loss.backward()
+            guard.step(optimizer, list(module.parameters()))
+            guard.end_step(step)
+            snapshots.append(guard._snapshots[id(optimizer)][1])
+        # alternating optimizers reuse their copies once their state exists
+        self.assertEqual(len(guard._snapshots), 2)
+        self.assertIs(snapshots[2], snapshots[4])
+        self.assertIs(snapshots[3], snapshots[5])
@@ -0,0 +1,159 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import tempfile
+
+import torch
+from torch.utils.data import Dataset
+
+import nemo
+from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.backends.pytorch.samplers import ResumableDistributedSampler
+from nemo.backends.pytorch.streaming import make_dataloader
+from nemo.core.neural_types import *
+from tests.common_setup import NeMoUnitTest
+
+
+class RecordingDataset(Dataset):
+    """(x, sin(x)) points which records the indices it reads"""
+
+    def __init__(self, n):
+        self.n = n
+        self.read = []
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, index):
+        self.read.append(index)
+        x = torch.tensor([index / 10.0 - 2.0])
+        return x, torch.sin(x)
+
+
+class RecordingDataLayer(DataLayerNM):
+    @property
+    def output_ports(self):
+        return {
+            "x": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag)}),
+            "y": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag)}),
+        }
+
+    def __init__(self, dataset, batch_size):
+        super().__init__()
+        self._batch_size = batch_size
+        self._num_workers = 0
+        self._shuffle = True
+        self._dataset = dataset
+
+    def __len__(self):
+        return len(self._dataset)
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    @property
+    def data_iterator(self):
+        return None
+
+
+class Preemption(nemo.core.ActionCallback):
+    def __init__(self, step):
+        super().__init__()
+        self._preempt_step = step
+
+    def on_iteration_end(self):
+        if self.step == self._preempt_step:
+            raise KeyboardInterrupt
+
+
+class TestSamplers(NeMoUnitTest):
+    def test_resumable_distributed_sampler(self):
+        dataset = list(range(10))
+        samplers = [ResumableDistributedSampler(dataset, num_replicas=3, rank=rank, seed=1) for rank in range(3)]
+        for sampler in samplers:
+            sampler.set_epoch(2)
+        epoch = [list(sampler) for sampler in samplers]
+        self.assertEqual([len(indices) for indices in epoch], [4, 4, 4])
+        # every index is read, padded with the first ones of the permutation
+        self.assertEqual(sorted(set(sum(epoch, []))), dataset)
+        torch_sampler = torch.utils.data.distributed.DistributedSampler(dataset, num_replicas=3, rank=1, seed=1)
+        torch_sampler.set_epoch(2)
+        self.assertEqual(epoch[1], list(torch_sampler))
+
+        sampler = samplers[1]
+        sampler.advance(3)
+        state = sampler.state_dict()
+        self.assertEqual(state, {"seed": 1, "epoch": 2, "offset": 3})
+
+        restored = ResumableDistributedSampler(dataset, num_replicas=3, rank=1)
+        restored.load_state_dict(state)
+        restored.set_epoch(2)
+        self.assertEqual(list(restored), epoch[1][3:])
+        # the following epoch starts from the beginning
+        restored.set_epoch(3)
+        self.assertEqual(len(list(restored)), 4)
+        self.assertNotEqual(list(restored), epoch[1])
+
+    def test_single_process_seed(self):
+        # without a seed of the factory, the order follows the torch seed of the process
+        for seed in [12, 34]:
+            torch.manual_seed(seed)
+            _, sampler = make_dataloader(RecordingDataLayer(RecordingDataset(10), batch_size=4), distributed=False)
+            self.assertEqual(sampler.seed, seed)
+        # the order of single-process runs follows the seed of the factory
+        nemo.core.NeuralModuleFactory(placement=self.nf.placement, random_seed=7)
+        _, sampler = make_dataloader(RecordingDataLayer(RecordingDataset(10), batch_size=4), distributed=False)
+        self.assertEqual(sampler.seed, 7)
+        sampler.set_epoch(1)
+        expected = ResumableDistributedSampler(list(range(10)), num_replicas=1, rank=0, seed=7)
+        expected.set_epoch(1)
+        self.assertEqual(list(sampler), list(expected))
+
+    def _train(self, dataset, callbacks):
+        data_layer = RecordingDataLayer(dataset, batch_size=4)
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_layer()
+        loss_tensor = loss(predictions=trainable_module(x=x), target=y)
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor],
+            optimizer="sgd",
+            optimization_params={"lr": 0.0003, "num_epochs": 3},
+            callbacks=callbacks,
+        )
+        return optimizer
+
+    def test_resume_mid_epoch(self):
+        uninterrupted = RecordingDataset(40)
+        self._train(uninterrupted, callbacks=[])
+        self.assertEqual(len(uninterrupted.read), 120)
+
+        interrupted = RecordingDataset(40)
+        with tempfile.TemporaryDirectory() as folder:
+            with self.assertRaises(KeyboardInterrupt):
+                callbacks = [nemo.core.CheckpointCallback(folder, step_freq=13), Preemption(13)]
+                self._train(interrupted, callbacks=callbacks)
+            # 14 batches were consumed when the checkpoint of step 13 was saved
+            self.assertEqual(interrupted.read, uninterrupted.read[:56])
+
+            interrupted.read = []
+            self._train(interrupted, callbacks=[nemo.core.CheckpointCallback(folder, step_freq=13)])
+        # the second epoch continues with its fifth batch
+        self.assertEqual(interrupted.read, uninterrupted.read[56:])
@@ -0,0 +1,128 @@
+# ! /usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Copyright 2020 NVIDIA. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# =============================================================================
+
+import itertools
+
+import torch
+from torch.utils.data import DataLoader, IterableDataset
+
+import nemo
+from nemo.backends.pytorch.nm import DataLayerNM
+from nemo.backends.pytorch.streaming import shard_for_worker
+from nemo.core.neural_types import *
+from tests.common_setup import NeMoUnitTest
+
+
+class SineStream(IterableDataset):
+    """(x, sin(x)) pairs of a finite or endless stream of points"""
+
+    def __init__(self, n=None, rank=None, world_size=None):
+        self.n = n
+        self.rank = rank
+        self.world_size = world_size
+
+    def __iter__(self):
+        points = itertools.count() if self.n is None else range(self.n)
+        for i in shard_for_worker(points, self.rank, self.world_size):
+            x = torch.tensor([(i % 100) / 25.0 - 2.0])
+            yield x, torch.sin(x)
+
+
+class SineStreamDataLayer(DataLayerNM):
+    @property
+    def output_ports(self):
+        return {
+            "x": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag)}),
+            "y": NeuralType({0: AxisType(BatchTag), 1: AxisType(ChannelTag)}),
+        }
+
+    def __init__(self, batch_size, n=None):
+        super().__init__()
+        self._batch_size = batch_size
+        self._num_workers = 0
+        self._dataset = SineStream(n)
+
+    def __len__(self):
+        raise TypeError("SineStreamDataLayer has no length")
+
+    @property
+    def dataset(self):
+        return self._dataset
+
+    @property
+    def data_iterator(self):
+        return None
+
+
+class EpochCounter(nemo.core.ActionCallback):
+    def __init__(self):
+        super().__init__()
+        self.epoch_steps = []
+
+    def on_epoch_start(self):
+        self.epoch_steps.append(self.step)
+
+
+class TestStreaming(NeMoUnitTest):
+    def test_shard_for_worker(self):
+        seen = []
+        for rank in range(2):
+            loader = DataLoader(SineStream(n=40, rank=rank, world_size=2), batch_size=None, num_workers=2)
+            seen.extend(round(float(x) * 25 + 50) for x, _ in loader)
+        self.assertEqual(sorted(seen), list(range(40)))
+
+    def _loss(self, data_layer):
+        trainable_module = nemo.backends.pytorch.tutorials.TaylorNet(dim=4)
+        loss = nemo.backends.pytorch.tutorials.MSELoss()
+        x, y = data_layer()
+        return loss(predictions=trainable_module(x=x), target=y)
+
+    def test_endless_stream_steps_per_epoch(self):
+        loss_tensor = self._loss(SineStreamDataLayer(batch_size=16))
+        callback = EpochCounter()
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor],
+            optimizer="sgd",
+            optimization_params={"lr": 0.0003, "num_epochs": 3, "steps_per_epoch": 5},
+            batches_per_step=2,
+            callbacks=[callback],
+        )
+        self.assertEqual(optimizer.step, 15)
+        self.assertEqual(optimizer.epoch_num, 3)
+        self.assertEqual(callback.epoch_steps, [0, 5, 10])
+
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor], optimizer="sgd", optimization_params={"lr": 0.0003, "max_steps": 7},
+        )
+        self.assertEqual(optimizer.step, 7)
+
+    def test_finite_stream(self):
+        data_layer = SineStreamDataLayer(batch_size=16, n=100)
+        loss_tensor = self._loss(data_layer)
+        optimizer = nemo.backends.pytorch.actions.PtActions()
+        optimizer.train(
+            tensors_to_optimize=[loss_tensor], optimizer="sgd", optimization_params={"lr": 0.0003, "num_epochs": 2},
+        )
+        # epochs end with the stream, 7 batches of 100 points
+        self.assertEqual(optimizer.step, 14)
+
+        x, y = data_layer()
+        evaluated = optimizer.infer(tensors=[y], verbose=True)
+        self.assertEqual(sum(batch.shape[0] for batch in evaluated[0]), 100)
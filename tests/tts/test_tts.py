@@ -19,9 +19,12 @@
 import os
 import tarfile
 
+import torch
+
 import nemo
 import nemo.collections.asr as nemo_asr
 import nemo.collections.tts as nemo_tts
+from nemo.collections.tts.parts.waveglow import STFTBiasDenoiser
 from tests.common_setup import NeMoUnitTest
 
 logging = nemo.logging
@@ -186,3 +189,80 @@ class TestTTSPytorch(NeMoUnitTest):
         optimizer.train(
             [loss_t], callbacks=[callback], optimizer="sgd", optimization_params={"num_epochs": 10, "lr": 0.0003},
         )
+
+    def test_tacotron2_decoder_infer(self):
+        decoder = nemo_tts.Tacotron2DecoderInfer(
+            n_mel_channels=20,
+            encoder_embedding_dim=32,
+            prenet_dim=16,
+            max_decoder_steps=200,
+            decoder_rnn_dim=48,
+            attention_rnn_dim=48,
+            attention_dim=16,
+            attention_location_n_filters=4,
+            attention_location_kernel_size=5,
+        ).decoder
+        decoder.eval()
+        with torch.no_grad():
+            decoder.gate_layer.linear_layer.bias.fill_(-0.3)
+        memory = torch.randn(6, 15, 32, device=decoder.gate_layer.linear_layer.weight.device)
+        memory_lengths = torch.tensor([15, 12, 9, 15, 5, 7], device=memory.device)
+
+        # without early stopping the whole batch is decoded for max_decoder_steps
+        outputs = []
+        for early_stopping in [True, False]:
+            decoder.early_stopping = early_stopping
+            torch.manual_seed(0)
+            with torch.no_grad():
+                outputs.append(decoder.infer(memory, memory_lengths))
+        (mel, gate, alignments, mel_len), (full_mel, full_gate, full_alignments, full_mel_len) = outputs
+
+        self.assertTrue(torch.equal(mel_len, full_mel_len))
+        self.assertEqual(mel.size(2), int(mel_len.max()))
+        for i, length in enumerate(mel_len.tolist()):
+            self.assertTrue(torch.allclose(mel[i, :, :length], full_mel[i, :, :length], atol=1e-5))
+            self.assertTrue(torch.allclose(gate[i, :length], full_gate[i, :length], atol=1e-5))
+            self.assertTrue(torch.allclose(alignments[i, :length], full_alignments[i, :length], atol=1e-5))
+
+    def test_stft_bias_denoiser_streaming(self):
+        torch.manual_seed(0)
+        denoiser = STFTBiasDenoiser(0.01 * torch.randn(1, 22050), strength=0.5)
+        audio = torch.randn(2, 10037)
+        expected = denoiser.denoise(audio)
+        for chunk_size in [100, 4096]:
+            chunks = [denoiser.update(audio[:, i : i + chunk_size]) for i in range(0, audio.size(1), chunk_size)]
+            result = torch.cat(chunks + [denoiser.flush()], dim=1)
+            self.assertEqual(result.shape, expected.shape)
+            self.assertTrue(torch.allclose(result, expected, atol=1e-5))
+
+        # flushing without any audio gives empty audio
+        self.assertEqual(denoiser.flush().shape, (1, 0))
+
+    def test_waveglow_stream(self):
+        torch.manual_seed(0)
+        waveglow = nemo_tts.WaveGlowInferNM(
+            n_mel_channels=8, n_flows=2, n_group=4, n_wn_layers=1, n_wn_channels=8, sigma=0.0
+        )
+        waveglow.eval()
+        # the last layer of the flows is initialized to zeros
+        with torch.no_grad():
+            for wn in waveglow.waveglow.WN:
+                wn.end.weight.normal_(std=0.1)
+                wn.end.bias.normal_(std=0.1)
+        mel = torch.randn(2, 8, 40, device=waveglow._device)
+        expected = waveglow.forward(mel)
+        chunk_size, overlap, hop_length = 16, 4, 256
+        result = torch.cat(list(waveglow.stream(mel, chunk_size=chunk_size, overlap=overlap)), dim=1)
+        self.assertEqual(result.shape, expected.shape)
+
+        # chunks are crossfaded over their overlap and match the whole
+        # utterance everywhere else
+        exact = torch.ones(result.size(1), dtype=torch.bool)
+        for start in range(chunk_size - overlap, mel.size(2), chunk_size - overlap):
+            exact[start * hop_length : (start + overlap) * hop_length] = False
+        self.assertTrue(torch.allclose(result[:, exact], expected[:, exact], atol=1e-5))
+        self.assertTrue(torch.allclose(result, expected, atol=1e-2))
+
+        for chunk_size, overlap in [(0, 0), (4, 3), (4, -1)]:
+            with self.assertRaises(ValueError):
+                next(waveglow.waveglow.infer_chunks(mel, chunk_size=chunk_size, overlap=overlap))